@@ -0,0 +1,89 @@
+"""
+Compares what an ops dashboard poll costs by scanning every ride with Ride.ride_is_active() against reading the
+manager's per-status sets, with a small share of all rides still active. Also reports what keeping the sets
+up to date adds to a status change.
+Run from the repository root:
+    python -m benchmarks.bench_active_rides --rides 1000000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+
+RIDES = 1_000_000
+ACTIVE_SHARE = 0.01
+POLLS = 5
+TRANSITIONS = 200_000
+
+
+def build_manager(city: SyntheticCity, ride_count: int, seed: int) -> RideSharingManager:
+    rng = random.Random(seed)
+    manager = RideSharingManager()
+    manager.initialize_spatial_index(MISSISSAUGA_BBOX)
+    rider = next(city.riders())
+    for _ in range(ride_count):
+        pickup = Location(*city.destination())
+        ride = Ride(rider, pickup, pickup)
+        manager.add_ride(ride)
+        if rng.random() < ACTIVE_SHARE:
+            ride.ride_status = rng.choice((RideStatus.REQUESTED, RideStatus.PICKING_UP, RideStatus.IN_TRIP))
+        else:
+            ride.ride_status = RideStatus.COMPLETED if rng.random() < 0.9 else RideStatus.CANCELLED
+    return manager
+
+
+def time_poll(poll) -> float:
+    started_at = time.perf_counter()
+    for _ in range(POLLS):
+        poll()
+    return (time.perf_counter() - started_at) / POLLS * 1000
+
+
+def scan_poll(manager: RideSharingManager):
+    active = [ride for ride in manager.rides.values() if ride.ride_is_active()]
+    Counter(ride.ride_status for ride in manager.rides.values())
+    regions = manager.ride_tracker.regions
+    Counter(regions.shard_of(ride.start_location.longitude, ride.start_location.latitude) for ride in active)
+
+
+def tracked_poll(manager: RideSharingManager):
+    manager.active_rides()
+    manager.ride_status_counts()
+    manager.active_ride_counts_by_region()
+
+
+def time_transitions(manager: RideSharingManager | None, city: SyntheticCity) -> float:
+    rider = next(city.riders())
+    rides = [Ride(rider, Location(*city.destination()), Location(*city.destination())) for _ in range(TRANSITIONS // 2)]
+    if manager is not None:
+        for ride in rides:
+            manager.add_ride(ride)
+    started_at = time.perf_counter()
+    for ride in rides:
+        ride.ride_status = RideStatus.REQUESTED
+        ride.ride_status = RideStatus.CANCELLED
+    return (time.perf_counter() - started_at) / TRANSITIONS * 1_000_000
+
+
+def run_benchmark(ride_count: int = RIDES, seed: int = 7):
+    city = SyntheticCity(seed, 0, 1)
+    manager = build_manager(city, ride_count, seed)
+    print(f"{ride_count:,} rides, {len(manager.active_rides()):,} active")
+    print(f"dashboard poll, scan:          {time_poll(lambda: scan_poll(manager)):8.2f} ms")
+    print(f"dashboard poll, status sets:   {time_poll(lambda: tracked_poll(manager)):8.2f} ms")
+    print(f"status change, untracked ride: {time_transitions(None, city):8.2f} us")
+    print(f"status change, tracked ride:   {time_transitions(RideSharingManager(), city):8.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark active-ride tracking.")
+    parser.add_argument("--rides", type=int, default=RIDES)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.rides, arguments.seed)
@@ -0,0 +1,81 @@
+"""
+Per-request greedy matching (RideSystem.request_ride) vs the batching dispatcher on the same synthetic load.
+Drivers stay busy once matched, so supply tightens through the run and early greedy choices start to hurt.
+The dispatcher gathers each batch's candidates in one vectorized query over the driver store, so its lead
+in requests per second grows with the fleet while per-request searches slow down as supply thins out.
+Run from the repository root:
+    python -m benchmarks.bench_batch_dispatch
+"""
+import random
+import time
+
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.batch_dispatcher import BatchDispatcher
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+# (drivers, requests per batch window, windows); the last requests nearly exhaust the fleet
+SCENARIOS = [(500, 25, 18), (2_000, 100, 18), (5_000, 250, 19), (20_000, 500, 38)]
+
+
+def random_point(rng: random.Random):
+    return rng.uniform(MISSISSAUGA_BBOX[1], MISSISSAUGA_BBOX[3]), rng.uniform(MISSISSAUGA_BBOX[0], MISSISSAUGA_BBOX[2])
+
+
+def build_city(seed: int, driver_count: int, rider_count: int):
+    rng = random.Random(seed)
+    ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+    for i in range(driver_count):
+        latitude, longitude = random_point(rng)
+        ride_system.ride_sharing_manager.register_driver(Driver(f"d{i}@email.com", f"d{i}", longitude, latitude))
+    requests = []
+    for i in range(rider_count):
+        latitude, longitude = random_point(rng)
+        rider = Rider(f"r{i}@email.com", f"r{i}", longitude, latitude)
+        requests.append((rider, Location(*random_point(rng))))
+    return ride_system, requests
+
+
+def summarize(rides, elapsed: float):
+    matched = [ride for ride in rides if ride.driver is not None and ride.driver.current_ride is ride]
+    pickup = [ride.start_location.calculate_distance_in_km(ride.driver.current_location) for ride in matched]
+    average = sum(pickup) / len(pickup) if pickup else float("nan")
+    return len(matched), average, len(rides) / elapsed
+
+
+def run_greedy(seed, driver_count, batch_size, waves):
+    ride_system, requests = build_city(seed, driver_count, batch_size * waves)
+    rides = []
+    start = time.perf_counter()
+    for rider, destination in requests:
+        rides.append(ride_system.request_ride(rider, destination))
+    return summarize(rides, time.perf_counter() - start)
+
+
+def run_batched(seed, driver_count, batch_size, waves):
+    ride_system, requests = build_city(seed, driver_count, batch_size * waves)
+    dispatcher = BatchDispatcher(ride_system, max_wait_seconds=0.0)
+    rides = []
+    start = time.perf_counter()
+    for wave in range(waves):
+        for rider, destination in requests[wave * batch_size:(wave + 1) * batch_size]:
+            rides.append(dispatcher.submit(rider, destination))
+        dispatcher.dispatch()
+    return summarize(rides, time.perf_counter() - start)
+
+
+def run_benchmark(seed: int = 7):
+    print(f"{'drivers':>8} {'batch':>6} {'requests':>9} | {'greedy matched':>14} {'pickup km':>9} {'req/s':>8} |"
+          f" {'batch matched':>13} {'pickup km':>9} {'req/s':>8}")
+    for driver_count, batch_size, waves in SCENARIOS:
+        greedy = run_greedy(seed, driver_count, batch_size, waves)
+        batched = run_batched(seed, driver_count, batch_size, waves)
+        print(f"{driver_count:>8} {batch_size:>6} {batch_size * waves:>9} | {greedy[0]:>14} {greedy[1]:>9.3f} {greedy[2]:>8.0f} |"
+              f" {batched[0]:>13} {batched[1]:>9.3f} {batched[2]:>8.0f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,67 @@
+"""
+Registers a fleet one driver at a time and with RideSharingManager.register_drivers, then compares
+registration time and the radius search, whose vectorized distance pass gathers driver coordinates
+by store slot and so benefits from the Hilbert-ordered slots of the bulk path. Every run gets a fresh process.
+Run from the repository root:
+    python -m benchmarks.bench_bulk_registration --drivers 100000 1000000
+"""
+import argparse
+import multiprocessing
+import time
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride import Ride
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+SIZES = [100_000, 1_000_000]
+QUERIES = 1_000
+RADIUS_KM = 1.0
+
+
+def time_radius_search(ride_system: RideSystem, city: SyntheticCity) -> float:
+    rides = []
+    for _ in range(QUERIES):
+        latitude, longitude = city.destination()
+        rides.append(Ride(Rider(None, "rider", longitude, latitude), Location(latitude, longitude), Location(latitude, longitude)))
+    started_at = time.perf_counter()
+    for ride in rides:
+        ride_system.search_driver_in_radius_km(ride, RADIUS_KM)
+    return (time.perf_counter() - started_at) / QUERIES * 1_000_000
+
+
+def run_configuration(seed: int, driver_count: int, bulk: bool):
+    city = SyntheticCity(seed, driver_count, 1)
+    drivers = list(city.drivers())
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    started_at = time.perf_counter()
+    if bulk:
+        manager.register_drivers(drivers)
+    else:
+        for driver in drivers:
+            manager.register_driver(driver)
+    return time.perf_counter() - started_at, time_radius_search(ride_system, city)
+
+
+def run_benchmark(sizes=SIZES, seed: int = 7):
+    print(f"{'drivers':>9} | {'one by one s':>12} {'bulk s':>7} {'speedup':>7} | {'radius us':>9} {'bulk radius us':>14}")
+    context = multiprocessing.get_context("spawn")
+    for driver_count in sizes:
+        results = []
+        for bulk in (False, True):
+            with context.Pool(1) as pool:
+                results.append(pool.apply(run_configuration, (seed, driver_count, bulk)))
+        (single_seconds, single_radius), (bulk_seconds, bulk_radius) = results
+        print(f"{driver_count:>9} | {single_seconds:>12.2f} {bulk_seconds:>7.2f} {single_seconds / bulk_seconds:>6.1f}x |"
+              f" {single_radius:>9.0f} {bulk_radius:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk driver registration.")
+    parser.add_argument("--drivers", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.drivers, arguments.seed)
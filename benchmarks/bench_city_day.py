@@ -0,0 +1,72 @@
+"""
+Simulates a full day of a mid-size city with CitySimulation and reports events per wall-clock second.
+Demand follows a weekday profile with morning and evening peaks, drawn as a Poisson process by thinning.
+Run from the repository root:
+    python -m benchmarks.bench_city_day
+"""
+import random
+import time
+from typing import Iterator
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.city_simulation import CitySimulation, RideRequestEvent
+from src.usecases.ride_system import RideSystem
+
+DAY_SECONDS = 24 * 3600
+DRIVERS = 3_000
+RIDERS = 40_000
+TRIPS_PER_DAY = 60_000
+STEP_SECONDS = 15.0
+# Relative demand for each hour of the day
+HOURLY_DEMAND = [0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.0, 1.8, 2.0, 1.2, 0.9, 1.0,
+                 1.2, 1.1, 1.0, 1.2, 1.6, 2.0, 1.9, 1.4, 1.1, 0.9, 0.6, 0.4]
+
+
+"""
+Yields (time, rider, destination) requests for one day, in time order.
+Args:
+    city (SyntheticCity): Supplies destinations.
+    riders (list): The rider population; a rider who is still travelling is skipped by the simulation.
+    trips (int): The expected number of requests over the day.
+    seed (int): Seeds the arrival process.
+"""
+def daily_requests(city: SyntheticCity, riders: list, trips: int, seed: int) -> Iterator[RideRequestEvent]:
+    rng = random.Random(f"{seed}-arrivals")
+    peak_rate = trips * max(HOURLY_DEMAND) / sum(HOURLY_DEMAND) / 3600
+    now = 0.0
+    while True:
+        now += rng.expovariate(peak_rate)
+        if now >= DAY_SECONDS:
+            return
+        if rng.random() * max(HOURLY_DEMAND) <= HOURLY_DEMAND[int(now // 3600)]:
+            yield now, city.requesting_rider(riders), Location(*city.destination())
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS, rider_count: int = RIDERS, trips: int = TRIPS_PER_DAY):
+    city = SyntheticCity(seed, driver_count, rider_count)
+    ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+    for driver in city.drivers():
+        ride_system.ride_sharing_manager.register_driver(driver)
+    riders = list(city.riders())
+
+    simulation = CitySimulation(ride_system, step_seconds=STEP_SECONDS)
+    simulation.add_requests(daily_requests(city, riders, trips, seed))
+    started_at = time.perf_counter()
+    for hour in range(1, 25):
+        simulation.run(until=hour * 3600)
+    elapsed = time.perf_counter() - started_at
+
+    stats = simulation.stats
+    events = simulation.queue.processed
+    print(f"{driver_count} drivers, {rider_count} riders, ~{trips} trips, {STEP_SECONDS:g}s movement steps")
+    print(f"simulated 24h in {elapsed:.1f}s wall clock: {events} events, {events / elapsed:,.0f} events/s")
+    print(f"requests {stats.requests}, matched {stats.matched}, unmatched {stats.unmatched}, completed {stats.completed},"
+          f" cancelled {stats.cancelled}, rejected (rider busy) {stats.rejected}")
+    if stats.pickups:
+        print(f"average pickup wait {stats.total_wait_seconds / stats.pickups:.0f}s, driver location updates {stats.moves}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
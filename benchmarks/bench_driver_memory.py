@@ -0,0 +1,99 @@
+"""
+Per-driver memory of registered drivers: the previous dict-backed Driver/Location objects vs the
+slotted Driver views over the columnar DriverStore. Spatial index entries are excluded since both
+layouts need one. The identity strings (id, email, name) are built once and shared by both runs.
+Both layouts carry the pooling fields (capacity and an empty stop list) a registered Driver has.
+The whole-driver reduction is checked against the 5x target; the position-only reduction is printed
+separately since it covers just the fields the store took over.
+Run from the repository root:
+    python -m benchmarks.bench_driver_memory
+"""
+import gc
+import random
+import tracemalloc
+
+from src.core.driver_store import DriverStore
+from src.models.users.driver import DEFAULT_CAPACITY, Driver
+
+DRIVER_COUNTS = [10_000, 100_000, 1_000_000]
+TARGET_REDUCTION = 5.0
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+
+class DictLocation:
+    def __init__(self, latitude: float, longitude: float):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class DictDriver:
+    def __init__(self, user_id: str, email: str, user_name: str, longitude: float, latitude: float):
+        self.user_id = user_id
+        self.email = email
+        self.user_name = user_name
+        self.current_location = DictLocation(latitude, longitude)
+        self.is_available = True
+        self.current_ride = None
+        self.drive_history = []
+        self.capacity = DEFAULT_CAPACITY
+        self.stops = []
+
+
+def traced_bytes(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def build_slotted(emails, coordinates):
+    store = DriverStore()
+    drivers = []
+    for email, (latitude, longitude) in zip(emails, coordinates):
+        driver = Driver.__new__(Driver)
+        driver.user_id, driver.email, driver.user_name = email, email, email
+        driver.ride_sharing_manager = None
+        driver.current_ride = None
+        driver.drive_history = []
+        driver.capacity = DEFAULT_CAPACITY
+        driver.stops = []
+        driver._is_available = True
+        driver.attach_store(store, store.allocate(email, latitude, longitude, True))
+        drivers.append(driver)
+    return store, drivers
+
+
+def run_benchmark(seed: int = 42):
+    print(f"{'drivers':>9} {'dict-backed (B)':>16} {'slotted+store (B)':>18} {'reduction':>10} {'5x target':>10}"
+          f" {'position dict (B)':>18} {'position store (B)':>19} {'reduction':>10}")
+    for count in DRIVER_COUNTS:
+        rng = random.Random(seed)
+        coordinates = [
+            (rng.uniform(MISSISSAUGA_BBOX[1], MISSISSAUGA_BBOX[3]), rng.uniform(MISSISSAUGA_BBOX[0], MISSISSAUGA_BBOX[2]))
+            for _ in range(count)
+        ]
+        emails = [f"driver{i}@email.com" for i in range(count)]
+
+        dict_bytes = traced_bytes(lambda: [
+            DictDriver(email, email, email, longitude, latitude)
+            for email, (latitude, longitude) in zip(emails, coordinates)
+        ]) / count
+        slotted_bytes = traced_bytes(lambda: build_slotted(emails, coordinates)) / count
+
+        # Position and availability alone: a Location object per driver vs three store columns
+        dict_position_bytes = traced_bytes(lambda: [DictLocation(latitude, longitude) for latitude, longitude in coordinates]) / count
+        store = DriverStore()
+        store_position_bytes = traced_bytes(lambda: [
+            store.allocate(email, latitude, longitude, True) for email, (latitude, longitude) in zip(emails, coordinates)
+        ] and store) / count
+
+        reduction = dict_bytes / slotted_bytes
+        print(f"{count:>9} {dict_bytes:>16.1f} {slotted_bytes:>18.1f} {reduction:>9.1f}x {'met' if reduction >= TARGET_REDUCTION else 'not met':>10}"
+              f" {dict_position_bytes:>18.1f} {store_position_bytes:>19.1f} {dict_position_bytes / store_position_bytes:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,45 @@
+"""
+Microbenchmark: scalar Location.calculate_distance_in_km loop vs the vectorized NumPy kernel.
+Run from the repository root:
+    python -m benchmarks.bench_haversine
+"""
+import random
+import time
+
+from src.models.location.location import Location
+from src.core.distance import PreparedCoordinates, haversine_one_to_many
+
+SIZES = [10, 1_000, 100_000]
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+
+def best_of(repeats: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(seed: int = 42):
+    rng = random.Random(seed)
+    origin = Location(latitude=43.60, longitude=-79.65)
+    print(f"{'points':>8} {'scalar (ms)':>12} {'numpy (ms)':>12} {'numpy+prep (ms)':>16} {'speedup':>8}")
+    for size in SIZES:
+        latitudes = [rng.uniform(MISSISSAUGA_BBOX[1], MISSISSAUGA_BBOX[3]) for _ in range(size)]
+        longitudes = [rng.uniform(MISSISSAUGA_BBOX[0], MISSISSAUGA_BBOX[2]) for _ in range(size)]
+        locations = [Location(latitude, longitude) for latitude, longitude in zip(latitudes, longitudes)]
+        points = PreparedCoordinates(latitudes, longitudes)
+        repeats = 5 if size >= 100_000 else 50
+
+        scalar = best_of(repeats, lambda: [origin.calculate_distance_in_km(location) for location in locations])
+        vectorized = best_of(repeats, lambda: haversine_one_to_many(origin.latitude, origin.longitude, points))
+        prepared = best_of(repeats, lambda: haversine_one_to_many(
+            origin.latitude, origin.longitude, PreparedCoordinates(latitudes, longitudes)
+        ))
+        print(f"{size:>8} {scalar * 1e3:>12.3f} {vectorized * 1e3:>12.3f} {prepared * 1e3:>16.3f} {scalar / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
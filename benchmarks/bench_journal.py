@@ -0,0 +1,81 @@
+"""
+Measures what journaling adds to the request, start and complete lifecycle, for each durability mode.
+"always" runs with several dispatcher threads so group commit can share fsyncs between them.
+Run from the repository root:
+    python -m benchmarks.bench_journal
+"""
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.journal import DURABILITY_ALWAYS, DURABILITY_INTERVAL, DURABILITY_NONE, RideJournal
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 10_000
+RIDES = 20_000
+THREADS = 4
+# Best of several runs, since a single run is noisy on a shared machine
+REPEATS = 3
+
+
+def run_rides(ride_system: RideSystem, city: SyntheticCity, riders: list, count: int):
+    for index in range(count):
+        ride = ride_system.request_ride(riders[index % len(riders)], Location(*city.destination()))
+        if ride.driver is not None:
+            ride.start_ride()
+            ride_system.complete_ride(ride)
+
+
+"""
+Runs the lifecycle once and returns microseconds per ride.
+Args:
+    durability (str | None): The journal durability mode, or None for no journal.
+    directory (str): Where the journal is written.
+    threads (int): Dispatcher threads sharing the manager.
+"""
+def time_mode(durability: str | None, directory: str, threads: int = 1, seed: int = 7) -> float:
+    city = SyntheticCity(seed, DRIVERS, threads * 100)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    for driver in city.drivers():
+        manager.register_driver(driver)
+    riders = list(city.riders())
+    journal = None
+    if durability is not None:
+        path = os.path.join(directory, f"{durability}.journal")
+        if os.path.exists(path):
+            os.remove(path)
+        journal = RideJournal(path, durability)
+        manager.attach_journal(journal)
+
+    per_thread = RIDES // threads
+    workers = [
+        threading.Thread(target=run_rides, args=(ride_system, city, riders[index::threads], per_thread)) for index in range(threads)
+    ]
+    started_at = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if journal is not None:
+        journal.close()
+    return (time.perf_counter() - started_at) / (per_thread * threads) * 1_000_000
+
+
+def run_benchmark():
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = min(time_mode(None, directory) for _ in range(REPEATS))
+        print(f"{'mode':>22} | {'us/ride':>8} | {'overhead':>8}")
+        print(f"{'no journal':>22} | {baseline:>8.1f} | {'':>8}")
+        for durability, threads in ((DURABILITY_NONE, 1), (DURABILITY_INTERVAL, 1), (DURABILITY_ALWAYS, 1), (DURABILITY_ALWAYS, THREADS)):
+            per_ride = min(time_mode(durability, directory, threads) for _ in range(REPEATS))
+            label = f"{durability} ({threads} thread{'s' if threads > 1 else ''})"
+            print(f"{label:>22} | {per_ride:>8.1f} | {per_ride / baseline - 1:>+8.1%}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,109 @@
+"""
+Fills a city with pooled routes from a burst of requests, then measures how long inserting one more request
+takes as the number of candidate routes grows, against re-simulating every insertion of every route in pure
+Python (whose answers the vectorized kernel must match), and how many riders share each car.
+Run from the repository root:
+    python -m benchmarks.bench_pooling
+"""
+import argparse
+import time
+from math import inf
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.pool_insertion import best_insertion
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.pool_dispatcher import PoolDispatcher
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 3_000
+RIDERS = 20_000
+PROBES = 200
+BURSTS = [500, 2_000, 6_000]
+CORRIDOR_RADIUS_KM = 3.0
+
+
+class FrozenClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def naive_cost(pool: PoolDispatcher, driver, pickup: Location, dropoff: Location, now: float) -> float:
+    seconds_per_km = 3600.0 / pool.speed_kmh
+    trip = pickup.calculate_distance_in_km(dropoff) * seconds_per_km
+    stops = [(stop.location, stop.deadline - now, 1 if stop.is_pickup else -1) for stop in driver.stops]
+    onboard = sum(-delta for _, _, delta in stops)
+    best = inf
+    for pickup_at in range(len(stops) + 1):
+        for dropoff_at in range(pickup_at, len(stops) + 1):
+            route = stops[:pickup_at] + [(pickup, pool.max_wait_seconds, 1)] + stops[pickup_at:dropoff_at] + [(dropoff, inf, -1)] + stops[dropoff_at:]
+            position, elapsed, load, feasible, picked_up_at = driver.current_location, 0.0, onboard, True, 0.0
+            for index, (location, deadline, delta) in enumerate(route):
+                elapsed += position.calculate_distance_in_km(location) * seconds_per_km
+                position, load = location, load + delta
+                if index == pickup_at:
+                    picked_up_at = elapsed
+                if elapsed > deadline or load > driver.capacity or (index == dropoff_at + 1 and elapsed - picked_up_at > trip * pool.max_detour_ratio):
+                    feasible = False
+                    break
+            if feasible:
+                before = 0.0
+                position = driver.current_location
+                for location, _, _ in stops:
+                    before += position.calculate_distance_in_km(location) * seconds_per_km
+                    position = location
+                best = min(best, elapsed - before)
+    return best
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS):
+    city = SyntheticCity(seed, driver_count, RIDERS)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    manager.register_drivers(city.drivers())
+    riders = list(city.riders())
+    clock = FrozenClock()
+    pool = PoolDispatcher(ride_system, corridor_radius_km=CORRIDOR_RADIUS_KM, clock=clock)
+
+    print(f"{driver_count:,} drivers, {CORRIDOR_RADIUS_KM:g} km corridors")
+    print(f"{'requests':>8} {'matched':>7} {'cars':>5} {'riders/car':>10} | {'routes/req':>10} {'kernel us':>9} {'match us':>8} {'naive us':>9}")
+    requested = 0
+    for burst in BURSTS:
+        while requested < burst:
+            rider = riders[requested]
+            requested += 1
+            if rider.current_ride is None:
+                pool.request_ride(rider, Location(*city.destination()))
+        matched = sum(len(driver.stops) for driver in pool.routes.values()) // 2
+
+        probes = [(riders[-1 - index].current_location, Location(*city.destination())) for index in range(PROBES)]
+        candidates, kernel_s, naive_s = 0, 0.0, 0.0
+        for pickup, dropoff in probes:
+            drivers = pool.candidates(pickup)
+            candidates += len(drivers)
+            arrays = pool.route_arrays(drivers, clock.now)
+            trip_seconds = pickup.calculate_distance_in_km(dropoff) / pool.speed_kmh * 3600.0
+            started_at = time.perf_counter()
+            insertion = best_insertion(*arrays, pickup, dropoff, pool.max_wait_seconds, trip_seconds * pool.max_detour_ratio, pool.speed_kmh)
+            kernel_s += time.perf_counter() - started_at
+            started_at = time.perf_counter()
+            naive = min(naive_cost(pool, driver, pickup, dropoff, clock.now) for driver in drivers)
+            naive_s += time.perf_counter() - started_at
+            assert (insertion is None and naive == inf) or abs(insertion.added_seconds - naive) < 1e-6
+        started_at = time.perf_counter()
+        for pickup, _ in probes:
+            pool.route_arrays(pool.candidates(pickup), clock.now)
+        prepare_s = time.perf_counter() - started_at
+        print(f"{burst:>8} {matched:>7} {len(pool.routes):>5} {matched / max(len(pool.routes), 1):>10.2f} | {candidates / PROBES:>10.0f}"
+              f" {kernel_s / PROBES * 1e6:>9.0f} {(kernel_s + prepare_s) / PROBES * 1e6:>8.0f} {naive_s / PROBES * 1e6:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled ride insertion.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.seed, arguments.drivers)
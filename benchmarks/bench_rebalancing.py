@@ -0,0 +1,67 @@
+"""
+Simulates the same day of demand with idle drivers left where their last trip ended and with a Rebalancer
+moving them towards forecast demand, and compares how often the nearest-driver search has to expand past
+its first-pass radius (the dispatch metrics' expansion rate), grid rings visited per search, pickup distance
+and wait.
+Run from the repository root:
+    python -m benchmarks.bench_rebalancing
+"""
+import argparse
+import time
+
+from benchmarks.bench_city_day import daily_requests
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.demand_forecast import DemandForecaster
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.zone_grid import ZoneGrid
+from src.usecases.city_simulation import CitySimulation
+from src.usecases.rebalancer import Rebalancer
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 1_500
+RIDERS = 20_000
+TRIPS_PER_DAY = 30_000
+STEP_SECONDS = 15.0
+REBALANCE_SECONDS = 300.0
+FORECAST_BUCKET_SECONDS = 900.0
+ZONE_SIZE_KM = 2.0
+
+
+def simulate_day(seed: int, driver_count: int, trips: int, rebalance: bool):
+    city = SyntheticCity(seed, driver_count, RIDERS)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    manager.register_drivers(city.drivers())
+    manager.enable_metrics()
+    riders = list(city.riders())
+
+    simulation = CitySimulation(ride_system, step_seconds=STEP_SECONDS)
+    if rebalance:
+        forecaster = DemandForecaster(ZoneGrid(MISSISSAUGA_BBOX, ZONE_SIZE_KM), FORECAST_BUCKET_SECONDS, clock=lambda: simulation.now)
+        simulation.enable_rebalancing(Rebalancer(ride_system, forecaster), REBALANCE_SECONDS)
+    simulation.add_requests(daily_requests(city, riders, trips, seed))
+    started_at = time.perf_counter()
+    simulation.run()
+    metrics = manager.metrics()
+    counters = metrics["counters"]
+    return (simulation.stats, metrics["rates"]["expansion_rate"], counters["rings_visited"] / counters["nearest_queries"],
+            time.perf_counter() - started_at)
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS, trips: int = TRIPS_PER_DAY):
+    print(f"{driver_count} drivers, ~{trips} trips, {ZONE_SIZE_KM:g} km zones, rebalancing every {REBALANCE_SECONDS:g}s")
+    print(f"{'':>12} | {'expanded':>8} {'rings/search':>12} {'pickup km':>9} {'wait s':>6} {'matched':>7} {'moves':>6} | {'wall s':>6}")
+    for rebalance in (False, True):
+        stats, expansion_rate, rings_per_search, elapsed = simulate_day(seed, driver_count, trips, rebalance)
+        label = "rebalanced" if rebalance else "stay put"
+        print(f"{label:>12} | {expansion_rate:>8.1%} {rings_per_search:>12.2f} {stats.total_pickup_km / max(stats.matched, 1):>9.2f}"
+              f" {stats.total_wait_seconds / max(stats.pickups, 1):>6.0f} {stats.matched:>7} {stats.repositioned:>6} | {elapsed:>6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark predictive driver rebalancing.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--trips", type=int, default=TRIPS_PER_DAY)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.seed, arguments.drivers, arguments.trips)
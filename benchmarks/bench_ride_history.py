@@ -0,0 +1,81 @@
+"""
+Runs many ride lifecycles with finished rides kept in memory, as before, and with a RideHistoryStore attached,
+then compares time per ride, peak memory and the latency of reading a driver's 20 latest rides.
+Every configuration gets a fresh process so peak memory is its own.
+Run from the repository root:
+    python -m benchmarks.bench_ride_history --rides 200000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from benchmarks.run_suite import peak_rss_mb
+from src.core.ride_history import RideHistoryStore
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 5_000
+RIDERS = 20_000
+RIDES = 200_000
+QUERIES = 1_000
+
+
+def run_configuration(seed: int, ride_count: int, history_path: str | None):
+    city = SyntheticCity(seed, DRIVERS, RIDERS)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    drivers = list(city.drivers())
+    manager.register_drivers(drivers)
+    riders = list(city.riders())
+    history = RideHistoryStore(history_path) if history_path else None
+    manager.attach_history(history)
+    baseline_rss = peak_rss_mb()
+
+    started_at = time.perf_counter()
+    for index in range(ride_count):
+        rider = riders[index % len(riders)]
+        ride = ride_system.request_ride(rider, Location(*city.destination()))
+        if ride.driver is not None:
+            ride.start_ride()
+            ride_system.complete_ride(ride)
+            # Riders request from where they were dropped off, so keep them where the drivers are
+            rider.update_location(*city.destination())
+    per_ride = (time.perf_counter() - started_at) / ride_count * 1_000_000
+    rss_growth = peak_rss_mb() - baseline_rss
+
+    rng = random.Random(seed)
+    sample = [rng.choice(drivers) for _ in range(QUERIES)]
+    started_at = time.perf_counter()
+    for driver in sample:
+        if history is not None:
+            history.rides_for_driver(driver.user_id, limit=20)
+        else:
+            driver.drive_history[-20:][::-1]
+    per_query = (time.perf_counter() - started_at) / QUERIES * 1_000_000
+    in_memory = len(manager.rides)
+    if history is not None:
+        history.close()
+    return per_ride, rss_growth, per_query, in_memory
+
+
+def run_benchmark(ride_count: int = RIDES, seed: int = 7):
+    print(f"{'finished rides':>14} | {'us/ride':>7} {'RSS growth MB':>13} {'rides held':>10} | {'latest 20 us':>12}")
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, path in (("in memory", None), ("SQLite + LRU", os.path.join(directory, "history.db"))):
+            with context.Pool(1) as pool:
+                per_ride, rss_growth, per_query, in_memory = pool.apply(run_configuration, (seed, ride_count, path))
+            print(f"{label:>14} | {per_ride:>7.1f} {rss_growth:>13.0f} {in_memory:>10,} | {per_query:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bounded ride history.")
+    parser.add_argument("--rides", type=int, default=RIDES)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.rides, arguments.seed)
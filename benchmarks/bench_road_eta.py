@@ -0,0 +1,108 @@
+"""
+Measures the road-network ETA engine on a generated street grid cut by a river with two bridges: landmark
+preprocessing, one-to-many pickup ETAs for the 50 nearest drivers (cold and cached, exact for all 50 and for
+the 5 that get offers), point-to-point routes with and without landmarks, and how often ranking by road ETA
+picks a different driver than straight-line distance and how much pickup time that saves.
+Run from the repository root:
+    python -m benchmarks.bench_road_eta
+"""
+import argparse
+import time
+import numpy as np
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.eta import RoadNetworkEta
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.road_network import grid_road_graph
+from src.models.location.location import Location
+from src.usecases.ride_system import ETA_CANDIDATES, MAX_DRIVER_OFFERS, RideSystem
+
+DRIVERS = 5_000
+RIDERS = 2_000
+QUERIES = 1_000
+ROUTES = 200
+SPACING_KM = 0.1
+RIVER_LONGITUDE = -79.65
+BRIDGE_LATITUDES = [43.55, 43.65]
+
+
+def percentiles(samples: list) -> str:
+    milliseconds = np.asarray(samples) * 1000
+    return f"p50 {np.percentile(milliseconds, 50):6.2f} ms  p99 {np.percentile(milliseconds, 99):6.2f} ms"
+
+
+def time_pickups(engine: RoadNetworkEta, queries: list, nearest: int | None, cold: bool) -> list:
+    samples = []
+    for latitude, longitude, latitudes, longitudes in queries:
+        if cold:
+            engine.cache.clear()
+        started_at = time.perf_counter()
+        engine.pickup_etas(latitude, longitude, latitudes, longitudes, nearest)
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+def time_routes(engine: RoadNetworkEta, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(ROUTES):
+        start = Location(rng.uniform(43.51, 43.69), rng.uniform(-79.79, -79.51))
+        end = Location(rng.uniform(43.51, 43.69), rng.uniform(-79.79, -79.51))
+        engine.cache.clear()
+        started_at = time.perf_counter()
+        engine.route(start, end)
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS):
+    started_at = time.perf_counter()
+    graph = grid_road_graph(MISSISSAUGA_BBOX, SPACING_KM, river_longitude=RIVER_LONGITUDE, bridge_latitudes=BRIDGE_LATITUDES)
+    build_s = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    engine = RoadNetworkEta(graph)
+    landmarks_s = time.perf_counter() - started_at
+    print(f"{len(graph):,} nodes, {graph.edge_count:,} edges: built in {build_s:.2f} s, "
+          f"{len(engine.landmarks)} landmarks in {landmarks_s:.2f} s")
+
+    city = SyntheticCity(seed, driver_count, RIDERS)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    manager.register_drivers(city.drivers())
+    riders = list(city.riders())
+    queries = []
+    for rider in riders[:QUERIES]:
+        pickup = rider.current_location
+        nearest = manager.nearest_available_drivers(pickup, ETA_CANDIDATES, 6.0)
+        latitudes, longitudes = manager.driver_store.coordinates([driver.slot for driver, _ in nearest])
+        queries.append((pickup.latitude, pickup.longitude, latitudes, longitudes))
+
+    print(f"pickup ETAs for the {ETA_CANDIDATES} nearest drivers, {driver_count:,} drivers:")
+    print(f"  all {ETA_CANDIDATES}, cold      {percentiles(time_pickups(engine, queries, None, True))}")
+    print(f"  top {MAX_DRIVER_OFFERS}, cold       {percentiles(time_pickups(engine, queries, MAX_DRIVER_OFFERS, True))}")
+    time_pickups(engine, queries, None, False)
+    print(f"  all {ETA_CANDIDATES}, cached    {percentiles(time_pickups(engine, queries, None, False))}")
+
+    print("point-to-point routes across the area:")
+    print(f"  A* with landmarks  {percentiles(time_routes(engine, seed))}")
+    print(f"  Dijkstra           {percentiles(time_routes(RoadNetworkEta(graph, landmarks=0), seed))}")
+
+    differs, saved = 0, []
+    engine.cache.clear()
+    for latitude, longitude, latitudes, longitudes in queries:
+        etas = engine.pickup_etas(latitude, longitude, latitudes, longitudes)
+        # Candidates come nearest first by straight line, so index 0 is what straight-line ranking offers first
+        if np.isfinite(etas).any() and etas.argmin() != 0:
+            differs += 1
+            if np.isfinite(etas[0]):
+                saved.append(etas[0] - etas.min())
+    print(f"ETA ranking offers a different first driver for {differs / len(queries):.1%} of pickups, "
+          f"saving {np.mean(saved) if saved else 0:.0f} s of pickup time on those")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark road-network ETAs.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.seed, arguments.drivers)
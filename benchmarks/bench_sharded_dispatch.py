@@ -0,0 +1,77 @@
+"""
+Matching throughput of ShardedRideSystem with worker processes as the shard count grows, on a metro-wide fleet.
+Every configuration sees the same drivers and the same requests, submitted in batches.
+Throughput can only scale up to the number of CPU cores; on fewer cores than shards the extra processes just add IPC.
+Run from the repository root:
+    python -m benchmarks.bench_sharded_dispatch
+"""
+import os
+import random
+import time
+
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+from src.usecases.sharded_ride_system import DriverRecord, RideRequest, ShardedRideSystem
+
+# Greater Toronto Area, roughly 80km x 67km
+METRO_BBOX = [-80.0, 43.4, -79.0, 44.0]
+DRIVERS = 100_000
+REQUESTS = 20_000
+BATCH_SIZE = 1_000
+# (rows, columns)
+LAYOUTS = [(1, 1), (1, 2), (2, 2), (2, 4), (4, 4)]
+
+
+def random_point(rng: random.Random):
+    return rng.uniform(METRO_BBOX[1], METRO_BBOX[3]), rng.uniform(METRO_BBOX[0], METRO_BBOX[2])
+
+
+def build_load(seed: int, driver_count: int, request_count: int):
+    rng = random.Random(seed)
+    drivers = []
+    for i in range(driver_count):
+        latitude, longitude = random_point(rng)
+        drivers.append(DriverRecord(f"d{i}@email.com", f"d{i}", longitude, latitude))
+    requests = [RideRequest(f"r{i}@email.com", f"r{i}", *random_point(rng), *random_point(rng)) for i in range(request_count)]
+    return drivers, requests
+
+
+def run_sharded(rows: int, columns: int, drivers, requests, batch_size: int):
+    with ShardedRideSystem(METRO_BBOX, rows, columns) as system:
+        system.register_drivers(drivers)
+        start = time.perf_counter()
+        matched = 0
+        for first in range(0, len(requests), batch_size):
+            matched += sum(1 for assignment in system.request_rides(requests[first:first + batch_size]) if assignment)
+        return matched, len(requests) / (time.perf_counter() - start)
+
+
+def run_single(drivers, requests):
+    ride_system = RideSystem(METRO_BBOX, RideSharingManager())
+    for record in drivers:
+        ride_system.ride_sharing_manager.register_driver(Driver(record.email, record.user_name, record.longitude, record.latitude))
+    start = time.perf_counter()
+    matched = 0
+    for request in requests:
+        rider = Rider(request.rider_email, request.rider_name, request.pickup_longitude, request.pickup_latitude)
+        ride = ride_system.request_ride(rider, Location(request.destination_latitude, request.destination_longitude))
+        matched += ride.driver is not None
+    return matched, len(requests) / (time.perf_counter() - start)
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS, request_count: int = REQUESTS, batch_size: int = BATCH_SIZE):
+    drivers, requests = build_load(seed, driver_count, request_count)
+    print(f"{driver_count} drivers, {request_count} requests in batches of {batch_size}, {os.cpu_count()} CPU cores")
+    print(f"{'layout':>18} {'shards':>6} {'matched':>8} {'req/s':>8} {'speedup':>8}")
+    matched, baseline = run_single(drivers, requests)
+    print(f"{'single RideSystem':>18} {'-':>6} {matched:>8} {baseline:>8.0f} {1.0:>8.2f}")
+    for rows, columns in LAYOUTS:
+        matched, throughput = run_sharded(rows, columns, drivers, requests, batch_size)
+        print(f"{f'{rows}x{columns} processes':>18} {rows * columns:>6} {matched:>8} {throughput:>8.0f} {throughput / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,65 @@
+"""
+Compares warming a dispatcher by registering every driver one by one with restoring it from a snapshot
+in a fresh process, as after a restart. Also reports snapshot write time and file size.
+Run from the repository root:
+    python -m benchmarks.bench_snapshot --drivers 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import load_snapshot, save_snapshot
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 1_000_000
+RIDERS = 10_000
+IN_FLIGHT = 2_000
+
+
+def time_restore(path: str):
+    started_at = time.perf_counter()
+    manager = load_snapshot(path)
+    return time.perf_counter() - started_at, len(manager.drivers)
+
+
+def run_benchmark(driver_count: int = DRIVERS, seed: int = 7):
+    city = SyntheticCity(seed, driver_count, RIDERS)
+    drivers = list(city.drivers())
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    started_at = time.perf_counter()
+    for driver in drivers:
+        manager.register_driver(driver)
+    register_seconds = time.perf_counter() - started_at
+    riders = list(city.riders())
+    for rider in riders[:IN_FLIGHT]:
+        manager.register_rider(rider)
+        ride_system.request_ride(rider, Location(*city.destination()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.snap")
+        started_at = time.perf_counter()
+        save_snapshot(manager, path)
+        save_seconds = time.perf_counter() - started_at
+        size_mb = os.path.getsize(path) / 1e6
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            restore_seconds, restored_drivers = pool.apply(time_restore, (path,))
+
+    print(f"{driver_count:,} drivers, {len(manager.rides):,} rides in flight")
+    print(f"register one by one: {register_seconds:.2f}s")
+    print(f"snapshot write:      {save_seconds:.2f}s ({size_mb:.0f} MB)")
+    print(f"snapshot restore:    {restore_seconds:.2f}s ({register_seconds / restore_seconds:.1f}x faster than registering)")
+    assert restored_drivers == driver_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark snapshot save and restore.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.drivers, arguments.seed)
@@ -0,0 +1,111 @@
+"""
+Measures a dispatcher worker's cold start, each sample in a fresh interpreter: importing the dispatcher,
+getting the fleet in (registering drivers one by one, in bulk, or restoring a snapshot), and serving the
+first ride request. Every mode also runs with the heavy modules the dispatcher used to import at startup
+(NumPy, pyqtree, http.server, the road network) loaded up front, for comparison.
+Run from the repository root:
+    python -m benchmarks.bench_startup --drivers 10000
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DRIVERS = 10_000
+REPEATS = 5
+MODES = ["register", "bulk", "snapshot"]
+EAGER_MODULES = ["numpy", "pyqtree", "http.server", "src.core.eta", "src.core.demand_forecast"]
+
+
+def run_worker(mode: str, driver_count: int, seed: int, snapshot_path: str, eager: bool) -> dict:
+    started_at = time.perf_counter()
+    if eager:
+        for name in EAGER_MODULES:
+            importlib.import_module(name)
+    from src.usecases.ride_system import start_ride_system
+    import_s = time.perf_counter() - started_at
+
+    # Building the city is test setup, so it is left out of every timing
+    from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+    from src.models.location.location import Location
+    city = SyntheticCity(seed, driver_count, 1)
+    drivers = list(city.drivers()) if mode != "snapshot" else []
+    rider = next(city.riders())
+    destination = Location(*city.destination())
+
+    started_at = time.perf_counter()
+    ride_system = start_ride_system(MISSISSAUGA_BBOX, snapshot_path if mode == "snapshot" else None)
+    manager = ride_system.ride_sharing_manager
+    if mode == "register":
+        for driver in drivers:
+            manager.register_driver(driver)
+    elif mode == "bulk":
+        manager.register_drivers(drivers)
+    manager.register_rider(rider)
+    ready_s = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    ride = ride_system.request_ride(rider, destination)
+    first_match_s = time.perf_counter() - started_at
+    return {"import_s": import_s, "ready_s": ready_s, "first_match_s": first_match_s,
+            "matched": ride.driver is not None, "numpy_loaded": type(sys.modules.get("numpy")).__name__ == "module"}
+
+
+def write_snapshot(path: str, driver_count: int, seed: int):
+    from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+    from src.core.ride_sharing_manager import RideSharingManager
+    from src.core.snapshot import save_snapshot
+    from src.usecases.ride_system import RideSystem
+    manager = RideSharingManager()
+    RideSystem(MISSISSAUGA_BBOX, manager)
+    manager.register_drivers(SyntheticCity(seed, driver_count, 1).drivers())
+    save_snapshot(manager, path)
+
+
+def sample(mode: str, driver_count: int, seed: int, snapshot_path: str, eager: bool) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--worker", mode,
+               "--drivers", str(driver_count), "--seed", str(seed), "--snapshot", snapshot_path]
+    if eager:
+        command.append("--eager")
+    started_at = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - started_at
+    return result
+
+
+def run_benchmark(seed: int = 7, driver_count: int = DRIVERS):
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "fleet.snap")
+        write_snapshot(snapshot_path, driver_count, seed)
+        print(f"{driver_count:,} drivers, median of {REPEATS} fresh processes")
+        print(f"{'mode':>9} {'imports':>7} | {'import ms':>9} {'ready ms':>9} {'1st match ms':>12} {'to match ms':>11} | {'numpy loaded':>12}")
+        for mode in MODES:
+            for eager in (True, False):
+                samples = [sample(mode, driver_count, seed, snapshot_path, eager) for _ in range(REPEATS)]
+                assert all(result["matched"] for result in samples)
+                import_ms, ready_ms, match_ms = (
+                    statistics.median(result[key] for result in samples) * 1000 for key in ("import_s", "ready_s", "first_match_s")
+                )
+                total_ms = statistics.median((result["import_s"] + result["ready_s"] + result["first_match_s"]) * 1000 for result in samples)
+                print(f"{mode:>9} {'eager' if eager else 'lazy':>7} | {import_ms:>9.1f} {ready_ms:>9.1f} {match_ms:>12.2f} {total_ms:>11.1f}"
+                      f" | {str(samples[0]['numpy_loaded']):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dispatcher cold start.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.worker:
+        print(json.dumps(run_worker(arguments.worker, arguments.drivers, arguments.seed, arguments.snapshot, arguments.eager)))
+    else:
+        run_benchmark(arguments.seed, arguments.drivers)
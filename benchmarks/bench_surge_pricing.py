@@ -0,0 +1,97 @@
+"""
+Measures what keeping surge pricing up to date adds to driver pings and ride lifecycles, and how long a
+per-zone multiplier read and a whole-city heatmap snapshot take, against a full recount over every driver.
+Run from the repository root:
+    python -m benchmarks.bench_surge_pricing --drivers 100000
+"""
+import argparse
+import time
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+DRIVERS = 100_000
+RIDERS = 10_000
+PINGS = 200_000
+RIDES = 5_000
+READS = 100_000
+
+
+def build(seed: int, driver_count: int, pricing: bool):
+    city = SyntheticCity(seed, driver_count, RIDERS)
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    drivers = list(city.drivers())
+    manager.register_drivers(drivers)
+    if pricing:
+        ride_system.enable_surge_pricing()
+    return city, ride_system, drivers, list(city.riders())
+
+
+def time_pings(city: SyntheticCity, drivers: list) -> float:
+    pings = []
+    for _ in range(PINGS):
+        driver = city.pinging_driver(drivers)
+        location = driver.current_location
+        pings.append((driver, *city.ping(location.latitude, location.longitude)))
+    started_at = time.perf_counter()
+    for driver, latitude, longitude in pings:
+        driver.update_location(latitude, longitude)
+    return (time.perf_counter() - started_at) / PINGS * 1_000_000
+
+
+def time_rides(city: SyntheticCity, ride_system: RideSystem, riders: list) -> float:
+    started_at = time.perf_counter()
+    for index in range(RIDES):
+        ride = ride_system.request_ride(riders[index % len(riders)], Location(*city.destination()))
+        if ride.driver is not None:
+            ride.start_ride()
+            ride_system.complete_ride(ride)
+    return (time.perf_counter() - started_at) / RIDES * 1_000_000
+
+
+def recount(manager: RideSharingManager, pricing):
+    counts = [0] * len(pricing.available)
+    for driver in manager.drivers.values():
+        if driver.is_available:
+            location = driver.current_location
+            counts[pricing.zones.zone_of(location.latitude, location.longitude)] += 1
+    return counts
+
+
+def run_benchmark(driver_count: int = DRIVERS, seed: int = 7):
+    results = {}
+    for pricing in (False, True):
+        city, ride_system, drivers, riders = build(seed, driver_count, pricing)
+        results[pricing] = (time_pings(city, drivers), time_rides(city, ride_system, riders))
+    pricing = ride_system.ride_sharing_manager.pricing
+    zones = len(pricing.available)
+
+    started_at = time.perf_counter()
+    for index in range(READS):
+        pricing.zone_multiplier(index % zones)
+    read_us = (time.perf_counter() - started_at) / READS * 1_000_000
+    started_at = time.perf_counter()
+    heatmap = pricing.heatmap()
+    heatmap_ms = (time.perf_counter() - started_at) * 1000
+    started_at = time.perf_counter()
+    counts = recount(ride_system.ride_sharing_manager, pricing)
+    recount_ms = (time.perf_counter() - started_at) * 1000
+    assert heatmap.available_drivers.ravel().tolist() == counts
+
+    print(f"{driver_count:,} drivers, {zones:,} zones of {pricing.zones.zone_size_km} km")
+    print(f"{'':>16} | {'no pricing':>10} | {'pricing':>8}")
+    print(f"{'ping us':>16} | {results[False][0]:>10.2f} | {results[True][0]:>8.2f}")
+    print(f"{'ride us':>16} | {results[False][1]:>10.1f} | {results[True][1]:>8.1f}")
+    print(f"zone multiplier read: {read_us:.2f} us")
+    print(f"heatmap snapshot:     {heatmap_ms:.2f} ms (full recount of supply: {recount_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark surge pricing.")
+    parser.add_argument("--drivers", type=int, default=DRIVERS)
+    parser.add_argument("--seed", type=int, default=7)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.drivers, arguments.seed)
@@ -0,0 +1,96 @@
+"""
+Writes a synthetic trace of driver pings and trips to a temporary CSV, then replays it through TraceReplayer
+and reports rows per second and peak memory. Peak memory should stay flat as --rows grows, since the
+file is streamed in chunks and only rides in flight are held.
+Run from the repository root:
+    python -m benchmarks.bench_trace_replay --rows 1000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from collections import deque
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from benchmarks.run_suite import peak_rss_mb
+from src.core.ride_sharing_manager import RideSharingManager
+from src.usecases.ride_system import RideSystem
+from src.usecases.trace_replay import DRIVER_PING, RIDE_COMPLETE, RIDE_REQUEST, TRACE_COLUMNS, TraceReplayer, iter_trace
+
+ROWS = 500_000
+DRIVERS = 5_000
+RIDERS = 20_000
+PINGS_PER_TRIP = 8
+# Trips in flight before the oldest one completes
+IN_FLIGHT = 500
+
+
+"""
+Writes a time-ordered trace: every driver pings once, then each trip is a request followed by pings,
+with the oldest open trip completed once IN_FLIGHT are open.
+Args:
+    path (str): The CSV to write.
+    rows (int): The approximate number of rows.
+    seed (int): The SyntheticCity seed.
+"""
+def write_trace(path: str, rows: int, seed: int):
+    city = SyntheticCity(seed, DRIVERS, RIDERS, MISSISSAUGA_BBOX)
+    positions = [(driver.current_location.latitude, driver.current_location.longitude) for driver in city.drivers()]
+    riders = list(city.riders())
+    idle = deque(range(len(riders)))
+    open_trips = deque()
+    timestamp = 0.0
+    written = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(TRACE_COLUMNS)
+        for index, (latitude, longitude) in enumerate(positions):
+            writer.writerow((timestamp, DRIVER_PING, index, latitude, longitude, "", ""))
+        written += len(positions)
+        while written < rows:
+            timestamp += 1.0
+            rider_index = idle.popleft()
+            location = riders[rider_index].current_location
+            writer.writerow((timestamp, RIDE_REQUEST, rider_index, location.latitude, location.longitude, *city.destination()))
+            open_trips.append(rider_index)
+            for _ in range(PINGS_PER_TRIP):
+                driver_index = city.ping_rng.randrange(len(positions))
+                positions[driver_index] = city.ping(*positions[driver_index])
+                writer.writerow((timestamp, DRIVER_PING, driver_index, *positions[driver_index], "", ""))
+            written += PINGS_PER_TRIP + 1
+            if len(open_trips) > IN_FLIGHT:
+                finished = open_trips.popleft()
+                writer.writerow((timestamp, RIDE_COMPLETE, finished, "", "", "", ""))
+                idle.append(finished)
+                written += 1
+
+
+def run_benchmark(rows: int = ROWS, seed: int = 7, chunk_rows: int = 10_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.csv")
+        started_at = time.perf_counter()
+        write_trace(path, rows, seed)
+        print(f"wrote {rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - started_at:.1f}s")
+
+        baseline_rss = peak_rss_mb()
+        ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        replayer = TraceReplayer(ride_system)
+        started_at = time.perf_counter()
+        stats = replayer.replay(iter_trace(path, chunk_rows))
+        elapsed = time.perf_counter() - started_at
+
+    print(f"replayed {stats.events:,} events in {elapsed:.1f}s: {stats.events / elapsed:,.0f} rows/s")
+    print(f"drivers {stats.drivers_registered}, requests {stats.requests}, matched {stats.matched}, unmatched {stats.unmatched},"
+          f" completed {stats.completed}, skipped {stats.skipped}")
+    if baseline_rss is not None:
+        print(f"peak RSS {peak_rss_mb():.0f} MB (before replay {baseline_rss:.0f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming trace replay.")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--chunk-rows", type=int, default=10_000)
+    arguments = parser.parse_args()
+    run_benchmark(arguments.rows, arguments.seed, arguments.chunk_rows)
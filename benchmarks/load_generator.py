@@ -0,0 +1,98 @@
+"""
+Seeded synthetic city: drivers, riders, trip destinations and GPS pings inside the Mississauga bbox used by main.py.
+Points are drawn from a mix of Gaussian hotspots (malls, stations, downtown) and a uniform background,
+so the spatial index sees realistic clustering. The same seed always yields the same city and event sequence.
+"""
+import random
+from math import cos, radians
+from typing import Iterator, List, Tuple
+
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+KM_PER_DEGREE = 111.0
+HOTSPOT_COUNT = 8
+HOTSPOT_SHARE = 0.6
+HOTSPOT_SPREAD_KM = 1.5
+PING_STEP_KM = 0.2
+
+
+class SyntheticCity:
+    """
+    Reproducible population and movement generator for load tests.
+    Separate random streams are used for placement, trips and pings, so changing the number of
+    pings in a run does not change which destinations the riders pick.
+    Args:
+        seed (int): Seeds every random stream.
+        driver_count (int): The number of drivers to place.
+        rider_count (int): The number of riders to place.
+        bbox (List[float]): The operational area [minX, minY, maxX, maxY].
+    """
+    def __init__(self, seed: int, driver_count: int, rider_count: int, bbox: List[float] = MISSISSAUGA_BBOX):
+        self.seed = seed
+        self.driver_count = driver_count
+        self.rider_count = rider_count
+        self.bbox = bbox
+        self.placement_rng = random.Random(f"{seed}-placement")
+        self.trip_rng = random.Random(f"{seed}-trips")
+        self.ping_rng = random.Random(f"{seed}-pings")
+        self.hotspots = [self.uniform_point(self.placement_rng) for _ in range(HOTSPOT_COUNT)]
+        self.km_per_longitude_degree = KM_PER_DEGREE * cos(radians((bbox[1] + bbox[3]) / 2))
+
+    def uniform_point(self, rng: random.Random) -> Tuple[float, float]:
+        return rng.uniform(self.bbox[1], self.bbox[3]), rng.uniform(self.bbox[0], self.bbox[2])
+
+    def clamp(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        return min(max(latitude, self.bbox[1]), self.bbox[3]), min(max(longitude, self.bbox[0]), self.bbox[2])
+
+
+    """
+    This function draws a (latitude, longitude) point, clustered around a hotspot with probability HOTSPOT_SHARE.
+    Args:
+        rng (random.Random): The stream to draw from.
+    """
+    def point(self, rng: random.Random) -> Tuple[float, float]:
+        if rng.random() >= HOTSPOT_SHARE:
+            return self.uniform_point(rng)
+        latitude, longitude = rng.choice(self.hotspots)
+        return self.clamp(
+            rng.gauss(latitude, HOTSPOT_SPREAD_KM / KM_PER_DEGREE),
+            rng.gauss(longitude, HOTSPOT_SPREAD_KM / self.km_per_longitude_degree)
+        )
+
+    def drivers(self) -> Iterator[Driver]:
+        for i in range(self.driver_count):
+            latitude, longitude = self.point(self.placement_rng)
+            yield Driver(f"driver{i}@load.test", f"driver{i}", longitude, latitude)
+
+    def riders(self) -> Iterator[Rider]:
+        for i in range(self.rider_count):
+            latitude, longitude = self.point(self.placement_rng)
+            yield Rider(f"rider{i}@load.test", f"rider{i}", longitude, latitude)
+
+    def destination(self) -> Tuple[float, float]:
+        return self.point(self.trip_rng)
+
+    def trip_roll(self) -> float:
+        return self.trip_rng.random()
+
+
+    """
+    This function moves a point by a random step of up to PING_STEP_KM, as one GPS ping would.
+    Args:
+        latitude (float): The current latitude.
+        longitude (float): The current longitude.
+    """
+    def ping(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        step = PING_STEP_KM / KM_PER_DEGREE
+        return self.clamp(
+            latitude + self.ping_rng.uniform(-step, step),
+            longitude + self.ping_rng.uniform(-step, step) * KM_PER_DEGREE / self.km_per_longitude_degree
+        )
+
+    def pinging_driver(self, drivers: List[Driver]) -> Driver:
+        return drivers[self.ping_rng.randrange(len(drivers))]
+
+    def requesting_rider(self, riders: List[Rider]) -> Rider:
+        return riders[self.trip_rng.randrange(len(riders))]
@@ -0,0 +1,221 @@
+"""
+End-to-end benchmark suite: request, match, start, complete and cancel cycles with GPS pings interleaved,
+on a seeded SyntheticCity, for every fleet size and spatial backend.
+Each configuration runs in a fresh process so its peak memory is its own. Results are written as JSON
+with stable keys, and --compare prints the change against an earlier results file.
+Run from the repository root:
+    python -m benchmarks.run_suite --sizes 1000 10000 --output results.json
+    python -m benchmarks.run_suite --compare results.json --output new.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+from collections import deque
+
+from benchmarks.load_generator import MISSISSAUGA_BBOX, SyntheticCity
+from src.core.metrics import LatencyHistogram
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+BACKENDS = ["grid", "quadtree"]
+CYCLES = 20_000
+PINGS_PER_CYCLE = 4
+CANCEL_SHARE = 0.1
+# Rides in flight before the oldest one finishes, as a share of the fleet
+IN_FLIGHT_SHARE = 0.05
+MAX_RIDERS = 50_000
+# Slow configurations stop early instead of running for hours; the result records how many cycles ran
+TIME_BUDGET_SECONDS = 60.0
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def microseconds_since(started_at: float) -> int:
+    return int((time.perf_counter() - started_at) * 1_000_000)
+
+
+"""
+Builds the city, runs the lifecycle cycles and returns one result record. Runs inside a worker process.
+Args:
+    seed (int): The SyntheticCity seed.
+    driver_count (int): The fleet size.
+    backend (str): The spatial backend name.
+    cycles (int): The number of ride requests.
+    time_budget_seconds (float): Stop issuing requests once the cycles have run this long.
+"""
+def run_configuration(seed: int, driver_count: int, backend: str, cycles: int, time_budget_seconds: float) -> dict:
+    baseline_rss = peak_rss_mb()
+    city = SyntheticCity(seed, driver_count, min(max(driver_count // 2, 1_000), MAX_RIDERS))
+    manager = RideSharingManager()
+    ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+    manager.initialize_spatial_index(MISSISSAUGA_BBOX, backend)
+
+    started_at = time.perf_counter()
+    drivers = list(city.drivers())
+    for driver in drivers:
+        manager.register_driver(driver)
+    registration_seconds = time.perf_counter() - started_at
+    idle_riders = list(city.riders())
+
+    match_latency, ping_latency = LatencyHistogram(), LatencyHistogram()
+    in_flight = deque()
+    # Keep half the riders idle so there is always someone to request the next ride
+    in_flight_limit = max(1, min(int(driver_count * IN_FLIGHT_SHARE), len(idle_riders) // 2))
+    matched = completed = cancelled = 0
+    started_at = time.perf_counter()
+    deadline = started_at + time_budget_seconds
+    cycles_run = 0
+    while cycles_run < cycles and time.perf_counter() < deadline:
+        cycles_run += 1
+        for _ in range(PINGS_PER_CYCLE):
+            driver = city.pinging_driver(drivers)
+            location = driver.current_location
+            latitude, longitude = city.ping(location.latitude, location.longitude)
+            ping_started_at = time.perf_counter()
+            driver.update_location(latitude, longitude)
+            ping_latency.record(microseconds_since(ping_started_at))
+
+        rider = idle_riders.pop(city.trip_rng.randrange(len(idle_riders)))
+        request_started_at = time.perf_counter()
+        ride = ride_system.request_ride(rider, Location(*city.destination()))
+        match_latency.record(microseconds_since(request_started_at))
+        if ride.driver is None:
+            idle_riders.append(rider)
+        else:
+            matched += 1
+            in_flight.append(ride)
+
+        # Finish the oldest ride once enough are in flight, keeping supply roughly steady
+        if len(in_flight) > in_flight_limit:
+            oldest = in_flight.popleft()
+            if city.trip_roll() < CANCEL_SHARE:
+                ride_system.cancel_ride(oldest)
+                cancelled += 1
+            else:
+                oldest.start_ride()
+                ride_system.complete_ride(oldest)
+                completed += 1
+            idle_riders.append(oldest.rider)
+    elapsed = time.perf_counter() - started_at
+
+    match, ping = match_latency.snapshot(), ping_latency.snapshot()
+    return {
+        "drivers": driver_count,
+        "backend": backend,
+        "cycles": cycles_run,
+        "registration_seconds": round(registration_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(cycles_run / elapsed, 1),
+        "operations_per_second": round(cycles_run * (PINGS_PER_CYCLE + 1) / elapsed, 1),
+        "match_p50_us": match["p50_us"],
+        "match_p99_us": match["p99_us"],
+        "ping_p50_us": ping["p50_us"],
+        "ping_p99_us": ping["p99_us"],
+        "matched": matched,
+        "completed": completed,
+        "cancelled": cancelled,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+"""
+Prints the change in throughput and tail latency of every configuration found in both result sets.
+Args:
+    baseline (dict): An earlier results document.
+    current (dict): The new results document.
+"""
+def compare_results(baseline: dict, current: dict):
+    earlier = {(result["drivers"], result["backend"]): result for result in baseline["results"]}
+    print(f"\n{'drivers':>9} {'backend':>9} | {'req/s':>8} {'change':>8} | {'match p99 us':>12} {'change':>8}")
+    for result in current["results"]:
+        before = earlier.get((result["drivers"], result["backend"]))
+        if before is None:
+            continue
+        throughput = result["requests_per_second"] / before["requests_per_second"] - 1
+        tail = result["match_p99_us"] / max(before["match_p99_us"], 1) - 1
+        print(f"{result['drivers']:>9} {result['backend']:>9} | {result['requests_per_second']:>8.0f} {throughput:>+8.1%} |"
+              f" {result['match_p99_us']:>12} {tail:>+8.1%}")
+
+
+def run_benchmark(
+    sizes=SIZES,
+    backends=BACKENDS,
+    cycles: int = CYCLES,
+    seed: int = 7,
+    time_budget_seconds: float = TIME_BUDGET_SECONDS,
+    output: str | None = None,
+    compare: str | None = None
+) -> dict:
+    document = {
+        "meta": {
+            "seed": seed,
+            "cycles": cycles,
+            "time_budget_seconds": time_budget_seconds,
+            "pings_per_cycle": PINGS_PER_CYCLE,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "results": []
+    }
+    print(f"{'drivers':>9} {'backend':>9} | {'register s':>10} {'cycles':>7} {'req/s':>8} {'ops/s':>8} | {'match p50':>9} {'p99 us':>8} |"
+          f" {'ping p50':>8} {'p99 us':>7} | {'peak MB':>8}")
+    context = multiprocessing.get_context("spawn")
+    for driver_count in sizes:
+        for backend in backends:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_configuration, (seed, driver_count, backend, cycles, time_budget_seconds))
+            document["results"].append(result)
+            print(f"{driver_count:>9} {backend:>9} | {result['registration_seconds']:>10.2f} {result['cycles']:>7} {result['requests_per_second']:>8.0f}"
+                  f" {result['operations_per_second']:>8.0f} | {result['match_p50_us']:>9} {result['match_p99_us']:>8} |"
+                  f" {result['ping_p50_us']:>8} {result['ping_p99_us']:>7} | {result['peak_rss_mb'] or 0:>8.0f}")
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+    if compare:
+        with open(compare) as file:
+            compare_results(json.load(file), document)
+    return document
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the matching and lifecycle benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="fleet sizes to run")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS, help="spatial backends to compare")
+    parser.add_argument("--cycles", type=int, default=CYCLES, help="ride requests per configuration")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET_SECONDS, help="seconds of cycles per configuration")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="an earlier JSON results file to diff against")
+    arguments = parser.parse_args()
+    run_benchmark(
+        arguments.sizes, arguments.backends, arguments.cycles, arguments.seed, arguments.time_budget, arguments.output, arguments.compare
+    )
@@ -1,18 +1,26 @@
-from src.core.ride_sharing_manager import ride_sharing_manager_object
+import argparse
+
+from src.core.events import enable_console_events
 from src.models.users.driver import Driver
 from src.models.users.rider import Rider
 from src.models.location.location import Location
-from src.usecases.ride_system import RideSystem
+from src.usecases.ride_system import start_ride_system
 from src.models.ride.ride_status import RideStatus
 
-def run_simulation():
+def run_simulation(verbose: bool = False, snapshot_path: str | None = None):
+    # Lifecycle events (registrations, offers, location pings) are only printed in verbose mode
+    if verbose:
+        enable_console_events()
+
     print("===================================================")
     print("       MINI RIDE-SHARING SIMULATOR STARTUP       ")
     print("===================================================")
 
     # --- SETUP THE SYSTEM ---
     mississauga_bbox = [-79.8, 43.5, -79.5, 43.7]
-    ride_system = RideSystem(operational_area=mississauga_bbox)
+    # A snapshot restores earlier drivers, riders and rides alongside the scenario participants
+    ride_system = start_ride_system(mississauga_bbox, snapshot_path)
+    manager = ride_system.ride_sharing_manager
     print("\nRide-Sharing System initialized for Mississauga.")
 
     # --- CREATE AND REGISTER DRIVERS & RIDERS ---
@@ -28,15 +36,24 @@ def run_simulation():
         Driver(email="td8@email.com", user_name="Mi", longitude=-79.58, latitude=43.52),
         Driver(email="td9@email.com", user_name="Mark", longitude=-79.72, latitude=43.69)
     ]
-    for driver in drivers:
-        ride_sharing_manager_object.register_driver(driver)
+    # Participants restored from the snapshot of an earlier run keep their ids; reuse them rather than registering twice
+    for position, driver in enumerate(drivers):
+        restored = manager.get_driver(driver.user_id)
+        if restored is None:
+            manager.register_driver(driver)
+        else:
+            drivers[position] = restored
 
     riders = [
         Rider(email="tr1@email.com", user_name="Pham", longitude=-79.65, latitude=43.60),
         Rider(email="tr2@email.com", user_name="Fam", longitude=-79.62, latitude=43.59)
     ]
-    for rider in riders:
-        ride_sharing_manager_object.register_rider(rider)
+    for position, rider in enumerate(riders):
+        restored = manager.get_rider(rider.user_id)
+        if restored is None:
+            manager.register_rider(rider)
+        else:
+            riders[position] = restored
 
     # SCENARIO 1: A RIDER COMPLETES A FULL TRIP ---
     print("\n===================================================")
@@ -132,4 +149,8 @@ def run_simulation():
     print("===================================================")
 
 if __name__ == "__main__":
-    run_simulation()
+    parser = argparse.ArgumentParser(description="Run the Mississauga ride-sharing scenarios.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every ride lifecycle event")
+    parser.add_argument("--snapshot", help="restore drivers, riders and rides from this snapshot file before the scenarios")
+    arguments = parser.parse_args()
+    run_simulation(arguments.verbose, arguments.snapshot)
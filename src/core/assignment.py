@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+import numpy as np
+
+INFEASIBLE = float("inf")
+
+
+"""
+Solves the min-cost assignment problem with the Hungarian method (shortest augmenting paths with potentials).
+Each augmentation step is vectorized over the columns with NumPy, so the Python-level work is O(n^2) steps.
+Infeasible pairs must be marked with INFEASIBLE; they are never returned.
+Args:
+    cost (Sequence[Sequence[float]]): An n x m cost matrix.
+Returns:
+    List[Tuple[int, int]]: (row, column) pairs of the optimal assignment.
+"""
+def hungarian_assignment(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    original = np.asarray(cost, dtype=np.float64)
+    if original.size == 0:
+        return []
+    transposed = original.shape[0] > original.shape[1]
+    matrix = original.T if transposed else original
+    rows, columns = matrix.shape
+
+    # Infeasible pairs get a penalty larger than any feasible assignment so they are only used when unavoidable
+    feasible = np.isfinite(matrix)
+    penalty = (float(matrix[feasible].max()) + 1.0) * (rows + 1) if feasible.any() else 1.0
+    matrix = np.where(feasible, matrix, penalty)
+
+    # Column 0 is a virtual start column; column_match[j] is the 1-indexed row assigned to column j (0 = free)
+    row_potential = np.zeros(rows + 1)
+    column_potential = np.zeros(columns + 1)
+    column_match = np.zeros(columns + 1, dtype=np.intp)
+    previous_column = np.zeros(columns + 1, dtype=np.intp)
+    for row in range(1, rows + 1):
+        column_match[0] = row
+        current_column = 0
+        min_slack = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[current_column] = True
+            current_row = column_match[current_column]
+            slack = matrix[current_row - 1] - row_potential[current_row] - column_potential[1:]
+            free = ~used[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            previous_column[1:][improved] = current_column
+            candidate_slack = np.where(free, min_slack[1:], np.inf)
+            next_column = int(candidate_slack.argmin()) + 1
+            delta = candidate_slack[next_column - 1]
+            row_potential[column_match[used]] += delta
+            column_potential[used] -= delta
+            min_slack[~used] -= delta
+            current_column = next_column
+            if column_match[current_column] == 0:
+                break
+        # Flip the augmenting path
+        while current_column:
+            prior = previous_column[current_column]
+            column_match[current_column] = column_match[prior]
+            current_column = prior
+
+    pairs = []
+    for column in range(1, columns + 1):
+        row = int(column_match[column])
+        if row and feasible[row - 1, column - 1]:
+            pairs.append((column - 1, row - 1) if transposed else (row - 1, column - 1))
+    return sorted(pairs)
+
+
+"""
+Assigns pairs greedily in order of increasing cost, O(k log k) in the number of feasible pairs.
+Used as the fallback when a batch is too large for the Hungarian method.
+Args:
+    cost (Sequence[Sequence[float]]): An n x m cost matrix with INFEASIBLE for disallowed pairs.
+Returns:
+    List[Tuple[int, int]]: (row, column) pairs of the assignment.
+"""
+def greedy_assignment(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    matrix = np.asarray(cost, dtype=np.float64)
+    if matrix.size == 0:
+        return []
+    feasible_rows, feasible_columns = np.nonzero(np.isfinite(matrix))
+    order = matrix[feasible_rows, feasible_columns].argsort(kind="stable")
+    assigned_rows, assigned_columns = set(), set()
+    pairs = []
+    for row, column in zip(feasible_rows[order].tolist(), feasible_columns[order].tolist()):
+        if row in assigned_rows or column in assigned_columns:
+            continue
+        assigned_rows.add(row)
+        assigned_columns.add(column)
+        pairs.append((row, column))
+    return sorted(pairs)
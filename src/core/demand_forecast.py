@@ -0,0 +1,90 @@
+from __future__ import annotations
+import threading
+import time
+from math import floor
+from typing import Callable, Dict
+
+from src.core.lazy_import import lazy_module
+from src.core.zone_grid import ZoneGrid
+
+np = lazy_module("numpy")
+
+DEFAULT_BUCKET_SECONDS = 900.0
+DEFAULT_SMOOTHING = 0.3
+
+
+class DemandForecaster:
+    """
+    Forecasts ride requests per zone for the next time bucket with an exponentially weighted moving average
+    of the requests each zone saw in past buckets. Recording a request is O(1); the averages are folded
+    forward once per bucket, and the forecast of a bucket is computed once and memoized until the next one.
+    Attach it with RideSystem.attach_demand_forecaster so every request is recorded. Safe to share between threads.
+    Args:
+        zones (ZoneGrid): The zones to forecast.
+        bucket_seconds (float): The length of a time bucket.
+        smoothing (float): The weight of the latest bucket, between 0 and 1.
+        clock (Callable[[], float]): Source of request times in seconds, e.g. a simulation clock.
+    """
+    def __init__(
+        self,
+        zones: ZoneGrid,
+        bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+        smoothing: float = DEFAULT_SMOOTHING,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("Invalid smoothing: Must be in (0, 1].")
+        self.zones = zones
+        self.bucket_seconds = bucket_seconds
+        self.smoothing = smoothing
+        self.clock = clock
+        self.average = np.zeros(len(zones))
+        self.counts: Dict[int, int] = {}
+        self.current_bucket = floor(clock() / bucket_seconds)
+        self.forecast_bucket: int | None = None
+        self.cached_forecast: np.ndarray | None = None
+        self.lock = threading.Lock()
+
+
+    """
+    This function folds the buckets that ended into the moving averages. The caller must hold the lock.
+    Buckets without any request decay every average without touching the zones one by one.
+    """
+    def advance(self):
+        bucket = floor(self.clock() / self.bucket_seconds)
+        if bucket <= self.current_bucket:
+            return
+        observed = np.zeros(len(self.zones))
+        if self.counts:
+            observed[list(self.counts)] = list(self.counts.values())
+        self.average += self.smoothing * (observed - self.average)
+        self.average *= (1.0 - self.smoothing) ** (bucket - self.current_bucket - 1)
+        self.counts = {}
+        self.current_bucket = bucket
+
+
+    """
+    This function records a ride request in the zone of its pickup.
+    Args:
+        latitude (float): The pickup latitude.
+        longitude (float): The pickup longitude.
+    """
+    def record_request(self, latitude: float, longitude: float):
+        zone = self.zones.zone_of(latitude, longitude)
+        with self.lock:
+            self.advance()
+            self.counts[zone] = self.counts.get(zone, 0) + 1
+
+
+    """
+    This function returns the expected requests per zone in the current bucket.
+    The result is memoized per bucket and must not be modified.
+    """
+    def forecast(self) -> np.ndarray:
+        with self.lock:
+            self.advance()
+            if self.forecast_bucket != self.current_bucket:
+                self.cached_forecast = self.average.copy()
+                self.cached_forecast.flags.writeable = False
+                self.forecast_bucket = self.current_bucket
+            return self.cached_forecast
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Sequence
+
+from src.core.lazy_import import lazy_module
+from src.models.location.location import EARTH_RADIUS_KM
+
+np = lazy_module("numpy")
+
+
+class PreparedCoordinates:
+    """
+    A batch of points stored as NumPy arrays with their radians and cosines of latitude computed once,
+    so repeated distance queries against the same points skip the degree conversion.
+    Args:
+        latitudes (Sequence[float]): Latitudes in decimal degrees.
+        longitudes (Sequence[float]): Longitudes in decimal degrees.
+    """
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]):
+        self.latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+        self.longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+        self.cos_latitudes = np.cos(self.latitudes)
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+
+"""
+Computes the Haversine distance from one origin to every point of a batch.
+Args:
+    latitude (float): The origin latitude in decimal degrees.
+    longitude (float): The origin longitude in decimal degrees.
+    points (PreparedCoordinates): The destinations.
+Returns:
+    np.ndarray: Distances in kilometers, one per point.
+"""
+def haversine_one_to_many(latitude: float, longitude: float, points: PreparedCoordinates) -> np.ndarray:
+    origin_lat = np.radians(latitude)
+    origin_long = np.radians(longitude)
+    sin_half_lat = np.sin((points.latitudes - origin_lat) * 0.5)
+    sin_half_long = np.sin((points.longitudes - origin_long) * 0.5)
+    a = sin_half_lat * sin_half_lat + np.cos(origin_lat) * points.cos_latitudes * sin_half_long * sin_half_long
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+"""
+Computes the Haversine distance between every origin and every destination.
+Args:
+    origins (PreparedCoordinates): The m origins.
+    destinations (PreparedCoordinates): The n destinations.
+Returns:
+    np.ndarray: An (m, n) matrix of distances in kilometers.
+"""
+def haversine_many_to_many(origins: PreparedCoordinates, destinations: PreparedCoordinates) -> np.ndarray:
+    sin_half_lat = np.sin((destinations.latitudes[np.newaxis, :] - origins.latitudes[:, np.newaxis]) * 0.5)
+    sin_half_long = np.sin((destinations.longitudes[np.newaxis, :] - origins.longitudes[:, np.newaxis]) * 0.5)
+    cos_product = origins.cos_latitudes[:, np.newaxis] * destinations.cos_latitudes[np.newaxis, :]
+    a = sin_half_lat * sin_half_lat + cos_product * sin_half_long * sin_half_long
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+"""
+Computes the Haversine distance between each start and the end at the same position, e.g. along road edges.
+Args:
+    starts (PreparedCoordinates): The n starts.
+    ends (PreparedCoordinates): The n ends.
+Returns:
+    np.ndarray: n distances in kilometers.
+"""
+def haversine_pairwise(starts: PreparedCoordinates, ends: PreparedCoordinates) -> np.ndarray:
+    sin_half_lat = np.sin((ends.latitudes - starts.latitudes) * 0.5)
+    sin_half_long = np.sin((ends.longitudes - starts.longitudes) * 0.5)
+    a = sin_half_lat * sin_half_lat + starts.cos_latitudes * ends.cos_latitudes * sin_half_long * sin_half_long
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
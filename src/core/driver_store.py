@@ -0,0 +1,129 @@
+from __future__ import annotations
+import threading
+from array import array
+from typing import List, Sequence, Tuple
+
+from src.core.lazy_import import lazy_module
+from src.models.location.location import Location
+
+np = lazy_module("numpy")
+
+
+class DriverStore:
+    """
+    Columnar store of driver positions and availability, indexed by a dense integer slot.
+    Coordinates live in parallel array('d') columns and availability in a bytearray, so kernels
+    can read them as NumPy arrays instead of walking Driver and Location objects.
+    Slot allocation and every NumPy read of the columns hold the lock: a column that is exporting its
+    buffer to a NumPy view cannot grow, so appends wait for reads to finish. Writes to an existing slot
+    are single element stores.
+    """
+    def __init__(self):
+        self.latitudes = array("d")
+        self.longitudes = array("d")
+        self.available = bytearray()
+        self.driver_ids: List[str | None] = []
+        self.free_slots: List[int] = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.driver_ids) - len(self.free_slots)
+
+
+    """
+    This function reserves a slot for a driver and writes their position and availability.
+    Args:
+        driver_id (str): The ID of the driver.
+        latitude (float): The driver's latitude.
+        longitude (float): The driver's longitude.
+        is_available (bool): The driver's availability.
+    Returns:
+        int: The slot now owned by the driver.
+    """
+    def allocate(self, driver_id: str, latitude: float, longitude: float, is_available: bool) -> int:
+        with self.lock:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.driver_ids[slot] = driver_id
+                self.latitudes[slot] = latitude
+                self.longitudes[slot] = longitude
+                self.available[slot] = is_available
+            else:
+                slot = len(self.driver_ids)
+                self.driver_ids.append(driver_id)
+                self.latitudes.append(latitude)
+                self.longitudes.append(longitude)
+                self.available.append(is_available)
+            return slot
+
+
+    """
+    This function appends many drivers at once, copying whole columns instead of writing one slot at a time.
+    Free slots are not reused.
+    Args:
+        driver_ids (Sequence[str]): The IDs of the drivers.
+        latitudes (np.ndarray): The drivers' latitudes as float64.
+        longitudes (np.ndarray): The drivers' longitudes as float64.
+        available (np.ndarray): The drivers' availability as uint8.
+    Returns:
+        range: The slots now owned by the drivers, in input order.
+    """
+    def bulk_allocate(self, driver_ids: Sequence[str], latitudes: np.ndarray, longitudes: np.ndarray, available: np.ndarray) -> range:
+        with self.lock:
+            first = len(self.driver_ids)
+            self.driver_ids.extend(driver_ids)
+            self.latitudes.frombytes(np.ascontiguousarray(latitudes, dtype=np.float64).tobytes())
+            self.longitudes.frombytes(np.ascontiguousarray(longitudes, dtype=np.float64).tobytes())
+            self.available.extend(np.ascontiguousarray(available, dtype=np.uint8).tobytes())
+            return range(first, len(self.driver_ids))
+
+
+    """
+    This function frees a slot so it can be reused by the next registration.
+    Args:
+        slot (int): The slot to free.
+    """
+    def release(self, slot: int):
+        with self.lock:
+            if self.driver_ids[slot] is None:
+                return
+            self.driver_ids[slot] = None
+            self.available[slot] = 0
+            self.free_slots.append(slot)
+
+    def set_position(self, slot: int, latitude: float, longitude: float):
+        self.latitudes[slot] = latitude
+        self.longitudes[slot] = longitude
+
+    def set_available(self, slot: int, is_available: bool):
+        self.available[slot] = is_available
+
+    def location_of(self, slot: int) -> Location:
+        return Location(self.latitudes[slot], self.longitudes[slot])
+
+    def position_of(self, slot: int) -> Tuple[float, float]:
+        return self.latitudes[slot], self.longitudes[slot]
+
+
+    """
+    This function copies the coordinates of the given slots into NumPy arrays.
+    Args:
+        slots (Sequence[int]): The slots to read.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The latitudes and longitudes, in slot order.
+    """
+    def coordinates(self, slots: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        index = np.fromiter(slots, dtype=np.intp, count=len(slots))
+        with self.lock:
+            return np.frombuffer(self.latitudes)[index], np.frombuffer(self.longitudes)[index]
+
+
+    """
+    This function copies the slots and coordinates of every available driver into NumPy arrays.
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The slots, latitudes and longitudes, in slot order.
+    """
+    def available_coordinates(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self.lock:
+            slots = np.flatnonzero(np.frombuffer(self.available, dtype=np.uint8))
+            return slots, np.frombuffer(self.latitudes)[slots], np.frombuffer(self.longitudes)[slots]
@@ -0,0 +1,386 @@
+from __future__ import annotations
+import heapq
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from bisect import insort
+from collections import OrderedDict
+from math import ceil, cos, floor, inf, radians, sqrt
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+
+from src.core.distance import PreparedCoordinates, haversine_one_to_many
+from src.core.road_network import KM_PER_DEGREE, RoadGraph
+from src.models.location.location import Location
+
+DEFAULT_SPEED_KMH = 30.0
+DEFAULT_LANDMARKS = 8
+# Landmarks whose bound at the source is highest steer each point-to-point search; the rest are skipped
+ACTIVE_LANDMARKS = 3
+DEFAULT_CACHE_SIZE = 100_000
+# Speed between a point and the road node it snaps to, e.g. down a driveway or across a parking lot
+DEFAULT_ACCESS_SPEED_KMH = 15.0
+# Drivers farther than this from a pickup by road are not worth offering it to
+DEFAULT_MAX_PICKUP_SECONDS = 1800.0
+
+
+class Route(NamedTuple):
+    seconds: float
+    km: float
+
+UNREACHABLE = Route(inf, inf)
+
+
+class EtaEngine(ABC):
+    """
+    Travel times and distances between points, e.g. to rank drivers by time to pickup and to price trips.
+    route() returns the trip between two points; pickup_etas() returns the seconds from many points to one
+    pickup, UNREACHABLE.seconds for points that cannot get there. Given nearest, pickup_etas() only has to be
+    exact for that many quickest points and may return UNREACHABLE.seconds for the rest.
+    """
+    @abstractmethod
+    def route(self, start: Location, end: Location) -> Route:
+        pass
+
+    @abstractmethod
+    def pickup_etas(
+        self, latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray, nearest: int | None = None
+    ) -> np.ndarray:
+        pass
+
+
+class StraightLineEta(EtaEngine):
+    """
+    Great-circle distance driven at a constant speed. Cheap, but ranks a driver across a river as close.
+    Args:
+        speed_kmh (float): The assumed average speed.
+    """
+    def __init__(self, speed_kmh: float = DEFAULT_SPEED_KMH):
+        self.speed_kmh = speed_kmh
+
+    def route(self, start: Location, end: Location) -> Route:
+        km = start.calculate_distance_in_km(end)
+        return Route(km / self.speed_kmh * 3600.0, km)
+
+    def pickup_etas(
+        self, latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray, nearest: int | None = None
+    ) -> np.ndarray:
+        return haversine_one_to_many(latitude, longitude, PreparedCoordinates(latitudes, longitudes)) / self.speed_kmh * 3600.0
+
+
+class RoadNetworkEta(EtaEngine):
+    """
+    Travel times over a road graph. Points snap to their nearest road node through a uniform grid of nodes.
+    Point-to-point routes run A* with an ALT heuristic (landmarks and the triangle inequality); a pickup's ETAs
+    from many drivers come from one Dijkstra search backwards from the pickup, stopped once every driver's node
+    is settled. Node-to-node results are kept in an LRU cache, so repeated pairs cost a dictionary lookup.
+    Safe to share between threads; searches only read the graph.
+    Args:
+        graph (RoadGraph): The road network.
+        landmarks (int): How many landmarks to precompute; each costs two full Dijkstra searches up front.
+        cache_size (int): How many node-to-node results to keep.
+        snap_cell_km (float | None): The cell size of the snapping grid; by default the median edge length.
+        access_speed_kmh (float): The speed between a point and its snapped node.
+        max_pickup_seconds (float): Pickup searches stop at this time; drivers beyond it are unreachable.
+    """
+    def __init__(
+        self,
+        graph: RoadGraph,
+        landmarks: int = DEFAULT_LANDMARKS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        snap_cell_km: float | None = None,
+        access_speed_kmh: float = DEFAULT_ACCESS_SPEED_KMH,
+        max_pickup_seconds: float = DEFAULT_MAX_PICKUP_SECONDS
+    ):
+        if not len(graph):
+            raise ValueError("Invalid road graph: It has no nodes.")
+        self.graph = graph
+        self.cache_size = cache_size
+        self.access_speed_kmh = access_speed_kmh
+        self.max_pickup_seconds = max_pickup_seconds
+        self.cache: OrderedDict[Tuple[int, int], Route] = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+        latitudes, longitudes = np.frombuffer(graph.latitudes), np.frombuffer(graph.longitudes)
+        self.origin_latitude = float(latitudes.min())
+        self.origin_longitude = float(longitudes.min())
+        self.km_per_longitude = KM_PER_DEGREE * cos(radians((latitudes.min() + latitudes.max()) / 2))
+        # About one node per cell keeps snapping to a few distance computations
+        if snap_cell_km is None:
+            snap_cell_km = float(np.median(np.frombuffer(graph.forward_km))) if graph.edge_count else 1.0
+        self.snap_cell_km = snap_cell_km
+        self.snap_rows = ceil((latitudes.max() - self.origin_latitude) * KM_PER_DEGREE / snap_cell_km) + 1
+        self.snap_columns = ceil((longitudes.max() - self.origin_longitude) * self.km_per_longitude / snap_cell_km) + 1
+        self.snap_cells: Dict[Tuple[int, int], List[int]] = {}
+        for node, (latitude, longitude) in enumerate(zip(latitudes.tolist(), longitudes.tolist())):
+            self.snap_cells.setdefault(self.snap_cell(latitude, longitude), []).append(node)
+
+        self.landmarks: List[Tuple[array, array]] = []
+        self.select_landmarks(landmarks)
+
+
+    """
+    This function picks landmarks far from each other and from everything else, and stores the travel
+    times from each landmark to every node and from every node to each landmark.
+    Args:
+        count (int): How many landmarks to pick.
+    """
+    def select_landmarks(self, count: int):
+        if count <= 0:
+            return
+        graph = self.graph
+        closest = np.full(len(graph), inf)
+        candidate = 0
+        for _ in range(min(count + 1, len(graph))):
+            from_landmark = shortest_seconds(graph.forward_offsets, graph.forward_targets, graph.forward_seconds, candidate)
+            to_landmark = shortest_seconds(graph.backward_offsets, graph.backward_targets, graph.backward_seconds, candidate)
+            self.landmarks.append((from_landmark, to_landmark))
+            # The next landmark is the reachable node farthest from every landmark so far
+            np.minimum(closest, np.frombuffer(from_landmark), out=closest)
+            reachable = np.where(np.isfinite(closest), closest, -1.0)
+            candidate = int(reachable.argmax())
+            if reachable[candidate] <= 0.0:
+                break
+        # The first search started from an arbitrary node, so it is dropped unless it was the only one
+        if len(self.landmarks) > 1:
+            self.landmarks.pop(0)
+
+
+    """
+    This function maps a point to its cell of the snapping grid.
+    Args:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+    """
+    def snap_cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            floor((latitude - self.origin_latitude) * KM_PER_DEGREE / self.snap_cell_km),
+            floor((longitude - self.origin_longitude) * self.km_per_longitude / self.snap_cell_km)
+        )
+
+
+    """
+    This function finds the road node nearest to a point, searching the snapping grid ring by ring.
+    Args:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+    Returns:
+        Tuple[int, float]: The node and its distance from the point in kilometers.
+    """
+    def snap(self, latitude: float, longitude: float) -> Tuple[int, float]:
+        graph_latitudes, graph_longitudes = self.graph.latitudes, self.graph.longitudes
+        row, column = self.snap_cell(latitude, longitude)
+        # Rings beyond the farthest grid corner hold no nodes
+        last_ring = max(abs(row), abs(row - self.snap_rows), abs(column), abs(column - self.snap_columns)) + 1
+        best_node, best_km = -1, inf
+        for ring in range(last_ring + 1):
+            for cell_row in range(row - ring, row + ring + 1):
+                step = 1 if abs(cell_row - row) == ring else 2 * ring
+                for cell_column in range(column - ring, column + ring + 1, step):
+                    for node in self.snap_cells.get((cell_row, cell_column), ()):
+                        north_km = (graph_latitudes[node] - latitude) * KM_PER_DEGREE
+                        east_km = (graph_longitudes[node] - longitude) * self.km_per_longitude
+                        km = sqrt(north_km * north_km + east_km * east_km)
+                        if km < best_km:
+                            best_node, best_km = node, km
+            # Nodes in the next ring are at least this far away
+            if best_km <= ring * self.snap_cell_km:
+                break
+        return best_node, best_km
+
+
+    """
+    This function returns the route between two points over the road network, including the legs
+    between each point and its snapped node.
+    Args:
+        start (Location): The start of the route.
+        end (Location): The end of the route.
+    Returns:
+        Route: The travel time and distance, UNREACHABLE when no road connects the points.
+    """
+    def route(self, start: Location, end: Location) -> Route:
+        source, source_km = self.snap(start.latitude, start.longitude)
+        target, target_km = self.snap(end.latitude, end.longitude)
+        key = (source, target)
+        with self.cache_lock:
+            network = self.cache.get(key)
+            if network is not None:
+                self.cache.move_to_end(key)
+        if network is None:
+            network = self.search_between(source, target)
+            self.remember({key: network})
+        access_km = source_km + target_km
+        return Route(network.seconds + access_km / self.access_speed_kmh * 3600.0, network.km + access_km)
+
+
+    """
+    This function returns the travel time from each of many points to a pickup. Node pairs missing
+    from the cache are answered by one search backwards from the pickup.
+    Args:
+        latitude (float): The pickup latitude.
+        longitude (float): The pickup longitude.
+        latitudes (np.ndarray): The latitudes of the points, e.g. candidate drivers.
+        longitudes (np.ndarray): The longitudes of the points.
+        nearest (int | None): Stop the search once this many quickest points are certain, e.g. the drivers
+            that will be offered the ride; the others may come back as inf.
+    Returns:
+        np.ndarray: Seconds per point, inf for points farther than max_pickup_seconds.
+    """
+    def pickup_etas(
+        self, latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray, nearest: int | None = None
+    ) -> np.ndarray:
+        target, target_km = self.snap(latitude, longitude)
+        seconds_per_km = 3600.0 / self.access_speed_kmh
+        # The seconds spent off the network by every point snapped to each node
+        snapped = [self.snap(point_latitude, point_longitude) for point_latitude, point_longitude in zip(latitudes.tolist(), longitudes.tolist())]
+        access: Dict[int, List[float]] = {}
+        for source, source_km in snapped:
+            access.setdefault(source, []).append((source_km + target_km) * seconds_per_km)
+        routes: Dict[int, Route] = {}
+        with self.cache_lock:
+            for source in access:
+                network = self.cache.get((source, target))
+                if network is not None:
+                    self.cache.move_to_end((source, target))
+                    routes[source] = network
+        missing = {source: access[source] for source in access if source not in routes}
+        if missing:
+            known = sorted(network.seconds + seconds for source, network in routes.items() for seconds in access[source])
+            found = self.search_to(target, missing, known, nearest)
+            routes.update(found)
+            self.remember({(source, target): network for source, network in found.items()})
+
+        return np.fromiter(
+            (routes.get(source, UNREACHABLE).seconds + (source_km + target_km) * seconds_per_km for source, source_km in snapped),
+            dtype=np.float64, count=len(snapped)
+        )
+
+
+    """
+    This function stores node-to-node results, evicting the least recently used ones beyond cache_size.
+    Args:
+        routes (Dict[Tuple[int, int], Route]): Results by (source, target) node.
+    """
+    def remember(self, routes: Dict[Tuple[int, int], Route]):
+        with self.cache_lock:
+            self.cache.update(routes)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+
+    """
+    This function runs Dijkstra backwards from a target until every source is settled, the search passes
+    max_pickup_seconds, or no unsettled source can be among the nearest quickest.
+    Args:
+        target (int): The node everyone travels to.
+        sources (Dict[int, List[float]]): The nodes travelling, with the off-network seconds of each point on them.
+        known (List[float]): The sorted total seconds of points already answered from the cache.
+        nearest (int | None): How many quickest points must be certain; None for all.
+    Returns:
+        Dict[int, Route]: The route of every settled source, and UNREACHABLE for the unsettled ones when
+            the whole reachable network was searched. Sources cut off by a limit are left out, so the
+            cache never mistakes them for unreachable.
+    """
+    def search_to(self, target: int, sources: Dict[int, List[float]], known: List[float], nearest: int | None) -> Dict[int, Route]:
+        graph = self.graph
+        offsets, heads, edge_seconds, edge_km = graph.backward_offsets, graph.backward_targets, graph.backward_seconds, graph.backward_km
+        remaining = set(sources)
+        least_access = min(min(seconds) for seconds in sources.values())
+        # The nearest-th quickest total known so far; no unsettled point can beat it once the search passes it
+        cutoff = known[nearest - 1] if nearest and len(known) >= nearest else inf
+        found: Dict[int, Route] = {}
+        best = {target: 0.0}
+        heap = [(0.0, 0.0, target)]
+        while heap and remaining:
+            seconds, km, node = heapq.heappop(heap)
+            if seconds > self.max_pickup_seconds or seconds + least_access >= cutoff:
+                return found
+            if seconds > best[node]:
+                continue
+            if node in remaining:
+                remaining.discard(node)
+                found[node] = Route(seconds, km)
+                if nearest:
+                    for access_seconds in sources[node]:
+                        insort(known, seconds + access_seconds)
+                    if len(known) >= nearest:
+                        cutoff = known[nearest - 1]
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = heads[edge]
+                candidate = seconds + edge_seconds[edge]
+                if candidate < best.get(neighbour, inf):
+                    best[neighbour] = candidate
+                    heapq.heappush(heap, (candidate, km + edge_km[edge], neighbour))
+        for source in remaining:
+            found[source] = UNREACHABLE
+        return found
+
+
+    """
+    This function runs A* between two nodes, guided by the landmarks with the highest lower bound at the source.
+    Args:
+        source (int): The start node.
+        target (int): The end node.
+    """
+    def search_between(self, source: int, target: int) -> Route:
+        # d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L); only landmarks connected both ways to the target help
+        bounds = [
+            (from_landmark, to_landmark, from_landmark[target], to_landmark[target])
+            for from_landmark, to_landmark in self.landmarks
+            if from_landmark[target] < inf and to_landmark[target] < inf
+        ]
+        bounds.sort(key=lambda bound: -max(bound[2] - bound[0][source], bound[1][source] - bound[3]))
+        bounds = bounds[:ACTIVE_LANDMARKS]
+
+        def potential(node: int) -> float:
+            estimate = 0.0
+            for from_landmark, to_landmark, from_landmark_to_target, target_to_landmark in bounds:
+                estimate = max(estimate, from_landmark_to_target - from_landmark[node], to_landmark[node] - target_to_landmark)
+            return estimate
+
+        graph = self.graph
+        offsets, heads, edge_seconds, edge_km = graph.forward_offsets, graph.forward_targets, graph.forward_seconds, graph.forward_km
+        best = {source: 0.0}
+        heap = [(potential(source), 0.0, 0.0, source)]
+        while heap:
+            _, seconds, km, node = heapq.heappop(heap)
+            if node == target:
+                return Route(seconds, km)
+            if seconds > best[node]:
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = heads[edge]
+                candidate = seconds + edge_seconds[edge]
+                if candidate < best.get(neighbour, inf):
+                    best[neighbour] = candidate
+                    estimate = potential(neighbour)
+                    if estimate < inf:
+                        heapq.heappush(heap, (candidate + estimate, candidate, km + edge_km[edge], neighbour))
+        return UNREACHABLE
+
+
+"""
+Runs a full Dijkstra search over a graph in compressed sparse row form.
+Args:
+    offsets (Sequence[int]): The first edge of each node, plus the edge count.
+    heads (Sequence[int]): The node each edge leads to.
+    edge_seconds (Sequence[float]): The travel time of each edge.
+    source (int): The node to search from.
+Returns:
+    array: The travel time from the source to every node, inf where unreachable.
+"""
+def shortest_seconds(offsets: Sequence[int], heads: Sequence[int], edge_seconds: Sequence[float], source: int) -> array:
+    best = array("d", [inf]) * (len(offsets) - 1)
+    best[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        seconds, node = heapq.heappop(heap)
+        if seconds > best[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbour = heads[edge]
+            candidate = seconds + edge_seconds[edge]
+            if candidate < best[neighbour]:
+                best[neighbour] = candidate
+                heapq.heappush(heap, (candidate, neighbour))
+    return best
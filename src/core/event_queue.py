@@ -0,0 +1,54 @@
+from __future__ import annotations
+import heapq
+from typing import Any, Callable, List, Tuple
+
+Handler = Callable[..., None]
+
+
+class EventQueue:
+    """
+    Discrete-event scheduler: handlers are queued at simulated times and run in time order, with
+    ties broken by scheduling order. Time jumps straight to the next event, so nothing ever sleeps.
+    """
+    def __init__(self, start_time: float = 0.0):
+        self.now = start_time
+        self.events: List[Tuple[float, int, Handler, Tuple[Any, ...]]] = []
+        self.sequence = 0
+        self.processed = 0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+    """
+    This function queues a handler to run at a simulated time.
+    Args:
+        time (float): When the handler runs, in simulated seconds. Times in the past run next.
+        handler (Handler): The callable to run.
+        args (Any): Arguments passed to the handler.
+    """
+    def schedule(self, time: float, handler: Handler, *args: Any):
+        heapq.heappush(self.events, (max(time, self.now), self.sequence, handler, args))
+        self.sequence += 1
+
+
+    """
+    This function runs events in time order until the queue is empty or the next event is later than `until`.
+    Handlers may schedule further events while it runs.
+    Args:
+        until (float): The last simulated time to process.
+    Returns:
+        int: The number of events processed by this call.
+    """
+    def run(self, until: float = float("inf")) -> int:
+        events = self.events
+        processed = 0
+        while events and events[0][0] <= until:
+            time, _, handler, args = heapq.heappop(events)
+            self.now = time
+            handler(*args)
+            processed += 1
+        if until != float("inf"):
+            self.now = max(self.now, until)
+        self.processed += processed
+        return processed
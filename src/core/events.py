@@ -0,0 +1,104 @@
+from __future__ import annotations
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, TextIO
+
+EVENT_LOGGER_NAME = "ride_sharing"
+
+# Off by default: the library never writes anything until an application turns events on
+event_logger = logging.getLogger(EVENT_LOGGER_NAME)
+event_logger.addHandler(logging.NullHandler())
+event_logger.setLevel(logging.WARNING)
+event_logger.propagate = False
+
+
+def get_event_logger(component: str) -> logging.Logger:
+    return logging.getLogger(f"{EVENT_LOGGER_NAME}.{component}")
+
+
+"""
+Emits a structured lifecycle event.
+The message is a %-style template formatted only if a handler actually writes the record, and the
+event name and fields are attached to the record as record.event and record.fields.
+Args:
+    logger (logging.Logger): The component logger.
+    level (int): The logging level of the event.
+    event (str): A stable machine-readable event name, e.g. "ride_requested".
+    message (str): The human-readable %-style template.
+    args (Any): The template arguments.
+    fields (Any): Structured fields such as ride_id, driver_id or duration_ms.
+"""
+def emit(logger: logging.Logger, level: int, event: str, message: str, *args: Any, **fields: Any):
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args, extra={"event": event, "fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats event records as one JSON object per line, with the event fields as top-level keys.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage()
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that hands records over unformatted, so message formatting and I/O both happen
+    on the listener thread instead of the thread that emitted the event.
+    Only suitable for in-process queues, since record arguments are not made picklable.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+"""
+Prints events to the console in the original simulator wording, e.g. for main.py's verbose mode.
+Args:
+    level (int): The lowest level printed; DEBUG includes location pings and driver offers.
+    stream (TextIO): The output stream, stdout by default.
+Returns:
+    logging.Handler: The installed handler.
+"""
+def enable_console_events(level: int = logging.DEBUG, stream: TextIO | None = None) -> logging.Handler:
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    event_logger.addHandler(handler)
+    event_logger.setLevel(level)
+    return handler
+
+
+"""
+Routes events through a queue to the given handlers, which run on a background listener thread.
+Emitting threads only enqueue the record and never block on formatting or I/O.
+Args:
+    handlers (logging.Handler): The sinks, e.g. a FileHandler with a JsonFormatter.
+    level (int): The lowest level emitted.
+Returns:
+    QueueListener: The started listener; stop it to flush the queue on shutdown.
+"""
+def enable_queued_events(*handlers: logging.Handler, level: int = logging.INFO) -> QueueListener:
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    event_logger.addHandler(DeferredQueueHandler(records))
+    event_logger.setLevel(level)
+    return listener
+
+
+# Turns events back off and drops every handler added since import
+def reset_events():
+    for handler in list(event_logger.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            event_logger.removeHandler(handler)
+    event_logger.setLevel(logging.WARNING)
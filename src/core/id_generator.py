@@ -0,0 +1,89 @@
+from __future__ import annotations
+import os
+import threading
+import time
+
+# Snowflake layout: 41 bits of milliseconds since EPOCH_MS | 10 bits of node id | 12 bits of sequence
+EPOCH_MS = 1_704_067_200_000 # 2024-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+NODE_ID_ENV = "RIDE_SHARING_NODE_ID"
+
+
+class IdGenerator:
+    """
+    Snowflake-style generator of 64-bit ids that are unique per node, monotonic within a process
+    and sortable by creation time. Ids are rendered as 16-character zero-padded hex strings.
+    Args:
+        node_id (int): The shard/node component, 0-1023. Every dispatcher process needs its own.
+        clock (callable): Millisecond wall clock, replaceable in tests.
+    """
+    def __init__(self, node_id: int = 0, clock=None):
+        if not (0 <= node_id <= MAX_NODE_ID):
+            raise ValueError(f"Invalid node id: Must be between 0 and {MAX_NODE_ID}.")
+        self.node_id = node_id
+        self.clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self.last_timestamp = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+
+    """
+    This function returns the next id as an integer.
+    If the wall clock steps backwards, the last timestamp is reused so ids never decrease.
+    """
+    def next_int(self) -> int:
+        with self.lock:
+            timestamp = max(self.clock() - EPOCH_MS, self.last_timestamp)
+            if timestamp == self.last_timestamp:
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    timestamp += 1
+            else:
+                self.sequence = 0
+            self.last_timestamp = timestamp
+            return (timestamp << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self.sequence
+
+    def next_id(self) -> str:
+        return encode_id(self.next_int())
+
+
+# Fixed-width hex, so string order matches creation order
+def encode_id(value: int) -> str:
+    return f"{value:016x}"
+
+
+def decode_id(encoded: str) -> int:
+    return int(encoded, 16)
+
+
+"""
+Splits an id back into its (timestamp_ms, node_id, sequence) parts.
+Args:
+    encoded (str): An id produced by IdGenerator.next_id.
+"""
+def parse_id(encoded: str) -> tuple[int, int, int]:
+    value = decode_id(encoded)
+    return (
+        (value >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+        (value >> SEQUENCE_BITS) & MAX_NODE_ID,
+        value & MAX_SEQUENCE
+    )
+
+
+id_generator = IdGenerator(int(os.environ.get(NODE_ID_ENV, "0")))
+
+"""
+Replaces the process-wide generator, e.g. when a worker process learns its shard number.
+Args:
+    node_id (int): The node component for every id generated from now on.
+"""
+def configure_node(node_id: int):
+    global id_generator
+    id_generator = IdGenerator(node_id)
+
+def generate_id() -> str:
+    return id_generator.next_id()
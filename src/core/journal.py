@@ -0,0 +1,350 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.core.events import emit, get_event_logger
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import load_snapshot, save_snapshot, snapshot_journal_sequence
+from src.models.location.location import Location
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.ride.stop import Stop
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+
+# Each record is framed as <payload length><CRC-32 of payload> followed by a compact JSON array
+# [sequence, kind, *fields]; a torn or corrupt tail stops replay at the last whole record
+FRAME = struct.Struct("<II")
+DRIVER_REGISTERED = "driver_registered"
+DRIVER_UNREGISTERED = "driver_unregistered"
+RIDER_REGISTERED = "rider_registered"
+DRIVER_AVAILABILITY = "driver_availability"
+RIDE_REQUESTED = "ride_requested"
+RIDE_ASSIGNED = "ride_assigned"
+RIDE_STARTED = "ride_started"
+RIDE_COMPLETED = "ride_completed"
+RIDE_CANCELLED = "ride_cancelled"
+# A pooled driver's capacity and whole stop list, written by PoolDispatcher whenever the route changes
+DRIVER_ROUTE = "driver_route"
+
+# Durability modes
+# Buffered in the process until a batch fills or flush() runs, then written without fsync: a process crash
+# loses up to batch_records - 1 records, and a power failure also loses what the OS had not written out
+DURABILITY_NONE = "none"
+DURABILITY_INTERVAL = "interval"  # A background thread writes and fsyncs every flush interval
+DURABILITY_ALWAYS = "always"      # Every record is fsynced before it returns; concurrent callers share one fsync
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_INTERVAL, DURABILITY_ALWAYS)
+DEFAULT_BATCH_RECORDS = 512
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.01
+
+Record = Tuple[Any, ...]
+
+logger = get_event_logger("journal")
+
+
+"""
+Reads the whole records of a journal file in order.
+Args:
+    path (str): The journal file.
+Returns:
+    Iterator[Tuple[Record, int]]: Each record with the file offset just past it.
+"""
+def read_journal(path: str) -> Iterator[Tuple[Record, int]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        data = file.read()
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        length, checksum = FRAME.unpack_from(data, offset)
+        start, end = offset + FRAME.size, offset + FRAME.size + length
+        payload = data[start:end]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        offset = end
+        yield tuple(json.loads(payload)), offset
+
+
+class RideJournal:
+    """
+    Append-only write-ahead journal of ride state transitions, driver availability changes, pooled routes
+    and registrations.
+    Attach it with RideSharingManager.attach_journal; pair it with checkpoint() and recover() to rebuild a
+    crashed dispatcher. Records are buffered and written in groups, so one write and one fsync cover
+    many requests. Driver location pings are not journaled: after recovery a driver is where the snapshot
+    or their last ride transition left them until their next ping.
+    Opening an existing journal continues its sequence and drops any torn record at its end.
+    Args:
+        path (str): The journal file.
+        durability (str): One of DURABILITY_MODES.
+        batch_records (int): Buffered records that trigger a write.
+        flush_interval_seconds (float): How often the background thread flushes in "interval" mode.
+    """
+    def __init__(
+        self,
+        path: str,
+        durability: str = DURABILITY_INTERVAL,
+        batch_records: int = DEFAULT_BATCH_RECORDS,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.path = path
+        self.durability = durability
+        self.batch_records = batch_records
+        self.flush_interval_seconds = flush_interval_seconds
+
+        last_sequence, valid_length = 0, 0
+        for record, valid_length in read_journal(path):
+            last_sequence = record[0]
+        self.file = open(path, "ab")
+        if self.file.tell() != valid_length:
+            self.file.truncate(valid_length)
+            emit(logger, logging.WARNING, "journal_tail_truncated", "Dropped a torn record at the end of %s.", path, path=path)
+
+        self.sequence = last_sequence
+        self.durable_sequence = last_sequence
+        self.buffer: List[bytes] = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.flusher = None
+        if durability == DURABILITY_INTERVAL:
+            self.flusher = threading.Thread(target=self.flush_periodically, name="ride-journal-flusher", daemon=True)
+            self.flusher.start()
+
+
+    """
+    This function appends a record to the journal.
+    Args:
+        kind (str): The record kind, e.g. RIDE_STARTED.
+        fields (Any): JSON-serializable fields of the record.
+    Returns:
+        int: The record's sequence number.
+    """
+    def record(self, kind: str, *fields: Any) -> int:
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+            payload = json.dumps((sequence, kind, *fields), separators=(",", ":")).encode("utf-8")
+            self.buffer.append(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            full = len(self.buffer) >= self.batch_records
+        if self.durability == DURABILITY_ALWAYS:
+            self.commit(sequence)
+        elif full:
+            self.flush()
+        return sequence
+
+
+    """
+    This function blocks until every record up to a sequence number is on disk (group commit).
+    Whichever caller gets the flush lock first writes and fsyncs everything buffered so far, so callers
+    queued behind it usually find their records already durable and return without another fsync.
+    Args:
+        sequence (int): The record that must be durable.
+    """
+    def commit(self, sequence: int):
+        if self.durable_sequence >= sequence:
+            return
+        with self.flush_lock:
+            if self.durable_sequence < sequence:
+                self.write_buffered(sync=True)
+
+
+    """
+    This function writes every buffered record, and fsyncs them unless durability is "none".
+    """
+    def flush(self):
+        with self.flush_lock:
+            self.write_buffered(sync=self.durability != DURABILITY_NONE)
+
+    def write_buffered(self, sync: bool):
+        with self.lock:
+            pending, self.buffer = self.buffer, []
+            sequence = self.sequence
+        if pending:
+            self.file.write(b"".join(pending))
+            self.file.flush()
+        if sync and (pending or self.durable_sequence < sequence):
+            os.fsync(self.file.fileno())
+        self.durable_sequence = sequence
+
+    def flush_periodically(self):
+        while not self.closed.wait(self.flush_interval_seconds):
+            if self.buffer:
+                self.flush()
+
+
+    """
+    This function saves a snapshot that includes every journal record so far, then empties the journal.
+    Recovery loads the snapshot and replays only records written after it. A crash between the two
+    steps is safe: the snapshot stores its last sequence and older records are skipped on replay.
+    Take it while no dispatch is in progress so the snapshot and the sequence agree.
+    Args:
+        manager (RideSharingManager): The manager this journal is attached to.
+        snapshot_path (str): Where to write the snapshot.
+    """
+    def checkpoint(self, manager: RideSharingManager, snapshot_path: str):
+        with self.flush_lock:
+            self.write_buffered(sync=True)
+            with self.lock:
+                save_snapshot(manager, snapshot_path, self.sequence)
+                self.file.truncate(0)
+                self.file.seek(0)
+                os.fsync(self.file.fileno())
+        emit(logger, logging.INFO, "journal_checkpoint", "Checkpoint at journal sequence %s written to %s.", self.sequence, snapshot_path,
+             sequence=self.sequence, path=snapshot_path)
+
+
+    """
+    This function flushes everything buffered and closes the journal.
+    """
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.flush_lock:
+            self.write_buffered(sync=self.durability != DURABILITY_NONE)
+        self.file.close()
+
+    def __enter__(self) -> "RideJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+"""
+Rebuilds a dispatcher's state after a crash: loads the last checkpoint snapshot, if any, and replays
+the journal records written after it.
+Args:
+    journal_path (str): The journal file.
+    snapshot_path (str): The last checkpoint snapshot; may not exist yet.
+    operational_area (List[float]): Initializes the spatial index when there is no snapshot.
+    backend (str): The spatial backend used when there is no snapshot.
+Returns:
+    RideSharingManager: The recovered manager, without a journal attached.
+"""
+def recover(journal_path: str, snapshot_path: str | None = None, operational_area: List[float] | None = None,
+            backend: str = "grid") -> RideSharingManager:
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        manager = load_snapshot(snapshot_path)
+        after_sequence = snapshot_journal_sequence(snapshot_path)
+    elif operational_area is not None:
+        manager = RideSharingManager()
+        manager.initialize_spatial_index(operational_area, backend)
+        after_sequence = 0
+    else:
+        raise ValueError("Recovery without a snapshot needs the operational area.")
+
+    replay = JournalReplay(manager)
+    replayed = 0
+    for record, _ in read_journal(journal_path):
+        if record[0] > after_sequence:
+            replay.apply(record)
+            replayed += 1
+    emit(logger, logging.INFO, "journal_recovered", "Recovered %d journal records after sequence %d.", replayed, after_sequence,
+         replayed=replayed, after_sequence=after_sequence)
+    return manager
+
+
+class JournalReplay:
+    """
+    Applies journal records to a manager. Each record is applied only if the state it moves from is
+    still current, so records already reflected in a snapshot are skipped.
+    Args:
+        manager (RideSharingManager): The manager to rebuild; it must not have a journal attached.
+    """
+    def __init__(self, manager: RideSharingManager):
+        self.manager = manager
+        # Riders that requested rides without registering
+        self.riders: Dict[str, Rider] = {ride.rider.user_id: ride.rider for ride in manager.rides.values()}
+
+    def apply(self, record: Record):
+        getattr(self, f"apply_{record[1]}")(*record[2:])
+
+    def apply_driver_registered(self, driver_id, email, user_name, latitude, longitude, is_available):
+        if driver_id not in self.manager.drivers:
+            self.manager.register_driver(Driver.from_snapshot(driver_id, email, user_name, Location(latitude, longitude), is_available))
+
+    def apply_driver_unregistered(self, driver_id):
+        driver = self.manager.get_driver(driver_id)
+        if driver is not None:
+            self.manager.unregister_driver(driver)
+
+    def apply_rider_registered(self, rider_id, email, user_name, latitude, longitude):
+        if rider_id not in self.manager.riders:
+            rider = self.riders.get(rider_id) or Rider.from_snapshot(rider_id, email, user_name, Location(latitude, longitude))
+            self.manager.register_rider(rider)
+
+    def apply_driver_availability(self, driver_id, is_available):
+        driver = self.manager.get_driver(driver_id)
+        if driver is not None:
+            driver.is_available = is_available
+
+    def apply_ride_requested(self, ride_id, rider_id, email, user_name, start_latitude, start_longitude, end_latitude, end_longitude, distance):
+        if ride_id in self.manager.rides:
+            return
+        rider = self.manager.get_rider(rider_id) or self.riders.get(rider_id)
+        if rider is None:
+            rider = self.riders[rider_id] = Rider.from_snapshot(rider_id, email, user_name, Location(start_latitude, start_longitude))
+        ride = Ride.from_snapshot(ride_id, rider, None, RideStatus.REQUESTED, Location(start_latitude, start_longitude),
+                                  Location(end_latitude, end_longitude), distance)
+        self.manager.add_ride(ride)
+        rider.current_ride = ride
+
+    def apply_ride_assigned(self, ride_id, driver_id):
+        ride = self.manager.get_ride(ride_id)
+        driver = self.manager.get_driver(driver_id)
+        if ride is None or driver is None or ride.ride_status != RideStatus.REQUESTED:
+            return
+        ride.driver = driver
+        ride.ride_status = RideStatus.PICKING_UP
+        driver.current_ride = ride
+
+    def apply_ride_started(self, ride_id):
+        ride = self.manager.get_ride(ride_id)
+        if ride is not None and ride.ride_status == RideStatus.PICKING_UP:
+            ride.start_ride()
+
+    def apply_ride_completed(self, ride_id):
+        ride = self.manager.get_ride(ride_id)
+        if ride is None or ride.ride_status != RideStatus.IN_TRIP:
+            return
+        ride.complete_ride()
+        ride.rider.ride_history.append(ride)
+        ride.rider.current_ride = None
+        if ride.driver is not None:
+            ride.driver.drive_history.append(ride)
+            if ride.driver.current_ride is ride:
+                ride.driver.current_ride = None
+
+    def apply_driver_route(self, driver_id, capacity, stops):
+        driver = self.manager.get_driver(driver_id)
+        if driver is None:
+            return
+        driver.capacity = capacity
+        driver.stops = []
+        for ride_id, is_pickup, deadline in stops:
+            ride = self.manager.get_ride(ride_id)
+            if ride is not None:
+                driver.stops.append(Stop(ride, is_pickup, ride.start_location if is_pickup else ride.end_location, deadline))
+        # Pooled rides are served through the stops, so none of them is the driver's current ride
+        if driver.current_ride is not None and any(stop.ride is driver.current_ride for stop in driver.stops):
+            driver.current_ride = None
+
+    def apply_ride_cancelled(self, ride_id):
+        ride = self.manager.get_ride(ride_id)
+        if ride is None or ride.ride_status not in (RideStatus.REQUESTED, RideStatus.PICKING_UP):
+            return
+        ride.cancel_ride()
+        ride.rider.current_ride = None
+        if ride.driver is not None and ride.driver.current_ride is ride:
+            ride.driver.current_ride = None
@@ -0,0 +1,31 @@
+from __future__ import annotations
+import importlib
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a module that is imported the first time one of its attributes is used, so a heavy
+    dependency needed only on some paths, e.g. NumPy for bulk registration and vectorized searches,
+    is not paid for at startup. The real module's attributes are then copied in, so later lookups
+    cost the same as on the module itself. The import holds Python's import lock for the module,
+    so threads racing on first use import it once.
+    Args:
+        name (str): The module's name, e.g. "numpy".
+    """
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+"""
+This function returns a module that is imported on first attribute use, or the module itself if it
+is imported already.
+Args:
+    name (str): The module's name, e.g. "numpy".
+"""
+def lazy_module(name: str) -> ModuleType:
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
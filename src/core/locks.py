@@ -0,0 +1,50 @@
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+DEFAULT_STRIPES = 64
+
+
+class StripedLock:
+    """
+    A fixed pool of re-entrant locks shared by key hash, so unrelated keys rarely contend
+    while the lock count stays constant no matter how many keys exist.
+    Args:
+        stripes (int): The number of locks in the pool.
+    """
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self.locks = [threading.RLock() for _ in range(stripes)]
+
+    def lock_for(self, key: Hashable) -> threading.RLock:
+        return self.locks[hash(key) % len(self.locks)]
+
+
+    """
+    This function holds the locks of several keys at once.
+    Locks are taken in stripe order, so two threads locking overlapping keys cannot deadlock.
+    Args:
+        keys (Hashable): The keys to lock.
+    """
+    @contextmanager
+    def holding(self, *keys: Hashable) -> Iterator[None]:
+        stripes = sorted({hash(key) % len(self.locks) for key in keys})
+        for stripe in stripes:
+            self.locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self.locks[stripe].release()
+
+
+    # Hold every stripe, for bulk writes that touch an unknown set of keys
+    @contextmanager
+    def holding_all(self) -> Iterator[None]:
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
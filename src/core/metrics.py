@@ -0,0 +1,210 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Dict, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Each power of two is split into 2**SUB_BUCKET_BITS buckets, so a recorded value is off by at most ~3%
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+METRIC_PREFIX = "ride_sharing"
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies in whole microseconds with log-linear buckets: values below
+    SUB_BUCKETS get one bucket each, and every power of two above is split into SUB_BUCKETS equal buckets.
+    Memory stays a few hundred counters from 1 microsecond to hours, with constant relative precision.
+    """
+    def __init__(self):
+        self.counts: List[int] = []
+        self.count = 0
+        self.total_microseconds = 0
+        self.min_microseconds = 0
+        self.max_microseconds = 0
+
+    @staticmethod
+    def bucket_of(value: int) -> int:
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def upper_bound_of(bucket: int) -> int:
+        if bucket < SUB_BUCKETS:
+            return bucket
+        shift, offset = divmod(bucket, SUB_BUCKETS)
+        shift -= 1
+        return ((offset + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, microseconds: int):
+        bucket = self.bucket_of(microseconds)
+        if bucket >= len(self.counts):
+            self.counts.extend([0] * (bucket + 1 - len(self.counts)))
+        self.counts[bucket] += 1
+        if self.count == 0 or microseconds < self.min_microseconds:
+            self.min_microseconds = microseconds
+        if microseconds > self.max_microseconds:
+            self.max_microseconds = microseconds
+        self.count += 1
+        self.total_microseconds += microseconds
+
+
+    """
+    This function returns the latency at or below which a fraction of the recorded values fall.
+    Values are reported as the upper bound of their bucket, capped at the largest value seen.
+    Args:
+        quantile (float): The fraction, between 0 and 1.
+    """
+    def percentile(self, quantile: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = max(1, round(quantile * self.count))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.upper_bound_of(bucket), self.max_microseconds)
+        return self.max_microseconds
+
+    def snapshot(self) -> Dict[str, float]:
+        summary = {
+            "count": self.count,
+            "sum_us": self.total_microseconds,
+            "min_us": self.min_microseconds,
+            "max_us": self.max_microseconds,
+            "mean_us": self.total_microseconds / self.count if self.count else 0.0
+        }
+        for quantile in QUANTILES:
+            summary[f"p{quantile * 100:g}_us"] = self.percentile(quantile)
+        return summary
+
+
+class DispatchMetrics:
+    """
+    Latency histograms and counters for the dispatch path, read through RideSharingManager.metrics().
+    Disabled by default: instrumented code checks `enabled` before reading a clock, so the cost of
+    the switched-off metrics is one attribute lookup per stage.
+    Args:
+        enabled (bool): Whether stages record anything.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+
+    """
+    This function records how long a stage took.
+    Args:
+        stage (str): The stage name, e.g. "nearest_query".
+        started_at (float): The time.perf_counter() reading taken when the stage began.
+    """
+    def observe_since(self, stage: str, started_at: float):
+        microseconds = int((time.perf_counter() - started_at) * 1_000_000)
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(microseconds)
+
+    def increment(self, counter: str, amount: int = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+
+
+    """
+    This function returns a point-in-time copy of every counter and histogram summary, plus derived dispatch rates.
+    """
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {stage: histogram.snapshot() for stage, histogram in self.histograms.items()}
+        queries = counters.get("nearest_queries", 0)
+        searches = counters.get("driver_searches", 0)
+        examined = counters.get("candidates_examined", 0)
+        rates = {
+            "expansion_rate": counters.get("nearest_expanded", 0) / queries if queries else 0.0,
+            "candidate_yield": counters.get("candidates_returned", 0) / examined if examined else 0.0,
+            "no_driver_rate": counters.get("driver_searches_empty", 0) / searches if searches else 0.0
+        }
+        return {"counters": counters, "histograms": histograms, "rates": rates}
+
+
+    """
+    This function renders the snapshot in the Prometheus text exposition format.
+    Counters become counters, histograms become summaries in seconds, and rates become gauges.
+    """
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for counter, value in sorted(snapshot["counters"].items()):
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        for stage, summary in sorted(snapshot["histograms"].items()):
+            name = f"{METRIC_PREFIX}_{stage}_seconds"
+            lines.append(f"# TYPE {name} summary")
+            for quantile in QUANTILES:
+                lines.append(f'{name}{{quantile="{quantile:g}"}} {summary[f"p{quantile * 100:g}_us"] / 1_000_000:.6f}')
+            lines += [f"{name}_sum {summary['sum_us'] / 1_000_000:.6f}", f"{name}_count {summary['count']}"]
+        for rate, value in sorted(snapshot["rates"].items()):
+            name = f"{METRIC_PREFIX}_{rate}"
+            lines += [f"# TYPE {name} gauge", f"{name} {value:.6f}"]
+        return "\n".join(lines) + "\n"
+
+
+    """
+    This function writes the Prometheus text to a file, e.g. for the node_exporter textfile collector.
+    The file is replaced atomically, so a scraper never reads a half-written snapshot.
+    Args:
+        path (str): The destination file.
+    """
+    def write_prometheus(self, path: str):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+
+    """
+    This function serves the Prometheus text on GET /metrics from a background thread.
+    http.server is imported here rather than at startup, since most processes never serve.
+    Args:
+        port (int): The port to listen on, 0 for any free port.
+        host (str): The interface to bind.
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    def serve_prometheus(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,177 @@
+from __future__ import annotations
+from math import inf
+from typing import NamedTuple
+import numpy as np
+
+from src.core.distance import PreparedCoordinates, haversine_one_to_many, haversine_pairwise
+from src.models.location.location import Location
+
+# Routes scored per NumPy pass; later passes only run while their lower bound can still win
+ROUTES_PER_PASS = 64
+
+
+class Insertion(NamedTuple):
+    route: int
+    # The new pickup goes right after this position of the route, 0 being the driver
+    pickup_after: int
+    # The new dropoff goes right after this position of the original route; equal to pickup_after
+    # when the dropoff directly follows the pickup
+    dropoff_after: int
+    added_seconds: float
+    pickup_seconds: float
+    dropoff_seconds: float
+
+
+"""
+Finds the cheapest feasible way to insert one ride's pickup and dropoff into any of many routes.
+Every route is a driver position followed by its stops; routes are padded to the same width by repeating
+their last position. Arrival times, slack before each stop's deadline and riders on board are prefix sums
+over a route, so checking one (route, pickup position, dropoff position) choice is O(1) and whole groups of
+routes are scored at once with NumPy. Routes are scored cheapest lower bound first, ROUTES_PER_PASS at a
+time, and the search stops once no route left can beat the best insertion found.
+Travel times are straight-line distance at a constant speed.
+Args:
+    latitudes (np.ndarray): (routes, width) latitudes of the driver and then each stop.
+    longitudes (np.ndarray): (routes, width) longitudes in the same layout.
+    stop_counts (np.ndarray): The number of stops of each route.
+    deadlines (np.ndarray): (routes, width) seconds from now by which each position must be reached; inf for
+        the driver and for padding.
+    loads (np.ndarray): (routes, width) riders on board when leaving each position; 0 for padding.
+    capacities (np.ndarray): The seats of each route's car.
+    pickup (Location): The new ride's pickup.
+    dropoff (Location): The new ride's dropoff.
+    pickup_deadline (float): Seconds from now by which the new rider must be picked up.
+    max_ride_seconds (float): The longest the new rider may spend in the car.
+    speed_kmh (float): The driving speed.
+Returns:
+    Insertion | None: The choice adding the least driving time, or None if no route can take the ride.
+"""
+def best_insertion(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    stop_counts: np.ndarray,
+    deadlines: np.ndarray,
+    loads: np.ndarray,
+    capacities: np.ndarray,
+    pickup: Location,
+    dropoff: Location,
+    pickup_deadline: float,
+    max_ride_seconds: float,
+    speed_kmh: float
+) -> Insertion | None:
+    routes, width = latitudes.shape
+    if not routes:
+        return None
+    seconds_per_km = 3600.0 / speed_kmh
+    # One more padded column so every position has a next one
+    latitudes = np.concatenate([latitudes, latitudes[:, -1:]], axis=1)
+    longitudes = np.concatenate([longitudes, longitudes[:, -1:]], axis=1)
+    legs = haversine_pairwise(
+        PreparedCoordinates(latitudes[:, :-1].ravel(), longitudes[:, :-1].ravel()),
+        PreparedCoordinates(latitudes[:, 1:].ravel(), longitudes[:, 1:].ravel())
+    ).reshape(routes, width) * seconds_per_km
+    positions = PreparedCoordinates(latitudes.ravel(), longitudes.ravel())
+    to_pickup = haversine_one_to_many(pickup.latitude, pickup.longitude, positions).reshape(routes, width + 1) * seconds_per_km
+    to_dropoff = haversine_one_to_many(dropoff.latitude, dropoff.longitude, positions).reshape(routes, width + 1) * seconds_per_km
+    trip = pickup.calculate_distance_in_km(dropoff) * seconds_per_km
+
+    arrival = np.zeros((routes, width))
+    np.cumsum(legs[:, :-1], axis=1, out=arrival[:, 1:])
+    slack = deadlines - arrival
+    # suffix_slack[:, k]: how much every position from k on can still be delayed
+    suffix_slack = np.full((routes, width + 1), inf)
+    suffix_slack[:, :width] = np.minimum.accumulate(slack[:, ::-1], axis=1)[:, ::-1]
+    has_next = np.arange(width)[np.newaxis, :] < stop_counts[:, np.newaxis]
+    # Extra driving from a stop between positions k and k + 1, or after the last position
+    pickup_detour = np.where(has_next, to_pickup[:, :width] + to_pickup[:, 1:] - legs, to_pickup[:, :width])
+    dropoff_detour = np.where(has_next, to_dropoff[:, :width] + to_dropoff[:, 1:] - legs, to_dropoff[:, :width])
+    pickup_at = arrival + to_pickup[:, :width]
+
+    # Every insertion adds at least its pickup detour, from a position the pickup can be reached from in time
+    # with a free seat
+    can_pick_up = (
+        (np.arange(width)[np.newaxis, :] <= stop_counts[:, np.newaxis])
+        & (pickup_at <= pickup_deadline) & (loads + 1 <= capacities[:, np.newaxis])
+        & (pickup_detour <= suffix_slack[:, 1:])
+    )
+    lower_bounds = np.where(can_pick_up, pickup_detour, inf).min(axis=1)
+    order = np.argsort(lower_bounds, kind="stable")
+    order = order[:np.searchsorted(lower_bounds[order], inf)]
+
+    best, best_cost = None, inf
+    for first in range(0, len(order), ROUTES_PER_PASS):
+        group = order[first:first + ROUTES_PER_PASS]
+        if lower_bounds[group[0]] >= best_cost:
+            break
+        group_width = int(stop_counts[group].max()) + 1
+        cost, dropoff_times = score_insertions(
+            group_width, stop_counts[group], capacities[group], loads[group, :group_width], slack[group, :group_width],
+            suffix_slack[group, :group_width + 1], arrival[group, :group_width], legs[group, :group_width],
+            pickup_detour[group, :group_width], dropoff_detour[group, :group_width], pickup_at[group, :group_width],
+            to_pickup[group, :group_width], to_dropoff[group, :group_width + 1], trip, pickup_deadline, max_ride_seconds
+        )
+        index = int(cost.argmin())
+        if cost.flat[index] < best_cost:
+            route, pickup_after, dropoff_after = np.unravel_index(index, cost.shape)
+            best_cost = float(cost.flat[index])
+            best = Insertion(
+                int(group[route]), int(pickup_after), int(dropoff_after), best_cost,
+                float(pickup_at[group[route], pickup_after]), float(dropoff_times[route, pickup_after, dropoff_after])
+            )
+    return best
+
+
+"""
+Scores every (pickup position, dropoff position) insertion into a group of routes.
+Args:
+    width (int): The positions scored per route.
+    The other arguments are best_insertion's per-route prefix arrays, cut to the group and width.
+Returns:
+    Tuple[np.ndarray, np.ndarray]: (routes, width, width) added seconds, inf where infeasible, and dropoff times.
+"""
+def score_insertions(
+    width: int, stop_counts: np.ndarray, capacities: np.ndarray, loads: np.ndarray, slack: np.ndarray,
+    suffix_slack: np.ndarray, arrival: np.ndarray, legs: np.ndarray, pickup_detour: np.ndarray,
+    dropoff_detour: np.ndarray, pickup_at: np.ndarray, to_pickup: np.ndarray, to_dropoff: np.ndarray,
+    trip: float, pickup_deadline: float, max_ride_seconds: float
+):
+    routes = len(stop_counts)
+    # range_slack[:, a, b] and range_load[:, a, b]: least slack and most riders over positions a..b
+    range_slack = np.full((routes, width + 1, width), inf)
+    range_load = np.zeros((routes, width, width))
+    for start in range(width):
+        range_slack[:, start, start:] = np.minimum.accumulate(slack[:, start:], axis=1)
+        range_load[:, start, start:] = np.maximum.accumulate(loads[:, start:], axis=1)
+
+    after_pickup = np.arange(width)[np.newaxis, :, np.newaxis]
+    after_dropoff = np.arange(width)[np.newaxis, np.newaxis, :]
+    counts = stop_counts[:, np.newaxis, np.newaxis]
+    has_next = np.arange(width)[np.newaxis, :] < stop_counts[:, np.newaxis]
+
+    # Dropoff later in the route: positions between the two stops are delayed by the pickup detour,
+    # positions after the dropoff by both detours
+    apart_added = pickup_detour[:, :, np.newaxis] + dropoff_detour[:, np.newaxis, :]
+    apart_dropoff_at = arrival[:, np.newaxis, :] + pickup_detour[:, :, np.newaxis] + to_dropoff[:, np.newaxis, :width]
+    apart = (
+        (after_dropoff > after_pickup) & (after_dropoff <= counts)
+        & (pickup_detour[:, :, np.newaxis] <= range_slack[:, 1:, :])
+        & (apart_added <= suffix_slack[:, np.newaxis, 1:])
+        & (range_load + 1 <= capacities[:, np.newaxis, np.newaxis])
+    )
+    # Dropoff right after the pickup
+    adjacent_added = to_pickup + trip + np.where(has_next, to_dropoff[:, 1:] - legs, 0.0)
+    adjacent = (
+        (np.arange(width)[np.newaxis, :] <= stop_counts[:, np.newaxis])
+        & (adjacent_added <= suffix_slack[:, 1:])
+        & (loads + 1 <= capacities[:, np.newaxis])
+    )
+
+    same = after_dropoff == after_pickup
+    added = np.where(same, adjacent_added[:, :, np.newaxis], apart_added)
+    dropoff_at = np.where(same, (pickup_at + trip)[:, :, np.newaxis], apart_dropoff_at)
+    feasible = (
+        np.where(same, adjacent[:, :, np.newaxis], apart)
+        & (pickup_at[:, :, np.newaxis] <= pickup_deadline)
+        & (dropoff_at - pickup_at[:, :, np.newaxis] <= max_ride_seconds)
+    )
+    return np.where(feasible, added, inf), dropoff_at
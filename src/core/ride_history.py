@@ -0,0 +1,239 @@
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Tuple
+
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+
+DEFAULT_RECENT_CAPACITY = 10_000
+DEFAULT_BATCH_ROWS = 1024
+# Checkpointing the write-ahead log is what fsyncs in WAL mode, so let it grow to 64 MB between checkpoints,
+# and give the rider and driver indexes, which take inserts at random positions, room in the page cache
+FILE_PRAGMAS = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA wal_autocheckpoint=16384", "PRAGMA cache_size=-32768")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS rides (
+        ride_id TEXT PRIMARY KEY,
+        rider_id TEXT NOT NULL,
+        driver_id TEXT,
+        status TEXT NOT NULL,
+        start_latitude REAL NOT NULL,
+        start_longitude REAL NOT NULL,
+        end_latitude REAL NOT NULL,
+        end_longitude REAL NOT NULL,
+        distance REAL NOT NULL,
+        finished_at REAL NOT NULL
+    )""",
+    # History queries filter by rider or driver and read newest first, so each index ends with the finish time
+    "CREATE INDEX IF NOT EXISTS rides_by_rider ON rides (rider_id, finished_at)",
+    "CREATE INDEX IF NOT EXISTS rides_by_driver ON rides (driver_id, finished_at)",
+    "CREATE INDEX IF NOT EXISTS rides_by_time ON rides (finished_at)",
+)
+INSERT = "INSERT OR REPLACE INTO rides VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+COLUMNS = "ride_id, rider_id, driver_id, status, start_latitude, start_longitude, end_latitude, end_longitude, distance, finished_at"
+
+
+class RideRecord(NamedTuple):
+    """
+    A finished ride as kept in cold storage: ids instead of object references.
+    """
+    ride_id: str
+    rider_id: str
+    driver_id: str | None
+    ride_status: RideStatus
+    start_latitude: float
+    start_longitude: float
+    end_latitude: float
+    end_longitude: float
+    distance: float
+    finished_at: float
+
+
+class RideHistoryStore:
+    """
+    Cold storage for completed and cancelled rides, so a long-running dispatcher only keeps rides in flight
+    in memory. Attach it with RideSharingManager.attach_history: finished rides then leave manager.rides and
+    are no longer appended to Rider.ride_history or Driver.drive_history. Each ride becomes one row in an
+    SQLite table indexed by rider, driver and finish time, and only the most recently finished Ride objects
+    stay in memory, in a bounded LRU. Rows are written in batches; every query writes pending rows first.
+    Safe to share between threads.
+    Args:
+        path (str): The SQLite database file, or ":memory:".
+        recent_capacity (int): How many finished Ride objects stay in memory.
+        batch_rows (int): Pending rows that trigger a write.
+        clock (Callable[[], float]): Source of finish times, e.g. a simulation clock.
+    """
+    def __init__(
+        self,
+        path: str = ":memory:",
+        recent_capacity: int = DEFAULT_RECENT_CAPACITY,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.recent_capacity = recent_capacity
+        self.batch_rows = batch_rows
+        self.clock = clock
+        self.recent: OrderedDict[str, Ride] = OrderedDict()
+        self.pending: List[Tuple] = []
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            for pragma in FILE_PRAGMAS:
+                self.connection.execute(pragma)
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+
+    """
+    This function moves a finished ride into the store.
+    Args:
+        ride (Ride): A completed or cancelled ride.
+    """
+    def archive(self, ride: Ride):
+        start, end = ride.start_location, ride.end_location
+        row = (
+            ride.ride_id, ride.rider.user_id, ride.driver.user_id if ride.driver else None, ride.ride_status.value,
+            start.latitude, start.longitude, end.latitude, end.longitude, ride.distance, self.clock()
+        )
+        with self.lock:
+            self.recent[ride.ride_id] = ride
+            self.recent.move_to_end(ride.ride_id)
+            if len(self.recent) > self.recent_capacity:
+                self.recent.popitem(last=False)
+            self.pending.append(row)
+            if len(self.pending) >= self.batch_rows:
+                self.write_pending()
+
+
+    """
+    This function writes pending rows to the database. The caller must hold the lock.
+    """
+    def write_pending(self):
+        if not self.pending:
+            return
+        self.connection.executemany(INSERT, self.pending)
+        self.connection.commit()
+        self.pending.clear()
+
+
+    """
+    This function writes every pending row to the database.
+    """
+    def flush(self):
+        with self.lock:
+            self.write_pending()
+
+
+    """
+    This function returns a recently finished ride if it is still in memory.
+    Args:
+        ride_id (str): The ID of the ride.
+    Returns:
+        Ride: The ride object, or None if it was never archived or has been evicted.
+    """
+    def get_recent(self, ride_id: str) -> Ride | None:
+        with self.lock:
+            ride = self.recent.get(ride_id)
+            if ride is not None:
+                self.recent.move_to_end(ride_id)
+            return ride
+
+
+    """
+    This function looks up a finished ride in the database.
+    Args:
+        ride_id (str): The ID of the ride.
+    Returns:
+        RideRecord: The ride's record, or None if it was never archived.
+    """
+    def get(self, ride_id: str) -> RideRecord | None:
+        records = self.query(f"SELECT {COLUMNS} FROM rides WHERE ride_id = ?", (ride_id,))
+        return records[0] if records else None
+
+
+    """
+    This function returns a rider's finished rides, newest first.
+    Args:
+        rider_id (str): The ID of the rider.
+        since (float): Only rides finished at or after this time.
+        until (float): Only rides finished before this time.
+        limit (int): The maximum number of rides, or None for all.
+    """
+    def rides_for_rider(self, rider_id: str, since: float = float("-inf"), until: float = float("inf"), limit: int | None = None) -> List[RideRecord]:
+        return self.query(
+            f"SELECT {COLUMNS} FROM rides WHERE rider_id = ? AND finished_at >= ? AND finished_at < ? ORDER BY finished_at DESC LIMIT ?",
+            (rider_id, since, until, -1 if limit is None else limit)
+        )
+
+
+    """
+    This function returns a driver's finished rides, newest first.
+    Args:
+        driver_id (str): The ID of the driver.
+        since (float): Only rides finished at or after this time.
+        until (float): Only rides finished before this time.
+        limit (int): The maximum number of rides, or None for all.
+    """
+    def rides_for_driver(self, driver_id: str, since: float = float("-inf"), until: float = float("inf"), limit: int | None = None) -> List[RideRecord]:
+        return self.query(
+            f"SELECT {COLUMNS} FROM rides WHERE driver_id = ? AND finished_at >= ? AND finished_at < ? ORDER BY finished_at DESC LIMIT ?",
+            (driver_id, since, until, -1 if limit is None else limit)
+        )
+
+
+    """
+    This function returns every ride finished in a time window, newest first.
+    Args:
+        since (float): Only rides finished at or after this time.
+        until (float): Only rides finished before this time.
+        limit (int): The maximum number of rides, or None for all.
+    """
+    def rides_between(self, since: float, until: float, limit: int | None = None) -> List[RideRecord]:
+        return self.query(
+            f"SELECT {COLUMNS} FROM rides WHERE finished_at >= ? AND finished_at < ? ORDER BY finished_at DESC LIMIT ?",
+            (since, until, -1 if limit is None else limit)
+        )
+
+
+    """
+    This function runs a query after writing pending rows and converts its rows to records.
+    Args:
+        sql (str): A SELECT of COLUMNS.
+        parameters (Tuple): The query parameters.
+    """
+    def query(self, sql: str, parameters: Tuple) -> List[RideRecord]:
+        with self.lock:
+            self.write_pending()
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [RideRecord(*row[:3], RideStatus(row[3]), *row[4:]) for row in rows]
+
+
+    """
+    This function counts the finished rides in the store.
+    """
+    def count(self) -> int:
+        with self.lock:
+            self.write_pending()
+            return self.connection.execute("SELECT COUNT(*) FROM rides").fetchone()[0]
+
+
+    """
+    This function writes pending rows and closes the database.
+    """
+    def close(self):
+        with self.lock:
+            self.write_pending()
+            self.connection.close()
+
+
+    def __enter__(self) -> "RideHistoryStore":
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,17 +1,115 @@
-from typing import Dict, List
-from pyqtree import Index
+from __future__ import annotations
+import logging
+import threading
+import time
+from math import ceil
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
 
+from src.core.lazy_import import lazy_module
+from src.core.driver_store import DriverStore
+from src.core.events import emit, get_event_logger
+from src.core.locks import StripedLock
+from src.core.metrics import DispatchMetrics
+from src.core.ride_tracker import RideTracker
+from src.core.spatial_index import SPATIAL_BACKENDS, GridSpatialIndex, QuadTreeSpatialIndex, QueryStats, hilbert_keys
 from src.models.users.driver import Driver
 from src.models.users.rider import Rider
 from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.location.location import Location
+
+np = lazy_module("numpy")
+
+if TYPE_CHECKING:
+    from src.core.journal import RideJournal
+    from src.core.ride_history import RideHistoryStore
+    from src.core.surge_pricing import SurgePricing
+
+# A nearest-driver query that has to search past this radius counts as expanded, as the 3 km search
+# that used to fall back to 6 km did
+FIRST_PASS_RADIUS_KM = 3.0
+
+logger = get_event_logger("manager")
 
 
 class RideSharingManager:
+    """
+    Registry of drivers, riders and rides plus the driver spatial indexes.
+    Safe to share between threads: registry writes and every per-driver state change hold the lock
+    stripe of the entity's id, and the spatial indexes stripe their own locks by cell.
+    """
     def __init__(self):
         self.drivers: Dict[str, Driver] = {}
         self.riders: Dict[str, Rider] = {}
         self.rides: Dict[str, Ride] = {}
-        self.spatial_index: Index = None
+        self.driver_store: DriverStore = DriverStore()
+        self.available_index: GridSpatialIndex | QuadTreeSpatialIndex = None
+        self.busy_index: GridSpatialIndex | QuadTreeSpatialIndex = None
+        self.registry_locks = StripedLock()
+        self.dispatch_metrics: DispatchMetrics = DispatchMetrics()
+        self.journal: RideJournal | None = None
+        self.history: RideHistoryStore | None = None
+        self.ride_tracker: RideTracker = RideTracker()
+        self.pricing: SurgePricing | None = None
+    
+    
+    """
+    This function starts journaling registrations, availability changes and ride transitions.
+    Rides already in the system journal their later transitions too.
+    Args:
+        journal (RideJournal): The journal to append to, or None to stop journaling.
+    """
+    def attach_journal(self, journal: RideJournal | None):
+        self.journal = journal
+        for ride in list(self.rides.values()):
+            ride.journal = journal
+    
+    
+    """
+    This function starts keeping a pricing engine's supply counts up to date with every driver change.
+    Drivers already available are counted once, from the driver store columns.
+    Args:
+        pricing (SurgePricing): The engine to update, or None to stop.
+    """
+    def attach_pricing(self, pricing: SurgePricing | None):
+        with self.registry_locks.holding_all():
+            self.pricing = pricing
+            if pricing is None:
+                return
+            pricing.drivers_available(*self.driver_store.available_coordinates())
+    
+    
+    """
+    This function moves finished rides to cold storage instead of keeping them in memory forever.
+    From now on completed and cancelled rides leave self.rides and the riders' and drivers' history lists;
+    query them through the store. Rides that already finished are moved too.
+    Args:
+        history (RideHistoryStore): The store to archive to, or None to keep finished rides in memory again.
+    """
+    def attach_history(self, history: RideHistoryStore | None):
+        self.history = history
+        if history is None:
+            return
+        for ride in list(self.rides.values()):
+            if not ride.ride_is_active() and ride.ride_status != RideStatus.NEW:
+                self.finish_ride(ride)
+    
+    
+    """
+    This function records that a ride has completed or been cancelled.
+    With a history store attached the ride moves to it; otherwise it stays in self.rides.
+    Args:
+        ride (Ride): The finished ride.
+    """
+    def finish_ride(self, ride: Ride):
+        if self.history is None:
+            return
+        with self.registry_locks.lock_for(ride.ride_id):
+            if self.rides.pop(ride.ride_id, None) is None:
+                return
+        ride.tracker = None
+        self.ride_tracker.remove(ride)
+        self.history.archive(ride)
     
     
     """
@@ -20,8 +118,12 @@ class RideSharingManager:
         rider (Rider): The rider object to be registered.
     """
     def register_rider(self, rider: Rider):
-        self.riders[rider.user_id] = rider
-        print(f"{rider.user_name} has been registered.")
+        with self.registry_locks.lock_for(rider.user_id):
+            self.riders[rider.user_id] = rider
+            if self.journal:
+                location = rider.current_location
+                self.journal.record("rider_registered", rider.user_id, rider.email, rider.user_name, location.latitude, location.longitude)
+        emit(logger, logging.INFO, "rider_registered", "%s has been registered.", rider.user_name, rider_id=rider.user_id)
     
     
     """
@@ -36,29 +138,228 @@ class RideSharingManager:
     
     
     """
-    This function initializes the spatial index for driver locations.
+    This function initializes the spatial indexes for driver locations.
+    Available and busy drivers are kept in separate indexes so dispatch queries only visit assignable drivers.
     Args:
         operational_area (List[float]): The bounding box for the operational area [minX, minY, maxX, maxY].
+        backend (str): The spatial index implementation, "grid" (default) or "quadtree".
     """    
-    def initialize_spatial_index(self, operational_area: List[float]):
-        self.spatial_index = Index(bbox = operational_area)
+    def initialize_spatial_index(self, operational_area: List[float], backend: str = "grid"):
+        if backend not in SPATIAL_BACKENDS:
+            raise ValueError(f"Unknown spatial backend: {backend}")
+        self.available_index = SPATIAL_BACKENDS[backend](operational_area)
+        self.busy_index = SPATIAL_BACKENDS[backend](operational_area)
+        self.ride_tracker.set_regions(operational_area)
     
     
     """
-    This function registers a driver in the system and adds them to the spatial index.
+    This function registers a driver in the system and adds them to the spatial index matching their availability.
     Args:
         driver (Driver): The driver object.
     """    
     def register_driver(self, driver: Driver):
-        if self.spatial_index is None:
+        if self.available_index is None:
             raise Exception("Spatial index not initialized.")
-        self.drivers[driver.user_id] = driver
-        location = driver.current_location
-        self.spatial_index.insert(
-            item=driver,
-            bbox=[location.longitude, location.latitude, location.longitude, location.latitude]
-        )
-        print(f"Driver {driver.user_name} has been registered.")
+        with self.registry_locks.lock_for(driver.user_id):
+            if driver.user_id in self.drivers:
+                raise Exception(f"Driver {driver.user_name} is already registered.")
+            self.drivers[driver.user_id] = driver
+            latitude, longitude = driver.current_coordinates
+            slot = self.driver_store.allocate(driver.user_id, latitude, longitude, driver.is_available)
+            driver.attach_store(self.driver_store, slot)
+            index = self.available_index if driver.is_available else self.busy_index
+            index.insert(driver.user_id, driver, longitude, latitude)
+            driver.ride_sharing_manager = self
+            if self.pricing and driver.is_available:
+                self.pricing.driver_available(slot, latitude, longitude)
+            if self.journal:
+                self.journal.record(
+                    "driver_registered", driver.user_id, driver.email, driver.user_name, latitude, longitude, driver.is_available
+                )
+        emit(logger, logging.INFO, "driver_registered", "Driver %s has been registered.", driver.user_name, driver_id=driver.user_id)
+    
+    
+    """
+    This function registers many drivers at once, e.g. a whole fleet at shift start.
+    Drivers are laid out in Hilbert curve order, so nearby drivers get neighbouring driver store slots
+    and neighbouring positions in their index buckets, and both spatial indexes are filled in one bulk
+    pass instead of one insert per driver. One event is emitted for the whole batch.
+    Args:
+        drivers (Iterable[Driver]): The drivers to register; none may be registered already.
+    Returns:
+        int: The number of drivers registered.
+    """
+    def register_drivers(self, drivers: Iterable[Driver]) -> int:
+        if self.available_index is None:
+            raise Exception("Spatial index not initialized.")
+        drivers = list(drivers)
+        if not drivers:
+            return 0
+        count = len(drivers)
+        coordinates = np.fromiter((driver.current_coordinates for driver in drivers), dtype=np.dtype((np.float64, 2)), count=count)
+        latitudes, longitudes = coordinates[:, 0], coordinates[:, 1]
+        order = np.argsort(hilbert_keys(longitudes, latitudes, self.available_index.bbox), kind="stable")
+        drivers = [drivers[position] for position in order.tolist()]
+        latitudes, longitudes = latitudes[order], longitudes[order]
+        available = np.fromiter((driver.is_available for driver in drivers), dtype=bool, count=count)
+        driver_ids = [driver.user_id for driver in drivers]
+
+        with self.registry_locks.holding_all():
+            if len(set(driver_ids)) != count or not self.drivers.keys().isdisjoint(driver_ids):
+                seen = set()
+                for driver in drivers:
+                    if driver.user_id in self.drivers or driver.user_id in seen:
+                        raise Exception(f"Driver {driver.user_name} is already registered.")
+                    seen.add(driver.user_id)
+            slots = self.driver_store.bulk_allocate(driver_ids, latitudes, longitudes, available.view(np.uint8))
+            for driver, slot in zip(drivers, slots):
+                driver.attach_store(self.driver_store, slot)
+                driver.ride_sharing_manager = self
+            self.drivers.update(zip(driver_ids, drivers))
+            if self.pricing:
+                self.pricing.drivers_available(np.asarray(slots)[available], latitudes[available], longitudes[available])
+            for index, mask in ((self.available_index, available), (self.busy_index, ~available)):
+                positions = np.flatnonzero(mask).tolist()
+                index.bulk_insert([driver_ids[position] for position in positions], [drivers[position] for position in positions],
+                                  longitudes[mask], latitudes[mask])
+            if self.journal:
+                for driver, latitude, longitude in zip(drivers, latitudes.tolist(), longitudes.tolist()):
+                    self.journal.record("driver_registered", driver.user_id, driver.email, driver.user_name, latitude, longitude, driver.is_available)
+        emit(logger, logging.INFO, "drivers_registered", "%d drivers have been registered.", count, count=count)
+        return count
+    
+    
+    """
+    This function removes a driver from the system, e.g. when they move to another shard.
+    The driver keeps their last position and availability but no longer reads them from the store.
+    Args:
+        driver (Driver): The driver to remove.
+    Returns:
+        bool: True if the driver was registered, else False.
+    """
+    def unregister_driver(self, driver: Driver) -> bool:
+        with self.registry_locks.lock_for(driver.user_id):
+            if self.drivers.pop(driver.user_id, None) is None:
+                return False
+            self.available_index.remove(driver.user_id)
+            self.busy_index.remove(driver.user_id)
+            slot = driver.slot
+            if self.pricing:
+                self.pricing.driver_unavailable(slot)
+            driver.detach_store()
+            self.driver_store.release(slot)
+            driver.ride_sharing_manager = None
+            if self.journal:
+                self.journal.record("driver_unregistered", driver.user_id)
+        emit(logger, logging.INFO, "driver_unregistered", "Driver %s has been unregistered.", driver.user_name, driver_id=driver.user_id)
+        return True
+    
+    
+    """
+    This function moves a registered driver to their current location in the spatial index.
+    Called by Driver.update_location on every location ping.
+    Args:
+        driver (Driver): The driver whose location changed.
+    """
+    def update_driver_location(self, driver: Driver):
+        with self.registry_locks.lock_for(driver.user_id):
+            index = self.available_index if driver.is_available else self.busy_index
+            if driver.user_id not in index:
+                return
+            latitude, longitude = self.driver_store.latitudes[driver.slot], self.driver_store.longitudes[driver.slot]
+            index.move(driver.user_id, longitude, latitude)
+            if self.pricing and driver.is_available:
+                self.pricing.driver_moved(driver.slot, latitude, longitude)
+    
+    
+    """
+    This function sets a registered driver's availability and moves them between the available and busy indexes.
+    Called by Driver whenever its availability is assigned.
+    Args:
+        driver (Driver): The driver whose availability changed.
+        is_available (bool): The new availability.
+    """
+    def set_driver_availability(self, driver: Driver, is_available: bool):
+        with self.registry_locks.lock_for(driver.user_id):
+            if driver._is_available == is_available:
+                return
+            driver._is_available = is_available
+            self.driver_store.set_available(driver.slot, is_available)
+            source, target = (self.busy_index, self.available_index) if is_available else (self.available_index, self.busy_index)
+            latitude, longitude = self.driver_store.latitudes[driver.slot], self.driver_store.longitudes[driver.slot]
+            if source.remove(driver.user_id):
+                target.insert(driver.user_id, driver, longitude, latitude)
+            if self.pricing:
+                if is_available:
+                    self.pricing.driver_available(driver.slot, latitude, longitude)
+                else:
+                    self.pricing.driver_unavailable(driver.slot)
+            if self.journal:
+                self.journal.record("driver_availability", driver.user_id, is_available)
+    
+    
+    """
+    This function atomically flips a driver's availability only if it still has the expected value.
+    Used by Driver.accept_ride so two racing requests can never both take the same driver.
+    Args:
+        driver (Driver): The driver to update.
+        expected (bool): The availability the caller saw.
+        is_available (bool): The new availability.
+    Returns:
+        bool: True if the availability was updated, False if another thread changed it first.
+    """
+    def compare_and_set_availability(self, driver: Driver, expected: bool, is_available: bool) -> bool:
+        with self.registry_locks.lock_for(driver.user_id):
+            if driver._is_available != expected:
+                return False
+            self.set_driver_availability(driver, is_available)
+            return True
+        
+    
+    """
+    This function finds the k nearest available drivers to a location.
+    Args:
+        location (Location): The search origin, usually the ride's pickup point.
+        k (int): The maximum number of drivers to return.
+        max_radius_km (float): Drivers farther than this are ignored.
+    Returns:
+        List[Tuple[Driver, float]]: (driver, distance_km) pairs, nearest first.
+    """
+    def nearest_available_drivers(self, location: Location, k: int, max_radius_km: float) -> List[Tuple[Driver, float]]:
+        metrics = self.dispatch_metrics
+        if not metrics.enabled:
+            return self.available_index.nearest(location.longitude, location.latitude, k, max_radius_km)
+
+        started_at = time.perf_counter()
+        stats = QueryStats()
+        nearest = self.available_index.nearest(location.longitude, location.latitude, k, max_radius_km, stats)
+        metrics.observe_since("nearest_query", started_at)
+        metrics.increment("nearest_queries")
+        metrics.increment("candidates_examined", stats.examined)
+        metrics.increment("candidates_returned", len(nearest))
+        metrics.increment("rings_visited", stats.rings)
+        # Rings 0..n cover n ring widths, so a query that stops within the first pass visits at most n + 1 rings
+        if stats.ring_width_km and stats.rings > ceil(FIRST_PASS_RADIUS_KM / stats.ring_width_km) + 1:
+            metrics.increment("nearest_expanded")
+        return nearest
+    
+    
+    """
+    This function turns dispatch metrics on or off. They are off by default.
+    Args:
+        enabled (bool): Whether the dispatch path records timings and counters.
+    """
+    def enable_metrics(self, enabled: bool = True):
+        self.dispatch_metrics.enabled = enabled
+    
+    
+    """
+    This function returns a snapshot of the dispatch metrics: counters, latency histogram summaries
+    in microseconds, and the derived expansion, candidate yield and no-driver rates.
+    Export it with dispatch_metrics.to_prometheus(), write_prometheus(path) or serve_prometheus(port).
+    """
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        return self.dispatch_metrics.snapshot()
         
     
     """
@@ -76,15 +377,68 @@ class RideSharingManager:
         ride (Ride): The ride object.
     """
     def add_ride(self, ride: Ride):
-        self.rides[ride.ride_id] = ride
+        with self.registry_locks.lock_for(ride.ride_id):
+            self.rides[ride.ride_id] = ride
+            ride.journal = self.journal
+            ride.tracker = self.ride_tracker
+        self.ride_tracker.update(ride)
     
     
     """
     This function retrieves a ride by its ID.
+    Finished rides are found while they are among the history store's recent rides.
     Args:
         ride_id (str): The ID of the ride.
     """
     def get_ride(self, ride_id: str) -> Ride:
-        return self.rides.get(ride_id)
+        ride = self.rides.get(ride_id)
+        if ride is None and self.history is not None:
+            return self.history.get_recent(ride_id)
+        return ride
+    
+    
+    """
+    This function lists every active ride (requested, picking up or in trip) without scanning finished ones.
+    """
+    def active_rides(self) -> List[Ride]:
+        return self.ride_tracker.active_rides()
+    
+    
+    """
+    This function counts the rides of each status.
+    """
+    def ride_status_counts(self) -> Dict[RideStatus, int]:
+        return self.ride_tracker.status_counts()
+    
+    
+    """
+    This function counts the active rides of each region of the operational area, by pickup location.
+    Returns:
+        Dict[int, int]: Active rides by region number, for regions that have any.
+    """
+    def active_ride_counts_by_region(self) -> Dict[int, int]:
+        return self.ride_tracker.active_counts_by_region()
+
+default_manager: RideSharingManager | None = None
+default_manager_lock = threading.Lock()
+
+
+"""
+This function returns the process-wide manager, building it on first use so that importing the
+dispatcher does not.
+"""
+def get_ride_sharing_manager() -> RideSharingManager:
+    global default_manager
+    with default_manager_lock:
+        if default_manager is None:
+            default_manager = RideSharingManager()
+        return default_manager
+
 
-ride_sharing_manager_object = RideSharingManager()
\ No newline at end of file
+"""
+Keeps ride_sharing_manager_object importable as the process-wide manager, built on first access.
+"""
+def __getattr__(name: str):
+    if name == "ride_sharing_manager_object":
+        return get_ride_sharing_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import threading
+from typing import Dict, List, TYPE_CHECKING
+
+from src.core.shard_grid import ShardGrid
+from src.models.ride.ride_status import ACTIVE_STATUSES, RideStatus
+
+if TYPE_CHECKING:
+    from src.models.ride.ride import Ride
+
+DEFAULT_REGION_ROWS = 10
+DEFAULT_REGION_COLUMNS = 10
+
+
+class RideTracker:
+    """
+    Keeps the rides of a manager grouped by status, and the number of active rides per region,
+    up to date on every status change so listings cost O(result) instead of a scan of every ride.
+    Rides report their own changes: RideSharingManager.add_ride sets ride.tracker.
+    Regions are the cells of a grid over the operational area, and a ride counts in the region of its pickup.
+    Safe to share between threads.
+    """
+    def __init__(self):
+        self.rides_by_status: Dict[RideStatus, Dict[str, Ride]] = {status: {} for status in RideStatus}
+        self.statuses: Dict[str, RideStatus] = {}
+        self.regions: ShardGrid | None = None
+        self.active_by_region: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+
+    """
+    This function splits the operational area into regions for the per-region counts and counts the active rides again.
+    Args:
+        operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+        rows (int): The number of regions from south to north.
+        columns (int): The number of regions from west to east.
+    """
+    def set_regions(self, operational_area: List[float], rows: int = DEFAULT_REGION_ROWS, columns: int = DEFAULT_REGION_COLUMNS):
+        with self.lock:
+            self.regions = ShardGrid(operational_area, rows, columns)
+            self.active_by_region = {}
+            for status in ACTIVE_STATUSES:
+                for ride in self.rides_by_status[status].values():
+                    self.count_active(ride, 1)
+
+
+    """
+    This function adjusts the active count of a ride's region. The caller must hold the lock.
+    Args:
+        ride (Ride): The ride that became active or stopped being active.
+        delta (int): 1 or -1.
+    """
+    def count_active(self, ride: Ride, delta: int):
+        if self.regions is None:
+            return
+        location = ride.start_location
+        region = self.regions.shard_of(location.longitude, location.latitude)
+        count = self.active_by_region.get(region, 0) + delta
+        if count:
+            self.active_by_region[region] = count
+        else:
+            del self.active_by_region[region]
+
+
+    """
+    This function starts tracking a ride, or moves it to the set of its current status.
+    Args:
+        ride (Ride): The ride whose status may have changed.
+    """
+    def update(self, ride: Ride):
+        with self.lock:
+            status = ride.ride_status
+            previous = self.statuses.get(ride.ride_id)
+            if previous == status:
+                return
+            if previous is not None:
+                del self.rides_by_status[previous][ride.ride_id]
+            self.rides_by_status[status][ride.ride_id] = ride
+            self.statuses[ride.ride_id] = status
+            was_active, is_active = previous in ACTIVE_STATUSES, status in ACTIVE_STATUSES
+            if was_active != is_active:
+                self.count_active(ride, 1 if is_active else -1)
+
+
+    """
+    This function stops tracking a ride, e.g. when it moves to the history store.
+    Args:
+        ride (Ride): The ride to forget.
+    """
+    def remove(self, ride: Ride):
+        with self.lock:
+            status = self.statuses.pop(ride.ride_id, None)
+            if status is None:
+                return
+            del self.rides_by_status[status][ride.ride_id]
+            if status in ACTIVE_STATUSES:
+                self.count_active(ride, -1)
+
+
+    """
+    This function lists the tracked rides with a status, oldest first.
+    Args:
+        status (RideStatus): The status to list.
+    """
+    def rides_with_status(self, status: RideStatus) -> List[Ride]:
+        with self.lock:
+            return list(self.rides_by_status[status].values())
+
+
+    """
+    This function lists every active ride: requested, picking up or in trip.
+    """
+    def active_rides(self) -> List[Ride]:
+        with self.lock:
+            return [ride for status in ACTIVE_STATUSES for ride in self.rides_by_status[status].values()]
+
+
+    """
+    This function counts the tracked rides of each status.
+    """
+    def status_counts(self) -> Dict[RideStatus, int]:
+        with self.lock:
+            return {status: len(rides) for status, rides in self.rides_by_status.items()}
+
+
+    """
+    This function counts the active rides of each region that has any.
+    Returns:
+        Dict[int, int]: Active rides by region number; see ShardGrid.bbox_of for a region's bounds.
+    """
+    def active_counts_by_region(self) -> Dict[int, int]:
+        with self.lock:
+            return dict(self.active_by_region)
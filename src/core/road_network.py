@@ -0,0 +1,258 @@
+from __future__ import annotations
+import xml.etree.ElementTree as ElementTree
+from array import array
+from math import ceil, cos, radians
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+from src.core.distance import PreparedCoordinates, haversine_pairwise
+
+KM_PER_DEGREE = 111.0
+DEFAULT_SPACING_KM = 0.25
+DEFAULT_SPEED_KMH = 40.0
+# Free-flow speeds of the OSM highway classes that cars drive on, used when a way has no usable maxspeed
+ROAD_SPEEDS_KMH = {
+    "motorway": 100.0, "motorway_link": 60.0,
+    "trunk": 80.0, "trunk_link": 50.0,
+    "primary": 60.0, "primary_link": 45.0,
+    "secondary": 50.0, "secondary_link": 40.0,
+    "tertiary": 40.0, "tertiary_link": 35.0,
+    "unclassified": 30.0, "residential": 30.0, "living_street": 10.0, "service": 15.0,
+}
+MPH_TO_KMH = 1.609344
+
+
+class RoadGraph:
+    """
+    A directed road network in compressed sparse row form: the edges leaving node v are
+    forward_targets[forward_offsets[v]:forward_offsets[v + 1]], with their travel seconds and lengths in
+    kilometers alongside. The reversed graph is kept the same way for searches that run from the destination.
+    Columns are array('d') / array('q') so the routing loops index them without NumPy scalar overhead.
+    Args:
+        latitudes (Sequence[float]): The latitude of each node.
+        longitudes (Sequence[float]): The longitude of each node.
+        sources (Sequence[int]): The start node of each edge.
+        targets (Sequence[int]): The end node of each edge.
+        lengths_km (Sequence[float]): The length of each edge.
+        speeds_kmh (Sequence[float]): The travel speed on each edge.
+    """
+    def __init__(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        sources: Sequence[int],
+        targets: Sequence[int],
+        lengths_km: Sequence[float],
+        speeds_kmh: Sequence[float]
+    ):
+        self.latitudes = array("d", np.asarray(latitudes, dtype=np.float64).tobytes())
+        self.longitudes = array("d", np.asarray(longitudes, dtype=np.float64).tobytes())
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        lengths_km = np.asarray(lengths_km, dtype=np.float64)
+        seconds = lengths_km / np.asarray(speeds_kmh, dtype=np.float64) * 3600.0
+        self.edge_count = len(sources)
+        self.forward_offsets, self.forward_targets, self.forward_seconds, self.forward_km = compress(
+            len(self.latitudes), sources, targets, seconds, lengths_km
+        )
+        self.backward_offsets, self.backward_targets, self.backward_seconds, self.backward_km = compress(
+            len(self.latitudes), targets, sources, seconds, lengths_km
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+
+    """
+    This function returns every edge as (sources, targets, lengths_km, speeds_kmh) arrays.
+    """
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        offsets = np.frombuffer(self.forward_offsets, dtype=np.int64)
+        sources = np.repeat(np.arange(len(self)), np.diff(offsets))
+        lengths_km = np.frombuffer(self.forward_km)
+        speeds_kmh = lengths_km / np.frombuffer(self.forward_seconds) * 3600.0
+        return sources, np.frombuffer(self.forward_targets, dtype=np.int64), lengths_km, speeds_kmh
+
+
+    """
+    This function writes the graph to a .npz file that load_road_graph reads back.
+    Args:
+        path (str | Path): The file to write.
+    """
+    def save(self, path: str | Path):
+        sources, targets, lengths_km, speeds_kmh = self.edges()
+        with open(path, "wb") as file:
+            np.savez(
+                file, latitudes=np.frombuffer(self.latitudes), longitudes=np.frombuffer(self.longitudes),
+                sources=sources, targets=targets, lengths_km=lengths_km, speeds_kmh=speeds_kmh
+            )
+
+
+"""
+Sorts edges by their start node into compressed sparse row columns.
+Args:
+    node_count (int): The number of nodes.
+    sources (np.ndarray): The start node of each edge.
+    targets (np.ndarray): The end node of each edge.
+    seconds (np.ndarray): The travel time of each edge.
+    lengths_km (np.ndarray): The length of each edge.
+Returns:
+    Tuple[array, array, array, array]: The offsets, targets, seconds and lengths columns.
+"""
+def compress(node_count: int, sources: np.ndarray, targets: np.ndarray, seconds: np.ndarray, lengths_km: np.ndarray):
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=offsets[1:])
+    return (
+        array("q", offsets.tobytes()),
+        array("q", targets[order].tobytes()),
+        array("d", seconds[order].tobytes()),
+        array("d", lengths_km[order].tobytes())
+    )
+
+
+"""
+Computes the great-circle length of edges between nodes.
+Args:
+    latitudes (np.ndarray): The latitude of each node.
+    longitudes (np.ndarray): The longitude of each node.
+    sources (np.ndarray): The start node of each edge.
+    targets (np.ndarray): The end node of each edge.
+Returns:
+    np.ndarray: The length of each edge in kilometers.
+"""
+def edge_lengths_km(latitudes: np.ndarray, longitudes: np.ndarray, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    return haversine_pairwise(
+        PreparedCoordinates(latitudes[sources], longitudes[sources]), PreparedCoordinates(latitudes[targets], longitudes[targets])
+    )
+
+
+"""
+Generates a two-way street grid over an area, optionally cut by a north-south river that can only be
+crossed on bridges, e.g. to test and benchmark routing without an OSM extract.
+Args:
+    operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+    spacing_km (float): The distance between parallel streets.
+    speed_kmh (float): The speed on every street.
+    river_longitude (float | None): The longitude of the river, or None for no river.
+    bridge_latitudes (Sequence[float]): The latitudes where a street crosses the river.
+Returns:
+    RoadGraph: The grid, with node row * columns + column at the crossing of street row and avenue column.
+"""
+def grid_road_graph(
+    operational_area: List[float],
+    spacing_km: float = DEFAULT_SPACING_KM,
+    speed_kmh: float = DEFAULT_SPEED_KMH,
+    river_longitude: float | None = None,
+    bridge_latitudes: Sequence[float] = ()
+) -> RoadGraph:
+    min_x, min_y, max_x, max_y = operational_area
+    step_latitude = spacing_km / KM_PER_DEGREE
+    step_longitude = step_latitude / cos(radians((min_y + max_y) / 2))
+    rows = max(ceil((max_y - min_y) / step_latitude), 1) + 1
+    columns = max(ceil((max_x - min_x) / step_longitude), 1) + 1
+    row_latitudes = min_y + np.arange(rows) * step_latitude
+    column_longitudes = min_x + np.arange(columns) * step_longitude
+    latitudes = np.repeat(row_latitudes, columns)
+    longitudes = np.tile(column_longitudes, rows)
+
+    nodes = np.arange(rows * columns).reshape(rows, columns)
+    east_from, east_to = nodes[:, :-1].ravel(), nodes[:, 1:].ravel()
+    if river_longitude is not None:
+        crosses = (longitudes[east_from] < river_longitude) & (longitudes[east_to] >= river_longitude)
+        bridged = np.zeros(rows, dtype=bool)
+        for latitude in bridge_latitudes:
+            bridged[np.abs(row_latitudes - latitude).argmin()] = True
+        keep = ~crosses | bridged[east_from // columns]
+        east_from, east_to = east_from[keep], east_to[keep]
+    north_from, north_to = nodes[:-1, :].ravel(), nodes[1:, :].ravel()
+    sources = np.concatenate([east_from, east_to, north_from, north_to])
+    targets = np.concatenate([east_to, east_from, north_to, north_from])
+    lengths_km = edge_lengths_km(latitudes, longitudes, sources, targets)
+    return RoadGraph(latitudes, longitudes, sources, targets, lengths_km, np.full(len(sources), speed_kmh))
+
+
+"""
+Reads the drivable ways of an OSM XML extract into a road graph. Ways keep their maxspeed when it
+is numeric and otherwise use the speed of their highway class; oneway ways only get forward edges.
+Only nodes on a drivable way become graph nodes.
+Args:
+    path (str | Path): The .osm file.
+Returns:
+    RoadGraph: The network.
+"""
+def parse_osm(path: str | Path) -> RoadGraph:
+    coordinates: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, int]] = []
+    for _, element in ElementTree.iterparse(str(path), events=("end",)):
+        if element.tag == "node":
+            coordinates[int(element.get("id"))] = (float(element.get("lat")), float(element.get("lon")))
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            speed = ROAD_SPEEDS_KMH.get(tags.get("highway"))
+            if speed is not None:
+                references = [int(reference.get("ref")) for reference in element.iter("nd")]
+                oneway = tags.get("oneway")
+                direction = 1 if oneway in ("yes", "true", "1") or tags.get("highway") == "motorway" else -1 if oneway == "-1" else 0
+                ways.append((references, parse_maxspeed(tags.get("maxspeed")) or speed, direction))
+        if element.tag in ("node", "way", "relation"):
+            element.clear()
+
+    node_ids: Dict[int, int] = {}
+    sources: List[int] = []
+    targets: List[int] = []
+    speeds: List[float] = []
+    for references, speed, direction in ways:
+        references = [reference for reference in references if reference in coordinates]
+        for start, end in zip(references, references[1:]):
+            start, end = node_ids.setdefault(start, len(node_ids)), node_ids.setdefault(end, len(node_ids))
+            if direction >= 0:
+                sources.append(start)
+                targets.append(end)
+                speeds.append(speed)
+            if direction <= 0:
+                sources.append(end)
+                targets.append(start)
+                speeds.append(speed)
+    latitudes = np.empty(len(node_ids))
+    longitudes = np.empty(len(node_ids))
+    for osm_id, node in node_ids.items():
+        latitudes[node], longitudes[node] = coordinates[osm_id]
+    sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+    return RoadGraph(latitudes, longitudes, sources, targets, edge_lengths_km(latitudes, longitudes, sources, targets), speeds)
+
+
+"""
+Reads an OSM maxspeed tag.
+Args:
+    maxspeed (str | None): The tag value, e.g. "50" or "30 mph".
+Returns:
+    float | None: The speed in km/h, or None when the value is missing or not numeric (e.g. "signals").
+"""
+def parse_maxspeed(maxspeed: str | None) -> float | None:
+    if not maxspeed:
+        return None
+    value, _, unit = maxspeed.partition(" ")
+    try:
+        speed = float(value)
+    except ValueError:
+        return None
+    return speed * MPH_TO_KMH if unit.strip() == "mph" else speed
+
+
+"""
+Loads a road graph from an OSM XML extract (.osm) or a file written by RoadGraph.save (.npz).
+Args:
+    path (str | Path): The file to read.
+Returns:
+    RoadGraph: The network.
+"""
+def load_road_graph(path: str | Path) -> RoadGraph:
+    if Path(path).suffix == ".osm":
+        return parse_osm(path)
+    with np.load(path) as columns:
+        return RoadGraph(
+            columns["latitudes"], columns["longitudes"], columns["sources"], columns["targets"],
+            columns["lengths_km"], columns["speeds_kmh"]
+        )
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from math import cos, floor, inf, radians
+from typing import List
+
+from src.core.id_generator import MAX_NODE_ID
+
+KM_PER_DEGREE = 111.0
+
+
+class ShardGrid:
+    """
+    Splits an operational area into rows x columns rectangular shards, numbered row by row from the
+    south-west corner. Points outside the area belong to the nearest edge shard.
+    Args:
+        operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+        rows (int): The number of shards from south to north.
+        columns (int): The number of shards from west to east.
+    """
+    def __init__(self, operational_area: List[float], rows: int, columns: int):
+        if rows < 1 or columns < 1:
+            raise ValueError("Invalid shard grid: Must have at least one row and one column.")
+        if rows * columns > MAX_NODE_ID + 1:
+            raise ValueError(f"Invalid shard grid: At most {MAX_NODE_ID + 1} shards are supported.")
+        self.operational_area = operational_area
+        self.rows = rows
+        self.columns = columns
+        self.shard_width = (operational_area[2] - operational_area[0]) / columns
+        self.shard_height = (operational_area[3] - operational_area[1]) / rows
+
+    def __len__(self) -> int:
+        return self.rows * self.columns
+
+    def column_of(self, longitude: float) -> int:
+        return min(max(floor((longitude - self.operational_area[0]) / self.shard_width), 0), self.columns - 1)
+
+    def row_of(self, latitude: float) -> int:
+        return min(max(floor((latitude - self.operational_area[1]) / self.shard_height), 0), self.rows - 1)
+
+
+    """
+    This function maps a point to the shard that owns it.
+    Args:
+        longitude (float): The longitude of the point.
+        latitude (float): The latitude of the point.
+    """
+    def shard_of(self, longitude: float, latitude: float) -> int:
+        return self.row_of(latitude) * self.columns + self.column_of(longitude)
+
+
+    """
+    This function returns the bounding box of a shard.
+    Args:
+        shard_id (int): The shard number.
+    """
+    def bbox_of(self, shard_id: int) -> List[float]:
+        row, column = divmod(shard_id, self.columns)
+        min_x = self.operational_area[0] + column * self.shard_width
+        min_y = self.operational_area[1] + row * self.shard_height
+        return [min_x, min_y, min_x + self.shard_width, min_y + self.shard_height]
+
+
+    """
+    This function returns every shard that may hold a point within radius_km of the given point.
+    Args:
+        longitude (float): The longitude of the search origin.
+        latitude (float): The latitude of the search origin.
+        radius_km (float): The search radius in kilometers.
+    """
+    def shards_within(self, longitude: float, latitude: float, radius_km: float) -> List[int]:
+        latitude_radius = radius_km / KM_PER_DEGREE
+        # A degree of longitude shrinks with cos(latitude), so the box is wider in degrees than it is tall
+        longitude_radius = latitude_radius / max(cos(radians(latitude)), 1e-6)
+        rows = range(self.row_of(latitude - latitude_radius), self.row_of(latitude + latitude_radius) + 1)
+        columns = range(self.column_of(longitude - longitude_radius), self.column_of(longitude + longitude_radius) + 1)
+        return [row * self.columns + column for row in rows for column in columns]
+
+
+    """
+    This function measures how far a point is from the nearest border its shard shares with another shard.
+    Any point in another shard is at least this far away, so nearer matches can be made without asking the neighbours.
+    Borders of the operational area itself have no neighbour and are ignored.
+    Args:
+        longitude (float): The longitude of the point.
+        latitude (float): The latitude of the point.
+    Returns:
+        float: The distance in kilometers, inf for a single-shard grid.
+    """
+    def distance_to_neighbours_km(self, longitude: float, latitude: float) -> float:
+        row, column = self.row_of(latitude), self.column_of(longitude)
+        min_x, min_y, max_x, max_y = self.bbox_of(row * self.columns + column)
+        km_per_longitude_degree = KM_PER_DEGREE * cos(radians(latitude))
+        distance = inf
+        if column > 0:
+            distance = min(distance, (longitude - min_x) * km_per_longitude_degree)
+        if column < self.columns - 1:
+            distance = min(distance, (max_x - longitude) * km_per_longitude_degree)
+        if row > 0:
+            distance = min(distance, (latitude - min_y) * KM_PER_DEGREE)
+        if row < self.rows - 1:
+            distance = min(distance, (max_y - latitude) * KM_PER_DEGREE)
+        return max(distance, 0.0)
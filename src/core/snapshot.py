@@ -0,0 +1,290 @@
+from __future__ import annotations
+import gc
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.spatial_index import SPATIAL_BACKENDS, GridSpatialIndex
+from src.models.location.location import Location
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import ACTIVE_STATUSES, RideStatus
+from src.models.ride.stop import Stop
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+
+# Layout: header, then length-prefixed sections in a fixed order, each padded to 8 bytes so columns are aligned
+MAGIC = b"RIDESNAP"
+VERSION = 3
+# The last field is the journal sequence the snapshot includes, so recovery replays only later records
+HEADER = struct.Struct("<8sIIII16sd4dQ")
+SECTION_LENGTH = struct.Struct("<Q")
+ALIGNMENT = 8
+STRING_SEPARATOR = "\0"
+STATUSES = list(RideStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+NO_DRIVER = -1
+SECTION_COUNT = 23
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def pack_strings(values: Sequence[str | None]) -> bytes:
+    return STRING_SEPARATOR.join(value or "" for value in values).encode("utf-8")
+
+
+def unpack_strings(section: memoryview, count: int) -> List[str]:
+    return str(section, "utf-8").split(STRING_SEPARATOR) if count else []
+
+
+"""
+Writes a snapshot of the whole manager: the driver, rider and ride registries, every ride's status,
+the driver position and availability columns, and each driver's capacity and pooled route. The file is written next to the target and renamed
+into place, so a crash mid-write leaves the previous snapshot intact.
+Take it between dispatch rounds; it is not atomic with respect to concurrent writers.
+Args:
+    manager (RideSharingManager): The manager to save, with its spatial index initialized.
+    path (str): The snapshot file.
+    journal_sequence (int): The last journal record already reflected in the manager, see RideJournal.checkpoint.
+"""
+def save_snapshot(manager: RideSharingManager, path: str, journal_sequence: int = 0):
+    if manager.available_index is None:
+        raise SnapshotError("Spatial index not initialized.")
+    rides = list(manager.rides.values())
+
+    # Rides can reference users that are no longer (or never were) in the registries, e.g. rehomed drivers
+    drivers: Dict[str, Driver] = dict(manager.drivers)
+    riders: Dict[str, Rider] = dict(manager.riders)
+    for ride in rides:
+        riders.setdefault(ride.rider.user_id, ride.rider)
+        if ride.driver is not None:
+            drivers.setdefault(ride.driver.user_id, ride.driver)
+    driver_list, rider_list = list(drivers.values()), list(riders.values())
+    driver_positions = {driver_id: position for position, driver_id in enumerate(drivers)}
+    rider_positions = {rider_id: position for position, rider_id in enumerate(riders)}
+
+    # Registered drivers are read straight from the columnar store; the rest from their own location
+    registered = np.fromiter((driver.user_id in manager.drivers for driver in driver_list), dtype=np.uint8, count=len(driver_list))
+    slots = [driver.slot if registered[position] else 0 for position, driver in enumerate(driver_list)]
+    latitudes, longitudes = manager.driver_store.coordinates(slots) if slots else (np.empty(0), np.empty(0))
+    for position in np.flatnonzero(registered == 0).tolist():
+        latitudes[position], longitudes[position] = driver_list[position].current_coordinates
+    available = np.fromiter((driver.is_available for driver in driver_list), dtype=np.uint8, count=len(driver_list))
+
+    rider_latitudes = np.fromiter((rider.current_location.latitude for rider in rider_list), dtype=np.float64, count=len(rider_list))
+    rider_longitudes = np.fromiter((rider.current_location.longitude for rider in rider_list), dtype=np.float64, count=len(rider_list))
+    rider_registered = np.fromiter((rider.user_id in manager.riders for rider in rider_list), dtype=np.uint8, count=len(rider_list))
+
+    count = len(rides)
+    ride_riders = np.fromiter((rider_positions[ride.rider.user_id] for ride in rides), dtype=np.int32, count=count)
+    ride_drivers = np.fromiter(
+        (NO_DRIVER if ride.driver is None else driver_positions[ride.driver.user_id] for ride in rides), dtype=np.int32, count=count
+    )
+    ride_statuses = np.fromiter((STATUS_CODES[ride.ride_status] for ride in rides), dtype=np.uint8, count=count)
+    ride_locations = np.array(
+        [(ride.start_location.latitude, ride.start_location.longitude, ride.end_location.latitude, ride.end_location.longitude, ride.distance)
+         for ride in rides],
+        dtype=np.float64
+    ).reshape(count, 5)
+
+    # Pooled routes: each driver's stop count, then every stop in driver and route order
+    capacities = np.fromiter((driver.capacity for driver in driver_list), dtype=np.int32, count=len(driver_list))
+    stop_counts = np.fromiter((len(driver.stops) for driver in driver_list), dtype=np.int32, count=len(driver_list))
+    stops = [stop for driver in driver_list for stop in driver.stops]
+    ride_positions = {ride.ride_id: position for position, ride in enumerate(rides)}
+    stop_rides = np.fromiter((ride_positions[stop.ride.ride_id] for stop in stops), dtype=np.int32, count=len(stops))
+    stop_pickups = np.fromiter((stop.is_pickup for stop in stops), dtype=np.uint8, count=len(stops))
+    stop_deadlines = np.fromiter((stop.deadline for stop in stops), dtype=np.float64, count=len(stops))
+
+    index = manager.available_index
+    backend = next(name for name, backend_class in SPATIAL_BACKENDS.items() if isinstance(index, backend_class))
+    cell_size_km = index.cell_size_km if isinstance(index, GridSpatialIndex) else 0.0
+    sections = [
+        pack_strings(list(drivers)), pack_strings([driver.email for driver in driver_list]), pack_strings([driver.user_name for driver in driver_list]),
+        latitudes.tobytes(), longitudes.tobytes(), available.tobytes(), registered.tobytes(),
+        pack_strings(list(riders)), pack_strings([rider.email for rider in rider_list]), pack_strings([rider.user_name for rider in rider_list]),
+        rider_latitudes.tobytes(), rider_longitudes.tobytes(), rider_registered.tobytes(),
+        pack_strings([ride.ride_id for ride in rides]), ride_riders.tobytes(), ride_drivers.tobytes(), ride_statuses.tobytes(),
+        np.ascontiguousarray(ride_locations.T).tobytes(),
+        capacities.tobytes(), stop_counts.tobytes(), stop_rides.tobytes(), stop_pickups.tobytes(), stop_deadlines.tobytes()
+    ]
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(driver_list), len(rider_list), count, backend.encode("ascii"), cell_size_km, *index.bbox,
+                                journal_sequence))
+        for section in sections:
+            write_section(file, section)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def write_section(file: BinaryIO, section: bytes):
+    file.write(SECTION_LENGTH.pack(len(section)))
+    file.write(section)
+    file.write(b"\0" * (-len(section) % ALIGNMENT))
+
+
+def read_sections(buffer: memoryview, offset: int) -> Iterator[memoryview]:
+    while offset < len(buffer):
+        if offset + SECTION_LENGTH.size > len(buffer):
+            raise SnapshotError("Snapshot is truncated.")
+        (length,) = SECTION_LENGTH.unpack_from(buffer, offset)
+        offset += SECTION_LENGTH.size
+        if offset + length > len(buffer):
+            raise SnapshotError("Snapshot is truncated.")
+        yield buffer[offset:offset + length]
+        offset += length + (-length % ALIGNMENT)
+
+
+"""
+Rebuilds a manager from a snapshot. The file is memory-mapped and the numeric columns are copied
+straight into the driver store; both spatial indexes are bulk-built rather than filled one insert at a time.
+Drive and ride histories are rebuilt from the completed rides, in creation order, and pooled drivers get
+their stops back; a PoolDispatcher built over the manager picks their routes up.
+Args:
+    path (str): The snapshot file.
+Returns:
+    RideSharingManager: A manager ready for dispatch, e.g. RideSystem(bbox, load_snapshot(path)).
+"""
+def load_snapshot(path: str) -> RideSharingManager:
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        buffer = memoryview(mapped)
+        # Millions of new objects would otherwise trigger repeated full collections that find nothing to free
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return restore(buffer)
+        finally:
+            if collecting:
+                gc.enable()
+            buffer.release()
+
+
+def read_header(buffer) -> tuple:
+    if len(buffer) < HEADER.size:
+        raise SnapshotError("Snapshot is truncated.")
+    header = HEADER.unpack_from(buffer)
+    if header[0] != MAGIC:
+        raise SnapshotError("Not a ride-sharing snapshot.")
+    if header[1] != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {header[1]}")
+    return header
+
+
+"""
+Reads the journal sequence recorded in a snapshot's header, without loading the snapshot.
+Args:
+    path (str): The snapshot file.
+"""
+def snapshot_journal_sequence(path: str) -> int:
+    with open(path, "rb") as file:
+        return read_header(file.read(HEADER.size))[-1]
+
+
+def restore(buffer: memoryview) -> RideSharingManager:
+    magic, version, driver_count, rider_count, ride_count, backend, cell_size_km, *bbox, _ = read_header(buffer)
+    sections = list(read_sections(buffer, HEADER.size))
+    if len(sections) != SECTION_COUNT:
+        raise SnapshotError("Snapshot is truncated.")
+    (driver_ids, driver_emails, driver_names, latitudes, longitudes, available, registered,
+     rider_ids, rider_emails, rider_names, rider_latitudes, rider_longitudes, rider_registered,
+     ride_ids, ride_riders, ride_drivers, ride_statuses, ride_locations,
+     capacities, stop_counts, stop_rides, stop_pickups, stop_deadlines) = sections
+
+    manager = RideSharingManager()
+    backend = backend.rstrip(b"\0").decode("ascii")
+    if backend == "grid":
+        manager.available_index, manager.busy_index = GridSpatialIndex(bbox, cell_size_km), GridSpatialIndex(bbox, cell_size_km)
+        # initialize_spatial_index would set the regions; the grid indexes are built here to keep their cell size
+        manager.ride_tracker.set_regions(bbox)
+    else:
+        manager.initialize_spatial_index(bbox, backend)
+
+    drivers = restore_drivers(
+        manager, unpack_strings(driver_ids, driver_count), unpack_strings(driver_emails, driver_count), unpack_strings(driver_names, driver_count),
+        np.frombuffer(latitudes, dtype=np.float64), np.frombuffer(longitudes, dtype=np.float64),
+        np.frombuffer(available, dtype=np.uint8), np.frombuffer(registered, dtype=np.uint8)
+    )
+    stop_counts = np.frombuffer(stop_counts, dtype=np.int32).tolist()
+    for driver, capacity in zip(drivers, np.frombuffer(capacities, dtype=np.int32).tolist()):
+        driver.capacity = capacity
+
+    rider_latitudes = np.frombuffer(rider_latitudes, dtype=np.float64).tolist()
+    rider_longitudes = np.frombuffer(rider_longitudes, dtype=np.float64).tolist()
+    riders = [
+        Rider.from_snapshot(rider_id, email or None, name, Location(latitude, longitude))
+        for rider_id, email, name, latitude, longitude in zip(
+            unpack_strings(rider_ids, rider_count), unpack_strings(rider_emails, rider_count), unpack_strings(rider_names, rider_count),
+            rider_latitudes, rider_longitudes
+        )
+    ]
+    for rider, is_registered in zip(riders, np.frombuffer(rider_registered, dtype=np.uint8).tolist()):
+        if is_registered:
+            manager.riders[rider.user_id] = rider
+
+    locations = np.frombuffer(ride_locations, dtype=np.float64).reshape(5, ride_count).tolist() if ride_count else [[]] * 5
+    rides: List[Ride] = []
+    for ride_id, rider_position, driver_position, status_code, start_latitude, start_longitude, end_latitude, end_longitude, distance in zip(
+        unpack_strings(ride_ids, ride_count),
+        np.frombuffer(ride_riders, dtype=np.int32).tolist(), np.frombuffer(ride_drivers, dtype=np.int32).tolist(),
+        np.frombuffer(ride_statuses, dtype=np.uint8).tolist(), *locations
+    ):
+        rider = riders[rider_position]
+        driver = None if driver_position == NO_DRIVER else drivers[driver_position]
+        status = STATUSES[status_code]
+        ride = Ride.from_snapshot(
+            ride_id, rider, driver, status, Location(start_latitude, start_longitude), Location(end_latitude, end_longitude), distance
+        )
+        manager.add_ride(ride)
+        rides.append(ride)
+        if status in ACTIVE_STATUSES:
+            rider.current_ride = ride
+            # A pooled driver serves several rides at once through their stops, never as their current ride
+            if driver is not None and not stop_counts[driver_position]:
+                driver.current_ride = ride
+        elif status == RideStatus.COMPLETED:
+            rider.ride_history.append(ride)
+            if driver is not None:
+                driver.drive_history.append(ride)
+
+    stops = iter(zip(np.frombuffer(stop_rides, dtype=np.int32).tolist(), np.frombuffer(stop_pickups, dtype=np.uint8).tolist(),
+                     np.frombuffer(stop_deadlines, dtype=np.float64).tolist()))
+    for driver, stop_count in zip(drivers, stop_counts):
+        for ride_position, is_pickup, deadline in (next(stops) for _ in range(stop_count)):
+            ride = rides[ride_position]
+            driver.stops.append(Stop(ride, bool(is_pickup), ride.start_location if is_pickup else ride.end_location, deadline))
+    return manager
+
+
+def restore_drivers(manager: RideSharingManager, driver_ids: List[str], emails: List[str], names: List[str], latitudes: np.ndarray,
+                    longitudes: np.ndarray, available: np.ndarray, registered: np.ndarray) -> List[Driver]:
+    is_registered = registered.astype(bool)
+    is_available = available.astype(bool)
+    availability = is_available.tolist()
+    registered_positions = np.flatnonzero(is_registered).tolist()
+    registered_ids = [driver_ids[position] for position in registered_positions]
+    store = manager.driver_store
+    slots = store.bulk_allocate(registered_ids, latitudes[is_registered], longitudes[is_registered], available[is_registered])
+
+    drivers: List[Driver | None] = [None] * len(driver_ids)
+    for position, slot in zip(registered_positions, slots):
+        drivers[position] = Driver.from_snapshot(
+            driver_ids[position], emails[position] or None, names[position], None, availability[position], store, slot, manager
+        )
+    manager.drivers.update(zip(registered_ids, (drivers[position] for position in registered_positions)))
+    for position in np.flatnonzero(~is_registered).tolist():
+        location = Location(float(latitudes[position]), float(longitudes[position]))
+        drivers[position] = Driver.from_snapshot(driver_ids[position], emails[position] or None, names[position], location, availability[position])
+
+    for index, mask in ((manager.available_index, is_registered & is_available), (manager.busy_index, is_registered & ~is_available)):
+        positions = np.flatnonzero(mask).tolist()
+        index.bulk_insert([driver_ids[position] for position in positions], [drivers[position] for position in positions],
+                          longitudes[mask], latitudes[mask])
+    return drivers
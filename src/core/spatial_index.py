@@ -0,0 +1,407 @@
+from __future__ import annotations
+import heapq
+import threading
+from itertools import repeat
+from math import asin, ceil, cos, floor, radians, sin, sqrt
+from typing import Any, Dict, Hashable, Iterator, List, Sequence, Tuple
+
+from src.core.lazy_import import lazy_module
+from src.core.locks import StripedLock
+from src.models.location.location import EARTH_RADIUS_KM, haversine_km
+
+np = lazy_module("numpy")
+
+KM_PER_DEGREE = 111.0
+DEFAULT_CELL_SIZE_KM = 1.0
+HILBERT_BITS = 16
+
+Cell = Tuple[int, int]
+
+
+"""
+Computes Hilbert curve keys for points, after snapping them to a 2^bits x 2^bits grid over the bounding box.
+Points close on the curve are close in space, so sorting by key lays nearby points out next to each other.
+Args:
+    longitudes (np.ndarray): The longitudes of the points.
+    latitudes (np.ndarray): The latitudes of the points.
+    bbox (List[float]): The area the grid covers [minX, minY, maxX, maxY]; points outside are clamped to its edge.
+    bits (int): The grid resolution per axis.
+Returns:
+    np.ndarray: One int64 key per point.
+"""
+def hilbert_keys(longitudes: np.ndarray, latitudes: np.ndarray, bbox: List[float], bits: int = HILBERT_BITS) -> np.ndarray:
+    side = 1 << bits
+    min_x, min_y, max_x, max_y = bbox
+    xs = np.clip(((np.asarray(longitudes, dtype=np.float64) - min_x) / (max_x - min_x) * side).astype(np.int64), 0, side - 1)
+    ys = np.clip(((np.asarray(latitudes, dtype=np.float64) - min_y) / (max_y - min_y) * side).astype(np.int64), 0, side - 1)
+    keys = np.zeros(len(xs), dtype=np.int64)
+    step = side >> 1
+    while step > 0:
+        right = (xs & step) > 0
+        top = (ys & step) > 0
+        keys += step * step * ((3 * right) ^ top)
+        # Rotate the quadrant so the curve inside it is in canonical orientation
+        rotate = ~top
+        flip = rotate & right
+        xs = np.where(flip, side - 1 - xs, xs)
+        ys = np.where(flip, side - 1 - ys, ys)
+        xs, ys = np.where(rotate, ys, xs), np.where(rotate, xs, ys)
+        step >>= 1
+    return keys
+
+
+class QueryStats:
+    """
+    Work done by one nearest-neighbour query, filled in when the caller passes it to nearest().
+    examined counts items whose distance was computed; rings counts the grid rings visited, each
+    ring_width_km wider than the last. An index searched in one pass leaves ring_width_km at 0.
+    """
+    __slots__ = ("examined", "rings", "ring_width_km")
+
+    def __init__(self):
+        self.examined = 0
+        self.rings = 0
+        self.ring_width_km = 0.0
+
+
+class GridSpatialIndex:
+    """
+    Movable-point spatial index that buckets items into fixed-size longitude/latitude cells.
+    Every item is keyed by an id, so moving an item is an O(1) bucket swap instead of a tree rebuild.
+    Thread safety: bucket writes hold the lock stripe of their cell, and queries read snapshots of
+    buckets, so different items can be written and queried from many threads. Writes to the same
+    item id must be serialized by the caller (RideSharingManager does this per driver).
+    Args:
+        bbox (List[float]): The operational area [minX, minY, maxX, maxY], used as the grid origin.
+        cell_size_km (float): The side length of a grid cell in kilometers.
+    """
+    def __init__(self, bbox: List[float], cell_size_km: float = DEFAULT_CELL_SIZE_KM):
+        self.bbox = bbox
+        self.cell_size_km = cell_size_km
+        self.cell_size = cell_size_km / KM_PER_DEGREE
+        self.cells: Dict[Cell, Dict[Hashable, Any]] = {}
+        self.positions: Dict[Hashable, Tuple[float, float, Cell]] = {}
+        self.cell_locks = StripedLock()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self.positions
+
+
+    """
+    This function maps a point to the grid cell that contains it.
+    Args:
+        longitude (float): The longitude of the point.
+        latitude (float): The latitude of the point.
+    """
+    def cell_of(self, longitude: float, latitude: float) -> Cell:
+        return (
+            floor((longitude - self.bbox[0]) / self.cell_size),
+            floor((latitude - self.bbox[1]) / self.cell_size)
+        )
+
+
+    """
+    This function adds an item to the index, replacing any previous entry with the same id.
+    Args:
+        item_id (Hashable): The unique key of the item.
+        item (Any): The object returned by queries.
+        longitude (float): The longitude of the item.
+        latitude (float): The latitude of the item.
+    """
+    def insert(self, item_id: Hashable, item: Any, longitude: float, latitude: float):
+        if item_id in self.positions:
+            self.remove(item_id)
+        cell = self.cell_of(longitude, latitude)
+        with self.cell_locks.holding(cell):
+            self.cells.setdefault(cell, {})[item_id] = item
+            self.positions[item_id] = (longitude, latitude, cell)
+
+
+    """
+    This function adds many items at once. Cells are computed for the whole batch with NumPy and each
+    bucket is filled in one pass, instead of one locked insert per item.
+    Meant for building an index from scratch, e.g. on restore: ids must not already be indexed.
+    Args:
+        item_ids (Sequence[Hashable]): The unique keys of the items.
+        items (Sequence[Any]): The objects returned by queries, in the same order.
+        longitudes (np.ndarray): The longitudes of the items.
+        latitudes (np.ndarray): The latitudes of the items.
+    """
+    def bulk_insert(self, item_ids: Sequence[Hashable], items: Sequence[Any], longitudes: np.ndarray, latitudes: np.ndarray):
+        if len(item_ids) == 0:
+            return
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        cell_xs = np.floor((longitudes - self.bbox[0]) / self.cell_size).astype(np.int64)
+        cell_ys = np.floor((latitudes - self.bbox[1]) / self.cell_size).astype(np.int64)
+        # Sort by cell so each bucket is one contiguous run, filled with a single dict update
+        order = np.lexsort((cell_ys, cell_xs))
+        cell_xs, cell_ys = cell_xs[order], cell_ys[order]
+        starts = np.flatnonzero(np.r_[True, (cell_xs[1:] != cell_xs[:-1]) | (cell_ys[1:] != cell_ys[:-1])])
+        bucket_cells = list(zip(cell_xs[starts].tolist(), cell_ys[starts].tolist()))
+        starts = starts.tolist()
+        sorted_longitudes, sorted_latitudes = longitudes[order].tolist(), latitudes[order].tolist()
+        order = order.tolist()
+        sorted_ids = [item_ids[position] for position in order]
+        sorted_items = [items[position] for position in order]
+        cells, positions = self.cells, self.positions
+        with self.cell_locks.holding_all():
+            for cell, start, end in zip(bucket_cells, starts, starts[1:] + [len(order)]):
+                cells.setdefault(cell, {}).update(zip(sorted_ids[start:end], sorted_items[start:end]))
+                # Every position in a bucket shares the bucket's cell tuple
+                positions.update(zip(sorted_ids[start:end], zip(sorted_longitudes[start:end], sorted_latitudes[start:end], repeat(cell))))
+
+
+    """
+    This function removes an item from the index.
+    Args:
+        item_id (Hashable): The unique key of the item.
+    Returns:
+        bool: True if the item was indexed, else False.
+    """
+    def remove(self, item_id: Hashable) -> bool:
+        position = self.positions.pop(item_id, None)
+        if position is None:
+            return False
+        cell = position[2]
+        with self.cell_locks.holding(cell):
+            bucket = self.cells[cell]
+            del bucket[item_id]
+            if not bucket:
+                del self.cells[cell]
+        return True
+
+
+    """
+    This function moves an indexed item to a new point. Only the cell buckets are touched.
+    Args:
+        item_id (Hashable): The unique key of the item.
+        longitude (float): The new longitude of the item.
+        latitude (float): The new latitude of the item.
+    """
+    def move(self, item_id: Hashable, longitude: float, latitude: float):
+        old_cell = self.positions[item_id][2]
+        new_cell = self.cell_of(longitude, latitude)
+        if new_cell == old_cell:
+            self.positions[item_id] = (longitude, latitude, new_cell)
+            return
+        with self.cell_locks.holding(old_cell, new_cell):
+            bucket = self.cells[old_cell]
+            item = bucket.pop(item_id)
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(new_cell, {})[item_id] = item
+            self.positions[item_id] = (longitude, latitude, new_cell)
+
+
+    """
+    This function returns every item whose point lies inside a bounding box.
+    Args:
+        bbox (List[float]): The search box [minX, minY, maxX, maxY].
+    """
+    def intersect(self, bbox: List[float]) -> List[Any]:
+        min_x, min_y, max_x, max_y = bbox
+        min_cell_x, min_cell_y = self.cell_of(min_x, min_y)
+        max_cell_x, max_cell_y = self.cell_of(max_x, max_y)
+
+        # Walk whichever is smaller: the cells covered by the box or the occupied cells
+        covered = (max_cell_x - min_cell_x + 1) * (max_cell_y - min_cell_y + 1)
+        if covered <= len(self.cells):
+            buckets = (
+                self.cells.get((cell_x, cell_y))
+                for cell_x in range(min_cell_x, max_cell_x + 1)
+                for cell_y in range(min_cell_y, max_cell_y + 1)
+            )
+        else:
+            buckets = (
+                bucket for (cell_x, cell_y), bucket in list(self.cells.items())
+                if min_cell_x <= cell_x <= max_cell_x and min_cell_y <= cell_y <= max_cell_y
+            )
+
+        positions = self.positions
+        results = []
+        for bucket in buckets:
+            if not bucket:
+                continue
+            # Snapshot the bucket so concurrent writers cannot change it mid-iteration
+            for item_id, item in list(bucket.items()):
+                position = positions.get(item_id)
+                if position is None:
+                    continue
+                longitude, latitude, _ = position
+                if min_x <= longitude <= max_x and min_y <= latitude <= max_y:
+                    results.append(item)
+        return results
+
+
+    """
+    This function yields the cells at Chebyshev distance `ring` from a center cell.
+    Args:
+        center (Cell): The cell the search started from.
+        ring (int): The ring number, 0 being the center cell itself.
+    """
+    def ring_cells(self, center: Cell, ring: int) -> Iterator[Cell]:
+        center_x, center_y = center
+        if ring == 0:
+            yield center
+            return
+        for cell_x in range(center_x - ring, center_x + ring + 1):
+            yield (cell_x, center_y - ring)
+            yield (cell_x, center_y + ring)
+        for cell_y in range(center_y - ring + 1, center_y + ring):
+            yield (center_x - ring, cell_y)
+            yield (center_x + ring, cell_y)
+
+
+    """
+    This function finds the k nearest items by Haversine distance, searching outward one ring of cells at a time.
+    An item is confirmed once no unvisited ring can hold anything closer, so the search stops as soon as k
+    items are confirmed and each cell is visited at most once.
+    Args:
+        longitude (float): The longitude of the search origin.
+        latitude (float): The latitude of the search origin.
+        k (int): The maximum number of items to return.
+        max_radius_km (float): Items farther than this are ignored.
+        stats (QueryStats): Optional, receives the number of items examined and rings visited.
+    Returns:
+        List[Tuple[Any, float]]: (item, distance_km) pairs, nearest first.
+    """
+    def nearest(self, longitude: float, latitude: float, k: int, max_radius_km: float, stats: QueryStats | None = None) -> List[Tuple[Any, float]]:
+        if k <= 0 or not self.positions:
+            return []
+
+        # Kilometers per cell along the narrower (longitude) side, taken at the most poleward latitude in range
+        edge_latitude = min(abs(latitude) + max_radius_km / KM_PER_DEGREE, 89.0)
+        ring_width_km = self.cell_size_km * cos(radians(edge_latitude))
+        max_ring = ceil(max_radius_km / ring_width_km) + 1
+
+        # Haversine inlined with the origin's radians and cosine computed once per query
+        origin_lat, origin_long = radians(latitude), radians(longitude)
+        origin_cos = cos(origin_lat)
+        diameter = 2 * EARTH_RADIUS_KM
+
+        center = self.cell_of(longitude, latitude)
+        positions = self.positions
+        candidates: List[Tuple[float, int, Any]] = []
+        results: List[Tuple[Any, float]] = []
+        sequence = 0
+        examined = 0
+        for ring in range(max_ring + 1):
+            for cell in self.ring_cells(center, ring):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                examined += len(bucket)
+                for item_id, item in list(bucket.items()):
+                    position = positions.get(item_id)
+                    if position is None:
+                        continue
+                    item_longitude, item_latitude, _ = position
+                    item_lat = radians(item_latitude)
+                    half_lat = sin((item_lat - origin_lat) * 0.5)
+                    half_long = sin((radians(item_longitude) - origin_long) * 0.5)
+                    distance = diameter * asin(sqrt(half_lat * half_lat + origin_cos * cos(item_lat) * half_long * half_long))
+                    if distance <= max_radius_km:
+                        heapq.heappush(candidates, (distance, sequence, item))
+                        sequence += 1
+
+            # Everything outside rings 0..ring is at least this far away
+            visited_radius_km = ring * ring_width_km
+            while candidates and candidates[0][0] <= visited_radius_km:
+                distance, _, item = heapq.heappop(candidates)
+                results.append((item, distance))
+                if len(results) == k:
+                    break
+            if len(results) == k or visited_radius_km >= max_radius_km:
+                break
+
+        if stats is not None:
+            stats.examined += examined
+            stats.rings += ring + 1
+            stats.ring_width_km = ring_width_km
+        while candidates and len(results) < k:
+            distance, _, item = heapq.heappop(candidates)
+            results.append((item, distance))
+        return results
+
+
+class QuadTreeSpatialIndex:
+    """
+    Adapter that gives the pyqtree Index the same id-keyed interface as GridSpatialIndex.
+    The tree stores item ids; moves are a remove followed by a reinsert, which costs O(depth) instead of O(1).
+    pyqtree is not thread-safe, so every operation holds one index-wide lock. It is imported only when
+    this backend is selected.
+    Args:
+        bbox (List[float]): The operational area [minX, minY, maxX, maxY].
+    """
+    def __init__(self, bbox: List[float]):
+        from pyqtree import Index
+        self.bbox = bbox
+        self.tree = Index(bbox=bbox)
+        self.entries: Dict[Hashable, Tuple[Any, List[float]]] = {}
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self.entries
+
+    def insert(self, item_id: Hashable, item: Any, longitude: float, latitude: float):
+        with self.lock:
+            if item_id in self.entries:
+                self.remove(item_id)
+            point = [longitude, latitude, longitude, latitude]
+            self.tree.insert(item=item_id, bbox=point)
+            self.entries[item_id] = (item, point)
+
+    def bulk_insert(self, item_ids: Sequence[Hashable], items: Sequence[Any], longitudes: np.ndarray, latitudes: np.ndarray):
+        with self.lock:
+            for item_id, item, longitude, latitude in zip(item_ids, items, np.asarray(longitudes).tolist(), np.asarray(latitudes).tolist()):
+                self.insert(item_id, item, longitude, latitude)
+
+    def remove(self, item_id: Hashable) -> bool:
+        with self.lock:
+            entry = self.entries.pop(item_id, None)
+            if entry is None:
+                return False
+            self.tree.remove(item=item_id, bbox=entry[1])
+            return True
+
+    def move(self, item_id: Hashable, longitude: float, latitude: float):
+        with self.lock:
+            item, _ = self.entries[item_id]
+            self.remove(item_id)
+            self.insert(item_id, item, longitude, latitude)
+
+    def intersect(self, bbox: List[float]) -> List[Any]:
+        with self.lock:
+            entries = self.entries
+            return [entries[item_id][0] for item_id in self.tree.intersect(bbox=bbox)]
+
+    def nearest(self, longitude: float, latitude: float, k: int, max_radius_km: float, stats: QueryStats | None = None) -> List[Tuple[Any, float]]:
+        if k <= 0 or not self.entries:
+            return []
+        lat_radius = max_radius_km / KM_PER_DEGREE
+        lon_radius = lat_radius / cos(radians(min(abs(latitude) + lat_radius, 89.0)))
+        search_bbox = [longitude - lon_radius, latitude - lat_radius, longitude + lon_radius, latitude + lat_radius]
+        candidates = []
+        with self.lock:
+            hits = [self.entries[item_id] for item_id in self.tree.intersect(bbox=search_bbox)]
+        if stats is not None:
+            stats.examined += len(hits)
+            stats.rings += 1
+        for item, point in hits:
+            distance = haversine_km(latitude, longitude, point[1], point[0])
+            if distance <= max_radius_km:
+                candidates.append((item, distance))
+        return heapq.nsmallest(k, candidates, key=lambda candidate: candidate[1])
+
+
+SPATIAL_BACKENDS = {
+    "grid": GridSpatialIndex,
+    "quadtree": QuadTreeSpatialIndex,
+}
@@ -0,0 +1,209 @@
+from __future__ import annotations
+import threading
+import time
+from math import ceil, floor
+from typing import Callable, Dict, List, NamedTuple
+
+from src.core.lazy_import import lazy_module
+from src.core.zone_grid import DEFAULT_ZONE_SIZE_KM, ZoneGrid
+
+np = lazy_module("numpy")
+
+DEFAULT_WINDOW_SECONDS = 300.0
+DEFAULT_BUCKET_SECONDS = 10.0
+# A zone surges once its recent requests outnumber its available drivers, by SURGE_SENSITIVITY per extra
+# request per driver, in steps of SURGE_STEP so quoted prices do not flicker, up to MAX_SURGE
+SURGE_SENSITIVITY = 0.5
+SURGE_STEP = 0.1
+MAX_SURGE = 3.0
+BASE_FARE = 2.5
+FARE_PER_KM = 1.25
+
+
+"""
+Prices a trip: a base fare plus a per-kilometer fare, times the surge multiplier.
+Args:
+    distance_km (float): The trip distance.
+    surge_multiplier (float): The surge at the pickup.
+"""
+def fare(distance_km: float, surge_multiplier: float = 1.0) -> float:
+    return round((BASE_FARE + FARE_PER_KM * distance_km) * surge_multiplier, 2)
+
+
+class Heatmap(NamedTuple):
+    """
+    Per-zone supply, demand and surge for the whole operational area, as (rows, columns) arrays with row 0 in the south.
+    """
+    available_drivers: np.ndarray
+    recent_requests: np.ndarray
+    surge_multipliers: np.ndarray
+    zone_size_km: float
+
+
+class SurgePricing:
+    """
+    Real-time supply and demand per zone of a grid over the operational area, for surge pricing.
+    Supply is the number of available drivers in each zone, kept up to date by RideSharingManager on every
+    registration, availability change and location ping of a driver. Demand is the number of ride requests
+    in each zone over a sliding window, kept as a ring of time buckets so old requests expire a bucket at a time.
+    Every event and every per-zone read is O(1); nothing rescans drivers or rides.
+    Attach it with RideSystem.enable_surge_pricing. Safe to share between threads.
+    Args:
+        operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+        zone_size_km (float): The side length of a zone in kilometers.
+        window_seconds (float): How long a request counts as demand.
+        bucket_seconds (float): How finely the window slides.
+        clock (Callable[[], float]): Source of request times in seconds, e.g. a simulation clock.
+    """
+    def __init__(
+        self,
+        operational_area: List[float],
+        zone_size_km: float = DEFAULT_ZONE_SIZE_KM,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.zones = ZoneGrid(operational_area, zone_size_km)
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+
+        self.available: List[int] = [0] * len(self.zones)
+        self.requests: List[int] = [0] * len(self.zones)
+        self.driver_zones: Dict[int, int] = {}
+        self.buckets: List[Dict[int, int]] = [{} for _ in range(max(ceil(window_seconds / bucket_seconds), 1))]
+        self.current_bucket = floor(clock() / bucket_seconds)
+        self.lock = threading.Lock()
+
+
+    """
+    This function counts a driver as available supply at a position.
+    Args:
+        slot (int): The driver's driver store slot.
+        latitude (float): The driver's latitude.
+        longitude (float): The driver's longitude.
+    """
+    def driver_available(self, slot: int, latitude: float, longitude: float):
+        zone = self.zones.zone_of(latitude, longitude)
+        with self.lock:
+            previous = self.driver_zones.get(slot)
+            if previous is not None:
+                self.available[previous] -= 1
+            self.driver_zones[slot] = zone
+            self.available[zone] += 1
+
+
+    """
+    This function counts many available drivers at once, e.g. when a fleet is registered or pricing is attached.
+    Args:
+        slots (np.ndarray): The drivers' driver store slots; none may be counted already.
+        latitudes (np.ndarray): The drivers' latitudes.
+        longitudes (np.ndarray): The drivers' longitudes.
+    """
+    def drivers_available(self, slots: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray):
+        zones = self.zones.zones_of(latitudes, longitudes)
+        counts = np.bincount(zones, minlength=len(self.available)).tolist()
+        with self.lock:
+            self.driver_zones.update(zip(np.asarray(slots).tolist(), zones.tolist()))
+            self.available = [total + count for total, count in zip(self.available, counts)]
+
+
+    """
+    This function stops counting a driver as supply, e.g. when they accept a ride or unregister.
+    Args:
+        slot (int): The driver's driver store slot.
+    """
+    def driver_unavailable(self, slot: int):
+        with self.lock:
+            zone = self.driver_zones.pop(slot, None)
+            if zone is not None:
+                self.available[zone] -= 1
+
+
+    """
+    This function moves an available driver's supply to the zone of their new position.
+    Drivers that are not counted as available are ignored.
+    Args:
+        slot (int): The driver's driver store slot.
+        latitude (float): The driver's new latitude.
+        longitude (float): The driver's new longitude.
+    """
+    def driver_moved(self, slot: int, latitude: float, longitude: float):
+        zone = self.zones.zone_of(latitude, longitude)
+        with self.lock:
+            previous = self.driver_zones.get(slot)
+            if previous is None or previous == zone:
+                return
+            self.available[previous] -= 1
+            self.available[zone] += 1
+            self.driver_zones[slot] = zone
+
+
+    """
+    This function expires the buckets that slid out of the window. The caller must hold the lock.
+    Costs nothing until a bucket boundary passes, then O(zones requested in the expired buckets).
+    """
+    def advance(self):
+        bucket = floor(self.clock() / self.bucket_seconds)
+        if bucket <= self.current_bucket:
+            return
+        ring = len(self.buckets)
+        for expired in range(self.current_bucket + 1, min(bucket, self.current_bucket + ring) + 1):
+            counts = self.buckets[expired % ring]
+            for zone, count in counts.items():
+                self.requests[zone] -= count
+            counts.clear()
+        self.current_bucket = bucket
+
+
+    """
+    This function counts a ride request as demand in the zone of its pickup.
+    Args:
+        latitude (float): The pickup latitude.
+        longitude (float): The pickup longitude.
+    """
+    def record_request(self, latitude: float, longitude: float):
+        zone = self.zones.zone_of(latitude, longitude)
+        with self.lock:
+            self.advance()
+            counts = self.buckets[self.current_bucket % len(self.buckets)]
+            counts[zone] = counts.get(zone, 0) + 1
+            self.requests[zone] += 1
+
+
+    """
+    This function returns the surge multiplier of a zone.
+    Args:
+        zone (int): The zone number, see ZoneGrid.zone_of.
+    """
+    def zone_multiplier(self, zone: int) -> float:
+        with self.lock:
+            self.advance()
+            requests, available = self.requests[zone], self.available[zone]
+        excess = requests / max(available, 1) - 1
+        if excess <= 0:
+            return 1.0
+        return min(1.0 + round(SURGE_SENSITIVITY * excess / SURGE_STEP) * SURGE_STEP, MAX_SURGE)
+
+
+    """
+    This function returns the surge multiplier at a point.
+    Args:
+        latitude (float): The latitude of the point, usually a pickup.
+        longitude (float): The longitude of the point.
+    """
+    def multiplier(self, latitude: float, longitude: float) -> float:
+        return self.zone_multiplier(self.zones.zone_of(latitude, longitude))
+
+
+    """
+    This function snapshots supply, demand and surge for every zone, e.g. for a demand heatmap.
+    """
+    def heatmap(self) -> Heatmap:
+        with self.lock:
+            self.advance()
+            available = np.array(self.available, dtype=np.int64)
+            requests = np.array(self.requests, dtype=np.int64)
+        excess = np.maximum(requests / np.maximum(available, 1) - 1, 0.0)
+        multipliers = np.minimum(1.0 + np.round(SURGE_SENSITIVITY * excess / SURGE_STEP) * SURGE_STEP, MAX_SURGE)
+        shape = (self.zones.rows, self.zones.columns)
+        return Heatmap(available.reshape(shape), requests.reshape(shape), multipliers.reshape(shape), self.zones.zone_size_km)
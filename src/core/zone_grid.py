@@ -0,0 +1,67 @@
+from __future__ import annotations
+from math import ceil, cos, floor, radians
+from typing import List, Tuple
+
+from src.core.lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+KM_PER_DEGREE = 111.0
+DEFAULT_ZONE_SIZE_KM = 1.0
+
+
+class ZoneGrid:
+    """
+    Splits an operational area into square zones of a fixed size in kilometers, numbered row by row from the
+    south-west corner, for per-zone aggregates such as surge pricing and demand forecasts.
+    Points outside the area belong to the nearest edge zone.
+    Args:
+        operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+        zone_size_km (float): The side length of a zone in kilometers.
+    """
+    def __init__(self, operational_area: List[float], zone_size_km: float = DEFAULT_ZONE_SIZE_KM):
+        self.operational_area = operational_area
+        self.zone_size_km = zone_size_km
+        # Zones are square in kilometers, so they are wider than tall in degrees
+        self.zone_height = zone_size_km / KM_PER_DEGREE
+        self.zone_width = self.zone_height / cos(radians((operational_area[1] + operational_area[3]) / 2))
+        self.rows = max(ceil((operational_area[3] - operational_area[1]) / self.zone_height), 1)
+        self.columns = max(ceil((operational_area[2] - operational_area[0]) / self.zone_width), 1)
+
+    def __len__(self) -> int:
+        return self.rows * self.columns
+
+
+    """
+    This function maps a point to its zone.
+    Args:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+    """
+    def zone_of(self, latitude: float, longitude: float) -> int:
+        row = min(max(floor((latitude - self.operational_area[1]) / self.zone_height), 0), self.rows - 1)
+        column = min(max(floor((longitude - self.operational_area[0]) / self.zone_width), 0), self.columns - 1)
+        return row * self.columns + column
+
+
+    """
+    This function maps many points to their zones at once.
+    Args:
+        latitudes (np.ndarray): The latitudes of the points.
+        longitudes (np.ndarray): The longitudes of the points.
+    """
+    def zones_of(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        rows = np.clip(np.floor((latitudes - self.operational_area[1]) / self.zone_height), 0, self.rows - 1).astype(np.int64)
+        columns = np.clip(np.floor((longitudes - self.operational_area[0]) / self.zone_width), 0, self.columns - 1).astype(np.int64)
+        return rows * self.columns + columns
+
+
+    """
+    This function returns the (latitude, longitude) center of every zone, in zone order.
+    """
+    def centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        rows, columns = np.divmod(np.arange(len(self)), self.columns)
+        return (
+            self.operational_area[1] + (rows + 0.5) * self.zone_height,
+            self.operational_area[0] + (columns + 0.5) * self.zone_width
+        )
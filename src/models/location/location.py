@@ -1,34 +1,30 @@
 from __future__ import annotations
 from math import radians, cos, sin, asin, sqrt
 
+EARTH_RADIUS_KM = 6371 # Radius of the Earth in kilometers
+
+def haversine_km(start_lat: float, start_long: float, end_lat: float, end_long: float) -> float:
+    start_lat, start_long, end_lat, end_long = radians(start_lat), radians(start_long), radians(end_lat), radians(end_long)
+    a = sin((end_lat - start_lat)/2)**2 + cos(start_lat) * cos(end_lat) * sin((end_long - start_long)/2)**2
+    return EARTH_RADIUS_KM * 2 * asin(sqrt(a))
+
+def validate_coordinates(latitude: float, longitude: float):
+    if not (-90 <= latitude <= 90):
+        raise ValueError("Invalid Latitude: Must be between -90 and 90.")
+    if not (-180 <= longitude <= 180):
+        raise ValueError("Invalid Longitude: Must be between -180 and 180.")
+
 class Location:
+    __slots__ = ("latitude", "longitude")
+
     def __init__(self, latitude: float, longitude: float):
-        if not (-90 <= latitude <= 90):
-            raise ValueError("Invalid Latitude: Must be between -90 and 90.")
-        if not (-180 <= longitude <= 180):
-            raise ValueError("Invalid Longitude: Must be between -180 and 180.")
+        validate_coordinates(latitude, longitude)
         self.latitude = latitude
         self.longitude = longitude
     
     def __repr__(self) -> str:
         return f"Location(lat={self.latitude}, lon={self.longitude})"
     
+    # Batches of points keep their radians and cosines in PreparedCoordinates instead
     def calculate_distance_in_km(self, end_location: Location) -> float:
-        radius = 6371 # Radius of the Earth in kilometers
-        
-        # Convert decimal degrees to radians
-        start_lat, start_long = map(radians, [self.latitude, self.longitude])
-        end_lat, end_long = map(radians, [end_location.latitude, end_location.longitude])
-        
-        # Haversine formula
-        long = end_long - start_long
-        lat = end_lat - start_lat
-        
-        # Square of half the chord length. A chord is a straight line connecting two points on a sphere.
-        a = sin(lat/2)**2 + cos(start_lat) * cos(end_lat) * sin(long/2)**2
-        
-        # Angular distance between 2 points
-        c = 2 * asin(sqrt(a))
-        
-        return radius * c  
-        
\ No newline at end of file
+        return haversine_km(self.latitude, self.longitude, end_location.latitude, end_location.longitude)
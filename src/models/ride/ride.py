@@ -1,25 +1,72 @@
 from __future__ import annotations
-from typing import List
-import uuid
-from uuid import uuid5
+import logging
+from typing import TYPE_CHECKING
 
+from src.core.events import emit, get_event_logger
+from src.core.id_generator import generate_id
 from ..users.rider import Rider
 from ..users.driver import Driver
 from ..location.location import Location
-from .ride_status import RideStatus
+from .ride_status import ACTIVE_STATUSES, RideStatus
 
-NAME_SPACE = uuid.NAMESPACE_DNS
-NAME = "ridesharingapp.com"
+if TYPE_CHECKING:
+    from src.core.journal import RideJournal
+    from src.core.ride_tracker import RideTracker
+
+logger = get_event_logger("rides")
 
 class Ride:
+    __slots__ = ("ride_id", "rider", "driver", "_ride_status", "start_location", "end_location", "distance", "journal", "tracker")
+
     def __init__(self, rider: Rider, start_location: Location, end_location: Location, driver: Driver = None, distance: float = 0.0):
-        self.ride_id: str = str(uuid5(NAME_SPACE, NAME))
+        self.ride_id: str = generate_id()
         self.rider: Rider = rider
         self.driver: Driver = driver
-        self.ride_status: RideStatus = RideStatus.NEW
+        # Set by RideSharingManager.add_ride so every status change updates the manager's per-status sets
+        self.tracker: RideTracker | None = None
+        self._ride_status: RideStatus = RideStatus.NEW
         self.start_location: Location = start_location
         self.end_location: Location = end_location
         self.distance: float = distance
+        # Set by RideSharingManager.add_ride when the manager journals ride transitions
+        self.journal: RideJournal | None = None
+    
+    # Rebuild a ride from a snapshot, keeping its saved id and status
+    @classmethod
+    def from_snapshot(cls, ride_id: str, rider: Rider, driver: Driver | None, ride_status: RideStatus, start_location: Location,
+                      end_location: Location, distance: float) -> "Ride":
+        ride = cls.__new__(cls)
+        ride.ride_id = ride_id
+        ride.rider = rider
+        ride.driver = driver
+        ride.tracker = None
+        ride._ride_status = ride_status
+        ride.start_location = start_location
+        ride.end_location = end_location
+        ride.distance = distance
+        ride.journal = None
+        return ride
+    
+    # Pickled rides, e.g. in the history of a driver handed to another shard worker, leave the manager's tracker and journal behind
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ("journal", "tracker")}
+    
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.journal = None
+        self.tracker = None
+    
+    # Ride's status; every change is reported to the tracker of the manager holding the ride
+    @property
+    def ride_status(self) -> RideStatus:
+        return self._ride_status
+    
+    @ride_status.setter
+    def ride_status(self, ride_status: RideStatus):
+        self._ride_status = ride_status
+        if self.tracker is not None:
+            self.tracker.update(self)
     
     # Get ride information
     def get_ride_info(self) -> str:
@@ -33,13 +80,18 @@ class Ride:
 
     # Check if ride is active
     def ride_is_active(self) -> bool:
-        return self.ride_status in [RideStatus.REQUESTED, RideStatus.PICKING_UP, RideStatus.IN_TRIP]
+        return self._ride_status in ACTIVE_STATUSES
     
     # Handle request for a ride
     def request_ride(self):
         if self.ride_status == RideStatus.NEW:
             self.ride_status = RideStatus.REQUESTED
-            print(f"Ride {self.ride_id} has been requested.")
+            if self.journal:
+                self.journal.record(
+                    "ride_requested", self.ride_id, self.rider.user_id, self.rider.email, self.rider.user_name,
+                    self.start_location.latitude, self.start_location.longitude, self.end_location.latitude, self.end_location.longitude, self.distance
+                )
+            emit(logger, logging.INFO, "ride_requested", "Ride %s has been requested.", self.ride_id, ride_id=self.ride_id, rider_id=self.rider.user_id)
         else:
             raise Exception("Ride can only be requested if it is in NEW status.")
     
@@ -48,7 +100,10 @@ class Ride:
         if self.ride_status == RideStatus.REQUESTED:
             self.driver = driver
             self.ride_status = RideStatus.PICKING_UP
-            print(f"Driver {driver.user_name} assigned to ride {self.ride_id}.")
+            if self.journal:
+                self.journal.record("ride_assigned", self.ride_id, driver.user_id)
+            emit(logger, logging.INFO, "ride_assigned", "Driver %s assigned to ride %s.", driver.user_name, self.ride_id,
+                 ride_id=self.ride_id, driver_id=driver.user_id)
         else:
             raise Exception("Cannot assign driver to a ride that is not in REQUESTED status.")
     
@@ -58,7 +113,9 @@ class Ride:
             if self.driver:
                 self.driver.update_location(self.start_location.latitude, self.start_location.longitude)
             self.ride_status = RideStatus.IN_TRIP
-            print(f"Ride {self.ride_id} has started.")
+            if self.journal:
+                self.journal.record("ride_started", self.ride_id)
+            emit(logger, logging.INFO, "ride_started", "Ride %s has started.", self.ride_id, ride_id=self.ride_id)
         else:
             raise Exception("Cannot start a ride that is not in picking-up status.")
 
@@ -69,7 +126,9 @@ class Ride:
         if self.driver:
             self.driver.update_location(self.end_location.latitude, self.end_location.longitude)
         self.ride_status = RideStatus.COMPLETED
-        print(f"Ride {self.ride_id} has been completed.")
+        if self.journal:
+            self.journal.record("ride_completed", self.ride_id)
+        emit(logger, logging.INFO, "ride_completed", "Ride %s has been completed.", self.ride_id, ride_id=self.ride_id)
     
     # Cancel the ride
     def cancel_ride(self):
@@ -80,5 +139,7 @@ class Ride:
             raise Exception("Cannot cancel a ride that is already in-trip or has finished.")
 
         self.ride_status = RideStatus.CANCELLED
-        print(f"Ride {self.ride_id} has been cancelled.")
+        if self.journal:
+            self.journal.record("ride_cancelled", self.ride_id)
+        emit(logger, logging.INFO, "ride_cancelled", "Ride %s has been cancelled.", self.ride_id, ride_id=self.ride_id)
         return True
\ No newline at end of file
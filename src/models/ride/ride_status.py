@@ -6,4 +6,7 @@ class RideStatus(Enum):
     PICKING_UP = "Picking Up"
     IN_TRIP = "In Trip"
     CANCELLED = "Cancelled"
-    COMPLETED = "Completed"
\ No newline at end of file
+    COMPLETED = "Completed"
+
+# Statuses of rides that still hold their rider and, once assigned, their driver
+ACTIVE_STATUSES = (RideStatus.REQUESTED, RideStatus.PICKING_UP, RideStatus.IN_TRIP)
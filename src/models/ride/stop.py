@@ -0,0 +1,21 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from ..location.location import Location
+
+if TYPE_CHECKING:
+    from .ride import Ride
+
+class Stop:
+    __slots__ = ("ride", "is_pickup", "location", "deadline")
+
+    def __init__(self, ride: "Ride", is_pickup: bool, location: Location, deadline: float):
+        self.ride: Ride = ride
+        # A pickup stop starts the ride, a dropoff stop completes it
+        self.is_pickup: bool = is_pickup
+        self.location: Location = location
+        # Latest arrival allowed by the rider's wait or detour limit, on the pooling dispatcher's clock
+        self.deadline: float = deadline
+
+    def __repr__(self) -> str:
+        return f"Stop({'pickup' if self.is_pickup else 'dropoff'} of {self.ride.ride_id} at {self.location})"
@@ -1,34 +1,133 @@
-import random
-from typing import List, TYPE_CHECKING
+import logging
+from typing import List, Tuple, TYPE_CHECKING
 
 
 from .user import User
-from ..location.location import Location
+from ..location.location import Location, validate_coordinates
+from src.core.events import emit, get_event_logger
 
 if TYPE_CHECKING:
     from ..ride.ride import Ride
+    from ..ride.stop import Stop
+    from src.core.ride_sharing_manager import RideSharingManager
+    from src.core.driver_store import DriverStore
+
+logger = get_event_logger("drivers")
+
+# Riders a car seats when it picks up pooled rides
+DEFAULT_CAPACITY = 4
 
 class Driver(User):
-    def __init__(self, email: str, user_name: str, longitude: float, latitude: float):
+    __slots__ = ("ride_sharing_manager", "driver_store", "slot", "_location", "_is_available", "current_ride", "drive_history", "capacity", "stops")
+
+    def __init__(self, email: str, user_name: str, longitude: float, latitude: float, capacity: int = DEFAULT_CAPACITY):
         super().__init__(email, user_name) 
-        self.current_location: Location = Location(latitude, longitude)
-        self.is_available: bool = True
+        self.ride_sharing_manager: RideSharingManager | None = None
+        self.driver_store: DriverStore | None = None
+        self.slot: int = -1
+        self._location: Location | None = Location(latitude, longitude)
+        self._is_available: bool = True
         self.current_ride: Ride | None = None
         self.drive_history: List[Ride] = [] 
+        self.capacity: int = capacity
+        # Pooled rides only: the pickups and dropoffs still to serve, in driving order
+        self.stops: List[Stop] = []
+    
+    # Rebuild a driver from a snapshot, keeping its saved id; registered drivers pass their store slot instead of a location
+    @classmethod
+    def from_snapshot(cls, user_id: str, email: str | None, user_name: str, location: Location | None, is_available: bool,
+                      driver_store: "DriverStore | None" = None, slot: int = -1,
+                      ride_sharing_manager: "RideSharingManager | None" = None) -> "Driver":
+        driver = cls.__new__(cls)
+        driver.user_id = user_id
+        driver.email = email
+        driver.user_name = user_name
+        driver.ride_sharing_manager = ride_sharing_manager
+        driver.driver_store = driver_store
+        driver.slot = slot
+        driver._location = location
+        driver._is_available = is_available
+        driver.current_ride = None
+        driver.drive_history = []
+        driver.capacity = DEFAULT_CAPACITY
+        driver.stops = []
+        return driver
+    
+    # Driver's location; once registered it is read from the manager's columnar driver store
+    @property
+    def current_location(self) -> Location:
+        if self.driver_store is None:
+            return self._location
+        return self.driver_store.location_of(self.slot)
+    
+    # Driver's (latitude, longitude), read from the store without building a Location
+    @property
+    def current_coordinates(self) -> Tuple[float, float]:
+        if self.driver_store is None:
+            return self._location.latitude, self._location.longitude
+        return self.driver_store.position_of(self.slot)
+    
+    # Bind the driver to its slot in a driver store, which owns position and availability from now on
+    def attach_store(self, driver_store: "DriverStore", slot: int):
+        self.driver_store = driver_store
+        self.slot = slot
+        self._location = None
+    
+    # Unbind the driver from its store slot, keeping a copy of its last position
+    def detach_store(self):
+        if self.driver_store is None:
+            return
+        self._location = self.driver_store.location_of(self.slot)
+        self.driver_store = None
+        self.slot = -1
+    
+    # Driver's availability; every change moves the driver between the manager's available and busy indexes
+    @property
+    def is_available(self) -> bool:
+        return self._is_available
+    
+    @is_available.setter
+    def is_available(self, is_available: bool):
+        if self.ride_sharing_manager:
+            self.ride_sharing_manager.set_driver_availability(self, is_available)
+        else:
+            self._is_available = is_available
+            if self.driver_store is not None:
+                self.driver_store.set_available(self.slot, is_available)
     
     # Update driver's location
     def update_location(self, latitude: float, longitude: float):
-        self.current_location = Location(latitude, longitude)
-        print(f"Driver {self.user_name} location updated to {self.current_location}.")
+        if self.driver_store is None:
+            self._location = Location(latitude, longitude)
+        else:
+            validate_coordinates(latitude, longitude)
+            self.driver_store.set_position(self.slot, latitude, longitude)
+        if self.ride_sharing_manager:
+            self.ride_sharing_manager.update_driver_location(self)
+        if logger.isEnabledFor(logging.DEBUG):
+            location = self.current_location
+            emit(logger, logging.DEBUG, "driver_location_updated", "Driver %s location updated to %s.", self.user_name, location,
+                 driver_id=self.user_id, latitude=location.latitude, longitude=location.longitude)
+    
+    # Driver accepts a ride if still available; the availability check-and-flip is atomic once registered
+    def try_accept_ride(self, ride: "Ride") -> bool:
+        if self.ride_sharing_manager:
+            if not self.ride_sharing_manager.compare_and_set_availability(self, True, False):
+                return False
+        elif not self._is_available:
+            return False
+        else:
+            self._is_available = False
+        
+        self.current_ride = ride
+        emit(logger, logging.INFO, "driver_accepted_ride", "Driver %s has accepted a ride from %s to %s.", self.user_name, ride.start_location, ride.end_location,
+             driver_id=self.user_id, ride_id=ride.ride_id)
+        return True
     
     # Driver accepts a ride
     def accept_ride(self, ride: "Ride"):
-        if not self.is_available:
+        if not self.try_accept_ride(ride):
             raise Exception("Driver is not available to accept a new ride.")
-        
-        self.current_ride = ride
-        self.is_available = False
-        print(f"Driver {self.user_name} has accepted a ride from {ride.start_location} to {ride.end_location}.")
     
     # Driver completes a ride
     def complete_ride(self):
@@ -38,7 +137,7 @@ class Driver(User):
         self.drive_history.append(self.current_ride)
         self.current_ride = None
         self.is_available = True
-        print(f"Driver {self.user_name} has completed a ride.")
+        emit(logger, logging.INFO, "driver_completed_ride", "Driver %s has completed a ride.", self.user_name, driver_id=self.user_id)
     
     # Driver cancels a ride
     def cancel_ride(self, ride: "Ride"):
@@ -47,4 +146,5 @@ class Driver(User):
         
         self.current_ride = None
         self.is_available = True
-        print(f"Driver {self.user_name} has cancelled a ride from {ride.start_location} to {ride.end_location}.")
\ No newline at end of file
+        emit(logger, logging.INFO, "driver_cancelled_ride", "Driver %s has cancelled a ride from %s to %s.", self.user_name, ride.start_location, ride.end_location,
+             driver_id=self.user_id, ride_id=ride.ride_id)
\ No newline at end of file
@@ -1,27 +1,47 @@
+import logging
 from typing import List, TYPE_CHECKING
 
 
 from .user import User
 from ..location.location import Location
+from src.core.events import emit, get_event_logger
 
 if TYPE_CHECKING:
     from ..ride.ride import Ride
 
+logger = get_event_logger("riders")
+
 class Rider(User):
+    __slots__ = ("current_location", "current_ride", "ride_history")
+
     def __init__(self, email: str, user_name: str, longitude: float, latitude: float):
         super().__init__(email, user_name)
         self.current_location = Location(latitude, longitude)
         self.current_ride: Ride | None = None
         self.ride_history: List[Ride] = [] 
     
+    # Rebuild a rider from a snapshot, keeping its saved id
+    @classmethod
+    def from_snapshot(cls, user_id: str, email: str | None, user_name: str, location: Location) -> "Rider":
+        rider = cls.__new__(cls)
+        rider.user_id = user_id
+        rider.email = email
+        rider.user_name = user_name
+        rider.current_location = location
+        rider.current_ride = None
+        rider.ride_history = []
+        return rider
+    
     def update_location(self, latitude: float, longitude: float):
         self.current_location = Location(latitude, longitude)
-        print(f"Rider {self.user_name} location updated to {self.current_location}.")
+        emit(logger, logging.DEBUG, "rider_location_updated", "Rider %s location updated to %s.", self.user_name, self.current_location,
+             rider_id=self.user_id, latitude=latitude, longitude=longitude)
     
     def ride_completed(self):
         if not self.current_ride:
             raise Exception("No ride to complete!")
         
         self.ride_history.append(self.current_ride)
-        print(f"Ride {self.current_ride.ride_id} completed by {self.user_name}.")
+        emit(logger, logging.INFO, "rider_completed_ride", "Ride %s completed by %s.", self.current_ride.ride_id, self.user_name,
+             rider_id=self.user_id, ride_id=self.current_ride.ride_id)
         self.current_ride = None
\ No newline at end of file
@@ -2,12 +2,21 @@ from abc import ABC, abstractmethod
 import uuid
 from uuid import uuid5
 
+from src.core.id_generator import generate_id
+
 NAME_SPACE = uuid.NAMESPACE_DNS
 NAME = "ridesharingapp.com"
 
+# Email-based identity is stable across registrations and processes
+def user_id_for(email: str) -> str:
+    return str(uuid5(NAME_SPACE, NAME + email))
+
 class User(ABC):
-    def __init__(self, email: str, user_name:str):
-        self.user_id: str = str(uuid5(NAME_SPACE, NAME + email))
+    __slots__ = ("user_id", "email", "user_name")
+
+    def __init__(self, email: str | None, user_name:str):
+        # Users without an email get a generated id
+        self.user_id: str = user_id_for(email) if email else generate_id()
         self.email: str = email
         self.user_name: str = user_name
     
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.location.location import Location
+from src.core.events import emit, get_event_logger
+from src.usecases.ride_system import MAX_DRIVER_OFFERS, MAX_SEARCH_RADIUS_KM, RideSystem
+
+DEFAULT_OFFER_TIMEOUT_SECONDS = 15.0
+CANDIDATE_POOL_FACTOR = 4
+
+logger = get_event_logger("async_dispatch")
+
+OfferHandler = Callable[[Driver, Ride], Awaitable[bool]]
+
+class AsyncRideSystem:
+    """
+    Asyncio front end for RideSystem: every ride request runs as a coroutine that offers the ride
+    to one driver at a time and awaits the answer, so thousands of requests can wait on drivers
+    concurrently on a single event loop.
+    A driver holds at most one outstanding offer; the reservation is taken and released without
+    awaiting in between, so two racing requests can never both assign the same driver.
+    Args:
+        ride_system (RideSystem): Provides the manager and the ride lifecycle methods.
+        offer_timeout_seconds (float): How long a driver has to answer before the offer falls through.
+        max_offers (int): How many drivers are offered a ride before it is cancelled.
+        offer_handler (OfferHandler): Delivers an offer and resolves to the driver's answer. Defaults to
+            waiting for respond_to_offer to be called for that driver.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        offer_timeout_seconds: float = DEFAULT_OFFER_TIMEOUT_SECONDS,
+        max_offers: int = MAX_DRIVER_OFFERS,
+        offer_handler: OfferHandler | None = None
+    ):
+        self.ride_system = ride_system
+        self.offer_timeout_seconds = offer_timeout_seconds
+        self.max_offers = max_offers
+        self.offer_handler = offer_handler or self.await_driver_response
+        self.reserved_drivers: Set[str] = set()
+        self.pending_offers: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+
+    """
+    Rider requests a ride and waits until a driver accepts it or every offer falls through
+    Args:
+        rider (Rider): The rider requesting the ride
+        destination (Location): The destination of the ride
+    """
+    async def request_ride(self, rider: Rider, destination: Location) -> Ride:
+        ride = self.ride_system.create_ride_request(rider, destination)
+        await self.process_ride_request(ride)
+        return ride
+
+
+    """
+    Offer a ride to the nearest free drivers one after another until one accepts
+    Args:
+        ride (Ride): The ride to be processed
+    """
+    async def process_ride_request(self, ride: Ride):
+        offered: Set[str] = set()
+        while len(offered) < self.max_offers and ride.ride_status == RideStatus.REQUESTED:
+            driver = self.reserve_next_driver(ride, offered)
+            if driver is None:
+                break
+            offered.add(driver.user_id)
+            try:
+                accepted = await self.send_offer(driver, ride)
+                # The rider may have cancelled, or the driver gone offline, while the offer was out
+                if accepted and ride.ride_status == RideStatus.REQUESTED and driver.try_accept_ride(ride):
+                    ride.assign_driver(driver)
+                    return
+            finally:
+                self.reserved_drivers.discard(driver.user_id)
+
+        if ride.ride_status == RideStatus.REQUESTED:
+            emit(logger, logging.INFO, "ride_unmatched", "No available drivers accepted ride %s. The ride will be cancelled.", ride.ride_id,
+                 ride_id=ride.ride_id, offers=len(offered))
+            self.ride_system.cancel_ride(ride)
+
+
+    """
+    Pick and reserve the nearest available driver that is neither already offered this ride nor holding another offer.
+    The search widens while every candidate it returned is taken, until it runs out of drivers within range.
+    Args:
+        ride (Ride): The ride being offered
+        offered (Set[str]): IDs of drivers already offered this ride
+    """
+    def reserve_next_driver(self, ride: Ride, offered: Set[str]) -> Driver | None:
+        k = self.max_offers * CANDIDATE_POOL_FACTOR
+        while True:
+            candidates = self.ride_system.ride_sharing_manager.nearest_available_drivers(ride.start_location, k, MAX_SEARCH_RADIUS_KM)
+            for driver, _ in candidates:
+                if driver.user_id in offered or driver.user_id in self.reserved_drivers:
+                    continue
+                self.reserved_drivers.add(driver.user_id)
+                return driver
+            if len(candidates) < k:
+                return None
+            k *= 2
+
+
+    """
+    Send an offer through the offer handler, treating a missed deadline as a decline
+    Args:
+        driver (Driver): The driver receiving the offer
+        ride (Ride): The ride being offered
+    """
+    async def send_offer(self, driver: Driver, ride: Ride) -> bool:
+        emit(logger, logging.DEBUG, "ride_offered", "Offering ride %s to %s...", ride.ride_id, driver.user_name,
+             ride_id=ride.ride_id, driver_id=driver.user_id)
+        try:
+            return bool(await asyncio.wait_for(self.offer_handler(driver, ride), self.offer_timeout_seconds))
+        except asyncio.TimeoutError:
+            emit(logger, logging.INFO, "offer_timed_out", "Offer to %s timed out.", driver.user_name,
+                 ride_id=ride.ride_id, driver_id=driver.user_id, timeout_seconds=self.offer_timeout_seconds)
+            return False
+        finally:
+            self.pending_offers.pop(driver.user_id, None)
+
+
+    """
+    Default offer handler: park the offer until the driver answers through respond_to_offer
+    Args:
+        driver (Driver): The driver receiving the offer
+        ride (Ride): The ride being offered
+    """
+    async def await_driver_response(self, driver: Driver, ride: Ride) -> bool:
+        response = asyncio.get_running_loop().create_future()
+        self.pending_offers[driver.user_id] = (ride.ride_id, response)
+        return await response
+
+
+    """
+    Driver answers the offer currently parked for them
+    Args:
+        driver (Driver): The driver answering
+        accepted (bool): True to accept the ride, False to decline
+    Returns:
+        bool: False if the driver had no outstanding offer, e.g. because it already timed out.
+    """
+    def respond_to_offer(self, driver: Driver, accepted: bool) -> bool:
+        pending = self.pending_offers.get(driver.user_id)
+        if pending is None or pending[1].done():
+            return False
+        pending[1].set_result(accepted)
+        return True
@@ -0,0 +1,246 @@
+from __future__ import annotations
+import logging
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.location.location import Location
+from src.core.distance import PreparedCoordinates, haversine_pairwise
+from src.core.events import emit, get_event_logger
+from src.core.assignment import INFEASIBLE, greedy_assignment, hungarian_assignment
+from src.usecases.ride_system import KM_PER_DEGREE, MAX_SEARCH_RADIUS_KM, RideSystem
+
+DEFAULT_WINDOW_SECONDS = 2.0
+DEFAULT_MAX_WAIT_SECONDS = 10.0
+CANDIDATES_PER_RIDE = 5
+HUNGARIAN_MAX_SIZE = 300
+# Smallest candidate cell; keeps the cell grid small when drivers are packed together
+MIN_CELL_KM = 0.05
+# Allowance for the flat-map approximation when deciding a ride's candidate block is complete
+PLANAR_ERROR = 1e-3
+
+logger = get_event_logger("batch")
+
+class BatchDispatcher:
+    """
+    Collects REQUESTED rides over a time window and matches the whole batch at once,
+    minimizing total pickup distance instead of handing each rider the nearest driver in arrival order.
+    Args:
+        ride_system (RideSystem): The system whose manager and lifecycle methods are used.
+        window_seconds (float): How long requests are collected before a batch is dispatched.
+        max_wait_seconds (float): Rides left unmatched for longer than this are cancelled.
+        candidates_per_ride (int): How many nearest drivers each ride contributes to the batch.
+        max_radius_km (float): Pickups farther than this are not allowed.
+        hungarian_max_size (int): Batches where both rides and candidate drivers exceed this fall back to greedy assignment.
+        clock (Callable[[], float]): Time source, replaceable for simulations.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        max_wait_seconds: float = DEFAULT_MAX_WAIT_SECONDS,
+        candidates_per_ride: int = CANDIDATES_PER_RIDE,
+        max_radius_km: float = MAX_SEARCH_RADIUS_KM,
+        hungarian_max_size: int = HUNGARIAN_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ride_system = ride_system
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.candidates_per_ride = candidates_per_ride
+        self.max_radius_km = max_radius_km
+        self.hungarian_max_size = hungarian_max_size
+        self.clock = clock
+        self.pending: List[Tuple[Ride, float]] = []
+        self.window_started_at: float | None = None
+
+
+    """
+    Create a ride request and queue it for the next batch
+    Args:
+        rider (Rider): The rider requesting the ride
+        destination (Location): The destination of the ride
+    """
+    def submit(self, rider: Rider, destination: Location) -> Ride:
+        ride = self.ride_system.create_ride_request(rider, destination)
+        self.add_pending(ride)
+        return ride
+
+
+    """
+    Queue an existing ride in REQUESTED status for the next batch
+    Args:
+        ride (Ride): The ride waiting for a driver
+    """
+    def add_pending(self, ride: Ride):
+        if ride.ride_status != RideStatus.REQUESTED:
+            raise Exception("Only rides in REQUESTED status can be batched.")
+        now = self.clock()
+        if self.window_started_at is None:
+            self.window_started_at = now
+        self.pending.append((ride, now))
+
+
+    """
+    Dispatch the pending batch if its collection window has elapsed
+    Returns:
+        List[Ride]: The rides that were matched, empty if the window is still open.
+    """
+    def tick(self) -> List[Ride]:
+        if self.window_started_at is None or self.clock() - self.window_started_at < self.window_seconds:
+            return []
+        return self.dispatch()
+
+
+    """
+    Match every pending ride against nearby available drivers with one global min-cost assignment
+    Returns:
+        List[Ride]: The rides that were matched.
+    """
+    def dispatch(self) -> List[Ride]:
+        batch = [(ride, submitted_at) for ride, submitted_at in self.pending if ride.ride_status == RideStatus.REQUESTED]
+        self.pending = []
+        self.window_started_at = None
+        if not batch:
+            return []
+        started_at = time.perf_counter()
+
+        # Each round solves the rides still unmatched against drivers still free; rides whose
+        # candidates were all taken by better matches get a fresh candidate list next round
+        matched_rides = []
+        matched_rows = set()
+        unmatched_rows = list(range(len(batch)))
+        while unmatched_rows:
+            drivers, cost = self.build_cost_matrix([batch[row][0] for row in unmatched_rows])
+            if not drivers:
+                break
+            if min(len(unmatched_rows), len(drivers)) <= self.hungarian_max_size:
+                pairs = hungarian_assignment(cost)
+            else:
+                pairs = greedy_assignment(cost)
+            if not pairs:
+                break
+            for position, column in pairs:
+                row = unmatched_rows[position]
+                ride, driver = batch[row][0], drivers[column]
+                # A driver taken by another thread since the search leaves the ride for the next round
+                if not driver.try_accept_ride(ride):
+                    continue
+                ride.assign_driver(driver)
+                matched_rides.append(ride)
+                matched_rows.add(row)
+            unmatched_rows = [row for row in unmatched_rows if row not in matched_rows]
+
+        # Unmatched rides wait for the next batch, keeping their submission time, until they run out of patience
+        now = self.clock()
+        for row, (ride, submitted_at) in enumerate(batch):
+            if row in matched_rows:
+                continue
+            if now - submitted_at >= self.max_wait_seconds:
+                emit(logger, logging.INFO, "ride_expired", "No driver matched ride %s within %ss. The ride will be cancelled.", ride.ride_id, self.max_wait_seconds,
+                     ride_id=ride.ride_id, waited_seconds=now - submitted_at)
+                self.ride_system.cancel_ride(ride)
+            else:
+                self.pending.append((ride, submitted_at))
+        if self.pending:
+            self.window_started_at = now
+        emit(logger, logging.INFO, "batch_dispatched", "Matched %d of %d batched rides.", len(matched_rides), len(batch),
+             batch_size=len(batch), matched=len(matched_rides), requeued=len(self.pending),
+             duration_ms=(time.perf_counter() - started_at) * 1000)
+        return matched_rides
+
+
+    """
+    Build the ride x driver pickup distance matrix from each ride's nearest available drivers.
+    The candidates of the whole batch come from one vectorized query over the driver store instead of one
+    spatial index search per ride: drivers are bucketed into cells holding about candidates_per_ride drivers
+    each, every pickup is measured against the drivers of its 3 x 3 block of cells, and the nearest are kept.
+    A ride whose nearest drivers could lie outside its block falls back to a spatial index search.
+    Pairs that were not kept are infeasible, which keeps the matrix sparse.
+    Args:
+        rides (List[Ride]): The rides in the batch
+    Returns:
+        Tuple[List[Driver], np.ndarray]: The candidate drivers (matrix columns) and the cost matrix.
+    """
+    def build_cost_matrix(self, rides: List[Ride]) -> Tuple[List[Driver], np.ndarray]:
+        manager = self.ride_system.ride_sharing_manager
+        store = manager.driver_store
+        slots, latitudes, longitudes = store.available_coordinates()
+        if not len(slots):
+            return [], np.full((len(rides), 0), INFEASIBLE)
+        pickup_latitudes = np.array([ride.start_location.latitude for ride in rides])
+        pickup_longitudes = np.array([ride.start_location.longitude for ride in rides])
+        k = min(self.candidates_per_ride, len(slots))
+
+        # Planar kilometres with longitude scaled at the highest latitude, so planar gaps never exceed real ones
+        km_per_longitude = KM_PER_DEGREE * np.cos(np.radians(max(np.abs(latitudes).max(), np.abs(pickup_latitudes).max())))
+        west, south = min(longitudes.min(), pickup_longitudes.min()), min(latitudes.min(), pickup_latitudes.min())
+        driver_x, driver_y = (longitudes - west) * km_per_longitude, (latitudes - south) * KM_PER_DEGREE
+        pickup_x, pickup_y = (pickup_longitudes - west) * km_per_longitude, (pickup_latitudes - south) * KM_PER_DEGREE
+        width, height = max(driver_x.max(), pickup_x.max()), max(driver_y.max(), pickup_y.max())
+        # Past the search radius a 3 x 3 block always covers every driver in range, so cells never need to be larger
+        cell_km = min(max(np.sqrt(width * height * k / len(slots)), MIN_CELL_KM), self.max_radius_km / (1 - PLANAR_ERROR))
+
+        # Cell keys are row * row_length + column, with a free column on each side so neighbours never wrap rows
+        row_length = int(width // cell_km) + 3
+        driver_cells = (driver_y // cell_km).astype(np.int64) * row_length + (driver_x // cell_km).astype(np.int64) + 1
+        order = np.argsort(driver_cells, kind="stable")
+        sorted_cells = driver_cells[order]
+        pickup_rows = (pickup_y // cell_km).astype(np.int64)
+        pickup_columns = (pickup_x // cell_km).astype(np.int64) + 1
+        # Each pickup reads three runs of consecutive cells, one per row of its block
+        run_firsts = (pickup_rows[:, np.newaxis] + np.arange(-1, 2)) * row_length + pickup_columns[:, np.newaxis] - 1
+        run_starts = np.searchsorted(sorted_cells, run_firsts).ravel()
+        run_counts = np.searchsorted(sorted_cells, run_firsts + 3).ravel() - run_starts
+        pair_rows = np.repeat(np.arange(len(rides)).repeat(3), run_counts)
+        offsets = np.arange(run_counts.sum()) - np.repeat(np.cumsum(run_counts) - run_counts, run_counts)
+        pair_drivers = order[np.repeat(run_starts, run_counts) + offsets]
+        distances = haversine_pairwise(
+            PreparedCoordinates(pickup_latitudes[pair_rows], pickup_longitudes[pair_rows]),
+            PreparedCoordinates(latitudes[pair_drivers], longitudes[pair_drivers])
+        )
+
+        # Rank each ride's pairs by distance and keep its k nearest within range
+        ranked = np.lexsort((distances, pair_rows))
+        pair_rows, pair_drivers, distances = pair_rows[ranked], pair_drivers[ranked], distances[ranked]
+        row_counts = np.bincount(pair_rows, minlength=len(rides))
+        ranks = np.arange(len(pair_rows)) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+        kth_distance = np.full(len(rides), np.inf)
+        kth_distance[pair_rows[ranks == k - 1]] = distances[ranks == k - 1]
+        # The block holds the exact answer when every driver outside it is farther than the k-th kept one, or than the radius
+        margin = np.minimum.reduce([
+            pickup_x - (pickup_columns - 2) * cell_km, (pickup_columns + 1) * cell_km - pickup_x,
+            pickup_y - (pickup_rows - 1) * cell_km, (pickup_rows + 2) * cell_km - pickup_y
+        ])
+        inexact = np.minimum(kth_distance, self.max_radius_km) > margin * (1 - PLANAR_ERROR)
+        keep = (ranks < k) & (distances <= self.max_radius_km) & ~inexact[pair_rows]
+        entries: List[Tuple[int, Driver | None, float]] = [
+            (row, manager.get_driver(store.driver_ids[slot]), distance)
+            for row, slot, distance in zip(pair_rows[keep].tolist(), slots[pair_drivers[keep]].tolist(), distances[keep].tolist())
+        ]
+        for row in np.flatnonzero(inexact).tolist():
+            entries.extend(
+                (row, driver, distance)
+                for driver, distance in manager.nearest_available_drivers(rides[row].start_location, self.candidates_per_ride, self.max_radius_km)
+            )
+
+        columns: Dict[str, int] = {}
+        drivers: List[Driver] = []
+        cells: List[Tuple[int, int, float]] = []
+        for row, driver, distance in entries:
+            # A driver unregistered since the store was read is skipped
+            if driver is None:
+                continue
+            column = columns.get(driver.user_id)
+            if column is None:
+                column = columns[driver.user_id] = len(drivers)
+                drivers.append(driver)
+            cells.append((row, column, distance))
+        cost = np.full((len(rides), len(drivers)), INFEASIBLE)
+        for row, column, distance in cells:
+            cost[row, column] = distance
+        return drivers, cost
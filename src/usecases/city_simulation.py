@@ -0,0 +1,233 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Iterator, Tuple, TYPE_CHECKING
+
+from src.core.event_queue import EventQueue
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.location.location import Location, haversine_km
+from src.usecases.ride_system import RideSystem
+
+if TYPE_CHECKING:
+    from src.usecases.rebalancer import Rebalancer
+
+DEFAULT_SPEED_KMH = 30.0
+DEFAULT_STEP_SECONDS = 30.0
+DEFAULT_PATIENCE_SECONDS = 600.0
+
+RideRequestEvent = Tuple[float, Rider, Location]
+
+
+class Leg:
+    """
+    A driver travelling in a straight line between two points at constant speed.
+    A driver has at most one leg; steps of a leg that was replaced or stopped are ignored.
+    """
+    __slots__ = ("driver", "ride", "origin_latitude", "origin_longitude", "target", "departed_at", "arrives_at", "on_arrival")
+
+    def __init__(self, driver: Driver, ride: Ride, origin_latitude: float, origin_longitude: float, target: Location, departed_at: float,
+                 arrives_at: float, on_arrival: Callable[[Ride], None]):
+        self.driver = driver
+        self.ride = ride
+        self.origin_latitude = origin_latitude
+        self.origin_longitude = origin_longitude
+        self.target = target
+        self.departed_at = departed_at
+        self.arrives_at = arrives_at
+        self.on_arrival = on_arrival
+
+    # Position along the straight line at a simulated time
+    def position_at(self, time: float) -> Tuple[float, float]:
+        duration = self.arrives_at - self.departed_at
+        fraction = 1.0 if duration <= 0 else min(max((time - self.departed_at) / duration, 0.0), 1.0)
+        return (
+            self.origin_latitude + (self.target.latitude - self.origin_latitude) * fraction,
+            self.origin_longitude + (self.target.longitude - self.origin_longitude) * fraction
+        )
+
+
+class SimulationStats:
+    __slots__ = ("requests", "rejected", "matched", "unmatched", "pickups", "completed", "cancelled", "moves", "total_wait_seconds",
+                 "total_pickup_km", "repositioned")
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class CitySimulation:
+    """
+    Discrete-event simulation of a city driving RideSystem through the full ride lifecycle.
+    Ride requests, driver movement steps, pickups, drop-offs and rider cancellations are events on
+    one heap, and simulated time jumps from event to event without any wall-clock sleeping.
+    Matched drivers drive straight to the pickup and then to the destination, sending a location
+    update every step so the spatial index follows them. Idle drivers stay where they are unless a
+    rebalancer is enabled, which sends them towards forecast demand; they stay available on the way.
+    Args:
+        ride_system (RideSystem): The system under simulation, with drivers already registered.
+        speed_kmh (float): The driving speed of every driver.
+        step_seconds (float): Simulated seconds between location updates of a moving driver.
+        rider_patience_seconds (float): Riders cancel if their driver has not arrived within this time.
+        start_time (float): The simulated time of the first event, in seconds.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        speed_kmh: float = DEFAULT_SPEED_KMH,
+        step_seconds: float = DEFAULT_STEP_SECONDS,
+        rider_patience_seconds: float = DEFAULT_PATIENCE_SECONDS,
+        start_time: float = 0.0
+    ):
+        self.ride_system = ride_system
+        self.seconds_per_km = 3600.0 / speed_kmh
+        self.step_seconds = step_seconds
+        self.rider_patience_seconds = rider_patience_seconds
+        self.queue = EventQueue(start_time)
+        self.legs: Dict[str, Leg] = {}
+        self.requested_at: Dict[str, float] = {}
+        self.stats = SimulationStats()
+
+    @property
+    def now(self) -> float:
+        return self.queue.now
+
+
+    """
+    This function feeds a time-ordered stream of ride requests into the simulation.
+    The stream is consumed lazily, one request ahead, so a day of demand never sits in memory.
+    Args:
+        requests (Iterable[RideRequestEvent]): (time, rider, destination) tuples in non-decreasing time order.
+    """
+    def add_requests(self, requests: Iterable[RideRequestEvent]):
+        self.schedule_next_request(iter(requests))
+
+    def schedule_next_request(self, requests: Iterator[RideRequestEvent]):
+        request = next(requests, None)
+        if request is not None:
+            time, rider, destination = request
+            self.queue.schedule(time, self.on_request, rider, destination, requests)
+
+
+    """
+    This function schedules a single ride request.
+    Args:
+        time (float): The simulated request time.
+        rider (Rider): The rider requesting.
+        destination (Location): Where the rider wants to go.
+    """
+    def request_at(self, time: float, rider: Rider, destination: Location):
+        self.queue.schedule(time, self.on_request, rider, destination, None)
+
+
+    """
+    This function advances the simulation.
+    Args:
+        until (float): The last simulated time to process; everything queued if omitted.
+    Returns:
+        int: The number of events processed.
+    """
+    def run(self, until: float = float("inf")) -> int:
+        return self.queue.run(until)
+
+    def on_request(self, rider: Rider, destination: Location, requests: Iterator[RideRequestEvent] | None):
+        if requests is not None:
+            self.schedule_next_request(requests)
+        if rider.current_ride is not None:
+            self.stats.rejected += 1
+            return
+        self.stats.requests += 1
+        ride = self.ride_system.request_ride(rider, destination)
+        if ride.driver is None:
+            self.stats.unmatched += 1
+            return
+        self.stats.matched += 1
+        self.stats.total_pickup_km += haversine_km(*ride.driver.current_coordinates, ride.start_location.latitude, ride.start_location.longitude)
+        self.requested_at[ride.ride_id] = self.now
+        self.start_leg(ride.driver, ride, ride.start_location, self.on_pickup)
+        self.queue.schedule(self.now + self.rider_patience_seconds, self.on_patience_expired, ride)
+
+
+    """
+    This function moves idle drivers where a rebalancer suggests, every interval of simulated time,
+    for as long as other events are queued.
+    Args:
+        rebalancer (Rebalancer): Plans the moves; its forecaster should use this simulation's clock.
+        interval_seconds (float): Simulated seconds between plans.
+    """
+    def enable_rebalancing(self, rebalancer: Rebalancer, interval_seconds: float):
+        self.queue.schedule(self.now + interval_seconds, self.on_rebalance, rebalancer, interval_seconds)
+
+    def on_rebalance(self, rebalancer: Rebalancer, interval_seconds: float):
+        for driver, target in rebalancer.plan():
+            leg = self.legs.get(driver.user_id)
+            # Drivers on their way to a pickup keep going
+            if leg is None or leg.ride is None:
+                self.start_leg(driver, None, target, self.on_repositioned)
+                self.stats.repositioned += 1
+        if len(self.queue):
+            self.queue.schedule(self.now + interval_seconds, self.on_rebalance, rebalancer, interval_seconds)
+
+    def on_repositioned(self, ride: None):
+        pass
+
+
+    """
+    This function sends a driver towards a point, scheduling their first movement step.
+    Args:
+        driver (Driver): The driver to move.
+        ride (Ride): The ride the leg serves, or None for a rebalancing move.
+        target (Location): Where the leg ends.
+        on_arrival (Callable[[Ride], None]): Runs when the driver reaches the target.
+    """
+    def start_leg(self, driver: Driver, ride: Ride | None, target: Location, on_arrival: Callable[[Ride], None]):
+        latitude, longitude = driver.current_coordinates
+        arrives_at = self.now + haversine_km(latitude, longitude, target.latitude, target.longitude) * self.seconds_per_km
+        leg = Leg(driver, ride, latitude, longitude, target, self.now, arrives_at, on_arrival)
+        self.legs[driver.user_id] = leg
+        self.queue.schedule(min(self.now + self.step_seconds, arrives_at), self.on_step, leg)
+
+    def on_step(self, leg: Leg):
+        if self.legs.get(leg.driver.user_id) is not leg:
+            return
+        if self.now >= leg.arrives_at:
+            del self.legs[leg.driver.user_id]
+            leg.on_arrival(leg.ride)
+            return
+        leg.driver.update_location(*leg.position_at(self.now))
+        self.stats.moves += 1
+        self.queue.schedule(min(self.now + self.step_seconds, leg.arrives_at), self.on_step, leg)
+
+
+    """
+    This function stops a driver's leg where they are now, leaving them at their interpolated position.
+    Args:
+        driver (Driver): The driver to stop.
+    """
+    def stop_leg(self, driver: Driver):
+        leg = self.legs.pop(driver.user_id, None)
+        if leg is not None:
+            driver.update_location(*leg.position_at(self.now))
+
+    def on_pickup(self, ride: Ride):
+        if ride.ride_status != RideStatus.PICKING_UP:
+            return
+        self.stats.pickups += 1
+        self.stats.total_wait_seconds += self.now - self.requested_at.pop(ride.ride_id)
+        ride.start_ride()
+        self.start_leg(ride.driver, ride, ride.end_location, self.on_dropoff)
+
+    def on_dropoff(self, ride: Ride):
+        self.ride_system.complete_ride(ride)
+        self.stats.completed += 1
+
+    def on_patience_expired(self, ride: Ride):
+        if ride.ride_status != RideStatus.PICKING_UP:
+            return
+        self.requested_at.pop(ride.ride_id, None)
+        self.stop_leg(ride.driver)
+        self.ride_system.cancel_ride(ride)
+        self.stats.cancelled += 1
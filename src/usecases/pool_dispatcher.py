@@ -0,0 +1,300 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+from math import ceil, cos, inf, radians
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
+
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.ride.ride import Ride
+from src.models.ride.stop import Stop
+from src.models.location.location import Location
+from src.core.events import emit, get_event_logger
+from src.core.pool_insertion import best_insertion
+from src.core.spatial_index import GridSpatialIndex
+from src.usecases.ride_system import KM_PER_DEGREE, MAX_SEARCH_RADIUS_KM, RideSystem
+
+DEFAULT_MAX_WAIT_SECONDS = 600.0
+DEFAULT_MAX_DETOUR_RATIO = 1.5
+DEFAULT_SPEED_KMH = 30.0
+# Pooled routes passing this close to a pickup are candidates for it
+DEFAULT_CORRIDOR_RADIUS_KM = 2.0
+IDLE_CANDIDATES = 10
+# Route corridors are indexed as points this share of the corridor radius apart along every leg
+CORRIDOR_STEP_SHARE = 0.5
+
+logger = get_event_logger("pooling")
+
+
+class RouteRows(NamedTuple):
+    # One entry per stop, in route order
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    deadlines: np.ndarray
+    # Riders on board when leaving each stop
+    loads: np.ndarray
+    # Riders on board before the first stop
+    onboard: int
+
+class PoolDispatcher:
+    """
+    Matches requests into shared rides. A request joins the route of a driver already carrying pooled riders
+    when the detour keeps everyone within their limits, or starts a new route with an idle driver, whichever
+    adds the least driving time. Each route is the driver's ordered stop list; the driver stays unavailable
+    for solo dispatch until the last stop is served.
+    Candidates are idle drivers from the available-driver index plus pooled routes found through a spatial
+    index of their corridors, and one vectorized pass scores every insertion into every candidate route.
+    Riders may wait at most max_wait_seconds for pickup and ride at most max_detour_ratio times their
+    direct trip. Travel times are straight-line distance at speed_kmh.
+    Call arrive() when a driver reaches their next stop. Drivers that already have stops, e.g. restored from
+    a snapshot, are picked up as pooled routes when the dispatcher is created.
+    Args:
+        ride_system (RideSystem): The system whose manager and lifecycle methods are used.
+        max_wait_seconds (float): The longest a rider waits for pickup once matched.
+        max_detour_ratio (float): The longest ride allowed, as a multiple of the direct trip.
+        speed_kmh (float): The driving speed used to plan routes.
+        corridor_radius_km (float): How close a pooled route must pass to a pickup to be considered.
+        idle_candidates (int): How many nearest idle drivers are considered.
+        clock (Callable[[], float]): Time source, replaceable for simulations.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        max_wait_seconds: float = DEFAULT_MAX_WAIT_SECONDS,
+        max_detour_ratio: float = DEFAULT_MAX_DETOUR_RATIO,
+        speed_kmh: float = DEFAULT_SPEED_KMH,
+        corridor_radius_km: float = DEFAULT_CORRIDOR_RADIUS_KM,
+        idle_candidates: int = IDLE_CANDIDATES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ride_system = ride_system
+        self.max_wait_seconds = max_wait_seconds
+        self.max_detour_ratio = max_detour_ratio
+        self.speed_kmh = speed_kmh
+        self.corridor_radius_km = corridor_radius_km
+        self.idle_candidates = idle_candidates
+        self.clock = clock
+        # Drivers with stops left, by id
+        self.routes: Dict[str, Driver] = {}
+        self.corridors = GridSpatialIndex(ride_system.operational_area)
+        self.corridor_points: Dict[str, int] = {}
+        # Each pooled route's stops as arrays, rebuilt whenever the route changes
+        self.route_rows: Dict[str, RouteRows] = {}
+        self.lock = threading.Lock()
+        for driver in list(ride_system.ride_sharing_manager.drivers.values()):
+            if driver.stops:
+                self.routes[driver.user_id] = driver
+                self.index_corridor(driver)
+
+
+    """
+    Create a ride request and insert it into the best route, cancelling it if no driver can take it
+    Args:
+        rider (Rider): The rider requesting the ride
+        destination (Location): The destination of the ride
+    """
+    def request_ride(self, rider: Rider, destination: Location) -> Ride:
+        ride = self.ride_system.create_ride_request(rider, destination)
+        with self.lock:
+            matched = self.match(ride)
+        if not matched:
+            self.ride_system.cancel_ride(ride)
+        return ride
+
+
+    """
+    Insert a REQUESTED ride into the route that grows the least. The caller holds the lock.
+    Args:
+        ride (Ride): The ride to match
+    Returns:
+        bool: Whether a driver took the ride.
+    """
+    def match(self, ride: Ride) -> bool:
+        started_at = time.perf_counter()
+        drivers = self.candidates(ride.start_location)
+        now = self.clock()
+        trip_seconds = ride.start_location.calculate_distance_in_km(ride.end_location) / self.speed_kmh * 3600.0
+        insertion = best_insertion(
+            *self.route_arrays(drivers, now), ride.start_location, ride.end_location,
+            self.max_wait_seconds, trip_seconds * self.max_detour_ratio, self.speed_kmh
+        ) if drivers else None
+        driver = drivers[insertion.route] if insertion else None
+        # An idle driver may have been taken by solo dispatch since the search
+        if driver is None or (not driver.stops and not self.ride_system.ride_sharing_manager.compare_and_set_availability(driver, True, False)):
+            emit(logger, logging.INFO, "pool_unmatched", "No route can take ride %s.", ride.ride_id,
+                 ride_id=ride.ride_id, candidates=len(drivers), duration_ms=(time.perf_counter() - started_at) * 1000)
+            return False
+
+        ride.assign_driver(driver)
+        driver.stops.insert(insertion.pickup_after, Stop(ride, True, ride.start_location, now + self.max_wait_seconds))
+        dropoff_deadline = now + insertion.pickup_seconds + trip_seconds * self.max_detour_ratio
+        driver.stops.insert(insertion.dropoff_after + 1, Stop(ride, False, ride.end_location, dropoff_deadline))
+        self.routes[driver.user_id] = driver
+        self.index_corridor(driver)
+        self.record_route(driver)
+        emit(logger, logging.INFO, "ride_pooled", "Driver %s takes ride %s with %d stops planned.", driver.user_name, ride.ride_id, len(driver.stops),
+             ride_id=ride.ride_id, driver_id=driver.user_id, stops=len(driver.stops), candidates=len(drivers),
+             added_seconds=insertion.added_seconds, duration_ms=(time.perf_counter() - started_at) * 1000)
+        return True
+
+
+    """
+    Collect the pooled routes whose corridor passes near a pickup and the nearest idle drivers
+    Args:
+        pickup (Location): The pickup location
+    """
+    def candidates(self, pickup: Location) -> List[Driver]:
+        # Every point of a leg is within half a step of an indexed point
+        lat_radius = self.corridor_radius_km * (1 + CORRIDOR_STEP_SHARE / 2) / KM_PER_DEGREE
+        lon_radius = lat_radius / cos(radians(pickup.latitude))
+        pooled = {
+            driver.user_id: driver for driver in self.corridors.intersect([
+                pickup.longitude - lon_radius, pickup.latitude - lat_radius,
+                pickup.longitude + lon_radius, pickup.latitude + lat_radius
+            ])
+        }
+        idle = self.ride_system.ride_sharing_manager.nearest_available_drivers(pickup, self.idle_candidates, MAX_SEARCH_RADIUS_KM)
+        return list(pooled.values()) + [driver for driver, _ in idle if driver.user_id not in pooled]
+
+
+    """
+    Lay the candidate routes out as padded arrays for best_insertion, gathering every route's cached stop
+    rows at once
+    Args:
+        drivers (List[Driver]): The candidates
+        now (float): The current time on the dispatcher's clock
+    """
+    def route_arrays(self, drivers: List[Driver], now: float):
+        stop_counts = np.fromiter((len(driver.stops) for driver in drivers), dtype=np.int64, count=len(drivers))
+        capacities = np.fromiter((driver.capacity for driver in drivers), dtype=np.int64, count=len(drivers))
+        width = 1 + int(stop_counts.max())
+        # Each driver's segment of the flat arrays is their position followed by their stops
+        starts = np.cumsum(stop_counts + 1) - (stop_counts + 1)
+        is_stop = np.ones(int(stop_counts.sum()) + len(drivers), dtype=bool)
+        is_stop[starts] = False
+        rows = [self.route_rows[driver.user_id] for driver in drivers if driver.stops]
+        driver_latitudes, driver_longitudes = self.ride_system.ride_sharing_manager.driver_store.coordinates([driver.slot for driver in drivers])
+        onboard = np.fromiter((self.route_rows[driver.user_id].onboard if driver.stops else 0 for driver in drivers), dtype=float, count=len(drivers))
+        flat = []
+        for field, driver_column in enumerate((driver_latitudes, driver_longitudes, np.full(len(drivers), inf), onboard)):
+            values = np.empty(len(is_stop))
+            values[starts] = driver_column
+            if rows:
+                values[is_stop] = np.concatenate([row[field] for row in rows])
+            flat.append(values)
+
+        columns = np.arange(width)[np.newaxis, :]
+        padding = columns > stop_counts[:, np.newaxis]
+        gather = starts[:, np.newaxis] + np.minimum(columns, stop_counts[:, np.newaxis])
+        latitudes, longitudes, deadlines, loads = (values[gather] for values in flat)
+        deadlines -= now
+        deadlines[padding] = inf
+        loads[padding] = 0
+        return latitudes, longitudes, stop_counts, deadlines, loads, capacities
+
+
+    """
+    Index points along a driver's planned route, from their position through every stop, and cache its
+    stop rows for route_arrays
+    Args:
+        driver (Driver): The driver whose route changed
+    """
+    def index_corridor(self, driver: Driver):
+        self.remove_corridor(driver)
+        waypoints = [driver.current_location] + [stop.location for stop in driver.stops]
+        points = [(waypoints[0].latitude, waypoints[0].longitude)]
+        for start, end in zip(waypoints, waypoints[1:]):
+            steps = max(ceil(start.calculate_distance_in_km(end) / (self.corridor_radius_km * CORRIDOR_STEP_SHARE)), 1)
+            for step in range(1, steps + 1):
+                share = step / steps
+                points.append((start.latitude + (end.latitude - start.latitude) * share, start.longitude + (end.longitude - start.longitude) * share))
+        for point, (latitude, longitude) in enumerate(points):
+            self.corridors.insert((driver.user_id, point), driver, longitude, latitude)
+        self.corridor_points[driver.user_id] = len(points)
+
+        stops = driver.stops
+        # Riders whose pickup is no longer on the route are on board
+        onboard = sum(-1 if stop.is_pickup else 1 for stop in stops)
+        self.route_rows[driver.user_id] = RouteRows(
+            np.fromiter((stop.location.latitude for stop in stops), dtype=float, count=len(stops)),
+            np.fromiter((stop.location.longitude for stop in stops), dtype=float, count=len(stops)),
+            np.fromiter((stop.deadline for stop in stops), dtype=float, count=len(stops)),
+            onboard + np.cumsum([1 if stop.is_pickup else -1 for stop in stops]),
+            onboard
+        )
+
+
+    """
+    Take a driver's route out of the corridor index
+    Args:
+        driver (Driver): The driver
+    """
+    def remove_corridor(self, driver: Driver):
+        self.route_rows.pop(driver.user_id, None)
+        for point in range(self.corridor_points.pop(driver.user_id, 0)):
+            self.corridors.remove((driver.user_id, point))
+
+
+    """
+    Serve a driver's next stop: pick the rider up or complete their ride. The driver becomes
+    available again after their last stop
+    Args:
+        driver (Driver): The driver who reached their next stop
+    Returns:
+        Stop: The stop served.
+    """
+    def arrive(self, driver: Driver) -> Stop:
+        with self.lock:
+            if not driver.stops:
+                raise Exception("Driver has no pooled stops.")
+            stop = driver.stops.pop(0)
+            if stop.is_pickup:
+                stop.ride.start_ride()
+            else:
+                self.ride_system.complete_ride(stop.ride)
+            self.route_changed(driver)
+        return stop
+
+
+    """
+    Cancel a pooled ride before pickup and take its stops off the driver's route
+    Args:
+        ride (Ride): The ride to cancel
+    """
+    def cancel_ride(self, ride: Ride):
+        with self.lock:
+            self.ride_system.cancel_ride(ride)
+            driver = ride.driver
+            if driver is not None and driver.user_id in self.routes:
+                driver.stops = [stop for stop in driver.stops if stop.ride is not ride]
+                self.route_changed(driver)
+
+
+    """
+    Re-index a driver's corridor after their stops changed, releasing them once none are left.
+    The caller holds the lock.
+    Args:
+        driver (Driver): The driver
+    """
+    def route_changed(self, driver: Driver):
+        self.record_route(driver)
+        if driver.stops:
+            self.index_corridor(driver)
+            return
+        self.remove_corridor(driver)
+        del self.routes[driver.user_id]
+        driver.is_available = True
+
+
+    """
+    Journal a driver's capacity and stops, so recovery rebuilds the route. The caller holds the lock.
+    Args:
+        driver (Driver): The driver whose route changed
+    """
+    def record_route(self, driver: Driver):
+        journal = self.ride_system.ride_sharing_manager.journal
+        if journal:
+            journal.record("driver_route", driver.user_id, driver.capacity,
+                           [[stop.ride.ride_id, stop.is_pickup, stop.deadline] for stop in driver.stops])
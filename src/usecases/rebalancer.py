@@ -0,0 +1,130 @@
+from __future__ import annotations
+import logging
+import threading
+from typing import Callable, List, Tuple
+import numpy as np
+
+from src.core.assignment import INFEASIBLE, hungarian_assignment
+from src.core.demand_forecast import DemandForecaster
+from src.core.distance import PreparedCoordinates, haversine_many_to_many
+from src.core.events import emit, get_event_logger
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.usecases.ride_system import RideSystem
+
+DEFAULT_MAX_MOVES = 100
+DEFAULT_MAX_DISTANCE_KM = 5.0
+# At most this many idle drivers per move are priced in the assignment, nearest to a short zone first
+CANDIDATES_PER_MOVE = 4
+
+Suggestion = Tuple[Driver, Location]
+
+logger = get_event_logger("rebalancer")
+
+
+class Rebalancer:
+    """
+    Suggests where idle drivers should wait so supply follows forecast demand.
+    Each plan spreads the idle fleet over the zones in proportion to the demand forecast, then moves
+    drivers from zones with more than their share to zones with less, solving which driver goes to which
+    zone as one min-distance assignment instead of sending every driver to their nearest gap.
+    Plans read driver positions from the driver store columns, so a plan costs O(idle drivers) NumPy work
+    plus an assignment of at most max_moves zones.
+    Args:
+        ride_system (RideSystem): The system whose idle drivers are moved.
+        forecaster (DemandForecaster): The demand forecast; it is attached to the ride system so it sees every request.
+        max_moves (int): The most drivers moved per plan.
+        max_distance_km (float): Drivers are never sent farther than this.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        forecaster: DemandForecaster,
+        max_moves: int = DEFAULT_MAX_MOVES,
+        max_distance_km: float = DEFAULT_MAX_DISTANCE_KM
+    ):
+        self.ride_system = ride_system
+        self.forecaster = forecaster
+        self.max_moves = max_moves
+        self.max_distance_km = max_distance_km
+        self.zone_latitudes, self.zone_longitudes = forecaster.zones.centers()
+        self.stopped = threading.Event()
+        self.worker: threading.Thread | None = None
+        ride_system.attach_demand_forecaster(forecaster)
+
+
+    """
+    This function plans where idle drivers should move.
+    Returns:
+        List[Suggestion]: (driver, zone center) pairs; drivers already in a zone that needs them are left alone.
+    """
+    def plan(self) -> List[Suggestion]:
+        forecast = self.forecaster.forecast()
+        total_demand = forecast.sum()
+        manager = self.ride_system.ride_sharing_manager
+        store = manager.driver_store
+        slots, latitudes, longitudes = store.available_coordinates()
+        if total_demand <= 0 or not slots.size:
+            return []
+        zones = self.forecaster.zones.zones_of(latitudes, longitudes)
+        supply = np.bincount(zones, minlength=len(forecast))
+        share = forecast * (slots.size / total_demand)
+
+        # Each missing driver is one target; the zones missing the most are served first
+        shortfall = np.floor(share - supply).astype(np.int64)
+        short_zones = np.flatnonzero(shortfall > 0)
+        short_zones = short_zones[np.argsort(-shortfall[short_zones], kind="stable")]
+        targets = np.repeat(short_zones, shortfall[short_zones])[:self.max_moves]
+        # Only drivers beyond their zone's share may leave it
+        excess = np.floor(supply - share).astype(np.int64)
+        order = np.argsort(zones, kind="stable")
+        rank = np.arange(slots.size) - np.searchsorted(zones[order], zones[order])
+        movable = order[rank < np.maximum(excess[zones[order]], 0)]
+        if not targets.size or not movable.size:
+            return []
+
+        distances = haversine_many_to_many(
+            PreparedCoordinates(self.zone_latitudes[targets], self.zone_longitudes[targets]),
+            PreparedCoordinates(latitudes[movable], longitudes[movable])
+        )
+        if movable.size > CANDIDATES_PER_MOVE * targets.size:
+            nearest = np.argsort(distances.min(axis=0), kind="stable")[:CANDIDATES_PER_MOVE * targets.size]
+            movable, distances = movable[nearest], distances[:, nearest]
+        cost = np.where(distances <= self.max_distance_km, distances, INFEASIBLE)
+
+        suggestions = []
+        for target, candidate in hungarian_assignment(cost):
+            driver = manager.get_driver(store.driver_ids[slots[movable[candidate]]])
+            zone = targets[target]
+            suggestions.append((driver, Location(float(self.zone_latitudes[zone]), float(self.zone_longitudes[zone]))))
+        emit(logger, logging.INFO, "rebalance_planned", "Suggested %d driver moves.", len(suggestions),
+             moves=len(suggestions), idle_drivers=int(slots.size), short_zones=int(short_zones.size))
+        return suggestions
+
+
+    """
+    This function plans on a background thread every interval and hands each plan to a callback,
+    e.g. one that pushes the suggestions to the drivers' apps.
+    Args:
+        interval_seconds (float): Wall-clock seconds between plans.
+        apply (Callable[[List[Suggestion]], None]): Receives every non-empty plan.
+    """
+    def start(self, interval_seconds: float, apply: Callable[[List[Suggestion]], None]):
+        def run():
+            while not self.stopped.wait(interval_seconds):
+                suggestions = self.plan()
+                if suggestions:
+                    apply(suggestions)
+        self.stopped.clear()
+        self.worker = threading.Thread(target=run, name="rebalancer", daemon=True)
+        self.worker.start()
+
+
+    """
+    This function stops the background thread started by start().
+    """
+    def stop(self):
+        self.stopped.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
@@ -1,17 +1,122 @@
 from __future__ import annotations
-from typing import List
+import logging
+import time
+from math import isfinite
+from typing import List, TYPE_CHECKING
 
+from src.core.lazy_import import lazy_module
 from src.models.users.driver import Driver
 from src.models.users.rider import Rider
 from src.models.ride.ride import Ride
 from src.models.location.location import Location
-from src.core.ride_sharing_manager import ride_sharing_manager_object
+from src.core.ride_sharing_manager import RideSharingManager, get_ride_sharing_manager
+from src.core.distance import PreparedCoordinates, haversine_one_to_many
+from src.core.events import emit, get_event_logger
+from src.core.surge_pricing import SurgePricing, fare
+
+np = lazy_module("numpy")
+
+if TYPE_CHECKING:
+    from src.core.demand_forecast import DemandForecaster
+    from src.core.eta import EtaEngine
 
 KM_PER_DEGREE = 111.0
+MAX_SEARCH_RADIUS_KM = 6.0
+MAX_DRIVER_OFFERS = 5
+# With an ETA engine attached, this many nearest drivers by straight line are ranked by travel time
+ETA_CANDIDATES = 50
+
+logger = get_event_logger("dispatch")
 
 class RideSystem:
-    def __init__(self, operational_area: List[float]):
-        ride_sharing_manager_object.initialize_spatial_index(operational_area)
+    def __init__(self, operational_area: List[float], ride_sharing_manager: RideSharingManager | None = None):
+        self.operational_area = operational_area
+        # Without a manager, the process-wide one is built now rather than at import
+        self.ride_sharing_manager = ride_sharing_manager if ride_sharing_manager is not None else get_ride_sharing_manager()
+        self.demand_forecaster: DemandForecaster | None = None
+        self.eta_engine: EtaEngine | None = None
+        # A manager restored from a snapshot already has its drivers indexed
+        if self.ride_sharing_manager.available_index is None:
+            self.ride_sharing_manager.initialize_spatial_index(operational_area)
+    
+    
+    """
+    Start surge pricing over a grid of zones across the operational area
+    Args:
+        pricing_kwargs: Passed to SurgePricing, e.g. zone_size_km, window_seconds or clock
+    """
+    def enable_surge_pricing(self, **pricing_kwargs) -> SurgePricing:
+        pricing = SurgePricing(self.operational_area, **pricing_kwargs)
+        self.ride_sharing_manager.attach_pricing(pricing)
+        return pricing
+    
+    
+    """
+    Record every ride request in a demand forecaster, e.g. one a Rebalancer plans from
+    Args:
+        forecaster (DemandForecaster): The forecaster to feed, or None to stop
+    """
+    def attach_demand_forecaster(self, forecaster: DemandForecaster | None):
+        self.demand_forecaster = forecaster
+    
+    
+    """
+    Rank drivers by travel time to the pickup and measure trips along the roads instead of in a straight line,
+    e.g. with a RoadNetworkEta. Straight-line distance still picks the candidates the engine ranks
+    Args:
+        engine (EtaEngine): The engine to use, or None to go back to straight-line distance
+    """
+    def attach_eta(self, engine: EtaEngine | None):
+        self.eta_engine = engine
+    
+    
+    """
+    Measure a trip, along the roads when an ETA engine is attached and in a straight line otherwise
+    or when no road connects the two points
+    Args:
+        start (Location): The start of the trip
+        end (Location): The end of the trip
+    """
+    def trip_distance_km(self, start: Location, end: Location) -> float:
+        if self.eta_engine:
+            km = self.eta_engine.route(start, end).km
+            if isfinite(km):
+                return km
+        return start.calculate_distance_in_km(end)
+    
+    
+    """
+    Order drivers by their ETA to a pickup, dropping those that cannot reach it
+    Args:
+        pickup (Location): The pickup location
+        drivers (List[Driver]): The candidate drivers
+        nearest (int | None): Only this many quickest drivers are needed, which lets the engine stop early
+    """
+    def rank_by_eta(self, pickup: Location, drivers: List[Driver], nearest: int | None = None) -> List[Driver]:
+        if not drivers:
+            return []
+        metrics = self.ride_sharing_manager.dispatch_metrics
+        started_at = time.perf_counter() if metrics.enabled else 0.0
+        latitudes, longitudes = self.ride_sharing_manager.driver_store.coordinates([driver.slot for driver in drivers])
+        etas = self.eta_engine.pickup_etas(pickup.latitude, pickup.longitude, latitudes, longitudes, nearest)
+        order = etas.argsort(kind="stable")
+        ranked = [drivers[i] for i in order[np.isfinite(etas[order])]]
+        if metrics.enabled:
+            metrics.observe_since("eta_ranking", started_at)
+        return ranked[:nearest] if nearest else ranked
+    
+    
+    """
+    Quote the fare of a trip at the current surge, 1x when surge pricing is off
+    Args:
+        rider (Rider): The rider asking for a quote, priced from their current location
+        destination (Location): The destination of the trip
+    """
+    def quote_fare(self, rider: Rider, destination: Location) -> float:
+        pickup = rider.current_location
+        distance = self.trip_distance_km(pickup, destination)
+        pricing = self.ride_sharing_manager.pricing
+        return fare(distance, pricing.multiplier(pickup.latitude, pickup.longitude) if pricing else 1.0)
     
     
     """ 
@@ -21,21 +126,44 @@ class RideSystem:
         destination (Location): The destination of the ride
     """
     def request_ride(self, rider: Rider, destination: Location) -> Ride:
+        metrics = self.ride_sharing_manager.dispatch_metrics
+        started_at = time.perf_counter() if metrics.enabled else 0.0
+        new_ride = self.create_ride_request(rider, destination)
+        self.process_ride_request(new_ride)
+        if metrics.enabled:
+            metrics.observe_since("request_ride", started_at)
+            metrics.increment("rides_matched" if new_ride.driver else "rides_unmatched")
+        return new_ride
+    
+    
+    """ 
+    Create a ride in REQUESTED status without matching a driver yet
+    Args:
+        rider (Rider): The rider requesting the ride
+        destination (Location): The destination of the ride
+    """
+    def create_ride_request(self, rider: Rider, destination: Location) -> Ride:
         if rider.current_ride:
             raise Exception("Rider already has an ongoing ride!")
         
-        distance = rider.current_location.calculate_distance_in_km(destination)
+        distance = self.trip_distance_km(rider.current_location, destination)
         new_ride = Ride(
             rider = rider,
             start_location = rider.current_location,
             end_location = destination,
             distance = distance
         )
-        ride_sharing_manager_object.add_ride(new_ride)
+        self.ride_sharing_manager.add_ride(new_ride)
         new_ride.request_ride()
+        pickup = rider.current_location
+        pricing = self.ride_sharing_manager.pricing
+        if pricing:
+            pricing.record_request(pickup.latitude, pickup.longitude)
+        if self.demand_forecaster:
+            self.demand_forecaster.record_request(pickup.latitude, pickup.longitude)
         rider.current_ride = new_ride
-        print(f"Rider {rider.user_name} has requested a ride from {rider.current_location} to {destination}.")
-        self.process_ride_request(new_ride)
+        emit(logger, logging.INFO, "ride_request_created", "Rider %s has requested a ride from %s to %s.", rider.user_name, rider.current_location, destination,
+             ride_id=new_ride.ride_id, rider_id=rider.user_id, distance_km=distance)
         return new_ride
     
     
@@ -52,9 +180,11 @@ class RideSystem:
         
         if rider:
             rider.current_ride = None
-        if driver:
-            driver.is_available = True
+        # Release the driver only if they are still on this ride; clear the ride before reopening availability
+        if driver and driver.current_ride is ride:
             driver.current_ride = None
+            driver.is_available = True
+        self.ride_sharing_manager.finish_ride(ride)
     
     
     """ 
@@ -66,15 +196,21 @@ class RideSystem:
         ride.complete_ride()
         rider = ride.rider
         driver = ride.driver
+        # With a history store attached, finished rides are queried from it rather than kept on the users
+        keep_history = self.ride_sharing_manager.history is None
         
         if rider:
-            rider.ride_history.append(ride)
+            if keep_history:
+                rider.ride_history.append(ride)
             rider.current_ride = None
         
         if driver:
-            driver.drive_history.append(ride)
-            driver.is_available = True
-            driver.current_ride = None
+            if keep_history:
+                driver.drive_history.append(ride)
+            if driver.current_ride is ride:
+                driver.current_ride = None
+                driver.is_available = True
+        self.ride_sharing_manager.finish_ride(ride)
 
     
     """ 
@@ -83,51 +219,67 @@ class RideSystem:
         ride (Ride): The ride to be processed
     """
     def process_ride_request(self, ride: Ride):
-        print(f"System is processing ride...")
+        emit(logger, logging.DEBUG, "ride_processing", "System is processing ride...", ride_id=ride.ride_id)
+        started_at = time.perf_counter()
         suitable_drivers = self.find_suitable_drivers(ride)
         
         assigned_driver = None
         if not suitable_drivers:
-            print("No drivers found in the operational area.")
+            emit(logger, logging.INFO, "no_drivers_found", "No drivers found in the operational area.", ride_id=ride.ride_id)
         else:
-            for driver in suitable_drivers:
-                print(f"Offering ride to {driver.user_name}...")
-                if True:
+            for offers, driver in enumerate(suitable_drivers, 1):
+                emit(logger, logging.DEBUG, "ride_offered", "Offering ride to %s...", driver.user_name, ride_id=ride.ride_id, driver_id=driver.user_id)
+                # Another request may have taken this driver since the search; move on to the next one
+                if driver.try_accept_ride(ride):
                     assigned_driver = driver
-                    print(f"Driver {driver.user_name} has accepted the ride.")
+                    emit(logger, logging.INFO, "ride_matched", "Driver %s has accepted the ride.", driver.user_name,
+                         ride_id=ride.ride_id, driver_id=driver.user_id, offers=offers,
+                         duration_ms=(time.perf_counter() - started_at) * 1000)
                     break
         
         if assigned_driver:
             ride.assign_driver(assigned_driver)
-            assigned_driver.accept_ride(ride)
         else:
-            print(f"No available drivers accepted the ride. The ride will be cancelled.")
-            ride.cancel_ride()
+            emit(logger, logging.INFO, "ride_unmatched", "No available drivers accepted the ride. The ride will be cancelled.",
+                 ride_id=ride.ride_id, candidates=len(suitable_drivers), duration_ms=(time.perf_counter() - started_at) * 1000)
+            # Cancel through the system so the rider is freed to request again
+            self.cancel_ride(ride)
     
     """
-    Find suitable drivers for a ride within 3km, expanding to 6km if none found
+    Find the nearest available drivers for a ride, nearest first, searching outward up to 6km.
+    With an ETA engine attached, the nearest ETA_CANDIDATES are reordered by travel time to the pickup
     Args:
         ride (Ride): The ride to find drivers for
     """
-    def find_suitable_drivers(self, ride: Ride) -> Driver | None:
-        print("Searching for drivers within 3km...")
-        drivers = self.search_driver_in_radius_km(ride, 3.0)
-        
-        if not drivers:
-            print("No drivers found. Expanding search to 6km...")
-            drivers = self.search_driver_in_radius_km(ride, 6.0)
-        
-        return drivers
+    def find_suitable_drivers(self, ride: Ride) -> List[Driver]:
+        emit(logger, logging.DEBUG, "driver_search", "Searching for the %d nearest drivers within %skm...", MAX_DRIVER_OFFERS, MAX_SEARCH_RADIUS_KM,
+             ride_id=ride.ride_id)
+        metrics = self.ride_sharing_manager.dispatch_metrics
+        started_at = time.perf_counter() if metrics.enabled else 0.0
+        nearest_drivers = self.ride_sharing_manager.nearest_available_drivers(
+            ride.start_location, ETA_CANDIDATES if self.eta_engine else MAX_DRIVER_OFFERS, MAX_SEARCH_RADIUS_KM
+        )
+        if metrics.enabled:
+            metrics.observe_since("driver_search", started_at)
+            metrics.increment("driver_searches")
+            if not nearest_drivers:
+                metrics.increment("driver_searches_empty")
+        if self.eta_engine:
+            return self.rank_by_eta(ride.start_location, [driver for driver, distance in nearest_drivers], MAX_DRIVER_OFFERS)
+        return [driver for driver, distance in nearest_drivers]
 
     
     """
-    Search for available drivers within a specified radius using spatial indexing and Haversine formula
+    Search for available drivers within a specified radius using spatial indexing and Haversine formula.
+    With an ETA engine attached, the nearest ETA_CANDIDATES come first in order of travel time
     Args:
         ride (Ride): Using ride's starting location to find drivers
         radius_km (float): The search radius in kilometers
     """
     def search_driver_in_radius_km(self, ride: Ride, radius_km: float) -> List[Driver]:
         rider_location = ride.start_location
+        metrics = self.ride_sharing_manager.dispatch_metrics
+        started_at = time.perf_counter() if metrics.enabled else 0.0
         
         # Coarse search using bounding box
         degree_radius = radius_km / KM_PER_DEGREE # 360 / 3.14 (pi) = 114.0 degrees per km
@@ -137,22 +289,53 @@ class RideSystem:
             rider_location.longitude + degree_radius,
             rider_location.latitude + degree_radius
         ]
-        candidate_drivers = ride_sharing_manager_object.spatial_index.intersect(bbox=search_bbox)
-
-        # Filter available drivers
-        available_drivers = [d for d in candidate_drivers if d.is_available]
+        # Only the available-driver index is searched, so every candidate can be assigned
+        available_drivers = self.ride_sharing_manager.available_index.intersect(bbox=search_bbox)
+        if metrics.enabled:
+            metrics.observe_since("radius_bbox_query", started_at)
+            metrics.increment("radius_searches")
+            metrics.increment("radius_candidates_examined", len(available_drivers))
         
         if not available_drivers:
-            print(f"No available drivers found in {radius_km} km bounding box.")
+            emit(logger, logging.DEBUG, "radius_search_miss", "No available drivers found in %s km bounding box.", radius_km,
+                 ride_id=ride.ride_id, radius_km=radius_km)
             return []
         
-        # Find the closest driver using Haversine algorithm
-        closest_drivers = []
-        for driver in available_drivers:
-            distance = rider_location.calculate_distance_in_km(driver.current_location)
-            if distance <= radius_km:
-                closest_drivers.append((driver, distance))
+        # Find the closest drivers with one vectorized Haversine pass, reading coordinates straight from the driver store
+        if metrics.enabled:
+            started_at = time.perf_counter()
+        candidates = PreparedCoordinates(*self.ride_sharing_manager.driver_store.coordinates(
+            [driver.slot for driver in available_drivers]
+        ))
+        distances = haversine_one_to_many(rider_location.latitude, rider_location.longitude, candidates)
+        in_radius = (distances <= radius_km).nonzero()[0]
+        if metrics.enabled:
+            metrics.observe_since("radius_haversine", started_at)
+            started_at = time.perf_counter()
+        sorted_in_radius = in_radius[distances[in_radius].argsort(kind="stable")]
+        if metrics.enabled:
+            metrics.observe_since("radius_sort", started_at)
+            metrics.increment("radius_candidates_returned", len(sorted_in_radius))
+        drivers = [available_drivers[i] for i in sorted_in_radius]
+        if self.eta_engine:
+            return self.rank_by_eta(rider_location, drivers[:ETA_CANDIDATES]) + drivers[ETA_CANDIDATES:]
+        return drivers
+
 
-        sorted_closest_drivers = sorted(closest_drivers, key=lambda x: x[1])
-        sorted_drivers = [driver for driver, distance in sorted_closest_drivers]
-        return sorted_drivers
\ No newline at end of file
+"""
+Build a ride system ready to dispatch, e.g. when a dispatcher worker starts. With a snapshot, its drivers,
+riders and rides are restored first, so the worker is warm before its first request instead of
+re-registering everyone; the snapshot module, and NumPy with it, is only imported then
+Args:
+    operational_area (List[float]): The area the system serves [minX, minY, maxX, maxY]
+    snapshot_path (str | None): A file written by save_snapshot
+    spatial_backend (str): The driver index backend without a snapshot, "grid" or "quadtree"
+"""
+def start_ride_system(operational_area: List[float], snapshot_path: str | None = None, spatial_backend: str = "grid") -> RideSystem:
+    if snapshot_path is not None:
+        from src.core.snapshot import load_snapshot
+        return RideSystem(operational_area, load_snapshot(snapshot_path))
+    manager = get_ride_sharing_manager()
+    if manager.available_index is None:
+        manager.initialize_spatial_index(operational_area, spatial_backend)
+    return RideSystem(operational_area, manager)
@@ -0,0 +1,529 @@
+from __future__ import annotations
+import heapq
+import multiprocessing
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from src.core.events import reset_events
+from src.core.id_generator import configure_node
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.shard_grid import ShardGrid
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.users.user import user_id_for
+from src.models.location.location import Location
+from src.usecases.ride_system import MAX_DRIVER_OFFERS, MAX_SEARCH_RADIUS_KM, RideSystem
+
+
+class DriverRecord(NamedTuple):
+    email: str
+    user_name: str
+    longitude: float
+    latitude: float
+
+
+class RideRequest(NamedTuple):
+    rider_email: str
+    rider_name: str
+    pickup_latitude: float
+    pickup_longitude: float
+    destination_latitude: float
+    destination_longitude: float
+
+
+class RideAssignment(NamedTuple):
+    ride_id: str
+    rider_id: str
+    driver_id: str
+    shard_id: int
+    pickup_km: float
+
+
+class ShardService:
+    """
+    One shard of a ShardedRideSystem: a RideSharingManager and RideSystem over the shard's part of
+    the operational area. Every method takes and returns picklable values, drivers included, so the
+    service can run in a worker process behind a pipe.
+    Args:
+        shard_id (int): The shard number in the grid.
+        grid (ShardGrid): The layout shared with the router, used to spot drivers that left the shard.
+    """
+    def __init__(self, shard_id: int, grid: ShardGrid):
+        self.shard_id = shard_id
+        self.grid = grid
+        self.ride_system = RideSystem(grid.bbox_of(shard_id), RideSharingManager())
+        self.manager = self.ride_system.ride_sharing_manager
+
+
+    """
+    This function registers drivers in this shard.
+    Args:
+        records (List[DriverRecord]): The drivers to register, all available.
+    """
+    def register_drivers(self, records: List[DriverRecord]):
+        self.manager.register_drivers(Driver(record.email, record.user_name, record.longitude, record.latitude) for record in records)
+
+
+    """
+    This function applies location pings to drivers of this shard.
+    Args:
+        pings (List[Tuple[str, float, float]]): (driver_id, latitude, longitude) triples.
+    Returns:
+        List[Driver]: Available drivers that moved out of the shard and were handed back to the router.
+    """
+    def update_driver_locations(self, pings: List[Tuple[str, float, float]]) -> List[Driver]:
+        evicted = []
+        for driver_id, latitude, longitude in pings:
+            driver = self.manager.get_driver(driver_id)
+            if driver is None:
+                continue
+            driver.update_location(latitude, longitude)
+            if self.evict_if_outside(driver):
+                evicted.append(driver)
+        return evicted
+
+
+    """
+    This function unregisters an available driver whose position now belongs to another shard.
+    Busy drivers stay until their ride ends, so the ride and its driver always live in the same shard.
+    Args:
+        driver (Driver): The driver to check.
+    Returns:
+        bool: True if the driver was unregistered and should be handed to another shard.
+    """
+    def evict_if_outside(self, driver: Driver) -> bool:
+        latitude, longitude = driver.current_coordinates
+        if not driver.is_available or self.grid.shard_of(longitude, latitude) == self.shard_id:
+            return False
+        return self.manager.unregister_driver(driver)
+
+
+    """
+    This function registers drivers handed over by another shard, keeping their history and settings.
+    Args:
+        drivers (List[Driver]): Unregistered drivers, all available.
+    """
+    def adopt_drivers(self, drivers: List[Driver]):
+        self.manager.register_drivers(drivers)
+
+
+    """
+    This function finds the nearest available drivers of this shard for several points.
+    Args:
+        queries (List[Tuple[float, float, int, float]]): (latitude, longitude, k, max_radius_km) tuples.
+    Returns:
+        List[List[Tuple[str, float]]]: (driver_id, distance_km) pairs per query, nearest first.
+    """
+    def nearest(self, queries: List[Tuple[float, float, int, float]]) -> List[List[Tuple[str, float]]]:
+        return [
+            [(driver.user_id, distance) for driver, distance in self.manager.nearest_available_drivers(Location(latitude, longitude), k, radius_km)]
+            for latitude, longitude, k, radius_km in queries
+        ]
+
+
+    """
+    This function matches requests whose pickup lies in this shard to local drivers.
+    A request is only matched when its nearest local driver is closer than any other shard can be.
+    Args:
+        requests (List[Tuple[RideRequest, float]]): Requests with the pickup's distance to the neighbouring shards.
+    Returns:
+        List[RideAssignment | None]: The assignment per request, None where the router has to ask the neighbours.
+    """
+    def match(self, requests: List[Tuple[RideRequest, float]]) -> List[RideAssignment | None]:
+        assignments = []
+        for request, safe_radius_km in requests:
+            candidates = self.manager.nearest_available_drivers(
+                Location(request.pickup_latitude, request.pickup_longitude), 1, min(safe_radius_km, MAX_SEARCH_RADIUS_KM)
+            )
+            assignments.append(self.assign(request, candidates[0][0], candidates[0][1]) if candidates else None)
+        return assignments
+
+
+    """
+    This function offers requests to specific drivers of this shard, chosen by the router across shards.
+    Args:
+        claims (List[Tuple[RideRequest, str, float]]): (request, driver_id, pickup_km) triples.
+    Returns:
+        List[RideAssignment | None]: The assignment per claim, None if the driver was no longer available.
+    """
+    def claim(self, claims: List[Tuple[RideRequest, str, float]]) -> List[RideAssignment | None]:
+        assignments = []
+        for request, driver_id, pickup_km in claims:
+            driver = self.manager.get_driver(driver_id)
+            if driver is None or not driver.is_available:
+                assignments.append(None)
+            else:
+                assignments.append(self.assign(request, driver, pickup_km))
+        return assignments
+
+
+    """
+    This function creates the ride for a request and assigns it to an available local driver.
+    Args:
+        request (RideRequest): The request being served.
+        driver (Driver): The driver taking the ride.
+        pickup_km (float): The driver's distance to the pickup.
+    """
+    def assign(self, request: RideRequest, driver: Driver, pickup_km: float) -> RideAssignment:
+        rider = self.manager.get_rider(user_id_for(request.rider_email))
+        if rider is None:
+            rider = Rider(request.rider_email, request.rider_name, request.pickup_longitude, request.pickup_latitude)
+            self.manager.register_rider(rider)
+        else:
+            rider.update_location(request.pickup_latitude, request.pickup_longitude)
+        ride = self.ride_system.create_ride_request(rider, Location(request.destination_latitude, request.destination_longitude))
+        driver.accept_ride(ride)
+        ride.assign_driver(driver)
+        return RideAssignment(ride.ride_id, rider.user_id, driver.user_id, self.shard_id, pickup_km)
+
+
+    """
+    This function starts a ride of this shard.
+    Args:
+        ride_id (str): The ID of the ride.
+    """
+    def start_ride(self, ride_id: str):
+        self.manager.get_ride(ride_id).start_ride()
+
+
+    """
+    This function completes a ride of this shard.
+    Args:
+        ride_id (str): The ID of the ride.
+    Returns:
+        List[Driver]: The driver if they ended the ride in another shard.
+    """
+    def complete_ride(self, ride_id: str) -> List[Driver]:
+        ride = self.manager.get_ride(ride_id)
+        self.ride_system.complete_ride(ride)
+        return [ride.driver] if self.evict_if_outside(ride.driver) else []
+
+
+    """
+    This function cancels a ride of this shard.
+    Args:
+        ride_id (str): The ID of the ride.
+    Returns:
+        List[Driver]: The driver if they were released in another shard.
+    """
+    def cancel_ride(self, ride_id: str) -> List[Driver]:
+        ride = self.manager.get_ride(ride_id)
+        self.ride_system.cancel_ride(ride)
+        return [ride.driver] if ride.driver and self.evict_if_outside(ride.driver) else []
+
+
+"""
+Entry point of a shard worker process: serves ShardService calls received over a pipe until told to close.
+Args:
+    shard_id (int): The shard number, also used as the id generator node so ride ids stay unique across shards.
+    grid (ShardGrid): The shard layout.
+    connection: The worker end of the pipe.
+"""
+def run_shard_worker(shard_id: int, grid: ShardGrid, connection):
+    configure_node(shard_id)
+    # Handlers inherited from a forked router would interleave on its console; workers start with events off
+    reset_events()
+    service = ShardService(shard_id, grid)
+    while True:
+        method, args = connection.recv()
+        if method == "close":
+            break
+        try:
+            connection.send(("ok", getattr(service, method)(*args)))
+        except Exception as error:
+            connection.send(("error", error))
+    connection.close()
+
+
+class ProcessShard:
+    """
+    Router-side handle of a shard running in its own worker process.
+    Calls are split into send and receive so the router can have every shard working at once.
+    """
+    def __init__(self, context, shard_id: int, grid: ShardGrid):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=run_shard_worker, args=(shard_id, grid, worker_connection), daemon=True)
+        self.process.start()
+        worker_connection.close()
+
+    def send(self, method: str, *args):
+        self.connection.send((method, args))
+
+    def receive(self) -> Tuple[str, Any]:
+        return self.connection.recv()
+
+    def close(self):
+        self.connection.send(("close", ()))
+        self.process.join()
+        self.connection.close()
+
+
+class LocalShard:
+    """
+    Router-side handle of a shard served in the router's own process, for tests and small deployments.
+    """
+    def __init__(self, shard_id: int, grid: ShardGrid):
+        self.service = ShardService(shard_id, grid)
+        self.reply: Tuple[str, Any] | None = None
+
+    def send(self, method: str, *args):
+        try:
+            self.reply = ("ok", getattr(self.service, method)(*args))
+        except Exception as error:
+            self.reply = ("error", error)
+
+    def receive(self) -> Tuple[str, Any]:
+        reply, self.reply = self.reply, None
+        return reply
+
+    def close(self):
+        pass
+
+
+class ShardedRideSystem:
+    """
+    Router over a grid of shards, each owning the drivers, riders and rides of its part of the operational area.
+    Requests and pings are batched per shard and every shard works on its batch in parallel.
+    A pickup is matched inside its own shard when the nearest local driver is closer than the shard border;
+    otherwise the radius query fans out to the neighbouring shards and the merged candidates are offered in order.
+    Args:
+        operational_area (List[float]): The bounding box [minX, minY, maxX, maxY].
+        rows (int): The number of shard rows.
+        columns (int): The number of shard columns.
+        use_processes (bool): Run every shard in its own worker process; False serves them in-process.
+        start_method (str): The multiprocessing start method, the platform default if None.
+    """
+    def __init__(
+        self,
+        operational_area: List[float],
+        rows: int = 2,
+        columns: int = 2,
+        use_processes: bool = True,
+        start_method: str | None = None
+    ):
+        self.grid = ShardGrid(operational_area, rows, columns)
+        if use_processes:
+            context = multiprocessing.get_context(start_method)
+            self.shards = [ProcessShard(context, shard_id, self.grid) for shard_id in range(len(self.grid))]
+        else:
+            self.shards = [LocalShard(shard_id, self.grid) for shard_id in range(len(self.grid))]
+        self.driver_shards: Dict[str, int] = {}
+        self.ride_shards: Dict[str, int] = {}
+        self.active_rides: Dict[str, str] = {}
+        self.ride_riders: Dict[str, str] = {}
+
+    def __enter__(self) -> "ShardedRideSystem":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+
+    """
+    This function sends one call to each of several shards and waits for all replies.
+    Every reply is read before an error is raised, so the pipes stay in step.
+    Args:
+        calls (Dict[int, Tuple[str, tuple]]): shard_id -> (method, args).
+    Returns:
+        Dict[int, Any]: shard_id -> the call's return value.
+    """
+    def call_shards(self, calls: Dict[int, Tuple[str, tuple]]) -> Dict[int, Any]:
+        for shard_id, (method, args) in calls.items():
+            self.shards[shard_id].send(method, *args)
+        replies = {shard_id: self.shards[shard_id].receive() for shard_id in calls}
+        for status, value in replies.values():
+            if status == "error":
+                raise value
+        return {shard_id: value for shard_id, (status, value) in replies.items()}
+
+
+    """
+    This function registers drivers in the shards that own their positions.
+    Args:
+        records (Iterable[DriverRecord]): The drivers to register; the email is their identity across shards.
+    """
+    def register_drivers(self, records: Iterable[DriverRecord]):
+        by_shard: Dict[int, List[DriverRecord]] = defaultdict(list)
+        for record in records:
+            driver_id = user_id_for(record.email)
+            if driver_id in self.driver_shards:
+                raise Exception(f"Driver {record.user_name} is already registered.")
+            shard_id = self.grid.shard_of(record.longitude, record.latitude)
+            self.driver_shards[driver_id] = shard_id
+            by_shard[shard_id].append(record)
+        self.call_shards({shard_id: ("register_drivers", (batch,)) for shard_id, batch in by_shard.items()})
+
+
+    """
+    This function applies driver location pings and hands drivers that crossed a shard border to their new shard.
+    Args:
+        pings (Iterable[Tuple[str, float, float]]): (driver_id, latitude, longitude) triples.
+    """
+    def update_driver_locations(self, pings: Iterable[Tuple[str, float, float]]):
+        by_shard: Dict[int, List[Tuple[str, float, float]]] = defaultdict(list)
+        for ping in pings:
+            by_shard[self.driver_shards[ping[0]]].append(ping)
+        evicted = self.call_shards({shard_id: ("update_driver_locations", (batch,)) for shard_id, batch in by_shard.items()})
+        self.rehome_drivers([driver for drivers in evicted.values() for driver in drivers])
+
+
+    """
+    This function hands drivers that left their shard to the shard that now owns their position.
+    The driver objects themselves move, so their ride history and settings go with them.
+    Args:
+        drivers (List[Driver]): The drivers that left their shard.
+    """
+    def rehome_drivers(self, drivers: List[Driver]):
+        by_shard: Dict[int, List[Driver]] = defaultdict(list)
+        for driver in drivers:
+            latitude, longitude = driver.current_coordinates
+            shard_id = self.grid.shard_of(longitude, latitude)
+            self.driver_shards[driver.user_id] = shard_id
+            by_shard[shard_id].append(driver)
+        self.call_shards({shard_id: ("adopt_drivers", (batch,)) for shard_id, batch in by_shard.items()})
+
+
+    """
+    This function matches a batch of ride requests to the nearest available drivers across all shards.
+    Local matches are made first; among cross-shard claims on the same driver, the earlier request wins.
+    Args:
+        requests (List[RideRequest]): The requests, at most one per rider.
+    Returns:
+        List[RideAssignment | None]: The assignment per request, None where no driver within range accepted.
+    """
+    def request_rides(self, requests: List[RideRequest]) -> List[RideAssignment | None]:
+        rider_ids = [user_id_for(request.rider_email) for request in requests]
+        if len(set(rider_ids)) != len(rider_ids) or any(rider_id in self.active_rides for rider_id in rider_ids):
+            raise Exception("Rider already has an ongoing ride!")
+
+        # Phase 1: every shard matches the pickups it owns that are closer to a local driver than to its borders
+        assignments: List[RideAssignment | None] = [None] * len(requests)
+        local: Dict[int, List[int]] = defaultdict(list)
+        safe_radius_km: List[float] = []
+        for position, request in enumerate(requests):
+            safe_radius_km.append(self.grid.distance_to_neighbours_km(request.pickup_longitude, request.pickup_latitude))
+            local[self.grid.shard_of(request.pickup_longitude, request.pickup_latitude)].append(position)
+        replies = self.call_shards({
+            shard_id: ("match", ([(requests[position], safe_radius_km[position]) for position in positions],))
+            for shard_id, positions in local.items()
+        })
+        for shard_id, positions in local.items():
+            for position, assignment in zip(positions, replies[shard_id]):
+                assignments[position] = assignment
+
+        # Phase 2: the rest fan out to every shard within the search radius and merge the candidates
+        deferred = [
+            position for position in range(len(requests))
+            if assignments[position] is None and safe_radius_km[position] < MAX_SEARCH_RADIUS_KM
+        ]
+        if deferred:
+            candidates = self.nearest_across_shards([requests[position] for position in deferred])
+            self.claim_in_rounds(requests, deferred, candidates, assignments)
+
+        for position, assignment in enumerate(assignments):
+            if assignment:
+                self.ride_shards[assignment.ride_id] = assignment.shard_id
+                self.ride_riders[assignment.ride_id] = assignment.rider_id
+                self.active_rides[assignment.rider_id] = assignment.ride_id
+        return assignments
+
+
+    """
+    This function finds the nearest available drivers of every pickup across all shards within the search radius.
+    Args:
+        requests (List[RideRequest]): The requests to search for.
+    Returns:
+        List[List[Tuple[float, int, str]]]: (distance_km, shard_id, driver_id) per request, nearest first.
+    """
+    def nearest_across_shards(self, requests: List[RideRequest]) -> List[List[Tuple[float, int, str]]]:
+        queries: Dict[int, List[int]] = defaultdict(list)
+        for position, request in enumerate(requests):
+            for shard_id in self.grid.shards_within(request.pickup_longitude, request.pickup_latitude, MAX_SEARCH_RADIUS_KM):
+                queries[shard_id].append(position)
+        replies = self.call_shards({
+            shard_id: ("nearest", ([
+                (requests[position].pickup_latitude, requests[position].pickup_longitude, MAX_DRIVER_OFFERS, MAX_SEARCH_RADIUS_KM)
+                for position in positions
+            ],))
+            for shard_id, positions in queries.items()
+        })
+        merged: List[List[Tuple[float, int, str]]] = [[] for _ in requests]
+        for shard_id, positions in queries.items():
+            for position, nearest in zip(positions, replies[shard_id]):
+                merged[position].extend((distance, shard_id, driver_id) for driver_id, distance in nearest)
+        return [heapq.nsmallest(MAX_DRIVER_OFFERS, candidates) for candidates in merged]
+
+
+    """
+    This function offers each deferred request to its next candidate, one round at a time, until it is taken.
+    Each round sends one claim per request to the candidates' shards in parallel.
+    Args:
+        requests (List[RideRequest]): Every request of the batch.
+        deferred (List[int]): Positions of the requests still waiting for a driver.
+        candidates (List[List[Tuple[float, int, str]]]): The merged candidates per deferred request.
+        assignments (List[RideAssignment | None]): Filled in place as requests are matched.
+    """
+    def claim_in_rounds(
+        self,
+        requests: List[RideRequest],
+        deferred: List[int],
+        candidates: List[List[Tuple[float, int, str]]],
+        assignments: List[RideAssignment | None]
+    ):
+        waiting = list(range(len(deferred)))
+        for offer in range(MAX_DRIVER_OFFERS):
+            claims: Dict[int, List[int]] = defaultdict(list)
+            for index in waiting:
+                if offer < len(candidates[index]):
+                    claims[candidates[index][offer][1]].append(index)
+            if not claims:
+                break
+            replies = self.call_shards({
+                shard_id: ("claim", ([
+                    (requests[deferred[index]], candidates[index][offer][2], candidates[index][offer][0]) for index in indexes
+                ],))
+                for shard_id, indexes in claims.items()
+            })
+            for shard_id, indexes in claims.items():
+                for index, assignment in zip(indexes, replies[shard_id]):
+                    assignments[deferred[index]] = assignment
+            waiting = [index for index in waiting if assignments[deferred[index]] is None]
+
+
+    """
+    This function starts a ride in the shard that owns it.
+    Args:
+        ride_id (str): The ID of the ride.
+    """
+    def start_ride(self, ride_id: str):
+        self.call_shards({self.ride_shards[ride_id]: ("start_ride", (ride_id,))})
+
+
+    """
+    This function completes a ride and moves its driver to the shard where the trip ended.
+    Args:
+        ride_id (str): The ID of the ride.
+    """
+    def complete_ride(self, ride_id: str):
+        self.finish_ride(ride_id, "complete_ride")
+
+
+    """
+    This function cancels a ride and releases its driver.
+    Args:
+        ride_id (str): The ID of the ride.
+    """
+    def cancel_ride(self, ride_id: str):
+        self.finish_ride(ride_id, "cancel_ride")
+
+    def finish_ride(self, ride_id: str, method: str):
+        shard_id = self.ride_shards[ride_id]
+        evicted = self.call_shards({shard_id: (method, (ride_id,))})[shard_id]
+        del self.ride_shards[ride_id]
+        del self.active_rides[self.ride_riders.pop(ride_id)]
+        self.rehome_drivers(evicted)
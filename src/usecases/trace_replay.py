@@ -0,0 +1,257 @@
+from __future__ import annotations
+import csv
+import gzip
+import heapq
+import logging
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple
+
+from src.core.events import emit, get_event_logger
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.ride.ride import Ride
+from src.models.ride.ride_status import RideStatus
+from src.models.location.location import Location
+from src.usecases.ride_system import RideSystem
+
+# Trace schema: one row per event, in non-decreasing timestamp order
+TRACE_COLUMNS = ("timestamp", "event", "subject_id", "latitude", "longitude", "destination_latitude", "destination_longitude")
+DRIVER_PING = "driver_ping"
+RIDE_REQUEST = "ride_request"
+RIDE_COMPLETE = "ride_complete"
+RIDE_CANCEL = "ride_cancel"
+DEFAULT_CHUNK_ROWS = 10_000
+TRACE_EMAIL_DOMAIN = "trace.replay"
+
+logger = get_event_logger("replay")
+
+
+class TraceEvent(NamedTuple):
+    """
+    One row of a trip log. Coordinates a given event does not use are None.
+    driver_ping: subject_id is the driver; latitude/longitude is their position. The first ping registers the driver.
+    ride_request: subject_id is the rider; latitude/longitude is the pickup, destination_* the drop-off.
+    ride_complete / ride_cancel: subject_id is the rider whose current ride ends.
+    """
+    timestamp: float
+    event: str
+    subject_id: str
+    latitude: float | None = None
+    longitude: float | None = None
+    destination_latitude: float | None = None
+    destination_longitude: float | None = None
+
+
+def optional_float(value) -> float | None:
+    return None if value is None or value == "" else float(value)
+
+
+def to_event(row) -> TraceEvent:
+    return TraceEvent(
+        float(row[0]), row[1], str(row[2]),
+        optional_float(row[3]), optional_float(row[4]), optional_float(row[5]), optional_float(row[6])
+    )
+
+
+"""
+Reads a CSV trace (optionally gzip-compressed) in chunks of parsed events.
+Only one chunk is held in memory at a time, however large the file. Malformed rows are logged and skipped.
+Args:
+    path (str): The CSV file, with a header naming the TRACE_COLUMNS in any order.
+    chunk_rows (int): The number of events per chunk.
+"""
+def read_csv_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[TraceEvent]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        positions = [header.index(column) for column in TRACE_COLUMNS]
+        chunk = []
+        for row in reader:
+            try:
+                chunk.append(to_event([row[position] for position in positions]))
+            except (ValueError, IndexError) as error:
+                emit(logger, logging.WARNING, "trace_row_malformed", "Skipped malformed row %s of %s: %s", reader.line_num, path, error,
+                     path=path, line=reader.line_num)
+                continue
+            if len(chunk) == chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+"""
+Reads a Parquet trace in record batches of parsed events. Requires pyarrow, imported only when called.
+Args:
+    path (str): The Parquet file, with the TRACE_COLUMNS as columns.
+    chunk_rows (int): The number of events per batch.
+"""
+def read_parquet_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[TraceEvent]]:
+    try:
+        import pyarrow.parquet as parquet
+    except ImportError as error:
+        raise ImportError("Reading Parquet traces requires pyarrow (pip install pyarrow).") from error
+    trace = parquet.ParquetFile(path)
+    for batch in trace.iter_batches(batch_size=chunk_rows, columns=list(TRACE_COLUMNS)):
+        columns = batch.to_pydict()
+        yield [to_event(row) for row in zip(*(columns[column] for column in TRACE_COLUMNS))]
+
+
+"""
+Streams the events of a trace file, choosing the reader by extension (.csv, .csv.gz or .parquet).
+Args:
+    path (str): The trace file.
+    chunk_rows (int): The number of events read at a time.
+"""
+def iter_trace(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[TraceEvent]:
+    reader = read_parquet_chunks if path.endswith(".parquet") else read_csv_chunks
+    for chunk in reader(path, chunk_rows):
+        yield from chunk
+
+
+"""
+Merges several time-ordered event streams, e.g. a pings file and a trips file, into one time-ordered stream.
+Args:
+    streams (Iterable[TraceEvent]): The streams to merge.
+"""
+def merge_traces(*streams: Iterable[TraceEvent]) -> Iterator[TraceEvent]:
+    return heapq.merge(*streams, key=lambda event: event.timestamp)
+
+
+class ReplayStats:
+    __slots__ = ("events", "pings", "drivers_registered", "requests", "matched", "unmatched", "completed", "cancelled",
+                 "skipped", "max_lag_seconds")
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class TraceReplayer:
+    """
+    Feeds a historical trace through the matcher: pings register or move drivers, requests go through
+    RideSystem.request_ride, and completion/cancel rows end the rider's ride.
+    Riders are only held while they have an active ride, so memory follows the number of rides in
+    flight rather than the size of the trace.
+    Args:
+        ride_system (RideSystem): The system to replay into.
+        speed_multiplier (float): Replay pace relative to trace time, e.g. 60 plays an hour per minute.
+            None replays as fast as possible.
+        clock (Callable[[], float]): Wall clock used for pacing.
+        sleep (Callable[[float], None]): Waits for the wall clock to catch up with the trace.
+    """
+    def __init__(
+        self,
+        ride_system: RideSystem,
+        speed_multiplier: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if speed_multiplier is not None and speed_multiplier <= 0:
+            raise ValueError("Invalid speed multiplier: Must be positive.")
+        self.ride_system = ride_system
+        self.speed_multiplier = speed_multiplier
+        self.clock = clock
+        self.sleep = sleep
+        self.drivers: Dict[str, Driver] = {}
+        self.active_rides: Dict[str, Ride] = {}
+        self.stats = ReplayStats()
+
+
+    """
+    This function replays a time-ordered stream of events.
+    Args:
+        events (Iterable[TraceEvent]): The events, e.g. from iter_trace.
+    Returns:
+        ReplayStats: Counters for the whole replay so far.
+    """
+    def replay(self, events: Iterable[TraceEvent]) -> ReplayStats:
+        first_timestamp = started_at = None
+        for event in events:
+            if self.speed_multiplier is not None:
+                if first_timestamp is None:
+                    first_timestamp, started_at = event.timestamp, self.clock()
+                due_at = started_at + (event.timestamp - first_timestamp) / self.speed_multiplier
+                wait = due_at - self.clock()
+                if wait > 0:
+                    self.sleep(wait)
+                else:
+                    self.stats.max_lag_seconds = max(self.stats.max_lag_seconds, -wait)
+            self.stats.events += 1
+            try:
+                self.apply(event)
+            except (ValueError, TypeError) as error:
+                self.stats.skipped += 1
+                emit(logger, logging.WARNING, "trace_event_skipped", "Skipped %s event for %s: %s", event.event, event.subject_id, error,
+                     subject_id=event.subject_id, timestamp=event.timestamp)
+        return self.stats
+
+
+    """
+    This function applies a single trace event to the system.
+    Args:
+        event (TraceEvent): The event to apply.
+    """
+    def apply(self, event: TraceEvent):
+        if event.event == DRIVER_PING:
+            self.apply_ping(event)
+        elif event.event == RIDE_REQUEST:
+            self.apply_request(event)
+        elif event.event == RIDE_COMPLETE:
+            self.finish_ride(event.subject_id, completed=True)
+        elif event.event == RIDE_CANCEL:
+            self.finish_ride(event.subject_id, completed=False)
+        else:
+            raise ValueError(f"Unknown trace event: {event.event}")
+
+    def apply_ping(self, event: TraceEvent):
+        self.stats.pings += 1
+        driver = self.drivers.get(event.subject_id)
+        if driver is None:
+            driver = Driver(f"{event.subject_id}@{TRACE_EMAIL_DOMAIN}", event.subject_id, event.longitude, event.latitude)
+            self.ride_system.ride_sharing_manager.register_driver(driver)
+            self.drivers[event.subject_id] = driver
+            self.stats.drivers_registered += 1
+        else:
+            driver.update_location(event.latitude, event.longitude)
+
+    def apply_request(self, event: TraceEvent):
+        if event.subject_id in self.active_rides:
+            raise ValueError("Rider already has an ongoing ride!")
+        self.stats.requests += 1
+        rider = Rider(f"{event.subject_id}@{TRACE_EMAIL_DOMAIN}", event.subject_id, event.longitude, event.latitude)
+        ride = self.ride_system.request_ride(rider, Location(event.destination_latitude, event.destination_longitude))
+        if ride.driver is None:
+            self.stats.unmatched += 1
+        else:
+            self.stats.matched += 1
+            self.active_rides[event.subject_id] = ride
+
+
+    """
+    This function ends the current ride of a rider, starting it first if the trace skipped the pickup.
+    Rows for riders without an active ride (e.g. whose request went unmatched) are ignored; a cancellation
+    for a ride already in trip is rejected with ValueError and the ride stays active.
+    Args:
+        rider_id (str): The rider's trace id.
+        completed (bool): True to complete the ride, False to cancel it.
+    """
+    def finish_ride(self, rider_id: str, completed: bool):
+        ride = self.active_rides.get(rider_id)
+        if ride is None:
+            return
+        if not completed and ride.ride_status == RideStatus.IN_TRIP:
+            raise ValueError(f"Ride {ride.ride_id} is already in trip and cannot be cancelled.")
+        del self.active_rides[rider_id]
+        if not completed and ride.ride_status == RideStatus.PICKING_UP:
+            self.ride_system.cancel_ride(ride)
+            self.stats.cancelled += 1
+            return
+        if ride.ride_status == RideStatus.PICKING_UP:
+            ride.start_ride()
+        self.ride_system.complete_ride(ride)
+        self.stats.completed += 1
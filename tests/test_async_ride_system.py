@@ -0,0 +1,87 @@
+import asyncio
+import random
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.async_ride_system import AsyncRideSystem
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestAsyncRideSystem(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        self.near = Driver("near@email.com", "Near", longitude=-79.641, latitude=43.590)
+        self.far = Driver("far@email.com", "Far", longitude=-79.660, latitude=43.590)
+        for driver in (self.near, self.far):
+            self.ride_system.ride_sharing_manager.register_driver(driver)
+        self.rider = Rider("rider@email.com", "Rider", longitude=-79.640, latitude=43.590)
+
+    async def test_unanswered_offer_falls_through_to_next_driver(self):
+        offers = []
+        async def only_far_answers(driver, ride):
+            offers.append(driver)
+            if driver is self.near:
+                await asyncio.Event().wait()
+            return True
+        async_system = AsyncRideSystem(self.ride_system, offer_timeout_seconds=0.01, offer_handler=only_far_answers)
+        ride = await async_system.request_ride(self.rider, Location(43.65, -79.59))
+        # The near driver never answered, so the offer went on to the far driver
+        self.assertEqual(offers, [self.near, self.far])
+        self.assertIs(ride.driver, self.far)
+        self.assertEqual(ride.ride_status, RideStatus.PICKING_UP)
+        self.assertTrue(self.near.is_available)
+
+    async def test_driver_accepts_parked_offer(self):
+        async_system = AsyncRideSystem(self.ride_system)
+        request = asyncio.create_task(async_system.request_ride(self.rider, Location(43.65, -79.59)))
+        while self.near.user_id not in async_system.pending_offers:
+            await asyncio.sleep(0)
+        self.assertFalse(async_system.respond_to_offer(self.far, True))
+        self.assertTrue(async_system.respond_to_offer(self.near, True))
+        ride = await request
+        self.assertIs(ride.driver, self.near)
+        self.assertEqual(async_system.pending_offers, {})
+
+    async def test_search_widens_past_reserved_drivers(self):
+        manager = self.ride_system.ride_sharing_manager
+        crowd = [Driver(f"d{i}@email.com", f"d{i}", -79.6405 + i * 0.00001, 43.590) for i in range(30)]
+        for driver in crowd:
+            manager.register_driver(driver)
+
+        async def accept(driver, ride):
+            return True
+        async_system = AsyncRideSystem(self.ride_system, offer_handler=accept)
+        # Every driver near the pickup is holding another rider's offer; only the far driver is free
+        async_system.reserved_drivers.update(driver.user_id for driver in crowd + [self.near])
+        ride = await async_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.assertIs(ride.driver, self.far)
+
+    async def test_all_declines_cancel_ride(self):
+        async def decline(driver, ride):
+            return False
+        async_system = AsyncRideSystem(self.ride_system, offer_handler=decline)
+        ride = await async_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.assertEqual(ride.ride_status, RideStatus.CANCELLED)
+        self.assertIsNone(self.rider.current_ride)
+
+    async def test_racing_requests_never_share_a_driver(self):
+        rng = random.Random(3)
+        manager = self.ride_system.ride_sharing_manager
+        for i in range(50):
+            manager.register_driver(Driver(f"d{i}@email.com", f"d{i}", -79.64 + rng.uniform(-0.02, 0.02), 43.59 + rng.uniform(-0.02, 0.02)))
+
+        async def slow_accept(driver, ride):
+            await asyncio.sleep(rng.uniform(0, 0.01))
+            return rng.random() < 0.7
+        async_system = AsyncRideSystem(self.ride_system, offer_handler=slow_accept)
+        riders = [Rider(f"r{i}@email.com", f"r{i}", -79.64, 43.59) for i in range(80)]
+        rides = await asyncio.gather(*(async_system.request_ride(rider, Location(43.65, -79.59)) for rider in riders))
+
+        assigned = [ride.driver.user_id for ride in rides if ride.ride_status == RideStatus.PICKING_UP]
+        self.assertEqual(len(assigned), len(set(assigned)))
+        self.assertGreater(len(assigned), 0)
+        self.assertEqual(async_system.reserved_drivers, set())
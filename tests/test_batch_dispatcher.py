@@ -0,0 +1,97 @@
+import random
+import unittest
+import numpy as np
+from src.core.assignment import INFEASIBLE, greedy_assignment, hungarian_assignment
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.batch_dispatcher import BatchDispatcher
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestAssignment(unittest.TestCase):
+    def test_hungarian_beats_greedy(self):
+        cost = [[1.0, 2.0], [1.1, 10.0]]
+        self.assertEqual(greedy_assignment(cost), [(0, 0), (1, 1)])
+        self.assertEqual(hungarian_assignment(cost), [(0, 1), (1, 0)])
+
+    def test_infeasible_pairs_are_skipped(self):
+        cost = [[1.0, INFEASIBLE], [2.0, INFEASIBLE], [INFEASIBLE, 3.0]]
+        self.assertEqual(hungarian_assignment(cost), [(0, 0), (2, 1)])
+        self.assertEqual(greedy_assignment(cost), [(0, 0), (2, 1)])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBatchDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        self.dispatcher = BatchDispatcher(self.ride_system, window_seconds=2.0, max_wait_seconds=4.0, clock=self.clock)
+        # Driver A sits between both riders; driver B is only reachable by the first rider
+        self.driver_a = Driver("a@email.com", "A", longitude=-79.640, latitude=43.590)
+        self.driver_b = Driver("b@email.com", "B", longitude=-79.660, latitude=43.590)
+        for driver in (self.driver_a, self.driver_b):
+            self.ride_system.ride_sharing_manager.register_driver(driver)
+        self.rider_1 = Rider("r1@email.com", "R1", longitude=-79.645, latitude=43.590)
+        self.rider_2 = Rider("r2@email.com", "R2", longitude=-79.600, latitude=43.590)
+
+    def test_window_and_global_assignment(self):
+        ride_1 = self.dispatcher.submit(self.rider_1, Location(43.65, -79.59))
+        ride_2 = self.dispatcher.submit(self.rider_2, Location(43.65, -79.59))
+        self.assertEqual(self.dispatcher.tick(), [])
+
+        self.clock.now = 2.0
+        matched = self.dispatcher.tick()
+        self.assertCountEqual(matched, [ride_1, ride_2])
+        # Greedy in arrival order would give A to the first rider and leave the second one 5km away from B
+        self.assertIs(ride_1.driver, self.driver_b)
+        self.assertIs(ride_2.driver, self.driver_a)
+        self.assertFalse(self.driver_a.is_available)
+        self.assertEqual(ride_1.ride_status, RideStatus.PICKING_UP)
+
+    def test_unmatched_ride_waits_then_cancels(self):
+        for driver in (self.driver_a, self.driver_b):
+            driver.is_available = False
+        ride = self.dispatcher.submit(self.rider_1, Location(43.65, -79.59))
+        self.clock.now = 2.0
+        self.assertEqual(self.dispatcher.tick(), [])
+        self.assertEqual(ride.ride_status, RideStatus.REQUESTED)
+
+        self.clock.now = 4.0
+        self.dispatcher.tick()
+        self.assertEqual(ride.ride_status, RideStatus.CANCELLED)
+        self.assertIsNone(self.rider_1.current_ride)
+
+    def test_batch_candidates_match_per_ride_search(self):
+        rng = random.Random(5)
+        manager = self.ride_system.ride_sharing_manager
+        # A dense cluster and a sparse outskirt, so some rides need a search past their block of cells
+        manager.register_drivers(
+            Driver(f"d{i}@email.com", f"d{i}", rng.uniform(-79.66, -79.62), rng.uniform(43.58, 43.60)) for i in range(400)
+        )
+        manager.register_drivers(
+            Driver(f"far{i}@email.com", f"far{i}", rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)) for i in range(20)
+        )
+        pickups = [(rng.uniform(-79.66, -79.62), rng.uniform(43.58, 43.60)) for _ in range(40)]
+        pickups += [(rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)) for _ in range(20)]
+        rides = [
+            self.ride_system.create_ride_request(Rider(f"r{i}@email.com", f"r{i}", longitude, latitude), Location(43.65, -79.59))
+            for i, (longitude, latitude) in enumerate(pickups)
+        ]
+        drivers, cost = self.dispatcher.build_cost_matrix(rides)
+        for row, ride in enumerate(rides):
+            expected = manager.nearest_available_drivers(ride.start_location, self.dispatcher.candidates_per_ride, self.dispatcher.max_radius_km)
+            found = {drivers[column].user_id: cost[row, column] for column in np.flatnonzero(np.isfinite(cost[row]))}
+            self.assertEqual(set(found), {driver.user_id for driver, _ in expected})
+            for driver, distance in expected:
+                self.assertAlmostEqual(found[driver.user_id], distance)
@@ -0,0 +1,77 @@
+import unittest
+from src.core.event_queue import EventQueue
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.city_simulation import CitySimulation
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+# Latitude degrees per kilometer
+KM = 1 / 111.19
+
+class TestEventQueue(unittest.TestCase):
+    def test_runs_in_time_then_scheduling_order(self):
+        queue = EventQueue()
+        order = []
+        queue.schedule(5, order.append, "late")
+        queue.schedule(1, order.append, "first")
+        queue.schedule(1, order.append, "second")
+        queue.schedule(1, lambda: queue.schedule(2, order.append, "chained"))
+        self.assertEqual(queue.run(until=3), 4)
+        self.assertEqual(order, ["first", "second", "chained"])
+        self.assertEqual(queue.now, 3)
+        queue.run()
+        self.assertEqual(order[-1], "late")
+        self.assertEqual(queue.now, 5)
+
+class TestCitySimulation(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        # 36 km/h covers 1km in 100 simulated seconds
+        self.simulation = CitySimulation(self.ride_system, speed_kmh=36.0, step_seconds=10.0, rider_patience_seconds=300.0)
+        self.rider = Rider("rider@email.com", "Rider", longitude=-79.64, latitude=43.59)
+
+    def test_full_trip_moves_driver_through_index(self):
+        driver = Driver("d@email.com", "D", longitude=-79.64, latitude=43.59 - KM)
+        self.manager.register_driver(driver)
+        destination = Location(43.59 + 2 * KM, -79.64)
+        self.simulation.request_at(10.0, self.rider, destination)
+
+        self.simulation.run(until=60.0)
+        ride = driver.current_ride
+        self.assertEqual(ride.ride_status, RideStatus.PICKING_UP)
+        # Halfway to the pickup, and indexed there
+        self.assertAlmostEqual(driver.current_location.latitude, 43.59 - KM / 2, places=4)
+        self.assertAlmostEqual(self.manager.busy_index.positions[driver.user_id][1], 43.59 - KM / 2, places=4)
+
+        self.simulation.run(until=200.0)
+        self.assertEqual(ride.ride_status, RideStatus.IN_TRIP)
+        self.simulation.run()
+        self.assertEqual(ride.ride_status, RideStatus.COMPLETED)
+        self.assertAlmostEqual(self.simulation.now, 10.0 + 100.0 + 200.0, delta=0.1)
+        self.assertTrue(driver.is_available)
+        self.assertEqual(self.simulation.stats.completed, 1)
+        self.assertAlmostEqual(self.simulation.stats.total_wait_seconds, 100.0, delta=0.1)
+
+    def test_impatient_rider_cancels_and_driver_stops_midway(self):
+        driver = Driver("d@email.com", "D", longitude=-79.64, latitude=43.59 - 5 * KM)
+        self.manager.register_driver(driver)
+        self.simulation.request_at(0.0, self.rider, Location(43.65, -79.59))
+        self.simulation.run()
+        self.assertEqual(self.simulation.stats.cancelled, 1)
+        self.assertIsNone(self.rider.current_ride)
+        self.assertIn(driver.user_id, self.manager.available_index)
+        # Stopped 3km along the 5km approach when the 300s patience ran out
+        self.assertAlmostEqual(driver.current_location.latitude, 43.59 - 2 * KM, places=4)
+
+    def test_request_stream_is_consumed_lazily(self):
+        self.manager.register_driver(Driver("d@email.com", "D", longitude=-79.64, latitude=43.59))
+        riders = [Rider(f"r{i}@email.com", f"r{i}", -79.64, 43.59) for i in range(3)]
+        self.simulation.add_requests((i * 1000.0, rider, Location(43.6, -79.64)) for i, rider in enumerate(riders))
+        self.assertEqual(len(self.simulation.queue), 1)
+        self.simulation.run()
+        self.assertEqual(self.simulation.stats.completed, 3)
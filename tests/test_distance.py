@@ -0,0 +1,28 @@
+import unittest
+from src.core.distance import PreparedCoordinates, haversine_one_to_many, haversine_many_to_many
+from src.models.location.location import Location
+
+class TestDistance(unittest.TestCase):
+    def setUp(self):
+        self.latitudes = [43.59, 43.62, 43.58]
+        self.longitudes = [-79.64, -79.60, -79.70]
+        self.points = PreparedCoordinates(self.latitudes, self.longitudes)
+        self.origin = Location(latitude=43.60, longitude=-79.65)
+
+    def test_one_to_many_matches_scalar(self):
+        distances = haversine_one_to_many(self.origin.latitude, self.origin.longitude, self.points)
+        for i, (latitude, longitude) in enumerate(zip(self.latitudes, self.longitudes)):
+            expected = self.origin.calculate_distance_in_km(Location(latitude, longitude))
+            self.assertAlmostEqual(distances[i], expected, places=9)
+
+    def test_many_to_many_shape_and_diagonal(self):
+        matrix = haversine_many_to_many(self.points, self.points)
+        self.assertEqual(matrix.shape, (3, 3))
+        for i in range(3):
+            self.assertAlmostEqual(matrix[i, i], 0.0)
+        self.assertAlmostEqual(matrix[0, 1], matrix[1, 0])
+
+    def test_location_distance_is_symmetric(self):
+        destination = Location(latitude=43.65, longitude=-79.59)
+        self.assertAlmostEqual(self.origin.calculate_distance_in_km(destination), destination.calculate_distance_in_km(self.origin))
+        self.assertAlmostEqual(self.origin.calculate_distance_in_km(destination), 7.3, delta=0.2)
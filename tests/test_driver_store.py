@@ -0,0 +1,41 @@
+import unittest
+from src.core.driver_store import DriverStore
+from src.models.users.driver import Driver
+
+class TestDriverStore(unittest.TestCase):
+    def setUp(self):
+        self.store = DriverStore()
+        self.driver = Driver(email="store@email.com", user_name="store", longitude=-79.64, latitude=43.59)
+        self.driver.attach_store(self.store, self.store.allocate(self.driver.user_id, 43.59, -79.64, True))
+
+    def test_driver_reads_position_from_store(self):
+        self.driver.update_location(43.70, -79.80)
+        self.assertEqual(self.store.latitudes[self.driver.slot], 43.70)
+        self.assertEqual(self.store.longitudes[self.driver.slot], -79.80)
+        self.assertEqual(self.driver.current_location.latitude, 43.70)
+
+    def test_availability_bitmap(self):
+        self.driver.is_available = False
+        self.assertEqual(self.store.available[self.driver.slot], 0)
+        self.driver.is_available = True
+        self.assertEqual(self.store.available[self.driver.slot], 1)
+
+    def test_release_reuses_slot(self):
+        other = self.store.allocate("other", 43.62, -79.60, True)
+        self.store.release(other)
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.allocate("third", 43.55, -79.68, False), other)
+
+    def test_coordinates(self):
+        other = self.store.allocate("other", 43.62, -79.60, True)
+        latitudes, longitudes = self.store.coordinates([other, self.driver.slot])
+        self.assertEqual(list(latitudes), [43.62, 43.59])
+        self.assertEqual(list(longitudes), [-79.60, -79.64])
+
+    def test_invalid_location_rejected(self):
+        with self.assertRaises(ValueError):
+            self.driver.update_location(95.0, -79.80)
+
+    def test_entities_have_no_instance_dict(self):
+        self.assertFalse(hasattr(self.driver, "__dict__"))
+        self.assertFalse(hasattr(self.driver.current_location, "__dict__"))
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.core.eta import RoadNetworkEta, StraightLineEta
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.road_network import grid_road_graph, load_road_graph
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+# The Credit River, crossed only near the north and south edges of the area
+RIVER_LONGITUDE = -79.65
+BRIDGE_LATITUDES = [43.51, 43.69]
+
+OSM_EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="43.600" lon="-79.650"/>
+  <node id="2" lat="43.600" lon="-79.640"/>
+  <node id="3" lat="43.610" lon="-79.640"/>
+  <node id="4" lat="43.610" lon="-79.650"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="primary"/><tag k="maxspeed" v="60"/>
+  </way>
+  <way id="11">
+    <nd ref="3"/><nd ref="4"/>
+    <tag k="highway" v="residential"/><tag k="oneway" v="yes"/>
+  </way>
+  <way id="12">
+    <nd ref="4"/><nd ref="1"/>
+    <tag k="highway" v="footway"/>
+  </way>
+</osm>
+"""
+
+class TestRoadNetworkEta(unittest.TestCase):
+    def setUp(self):
+        self.graph = grid_road_graph(MISSISSAUGA_BBOX, 0.25, 40.0, RIVER_LONGITUDE, BRIDGE_LATITUDES)
+        self.eta = RoadNetworkEta(self.graph, landmarks=4)
+
+    def test_river_makes_close_points_far_by_road(self):
+        west, east = Location(43.6, -79.655), Location(43.6, -79.645)
+        route = self.eta.route(west, east)
+        self.assertGreater(route.km, 15.0)
+        self.assertLess(StraightLineEta().route(west, east).km, 1.0)
+        # Along the same bank the road distance stays close to the straight line
+        self.assertLess(self.eta.route(east, Location(43.6, -79.6)).km, 1.5 * east.calculate_distance_in_km(Location(43.6, -79.6)))
+
+    def test_pickup_etas_match_routes(self):
+        pickup = Location(43.62, -79.64)
+        latitudes = np.array([43.61, 43.63, 43.62, 43.64])
+        longitudes = np.array([-79.63, -79.66, -79.645, -79.62])
+        etas = self.eta.pickup_etas(pickup.latitude, pickup.longitude, latitudes, longitudes)
+        for latitude, longitude, seconds in zip(latitudes, longitudes, etas):
+            self.assertAlmostEqual(seconds, self.eta.route(Location(latitude, longitude), pickup).seconds)
+        # Only the two quickest have to be exact, and they are
+        self.eta.cache.clear()
+        nearest = self.eta.pickup_etas(pickup.latitude, pickup.longitude, latitudes, longitudes, nearest=2)
+        self.assertEqual(sorted(nearest)[:2], sorted(etas)[:2])
+        self.assertTrue(np.isinf(nearest[1]))
+
+    def test_results_are_cached_per_node_pair(self):
+        start, end = Location(43.55, -79.7), Location(43.65, -79.55)
+        first = self.eta.route(start, end)
+        self.assertEqual(len(self.eta.cache), 1)
+        self.assertEqual(self.eta.route(start, end), first)
+        self.assertEqual(len(self.eta.cache), 1)
+        small = RoadNetworkEta(self.graph, landmarks=0, cache_size=2)
+        for longitude in (-79.7, -79.6, -79.55):
+            small.route(start, Location(43.65, longitude))
+        self.assertEqual(len(small.cache), 2)
+
+    def test_graph_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grid.npz")
+            self.graph.save(path)
+            loaded = load_road_graph(path)
+            self.assertEqual(len(loaded), len(self.graph))
+            self.assertEqual(loaded.edge_count, self.graph.edge_count)
+            start, end = Location(43.55, -79.7), Location(43.65, -79.55)
+            self.assertAlmostEqual(RoadNetworkEta(loaded).route(start, end).seconds, self.eta.route(start, end).seconds)
+
+            path = os.path.join(directory, "extract.osm")
+            with open(path, "w") as file:
+                file.write(OSM_EXTRACT)
+            graph = load_road_graph(path)
+        # The footway is skipped and the residential street is one way
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(graph.edge_count, 5)
+        eta = RoadNetworkEta(graph)
+        self.assertEqual(eta.route(Location(43.61, -79.65), Location(43.6, -79.65)).seconds, float("inf"))
+        self.assertAlmostEqual(eta.route(Location(43.6, -79.65), Location(43.6, -79.64)).seconds, 0.805 / 60 * 3600, delta=1.0)
+
+class TestRideSystemEta(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        graph = grid_road_graph(MISSISSAUGA_BBOX, 0.25, 40.0, RIVER_LONGITUDE, BRIDGE_LATITUDES)
+        self.ride_system.attach_eta(RoadNetworkEta(graph, landmarks=4))
+        self.across = Driver("across@email.com", "Across", longitude=-79.645, latitude=43.6)
+        self.same_bank = Driver("bank@email.com", "Bank", longitude=-79.67, latitude=43.6)
+        self.manager.register_driver(self.across)
+        self.manager.register_driver(self.same_bank)
+
+    def test_drivers_ranked_by_road_eta(self):
+        rider = Rider("r@email.com", "R", longitude=-79.655, latitude=43.6)
+        ride = self.ride_system.create_ride_request(rider, Location(43.61, -79.66))
+        # The driver across the river is nearer in a straight line but more than 30 minutes away by road
+        self.assertEqual(self.ride_system.find_suitable_drivers(ride), [self.same_bank])
+        self.assertEqual(self.ride_system.search_driver_in_radius_km(ride, 3.0), [self.same_bank])
+        self.ride_system.eta_engine.max_pickup_seconds = float("inf")
+        self.assertEqual(self.ride_system.find_suitable_drivers(ride), [self.same_bank, self.across])
+        self.ride_system.attach_eta(None)
+        self.assertEqual(self.ride_system.find_suitable_drivers(ride), [self.across, self.same_bank])
+
+    def test_trips_measured_along_roads(self):
+        rider = Rider("r@email.com", "R", longitude=-79.655, latitude=43.6)
+        ride = self.ride_system.request_ride(rider, Location(43.6, -79.64))
+        self.assertIs(ride.driver, self.same_bank)
+        self.assertGreater(ride.distance, 15.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import io
+import json
+import logging
+import unittest
+from src.core.events import JsonFormatter, emit, enable_console_events, enable_queued_events, get_event_logger, reset_events
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class CountingArgument:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "counted"
+
+class TestEvents(unittest.TestCase):
+    def tearDown(self):
+        reset_events()
+
+    def request_ride(self):
+        ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        ride_system.ride_sharing_manager.register_driver(Driver("d@email.com", "D", -79.64, 43.59))
+        return ride_system.request_ride(Rider("r@email.com", "R", -79.641, 43.59), Location(43.65, -79.59))
+
+    def test_events_are_off_and_unformatted_by_default(self):
+        argument = CountingArgument()
+        emit(get_event_logger("test"), logging.INFO, "test_event", "Value %s", argument)
+        self.assertEqual(argument.formatted, 0)
+
+    def test_console_events_keep_simulator_wording(self):
+        stream = io.StringIO()
+        enable_console_events(stream=stream)
+        ride = self.request_ride()
+        output = stream.getvalue()
+        self.assertIn("Driver D has been registered.", output)
+        self.assertIn(f"Driver D assigned to ride {ride.ride_id}.", output)
+
+    def test_queued_json_events_carry_fields(self):
+        stream = io.StringIO()
+        sink = logging.StreamHandler(stream)
+        sink.setFormatter(JsonFormatter())
+        listener = enable_queued_events(sink)
+        ride = self.request_ride()
+        listener.stop()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        matched = next(event for event in events if event["event"] == "ride_matched")
+        self.assertEqual(matched["ride_id"], ride.ride_id)
+        self.assertEqual(matched["driver_id"], ride.driver.user_id)
+        self.assertGreaterEqual(matched["duration_ms"], 0)
+        # INFO level leaves out location pings and offers
+        self.assertNotIn("ride_offered", [event["event"] for event in events])
@@ -0,0 +1,56 @@
+import threading
+import unittest
+from src.core.id_generator import IdGenerator, EPOCH_MS, parse_id
+from src.models.users.rider import Rider
+
+class TestIdGenerator(unittest.TestCase):
+    def test_ids_are_unique_and_sorted(self):
+        generator = IdGenerator(node_id=3)
+        ids = [generator.next_id() for _ in range(10_000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+    def test_parse_roundtrip(self):
+        generator = IdGenerator(node_id=17, clock=lambda: EPOCH_MS + 5_000)
+        generator.next_id()
+        self.assertEqual(parse_id(generator.next_id()), (EPOCH_MS + 5_000, 17, 1))
+
+    def test_clock_going_backwards_stays_monotonic(self):
+        now = [EPOCH_MS + 10_000]
+        generator = IdGenerator(clock=lambda: now[0])
+        first = generator.next_id()
+        now[0] -= 1_000
+        self.assertGreater(generator.next_id(), first)
+
+    def test_sequence_overflow_borrows_next_millisecond(self):
+        generator = IdGenerator(clock=lambda: EPOCH_MS)
+        ids = [generator.next_id() for _ in range(5_000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(parse_id(ids[-1])[0], EPOCH_MS + 1)
+
+    def test_nodes_never_collide(self):
+        clock = lambda: EPOCH_MS + 42
+        first, second = IdGenerator(node_id=1, clock=clock), IdGenerator(node_id=2, clock=clock)
+        self.assertNotEqual(first.next_id(), second.next_id())
+
+    def test_thread_safety(self):
+        generator = IdGenerator()
+        ids = []
+        def worker():
+            ids.extend(generator.next_id() for _ in range(2_000))
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(ids)), 8_000)
+
+    def test_invalid_node_id(self):
+        with self.assertRaises(ValueError):
+            IdGenerator(node_id=1024)
+
+    def test_users_without_email_get_generated_ids(self):
+        first = Rider(email=None, user_name="guest", longitude=-79.60, latitude=43.60)
+        second = Rider(email=None, user_name="guest", longitude=-79.60, latitude=43.60)
+        self.assertNotEqual(first.user_id, second.user_id)
+        self.assertEqual(Rider("a@email.com", "a", -79.6, 43.6).user_id, Rider("a@email.com", "b", -79.6, 43.6).user_id)
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import unittest
+from src.core.journal import DURABILITY_ALWAYS, DURABILITY_NONE, RideJournal, read_journal, recover
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import save_snapshot
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestRideJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.directory.name, "rides.journal")
+        self.snapshot_path = os.path.join(self.directory.name, "rides.snap")
+        self.journal = RideJournal(self.journal_path, DURABILITY_ALWAYS)
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.manager.attach_journal(self.journal)
+        self.drivers = [
+            Driver("d1@email.com", "D1", longitude=-79.64, latitude=43.59),
+            Driver("d2@email.com", "D2", longitude=-79.60, latitude=43.62),
+        ]
+        for driver in self.drivers:
+            self.manager.register_driver(driver)
+        self.rider = Rider("r1@email.com", "R1", longitude=-79.65, latitude=43.60)
+        self.manager.register_rider(self.rider)
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def assert_same_state(self, recovered: RideSharingManager):
+        self.assertEqual(set(recovered.drivers), set(self.manager.drivers))
+        self.assertEqual(set(recovered.riders), set(self.manager.riders))
+        self.assertEqual({ride_id: ride.ride_status for ride_id, ride in recovered.rides.items()},
+                         {ride_id: ride.ride_status for ride_id, ride in self.manager.rides.items()})
+        for driver_id, driver in self.manager.drivers.items():
+            restored = recovered.get_driver(driver_id)
+            self.assertEqual(restored.is_available, driver.is_available)
+            self.assertIn(driver_id, recovered.available_index if driver.is_available else recovered.busy_index)
+            self.assertEqual(getattr(restored.current_ride, "ride_id", None), getattr(driver.current_ride, "ride_id", None))
+            self.assertEqual([ride.ride_id for ride in restored.drive_history], [ride.ride_id for ride in driver.drive_history])
+
+    def test_recovers_without_snapshot(self):
+        completed = self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        completed.start_ride()
+        self.ride_system.complete_ride(completed)
+        walk_up = Rider("walkup@email.com", "Walk-up", longitude=-79.61, latitude=43.62)
+        in_flight = self.ride_system.request_ride(walk_up, Location(43.55, -79.70))
+
+        # No close: the process "crashes" with only the fsynced records on disk
+        recovered = recover(self.journal_path, self.snapshot_path, MISSISSAUGA_BBOX)
+        self.assert_same_state(recovered)
+        ride = recovered.get_ride(in_flight.ride_id)
+        self.assertEqual(ride.ride_status, RideStatus.PICKING_UP)
+        self.assertIs(ride.rider.current_ride, ride)
+        driver = recovered.get_driver(completed.driver.user_id)
+        self.assertEqual(driver.current_location.latitude, 43.65)
+
+    def test_recovers_from_checkpoint_and_later_records(self):
+        first = self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.journal.checkpoint(self.manager, self.snapshot_path)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        first.start_ride()
+        self.ride_system.complete_ride(first)
+        self.manager.register_driver(Driver("d3@email.com", "D3", longitude=-79.70, latitude=43.58))
+
+        recovered = recover(self.journal_path, self.snapshot_path)
+        self.assert_same_state(recovered)
+        self.assertEqual(recovered.get_ride(first.ride_id).ride_status, RideStatus.COMPLETED)
+
+    def test_replay_skips_records_already_in_snapshot(self):
+        ride = self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        ride.start_ride()
+        # A crash between writing the checkpoint snapshot and emptying the journal
+        save_snapshot(self.manager, self.snapshot_path, journal_sequence=self.journal.sequence - 1)
+        recovered = recover(self.journal_path, self.snapshot_path)
+        self.assert_same_state(recovered)
+
+    def test_torn_tail_is_dropped(self):
+        self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.journal.close()
+        records = [record for record, _ in read_journal(self.journal_path)]
+        with open(self.journal_path, "ab") as file:
+            file.write(b"\x40\x00\x00\x00partial")
+
+        self.journal = RideJournal(self.journal_path, DURABILITY_NONE)
+        self.assertEqual(self.journal.sequence, records[-1][0])
+        self.journal.record("driver_availability", self.drivers[0].user_id, True)
+        self.journal.close()
+        self.assertEqual([record for record, _ in read_journal(self.journal_path)][-1][0], records[-1][0] + 1)
+
+    def test_batched_records_reach_disk_on_close(self):
+        journal_path = os.path.join(self.directory.name, "batched.journal")
+        journal = RideJournal(journal_path, DURABILITY_NONE, batch_records=100)
+        for _ in range(10):
+            journal.record("driver_availability", "d", False)
+        self.assertEqual(list(read_journal(journal_path)), [])
+        journal.close()
+        self.assertEqual(len(list(read_journal(journal_path))), 10)
+
+    def test_concurrent_commits_are_all_durable(self):
+        def record_many():
+            for _ in range(50):
+                self.journal.record("driver_availability", "d", True)
+        threads = [threading.Thread(target=record_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sequences = [record[0] for record, _ in read_journal(self.journal_path)]
+        self.assertEqual(sequences, list(range(1, len(sequences) + 1)))
+        self.assertEqual(self.journal.durable_sequence, self.journal.sequence)
+
+if __name__ == "__main__":
+    unittest.main()
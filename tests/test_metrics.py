@@ -0,0 +1,85 @@
+import os
+import random
+import tempfile
+import unittest
+import urllib.request
+from src.core.metrics import LatencyHistogram
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_precision(self):
+        histogram = LatencyHistogram()
+        values = list(range(1, 100_001))
+        random.Random(1).shuffle(values)
+        for value in values:
+            histogram.record(value)
+        for quantile in (0.5, 0.9, 0.99):
+            exact = quantile * 100_000
+            self.assertLessEqual(abs(histogram.percentile(quantile) - exact) / exact, 0.04)
+        self.assertEqual(histogram.percentile(1.0), 100_000)
+        self.assertEqual(histogram.snapshot()["min_us"], 1)
+
+class TestDispatchMetrics(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.manager.register_driver(Driver("d@email.com", "D", -79.64, 43.59))
+
+    def request(self, name, longitude):
+        return self.ride_system.request_ride(Rider(f"{name}@email.com", name, longitude, 43.59), Location(43.65, -79.59))
+
+    def test_disabled_by_default(self):
+        self.request("r", -79.641)
+        self.assertEqual(self.manager.metrics()["counters"], {})
+        self.assertEqual(self.manager.metrics()["histograms"], {})
+
+    def test_dispatch_counters_and_rates(self):
+        self.manager.enable_metrics()
+        self.request("near", -79.641)
+        # The only driver is now busy, so the second search comes back empty after expanding
+        self.request("far", -79.75)
+        snapshot = self.manager.metrics()
+        self.assertEqual(snapshot["counters"]["driver_searches"], 2)
+        self.assertEqual(snapshot["counters"]["driver_searches_empty"], 1)
+        self.assertEqual(snapshot["counters"]["rides_matched"], 1)
+        self.assertEqual(snapshot["rates"]["no_driver_rate"], 0.5)
+        self.assertEqual(snapshot["histograms"]["request_ride"]["count"], 2)
+        self.assertEqual(snapshot["rates"]["expansion_rate"], 0.5)
+
+    def test_nearby_drivers_do_not_count_as_expansion(self):
+        self.manager.enable_metrics()
+        for i in range(50):
+            self.manager.register_driver(Driver(f"n{i}@email.com", f"N{i}", -79.64 + i * 1e-5, 43.5901))
+        for i in range(5):
+            self.request(f"r{i}", -79.6401)
+        snapshot = self.manager.metrics()
+        self.assertEqual(snapshot["counters"]["nearest_queries"], 5)
+        self.assertEqual(snapshot["rates"]["expansion_rate"], 0.0)
+
+    def test_prometheus_export(self):
+        self.manager.enable_metrics()
+        self.request("near", -79.641)
+        text = self.manager.dispatch_metrics.to_prometheus()
+        self.assertIn("# TYPE ride_sharing_request_ride_seconds summary", text)
+        self.assertIn('ride_sharing_nearest_query_seconds{quantile="0.99"}', text)
+        self.assertIn("ride_sharing_driver_searches_total 1", text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dispatch.prom")
+            self.manager.dispatch_metrics.write_prometheus(path)
+            with open(path) as file:
+                self.assertEqual(file.read(), text)
+
+        server = self.manager.dispatch_metrics.serve_prometheus(port=0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                self.assertIn("ride_sharing_driver_searches_total 1", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from src.core.journal import DURABILITY_ALWAYS, RideJournal, recover
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import load_snapshot, save_snapshot
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.pool_dispatcher import PoolDispatcher
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestPoolDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.clock = FakeClock()
+        self.pool = PoolDispatcher(self.ride_system, clock=self.clock)
+        self.west = Driver("west@email.com", "West", longitude=-79.70, latitude=43.60, capacity=2)
+        self.east = Driver("east@email.com", "East", longitude=-79.62, latitude=43.62)
+        self.manager.register_driver(self.west)
+        self.manager.register_driver(self.east)
+
+    def request(self, name: str, longitude: float, latitude: float, destination: Location):
+        return self.pool.request_ride(Rider(f"{name}@email.com", name, longitude=longitude, latitude=latitude), destination)
+
+    def test_requests_along_the_way_share_the_car(self):
+        first = self.request("first", -79.69, 43.60, Location(43.60, -79.60))
+        second = self.request("second", -79.68, 43.601, Location(43.60, -79.61))
+        self.assertIs(first.driver, self.west)
+        self.assertIs(second.driver, self.west)
+        self.assertTrue(self.east.is_available)
+        self.assertFalse(self.west.is_available)
+        self.assertEqual(
+            [(stop.ride, stop.is_pickup) for stop in self.west.stops],
+            [(first, True), (second, True), (second, False), (first, False)]
+        )
+
+        self.assertIs(self.pool.arrive(self.west).ride, first)
+        self.assertEqual(first.ride_status, RideStatus.IN_TRIP)
+        for _ in range(3):
+            self.pool.arrive(self.west)
+        self.assertEqual((first.ride_status, second.ride_status), (RideStatus.COMPLETED, RideStatus.COMPLETED))
+        self.assertTrue(self.west.is_available)
+        self.assertEqual(self.pool.routes, {})
+        self.assertEqual(len(self.pool.corridors), 0)
+
+    def test_capacity_and_detour_limits(self):
+        self.request("first", -79.69, 43.60, Location(43.60, -79.60))
+        self.request("second", -79.68, 43.601, Location(43.60, -79.61))
+        # The west car is full, so the third rider goes to the east car
+        third = self.request("third", -79.67, 43.60, Location(43.60, -79.62))
+        self.assertIs(third.driver, self.east)
+        # Serving this pickup would keep someone's rider waiting or riding too long, so it gets no driver
+        detour = self.request("detour", -79.67, 43.68, Location(43.69, -79.66))
+        self.assertIsNone(detour.driver)
+        self.assertEqual(detour.ride_status, RideStatus.CANCELLED)
+
+    def test_cancel_before_pickup_frees_the_driver(self):
+        ride = self.request("first", -79.69, 43.60, Location(43.60, -79.60))
+        self.pool.cancel_ride(ride)
+        self.assertEqual(ride.ride_status, RideStatus.CANCELLED)
+        self.assertEqual(self.west.stops, [])
+        self.assertTrue(self.west.is_available)
+        self.assertIsNone(ride.rider.current_ride)
+
+    def assert_route_restored(self, manager: RideSharingManager, first, second):
+        west = manager.get_driver(self.west.user_id)
+        self.assertEqual(west.capacity, 2)
+        self.assertIsNone(west.current_ride)
+        self.assertEqual(
+            [(stop.ride.ride_id, stop.is_pickup, stop.deadline) for stop in west.stops],
+            [(stop.ride.ride_id, stop.is_pickup, stop.deadline) for stop in self.west.stops]
+        )
+        # A dispatcher over the restored manager serves the route; the car is freed only after the last dropoff
+        pool = PoolDispatcher(RideSystem(MISSISSAUGA_BBOX, manager), clock=self.clock)
+        self.assertEqual(set(pool.routes), {west.user_id})
+        for _ in range(3):
+            pool.arrive(west)
+            self.assertFalse(west.is_available)
+        pool.arrive(west)
+        self.assertTrue(west.is_available)
+        self.assertEqual([manager.get_ride(ride.ride_id).ride_status for ride in (first, second)], [RideStatus.COMPLETED] * 2)
+
+    def test_route_survives_snapshot(self):
+        first = self.request("first", -79.69, 43.60, Location(43.60, -79.60))
+        second = self.request("second", -79.68, 43.601, Location(43.60, -79.61))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.snap")
+            save_snapshot(self.manager, path)
+            restored = load_snapshot(path)
+        self.assert_route_restored(restored, first, second)
+
+    def test_route_survives_journal_recovery(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path, snapshot_path = os.path.join(directory, "rides.journal"), os.path.join(directory, "rides.snap")
+            journal = RideJournal(path, DURABILITY_ALWAYS)
+            self.manager.attach_journal(journal)
+            journal.checkpoint(self.manager, snapshot_path)
+            # The route is built after the checkpoint, so only the journal has it
+            first = self.request("first", -79.69, 43.60, Location(43.60, -79.60))
+            second = self.request("second", -79.68, 43.601, Location(43.60, -79.61))
+            recovered = recover(path, snapshot_path)
+            journal.close()
+        self.assert_route_restored(recovered, first, second)
+
+if __name__ == "__main__":
+    unittest.main()
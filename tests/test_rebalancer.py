@@ -0,0 +1,80 @@
+import unittest
+from src.core.demand_forecast import DemandForecaster
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.zone_grid import ZoneGrid
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.rebalancer import Rebalancer
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestDemandForecaster(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.forecaster = DemandForecaster(ZoneGrid(MISSISSAUGA_BBOX, 2.0), bucket_seconds=60.0, smoothing=0.5, clock=self.clock)
+        self.zone = self.forecaster.zones.zone_of(43.6, -79.6)
+
+    def test_moving_average_per_bucket(self):
+        for _ in range(4):
+            self.forecaster.record_request(43.6, -79.6)
+        # Requests of the running bucket are not forecast yet
+        self.assertEqual(self.forecaster.forecast()[self.zone], 0.0)
+        self.clock.now = 60.0
+        first = self.forecaster.forecast()
+        self.assertEqual(first[self.zone], 2.0)
+        self.assertIs(self.forecaster.forecast(), first)
+        self.assertFalse(first.flags.writeable)
+        # Two empty buckets halve the average twice
+        self.clock.now = 180.0
+        self.assertEqual(self.forecaster.forecast()[self.zone], 0.5)
+        self.assertEqual(first[self.zone], 2.0)
+
+    def test_invalid_smoothing(self):
+        with self.assertRaises(ValueError):
+            DemandForecaster(ZoneGrid(MISSISSAUGA_BBOX), smoothing=0.0)
+
+class TestRebalancer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        forecaster = DemandForecaster(ZoneGrid(MISSISSAUGA_BBOX, 2.0), bucket_seconds=60.0, clock=self.clock)
+        self.rebalancer = Rebalancer(self.ride_system, forecaster, max_distance_km=8.0)
+        self.busy_zone = forecaster.zones.zone_of(43.6, -79.6)
+
+    def test_surplus_drivers_move_towards_forecast_demand(self):
+        near = [Driver(f"near{i}@email.com", "Near", longitude=-79.64, latitude=43.63 + i * 0.001) for i in range(3)]
+        far = Driver("far@email.com", "Far", longitude=-79.52, latitude=43.51)
+        for driver in near + [far]:
+            self.manager.register_driver(driver)
+        self.assertEqual(self.rebalancer.plan(), [])
+
+        for index in range(10):
+            self.ride_system.create_ride_request(Rider(f"r{index}@email.com", "R", longitude=-79.6, latitude=43.6), Location(43.65, -79.55))
+        self.clock.now = 60.0
+        suggestions = self.rebalancer.plan()
+        # All demand is in one zone, so every driver belongs there; the far one is out of reach
+        self.assertEqual({driver for driver, _ in suggestions}, set(near))
+        for driver, target in suggestions:
+            self.assertEqual(self.rebalancer.forecaster.zones.zone_of(target.latitude, target.longitude), self.busy_zone)
+            self.assertLessEqual(driver.current_location.calculate_distance_in_km(target), 8.0)
+
+    def test_busy_drivers_are_not_moved(self):
+        driver = Driver("d@email.com", "D", longitude=-79.64, latitude=43.66)
+        self.manager.register_driver(driver)
+        self.ride_system.create_ride_request(Rider("r@email.com", "R", longitude=-79.6, latitude=43.6), Location(43.65, -79.55))
+        self.clock.now = 60.0
+        self.manager.set_driver_availability(driver, False)
+        self.assertEqual(self.rebalancer.plan(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import itertools
+import os
+import tempfile
+import unittest
+from src.core.ride_history import RideHistoryStore
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestRideHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = itertools.count(1000.0)
+        self.history = RideHistoryStore(recent_capacity=2, batch_rows=3, clock=lambda: next(self.clock))
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.manager.attach_history(self.history)
+        self.driver = Driver("d1@email.com", "D1", longitude=-79.64, latitude=43.59)
+        self.manager.register_driver(self.driver)
+        self.rider = Rider("r1@email.com", "R1", longitude=-79.65, latitude=43.60)
+
+    def tearDown(self):
+        self.history.close()
+
+    def complete_ride(self):
+        ride = self.ride_system.request_ride(self.rider, Location(43.61, -79.64))
+        ride.start_ride()
+        self.ride_system.complete_ride(ride)
+        return ride
+
+    def test_finished_rides_leave_memory(self):
+        rides = [self.complete_ride() for _ in range(3)]
+        self.assertEqual(self.manager.rides, {})
+        self.assertEqual(self.rider.ride_history, [])
+        self.assertEqual(self.driver.drive_history, [])
+        # Only the two most recent rides are still held as objects
+        self.assertIsNone(self.manager.get_ride(rides[0].ride_id))
+        self.assertIs(self.manager.get_ride(rides[2].ride_id), rides[2])
+        record = self.history.get(rides[0].ride_id)
+        self.assertEqual(record.ride_status, RideStatus.COMPLETED)
+        self.assertEqual((record.rider_id, record.driver_id), (self.rider.user_id, self.driver.user_id))
+        self.assertEqual(self.history.count(), 3)
+
+    def test_history_queries_are_newest_first_and_windowed(self):
+        rides = [self.complete_ride() for _ in range(4)]
+        unmatched = self.ride_system.request_ride(Rider("far@email.com", "Far", longitude=-79.51, latitude=43.69), Location(43.6, -79.6))
+        self.assertEqual(unmatched.ride_status, RideStatus.CANCELLED)
+
+        driver_rides = self.history.rides_for_driver(self.driver.user_id)
+        self.assertEqual([record.ride_id for record in driver_rides], [ride.ride_id for ride in reversed(rides)])
+        self.assertEqual([record.ride_id for record in self.history.rides_for_rider(self.rider.user_id, limit=2)],
+                         [rides[3].ride_id, rides[2].ride_id])
+        self.assertEqual([record.ride_id for record in self.history.rides_between(1001.0, 1003.0)],
+                         [rides[2].ride_id, rides[1].ride_id])
+        self.assertEqual(self.history.rides_for_rider(unmatched.rider.user_id)[0].ride_status, RideStatus.CANCELLED)
+
+    def test_queries_use_indexes(self):
+        for column in ("rider_id", "driver_id"):
+            plan = self.history.connection.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM rides WHERE {column} = ? AND finished_at >= ? ORDER BY finished_at DESC", ("x", 0.0)
+            ).fetchall()
+            self.assertIn("USING INDEX", " ".join(row[-1] for row in plan))
+            self.assertNotIn("TEMP B-TREE", " ".join(row[-1] for row in plan))
+
+    def test_rides_finished_before_attaching_are_moved(self):
+        manager = RideSharingManager()
+        ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+        manager.register_driver(Driver("d2@email.com", "D2", longitude=-79.64, latitude=43.59))
+        rider = Rider("r2@email.com", "R2", longitude=-79.65, latitude=43.60)
+        finished = ride_system.request_ride(rider, Location(43.61, -79.64))
+        finished.start_ride()
+        ride_system.complete_ride(finished)
+        in_flight = ride_system.request_ride(rider, Location(43.61, -79.64))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.db")
+            with RideHistoryStore(path) as history:
+                manager.attach_history(history)
+                self.assertEqual(set(manager.rides), {in_flight.ride_id})
+            with RideHistoryStore(path) as reopened:
+                self.assertEqual(reopened.get(finished.ride_id).ride_status, RideStatus.COMPLETED)
+
+if __name__ == "__main__":
+    unittest.main()
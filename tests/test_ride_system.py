@@ -0,0 +1,24 @@
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestRideSystem(unittest.TestCase):
+    def setUp(self):
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        self.rider = Rider("rider@email.com", "Rider", longitude=-79.64, latitude=43.59)
+
+    def test_unmatched_request_frees_rider(self):
+        ride = self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.assertEqual(ride.ride_status, RideStatus.CANCELLED)
+        self.assertIsNone(self.rider.current_ride)
+
+        # Once a driver shows up the same rider can ask again
+        self.ride_system.ride_sharing_manager.register_driver(Driver("d@email.com", "D", -79.641, 43.59))
+        ride = self.ride_system.request_ride(self.rider, Location(43.65, -79.59))
+        self.assertEqual(ride.ride_status, RideStatus.PICKING_UP)
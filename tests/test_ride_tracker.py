@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from src.core.ride_history import RideHistoryStore
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import load_snapshot, save_snapshot
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestRideTracker(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        for index, longitude in enumerate((-79.64, -79.63, -79.75)):
+            self.manager.register_driver(Driver(f"d{index}@email.com", f"D{index}", longitude=longitude, latitude=43.59))
+        self.riders = [Rider(f"r{index}@email.com", f"R{index}", longitude=longitude, latitude=43.59)
+                       for index, longitude in enumerate((-79.641, -79.631, -79.751, -79.51))]
+
+    def test_transitions_move_rides_between_status_sets(self):
+        rides = [self.ride_system.request_ride(rider, Location(43.6, -79.6)) for rider in self.riders]
+        rides[0].start_ride()
+        rides[1].start_ride()
+        self.ride_system.complete_ride(rides[1])
+
+        counts = self.manager.ride_status_counts()
+        self.assertEqual(counts[RideStatus.IN_TRIP], 1)
+        self.assertEqual(counts[RideStatus.PICKING_UP], 1)
+        self.assertEqual(counts[RideStatus.COMPLETED], 1)
+        # The fourth rider is out of reach of every driver
+        self.assertEqual(counts[RideStatus.CANCELLED], 1)
+        self.assertEqual(counts[RideStatus.NEW], 0)
+        self.assertEqual({ride.ride_id for ride in self.manager.active_rides()},
+                         {ride.ride_id for ride in self.manager.rides.values() if ride.ride_is_active()})
+
+    def test_active_counts_by_region_follow_pickups(self):
+        west = self.ride_system.request_ride(self.riders[2], Location(43.6, -79.6))
+        east = [self.ride_system.request_ride(rider, Location(43.6, -79.6)) for rider in self.riders[:2]]
+        regions = self.manager.ride_tracker.regions
+        west_region = regions.shard_of(-79.751, 43.59)
+        east_region = regions.shard_of(-79.641, 43.59)
+        self.assertEqual(self.manager.active_ride_counts_by_region(), {west_region: 1, east_region: 2})
+
+        self.ride_system.cancel_ride(west)
+        east[0].start_ride()
+        self.assertEqual(self.manager.active_ride_counts_by_region(), {east_region: 2})
+
+    def test_snapshot_restore_and_history_spill_keep_sets_in_step(self):
+        ride = self.ride_system.request_ride(self.riders[0], Location(43.6, -79.6))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.snap")
+            save_snapshot(self.manager, path)
+            restored = load_snapshot(path)
+        self.assertEqual([active.ride_id for active in restored.active_rides()], [ride.ride_id])
+
+        with RideHistoryStore() as history:
+            self.manager.attach_history(history)
+            ride.start_ride()
+            self.ride_system.complete_ride(ride)
+            self.assertEqual(self.manager.active_rides(), [])
+            self.assertEqual(sum(self.manager.ride_status_counts().values()), len(self.manager.rides))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import random
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.shard_grid import ShardGrid
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.models.users.user import user_id_for
+from src.usecases.ride_system import RideSystem
+from src.usecases.sharded_ride_system import DriverRecord, RideRequest, ShardedRideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestShardGrid(unittest.TestCase):
+    def setUp(self):
+        self.grid = ShardGrid(MISSISSAUGA_BBOX, 2, 3)
+
+    def test_shard_of_clamps_outside_points(self):
+        self.assertEqual(self.grid.shard_of(-79.79, 43.51), 0)
+        self.assertEqual(self.grid.shard_of(-79.51, 43.69), 5)
+        self.assertEqual(self.grid.shard_of(-81.0, 45.0), 3)
+
+    def test_shards_within_covers_neighbours_near_border(self):
+        # The column border sits at -79.7; 1km west of it is ~0.0124 degrees at this latitude
+        self.assertEqual(self.grid.shards_within(-79.71, 43.55, 0.5), [0])
+        self.assertEqual(self.grid.shards_within(-79.71, 43.55, 2.0), [0, 1])
+
+    def test_distance_to_neighbours_ignores_outer_border(self):
+        self.assertAlmostEqual(self.grid.distance_to_neighbours_km(-79.71, 43.51), 0.01 * 111.0 * 0.7245, places=1)
+        self.assertEqual(ShardGrid(MISSISSAUGA_BBOX, 1, 1).distance_to_neighbours_km(-79.71, 43.51), float("inf"))
+
+
+class TestShardedRideSystem(unittest.TestCase):
+    def setUp(self):
+        self.system = ShardedRideSystem(MISSISSAUGA_BBOX, 1, 2, use_processes=False)
+
+    def tearDown(self):
+        self.system.close()
+
+    def request(self, name, latitude, longitude):
+        return RideRequest(f"{name}@email.com", name, latitude, longitude, 43.65, -79.59)
+
+    def test_cross_border_driver_beats_local_driver(self):
+        # The border is at -79.65; the rider is just west of it
+        self.system.register_drivers([
+            DriverRecord("west@email.com", "West", -79.67, 43.6),
+            DriverRecord("east@email.com", "East", -79.648, 43.6)
+        ])
+        assignment = self.system.request_rides([self.request("rider", 43.6, -79.651)])[0]
+        self.assertEqual(assignment.driver_id, user_id_for("east@email.com"))
+        self.assertEqual(assignment.shard_id, 1)
+
+    def test_local_match_and_duplicate_rider_rejected(self):
+        self.system.register_drivers([DriverRecord("d@email.com", "D", -79.75, 43.6)])
+        assignment = self.system.request_rides([self.request("rider", 43.6, -79.751)])[0]
+        self.assertEqual(assignment.shard_id, 0)
+        with self.assertRaises(Exception):
+            self.system.request_rides([self.request("rider", 43.6, -79.751)])
+
+    def test_driver_ping_moves_driver_to_new_shard(self):
+        self.system.register_drivers([DriverRecord("d@email.com", "D", -79.75, 43.6)])
+        driver_id = user_id_for("d@email.com")
+        self.system.update_driver_locations([(driver_id, 43.6, -79.55)])
+        self.assertEqual(self.system.driver_shards[driver_id], 1)
+        self.assertNotIn(driver_id, self.system.shards[0].service.manager.drivers)
+        assignment = self.system.request_rides([self.request("rider", 43.6, -79.551)])[0]
+        self.assertEqual(assignment.driver_id, driver_id)
+
+    def test_completed_trip_rehomes_driver(self):
+        self.system.register_drivers([DriverRecord("d@email.com", "D", -79.75, 43.6)])
+        assignment = self.system.request_rides([self.request("rider", 43.6, -79.751)])[0]
+        self.system.start_ride(assignment.ride_id)
+        self.system.complete_ride(assignment.ride_id)
+        # The destination is in the eastern shard
+        self.assertEqual(self.system.driver_shards[assignment.driver_id], 1)
+        self.assertEqual(self.system.active_rides, {})
+
+    def test_moved_driver_keeps_history(self):
+        self.system.register_drivers([DriverRecord("d@email.com", "D", -79.75, 43.6)])
+        assignment = self.system.request_rides([self.request("rider", 43.6, -79.751)])[0]
+        driver = self.system.shards[0].service.manager.get_driver(assignment.driver_id)
+        driver.capacity = 6
+        self.system.start_ride(assignment.ride_id)
+        self.system.complete_ride(assignment.ride_id)
+        moved = self.system.shards[1].service.manager.get_driver(assignment.driver_id)
+        self.assertIs(moved, driver)
+        self.assertEqual([ride.ride_id for ride in moved.drive_history], [assignment.ride_id])
+        self.assertEqual(moved.capacity, 6)
+        # The driver is matched from the new shard, and a ping back moves them again with the same history
+        self.system.update_driver_locations([(assignment.driver_id, 43.6, -79.75)])
+        self.assertIs(self.system.shards[0].service.manager.get_driver(assignment.driver_id), driver)
+        self.assertEqual(len(driver.drive_history), 1)
+
+    def test_matches_single_system_nearest_driver(self):
+        rng = random.Random(3)
+        sharded = ShardedRideSystem(MISSISSAUGA_BBOX, 3, 3, use_processes=False)
+        single = RideSystem(MISSISSAUGA_BBOX, RideSharingManager())
+        records = [
+            DriverRecord(f"d{i}@email.com", f"d{i}", rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)) for i in range(300)
+        ]
+        sharded.register_drivers(records)
+        for record in records:
+            single.ride_sharing_manager.register_driver(Driver(record.email, record.user_name, record.longitude, record.latitude))
+        for i in range(100):
+            request = self.request(f"r{i}", rng.uniform(43.5, 43.7), rng.uniform(-79.8, -79.5))
+            assignment = sharded.request_rides([request])[0]
+            ride = single.request_ride(
+                Rider(request.rider_email, request.rider_name, request.pickup_longitude, request.pickup_latitude),
+                Location(request.destination_latitude, request.destination_longitude)
+            )
+            self.assertEqual(assignment.driver_id if assignment else None, ride.driver.user_id if ride.driver else None)
+        sharded.close()
+
+    def test_worker_processes(self):
+        with ShardedRideSystem(MISSISSAUGA_BBOX, 1, 2) as system:
+            system.register_drivers([DriverRecord("east@email.com", "East", -79.648, 43.6)])
+            assignments = system.request_rides([self.request("a", 43.6, -79.651), self.request("b", 43.6, -79.652)])
+            self.assertEqual(assignments[0].driver_id, user_id_for("east@email.com"))
+            self.assertIsNone(assignments[1])
+            system.start_ride(assignments[0].ride_id)
+            # Worker errors are re-raised in the router
+            with self.assertRaisesRegex(Exception, "picking-up"):
+                system.start_ride(assignments[0].ride_id)
+            system.complete_ride(assignments[0].ride_id)
+            # The driver crosses shards with their history, pickled through both workers' pipes
+            system.update_driver_locations([(assignments[0].driver_id, 43.6, -79.75)])
+            self.assertEqual(system.driver_shards[assignments[0].driver_id], 0)
+            assignment = system.request_rides([self.request("c", 43.6, -79.751)])[0]
+            self.assertEqual(assignment.driver_id, user_id_for("east@email.com"))
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import SnapshotError, load_snapshot, save_snapshot
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.snap")
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.drivers = [
+            Driver("d1@email.com", "D1", longitude=-79.64, latitude=43.59),
+            Driver("d2@email.com", "D2", longitude=-79.60, latitude=43.62),
+            Driver("d3@email.com", "D3", longitude=-79.70, latitude=43.58),
+        ]
+        for driver in self.drivers:
+            self.manager.register_driver(driver)
+        self.riders = [Rider("r1@email.com", "R1", longitude=-79.65, latitude=43.60), Rider("r2@email.com", "R2", longitude=-79.61, latitude=43.62)]
+        for rider in self.riders:
+            self.manager.register_rider(rider)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_keeps_registries_and_in_flight_rides(self):
+        completed = self.ride_system.request_ride(self.riders[0], Location(43.65, -79.59))
+        completed.start_ride()
+        self.ride_system.complete_ride(completed)
+        in_flight = self.ride_system.request_ride(self.riders[1], Location(43.55, -79.70))
+        self.drivers[2].update_location(43.57, -79.71)
+
+        save_snapshot(self.manager, self.path)
+        restored = load_snapshot(self.path)
+
+        self.assertEqual(set(restored.drivers), set(self.manager.drivers))
+        self.assertEqual(set(restored.riders), set(self.manager.riders))
+        self.assertEqual(set(restored.rides), {completed.ride_id, in_flight.ride_id})
+        ride = restored.get_ride(in_flight.ride_id)
+        self.assertEqual(ride.ride_status, RideStatus.PICKING_UP)
+        self.assertEqual(ride.driver.user_id, in_flight.driver.user_id)
+        self.assertIs(ride.driver.current_ride, ride)
+        self.assertIs(restored.get_rider(self.riders[1].user_id).current_ride, ride)
+        self.assertFalse(ride.driver.is_available)
+        self.assertIn(ride.driver.user_id, restored.busy_index)
+
+        driver = restored.get_driver(self.drivers[2].user_id)
+        self.assertEqual((driver.current_location.latitude, driver.current_location.longitude), (43.57, -79.71))
+        self.assertEqual(driver.email, "d3@email.com")
+        history = restored.get_driver(completed.driver.user_id).drive_history
+        self.assertEqual([ride.ride_id for ride in history], [completed.ride_id])
+        self.assertEqual(restored.get_rider(self.riders[0].user_id).ride_history[0].ride_status, RideStatus.COMPLETED)
+
+    def test_round_trip_keeps_active_counts_by_region(self):
+        self.ride_system.request_ride(self.riders[0], Location(43.65, -79.59))
+        self.ride_system.request_ride(self.riders[1], Location(43.55, -79.70))
+        counts = self.manager.active_ride_counts_by_region()
+        self.assertEqual(sum(counts.values()), 2)
+        save_snapshot(self.manager, self.path)
+        self.assertEqual(load_snapshot(self.path).active_ride_counts_by_region(), counts)
+
+    def test_restored_manager_dispatches(self):
+        save_snapshot(self.manager, self.path)
+        restored = load_snapshot(self.path)
+        ride_system = RideSystem(MISSISSAUGA_BBOX, restored)
+        self.assertEqual(len(restored.available_index), 3)
+
+        rider = restored.get_rider(self.riders[0].user_id)
+        ride = ride_system.request_ride(rider, Location(43.65, -79.59))
+        self.assertEqual(ride.driver.user_id, self.drivers[0].user_id)
+        ride.driver.update_location(43.60, -79.65)
+        self.assertEqual(len(restored.available_index), 2)
+        self.assertIn(ride.driver.user_id, restored.busy_index)
+        new_driver = Driver("d4@email.com", "D4", longitude=-79.64, latitude=43.59)
+        restored.register_driver(new_driver)
+        self.assertEqual(new_driver.slot, 3)
+
+    def test_keeps_drivers_that_left_the_registry(self):
+        ride = self.ride_system.request_ride(self.riders[0], Location(43.65, -79.59))
+        self.manager.unregister_driver(ride.driver)
+        save_snapshot(self.manager, self.path)
+        restored = load_snapshot(self.path)
+        self.assertNotIn(ride.driver.user_id, restored.drivers)
+        self.assertEqual(restored.get_ride(ride.ride_id).driver.current_location.latitude, 43.59)
+
+    def test_quadtree_backend(self):
+        manager = RideSharingManager()
+        manager.initialize_spatial_index(MISSISSAUGA_BBOX, "quadtree")
+        manager.register_driver(Driver("q@email.com", "Q", longitude=-79.64, latitude=43.59))
+        save_snapshot(manager, self.path)
+        restored = load_snapshot(self.path)
+        self.assertEqual(len(restored.available_index.nearest(-79.64, 43.59, 1, 1.0)), 1)
+
+    def test_rejects_corrupt_files(self):
+        save_snapshot(self.manager, self.path)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        with open(self.path, "wb") as file:
+            file.write(data[:len(data) // 2])
+        with self.assertRaises(SnapshotError):
+            load_snapshot(self.path)
+        with open(self.path, "wb") as file:
+            file.write(b"NOTASNAP" + data[8:])
+        with self.assertRaises(SnapshotError):
+            load_snapshot(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import random
+import unittest
+from unittest.mock import Mock
+from src.core.spatial_index import GridSpatialIndex, QuadTreeSpatialIndex, hilbert_keys
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.users.driver import Driver
+from src.models.location.location import haversine_km
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestGridSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = GridSpatialIndex(MISSISSAUGA_BBOX)
+        self.index.insert("d1", "driver1", -79.64, 43.59)
+        self.index.insert("d2", "driver2", -79.60, 43.62)
+
+    def test_intersect(self):
+        self.assertEqual(self.index.intersect([-79.65, 43.58, -79.63, 43.60]), ["driver1"])
+        self.assertCountEqual(self.index.intersect(MISSISSAUGA_BBOX), ["driver1", "driver2"])
+
+    def test_move_to_new_cell(self):
+        self.index.move("d1", -79.55, 43.68)
+        self.assertEqual(self.index.intersect([-79.65, 43.58, -79.63, 43.60]), [])
+        self.assertEqual(self.index.intersect([-79.56, 43.67, -79.54, 43.69]), ["driver1"])
+        self.assertEqual(len(self.index), 2)
+
+    def test_remove(self):
+        self.assertTrue(self.index.remove("d1"))
+        self.assertFalse(self.index.remove("d1"))
+        self.assertNotIn("d1", self.index)
+        self.assertEqual(self.index.intersect(MISSISSAUGA_BBOX), ["driver2"])
+
+    def test_query_larger_than_occupied_cells(self):
+        world = [-180.0, -90.0, 180.0, 90.0]
+        self.assertCountEqual(self.index.intersect(world), ["driver1", "driver2"])
+
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        index = GridSpatialIndex(MISSISSAUGA_BBOX, cell_size_km=0.5)
+        points = {}
+        for i in range(500):
+            longitude, latitude = rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)
+            index.insert(i, i, longitude, latitude)
+            points[i] = (longitude, latitude)
+
+        for _ in range(20):
+            longitude, latitude = rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)
+            expected = sorted(
+                (haversine_km(latitude, longitude, lat, lon), i) for i, (lon, lat) in points.items()
+            )
+            expected = [i for distance, i in expected if distance <= 3.0][:5]
+            self.assertEqual([i for i, _ in index.nearest(longitude, latitude, 5, 3.0)], expected)
+
+    def test_nearest_respects_max_radius(self):
+        self.assertEqual(self.index.nearest(-79.75, 43.52, 3, 1.0), [])
+        nearest = self.index.nearest(-79.64, 43.59, 3, 10.0)
+        self.assertEqual([item for item, _ in nearest], ["driver1", "driver2"])
+
+
+class TestQuadTreeSpatialIndex(unittest.TestCase):
+    def test_move(self):
+        index = QuadTreeSpatialIndex(MISSISSAUGA_BBOX)
+        index.insert("d1", "driver1", -79.64, 43.59)
+        index.move("d1", -79.55, 43.68)
+        self.assertEqual(index.intersect([-79.65, 43.58, -79.63, 43.60]), [])
+        self.assertEqual(index.intersect([-79.56, 43.67, -79.54, 43.69]), ["driver1"])
+
+    def test_nearest(self):
+        index = QuadTreeSpatialIndex(MISSISSAUGA_BBOX)
+        index.insert("d1", "driver1", -79.64, 43.59)
+        index.insert("d2", "driver2", -79.60, 43.62)
+        self.assertEqual([item for item, _ in index.nearest(-79.61, 43.62, 2, 10.0)], ["driver2", "driver1"])
+
+
+class TestManagerLocationUpdates(unittest.TestCase):
+    def test_driver_ping_moves_index_entry(self):
+        manager = RideSharingManager()
+        manager.initialize_spatial_index(MISSISSAUGA_BBOX)
+        driver = Driver(email="grid@email.com", user_name="grid", longitude=-79.64, latitude=43.59)
+        manager.register_driver(driver)
+
+        driver.update_location(43.68, -79.55)
+        self.assertEqual(manager.available_index.intersect([-79.65, 43.58, -79.63, 43.60]), [])
+        self.assertEqual(manager.available_index.intersect([-79.56, 43.67, -79.54, 43.69]), [driver])
+
+    def test_availability_moves_driver_between_indexes(self):
+        manager = RideSharingManager()
+        manager.initialize_spatial_index(MISSISSAUGA_BBOX)
+        driver = Driver(email="busy@email.com", user_name="busy", longitude=-79.64, latitude=43.59)
+        manager.register_driver(driver)
+
+        driver.accept_ride(Mock())
+        self.assertEqual(manager.available_index.intersect(MISSISSAUGA_BBOX), [])
+        self.assertEqual(manager.busy_index.intersect(MISSISSAUGA_BBOX), [driver])
+
+        driver.update_location(43.68, -79.55)
+        self.assertEqual(manager.busy_index.intersect([-79.56, 43.67, -79.54, 43.69]), [driver])
+
+        driver.complete_ride()
+        self.assertEqual(manager.available_index.intersect([-79.56, 43.67, -79.54, 43.69]), [driver])
+        self.assertEqual(len(manager.busy_index), 0)
+
+
+class TestBulkLoading(unittest.TestCase):
+    def test_hilbert_keys_walk_neighbouring_cells(self):
+        side = 8
+        cells = [(x, y) for x in range(side) for y in range(side)]
+        keys = hilbert_keys([(x + 0.5) / side for x, _ in cells], [(y + 0.5) / side for _, y in cells], [0, 0, 1, 1], bits=3)
+        self.assertEqual(sorted(keys.tolist()), list(range(side * side)))
+        walk = [cells[position] for position in keys.argsort()]
+        for (x1, y1), (x2, y2) in zip(walk, walk[1:]):
+            self.assertEqual(abs(x1 - x2) + abs(y1 - y2), 1)
+
+    def test_bulk_insert_matches_single_inserts(self):
+        rng = random.Random(3)
+        points = [(f"d{i}", rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)) for i in range(500)]
+        for backend in (GridSpatialIndex, QuadTreeSpatialIndex):
+            single, bulk = backend(MISSISSAUGA_BBOX), backend(MISSISSAUGA_BBOX)
+            for item_id, longitude, latitude in points:
+                single.insert(item_id, item_id, longitude, latitude)
+            bulk.bulk_insert([item_id for item_id, _, _ in points], [item_id for item_id, _, _ in points],
+                             [longitude for _, longitude, _ in points], [latitude for _, _, latitude in points])
+            self.assertEqual(len(bulk), 500)
+            self.assertEqual(bulk.nearest(-79.64, 43.59, 10, 3.0), single.nearest(-79.64, 43.59, 10, 3.0))
+            bulk.move("d0", -79.64, 43.59)
+            self.assertEqual(bulk.nearest(-79.64, 43.59, 1, 1.0)[0][0], "d0")
+
+
+class TestManagerBulkRegistration(unittest.TestCase):
+    def setUp(self):
+        self.manager = RideSharingManager()
+        self.manager.initialize_spatial_index(MISSISSAUGA_BBOX)
+        rng = random.Random(5)
+        self.drivers = [
+            Driver(email=f"bulk{i}@email.com", user_name=f"bulk{i}", longitude=rng.uniform(-79.8, -79.5), latitude=rng.uniform(43.5, 43.7))
+            for i in range(200)
+        ]
+
+    def test_registers_fleet_in_hilbert_order(self):
+        self.drivers[0].is_available = False
+        self.assertEqual(self.manager.register_drivers(self.drivers), 200)
+        self.assertEqual(len(self.manager.drivers), 200)
+        self.assertEqual(len(self.manager.available_index), 199)
+        self.assertIn(self.drivers[0].user_id, self.manager.busy_index)
+
+        by_slot = sorted(self.drivers, key=lambda driver: driver.slot)
+        self.assertEqual([driver.slot for driver in by_slot], list(range(200)))
+        step = [haversine_km(a.current_location.latitude, a.current_location.longitude, b.current_location.latitude, b.current_location.longitude)
+                for a, b in zip(by_slot, by_slot[1:])]
+        # Consecutive slots are spatial neighbours: the walk is far shorter than a random order's ~10km steps
+        self.assertLess(sum(step) / len(step), 3.0)
+
+        driver = self.drivers[5]
+        driver.update_location(43.68, -79.55)
+        self.assertIn(driver, self.manager.available_index.intersect([-79.56, 43.67, -79.54, 43.69]))
+
+    def test_duplicate_registers_nothing(self):
+        self.manager.register_driver(self.drivers[7])
+        with self.assertRaises(Exception):
+            self.manager.register_drivers(self.drivers)
+        self.assertEqual(len(self.manager.drivers), 1)
+        with self.assertRaises(Exception):
+            self.manager.register_drivers([self.drivers[1], self.drivers[1]])
+        self.assertEqual(len(self.manager.available_index), 1)
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from src.core.lazy_import import lazy_module
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.snapshot import save_snapshot
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem, start_ride_system
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestStartup(unittest.TestCase):
+    def test_importing_the_dispatcher_skips_heavy_modules(self):
+        script = (
+            "import sys\n"
+            "import src.core.ride_sharing_manager as module\n"
+            "import src.usecases.ride_system\n"
+            "print(sorted(name for name in ('numpy', 'pyqtree', 'http.server', 'src.core.road_network') if name in sys.modules))\n"
+            "print(module.default_manager is None)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split("\n")[:2], ["[]", "True"])
+
+    def test_lazy_module_imports_on_first_use(self):
+        math = lazy_module("math")
+        self.assertIs(math, sys.modules["math"])
+        module = lazy_module("colorsys")
+        self.assertAlmostEqual(module.rgb_to_hsv(1.0, 0.0, 0.0)[2], 1.0)
+        self.assertIs(module.rgb_to_hsv, sys.modules["colorsys"].rgb_to_hsv)
+
+    def test_prewarm_from_snapshot(self):
+        manager = RideSharingManager()
+        RideSystem(MISSISSAUGA_BBOX, manager)
+        driver = Driver("d1@email.com", "D1", longitude=-79.64, latitude=43.59)
+        manager.register_driver(driver)
+        rider = Rider("r1@email.com", "R1", longitude=-79.65, latitude=43.60)
+        manager.register_rider(rider)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.snap")
+            save_snapshot(manager, path)
+            ride_system = start_ride_system(MISSISSAUGA_BBOX, path)
+
+        restored = ride_system.ride_sharing_manager
+        self.assertIsNot(restored, manager)
+        self.assertEqual(set(restored.drivers), {driver.user_id})
+        ride = ride_system.request_ride(restored.riders[rider.user_id], Location(43.65, -79.59))
+        self.assertEqual(ride.driver.user_id, driver.user_id)
+
+    def test_scenarios_run_on_snapshot_of_earlier_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.snap")
+            script = (
+                "import sys\n"
+                "from main import run_simulation\n"
+                "from src.core.ride_sharing_manager import get_ride_sharing_manager\n"
+                "from src.core.snapshot import save_snapshot\n"
+                "run_simulation()\n"
+                "save_snapshot(get_ride_sharing_manager(), sys.argv[1])\n"
+            )
+            subprocess.run([sys.executable, "-c", script, path], cwd=REPOSITORY_ROOT, capture_output=True, check=True)
+            # The snapshot already holds every scenario participant
+            result = subprocess.run([sys.executable, "main.py", "--snapshot", path], cwd=REPOSITORY_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn("An error occurred", result.stdout)
+        self.assertIn("SIMULATION COMPLETE", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.core.surge_pricing import MAX_SURGE, fare
+from src.models.location.location import Location
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestSurgePricing(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+        self.manager.register_driver(Driver("early@email.com", "Early", longitude=-79.64, latitude=43.59))
+        self.pricing = self.ride_system.enable_surge_pricing(window_seconds=60.0, bucket_seconds=10.0, clock=self.clock)
+
+    def available_in(self, latitude: float, longitude: float) -> int:
+        return self.pricing.available[self.pricing.zones.zone_of(latitude, longitude)]
+
+    def test_supply_follows_driver_changes(self):
+        self.assertEqual(self.available_in(43.59, -79.64), 1)
+        driver = Driver("d@email.com", "D", longitude=-79.641, latitude=43.589)
+        self.manager.register_driver(driver)
+        self.assertEqual(self.available_in(43.59, -79.64), 2)
+
+        driver.update_location(43.65, -79.55)
+        self.assertEqual(self.available_in(43.59, -79.64), 1)
+        self.assertEqual(self.available_in(43.65, -79.55), 1)
+
+        ride = self.ride_system.request_ride(Rider("r@email.com", "R", longitude=-79.551, latitude=43.65), Location(43.6, -79.6))
+        self.assertIs(ride.driver, driver)
+        self.assertEqual(self.available_in(43.65, -79.55), 0)
+        # Pings of busy drivers do not count as supply
+        driver.update_location(43.59, -79.64)
+        self.assertEqual(self.available_in(43.59, -79.64), 1)
+
+        ride.start_ride()
+        self.ride_system.complete_ride(ride)
+        self.assertEqual(self.available_in(43.6, -79.6), 1)
+        self.manager.unregister_driver(driver)
+        self.assertEqual(sum(self.pricing.available), 1)
+
+    def test_demand_slides_out_of_the_window(self):
+        rider_location = (43.68, -79.52)
+        zone = self.pricing.zones.zone_of(*rider_location)
+        for _ in range(3):
+            self.pricing.record_request(*rider_location)
+        self.assertEqual(self.pricing.zone_multiplier(zone), 2.0)
+        for _ in range(10):
+            self.pricing.record_request(*rider_location)
+        self.assertEqual(self.pricing.zone_multiplier(zone), MAX_SURGE)
+
+        self.clock.now = 55.0
+        self.pricing.record_request(*rider_location)
+        self.assertEqual(self.pricing.requests[zone], 14)
+        self.clock.now = 65.0
+        self.assertEqual(self.pricing.heatmap().recent_requests.sum(), 1)
+        self.clock.now = 1000.0
+        self.assertEqual(self.pricing.zone_multiplier(zone), 1.0)
+
+        rider = Rider("r@email.com", "R", longitude=rider_location[1], latitude=rider_location[0])
+        self.assertEqual(self.ride_system.quote_fare(rider, Location(43.6, -79.6)),
+                         fare(rider.current_location.calculate_distance_in_km(Location(43.6, -79.6))))
+
+    def test_heatmap_matches_a_full_recount(self):
+        rng = random.Random(5)
+        drivers = [Driver(f"bulk{i}@email.com", f"bulk{i}", rng.uniform(-79.8, -79.5), rng.uniform(43.5, 43.7)) for i in range(200)]
+        self.manager.register_drivers(drivers)
+        for driver in rng.sample(drivers, 50):
+            driver.update_location(rng.uniform(43.5, 43.7), rng.uniform(-79.8, -79.5))
+        for driver in rng.sample(drivers, 30):
+            driver.is_available = False
+
+        heatmap = self.pricing.heatmap()
+        expected = [0] * len(self.pricing.available)
+        for driver in self.manager.drivers.values():
+            if driver.is_available:
+                expected[self.pricing.zones.zone_of(driver.current_location.latitude, driver.current_location.longitude)] += 1
+        self.assertEqual(heatmap.available_drivers.ravel().tolist(), expected)
+        self.assertEqual(heatmap.surge_multipliers.shape, (self.pricing.zones.rows, self.pricing.zones.columns))
+
+if __name__ == "__main__":
+    unittest.main()
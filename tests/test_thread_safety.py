@@ -0,0 +1,95 @@
+import random
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.location.location import Location
+from src.models.ride.ride_status import RideStatus
+from src.models.users.driver import Driver
+from src.models.users.rider import Rider
+from src.usecases.ride_system import RideSystem
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+class TestThreadSafety(unittest.TestCase):
+    def test_parallel_requests_never_double_assign(self):
+        rng = random.Random(11)
+        manager = RideSharingManager()
+        ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+        # Few drivers packed around the riders so requests fight over the same candidates
+        drivers = [
+            Driver(f"d{i}@email.com", f"d{i}", -79.64 + rng.uniform(-0.01, 0.01), 43.59 + rng.uniform(-0.01, 0.01))
+            for i in range(60)
+        ]
+        for driver in drivers:
+            manager.register_driver(driver)
+        riders = [Rider(f"r{i}@email.com", f"r{i}", -79.64, 43.59) for i in range(400)]
+        stop_pings = threading.Event()
+
+        def ping_drivers():
+            ping_rng = random.Random(5)
+            while not stop_pings.is_set():
+                driver = ping_rng.choice(drivers)
+                driver.update_location(43.59 + ping_rng.uniform(-0.01, 0.01), -79.64 + ping_rng.uniform(-0.01, 0.01))
+
+        def request_and_maybe_finish(rider):
+            ride = ride_system.request_ride(rider, Location(43.65, -79.59))
+            if ride.driver and rider.user_name.endswith(("0", "5")):
+                ride.start_ride()
+                ride_system.complete_ride(ride)
+            return ride
+
+        pinger = threading.Thread(target=ping_drivers)
+        pinger.start()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            rides = list(executor.map(request_and_maybe_finish, riders))
+        stop_pings.set()
+        pinger.join()
+
+        active = [ride for ride in rides if ride.ride_status == RideStatus.PICKING_UP]
+        active_drivers = [ride.driver.user_id for ride in active]
+        self.assertGreater(len(active), 0)
+        self.assertEqual(len(active_drivers), len(set(active_drivers)))
+        for ride in active:
+            self.assertIs(ride.driver.current_ride, ride)
+
+        # Every driver sits in exactly the index that matches their availability
+        for driver in drivers:
+            in_available = driver.user_id in manager.available_index
+            in_busy = driver.user_id in manager.busy_index
+            self.assertNotEqual(in_available, in_busy)
+            self.assertEqual(in_available, driver.is_available)
+            self.assertEqual(driver.is_available, driver.current_ride is None)
+            self.assertEqual(manager.driver_store.available[driver.slot], driver.is_available)
+
+    def test_registration_while_searching(self):
+        manager = RideSharingManager()
+        ride_system = RideSystem(MISSISSAUGA_BBOX, manager)
+        for i in range(200):
+            manager.register_driver(Driver(f"seed{i}@email.com", f"seed{i}", -79.64 + (i % 20) * 0.001, 43.59 + (i // 20) * 0.001))
+        ride = ride_system.create_ride_request(Rider("r@email.com", "r", -79.64, 43.59), Location(43.65, -79.59))
+        stop_searches = threading.Event()
+
+        def search():
+            found = 0
+            while not stop_searches.is_set():
+                found = max(found, len(ride_system.search_driver_in_radius_km(ride, 3.0)))
+            return found
+
+        # Switching threads often makes registrations land in the middle of column reads
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                searches = [executor.submit(search) for _ in range(3)]
+                try:
+                    # Growing the store's columns must wait for in-flight reads of them
+                    for i in range(20_000):
+                        manager.register_driver(Driver(f"new{i}@email.com", f"new{i}", -79.70, 43.60))
+                finally:
+                    stop_searches.set()
+                self.assertEqual([search.result() for search in searches], [200] * 3)
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(len(manager.driver_store), 20_200)
@@ -0,0 +1,130 @@
+import csv
+import gzip
+import os
+import tempfile
+import unittest
+from src.core.ride_sharing_manager import RideSharingManager
+from src.models.ride.ride_status import RideStatus
+from src.usecases.ride_system import RideSystem
+from src.usecases.trace_replay import (
+    TRACE_COLUMNS, TraceEvent, TraceReplayer, iter_trace, merge_traces, read_csv_chunks, read_parquet_chunks
+)
+
+MISSISSAUGA_BBOX = [-79.8, 43.5, -79.5, 43.7]
+
+ROWS = [
+    (0, "driver_ping", "d1", 43.59, -79.64, "", ""),
+    (1, "driver_ping", "d2", 43.60, -79.62, "", ""),
+    (2, "ride_request", "r1", 43.591, -79.641, 43.65, -79.6),
+    (3, "driver_ping", "d1", 43.592, -79.642, "", ""),
+    (4, "ride_request", "r2", 43.601, -79.621, 43.55, -79.7),
+    (5, "ride_complete", "r1", "", "", "", ""),
+    (6, "ride_cancel", "r2", "", "", "", ""),
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TestTraceReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = RideSharingManager()
+        self.ride_system = RideSystem(MISSISSAUGA_BBOX, self.manager)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_csv(self, name, rows, opener=open):
+        path = os.path.join(self.directory.name, name)
+        with opener(path, "wt", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(TRACE_COLUMNS)
+            writer.writerows(rows)
+        return path
+
+    def test_reads_csv_in_bounded_chunks(self):
+        path = self.write_csv("trace.csv", ROWS)
+        chunks = list(read_csv_chunks(path, chunk_rows=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(chunks[0][2], TraceEvent(2.0, "ride_request", "r1", 43.591, -79.641, 43.65, -79.6))
+        self.assertIsNone(chunks[0][0].destination_latitude)
+
+    def test_reads_gzip_and_skips_malformed_rows(self):
+        path = self.write_csv("trace.csv.gz", ROWS[:2] + [("later", "driver_ping", "d3", 1, 1, "", "")], gzip.open)
+        self.assertEqual([event.subject_id for event in iter_trace(path)], ["d1", "d2"])
+
+    def test_replays_full_lifecycle(self):
+        path = self.write_csv("trace.csv", ROWS)
+        replayer = TraceReplayer(self.ride_system)
+        stats = replayer.replay(iter_trace(path, chunk_rows=2))
+
+        self.assertEqual(stats.events, 7)
+        self.assertEqual(stats.drivers_registered, 2)
+        self.assertEqual(stats.pings, 3)
+        self.assertEqual((stats.requests, stats.matched, stats.completed, stats.cancelled), (2, 2, 1, 1))
+        self.assertEqual(replayer.active_rides, {})
+        driver = replayer.drivers["d1"]
+        self.assertTrue(driver.is_available)
+        self.assertEqual(driver.drive_history[0].ride_status, RideStatus.COMPLETED)
+        # Completing moves the driver to the drop-off
+        self.assertEqual(driver.current_location.latitude, 43.65)
+        self.assertTrue(replayer.drivers["d2"].is_available)
+
+    def test_skips_invalid_events(self):
+        events = [
+            TraceEvent(0, "driver_ping", "d1", 95.0, -79.64),
+            TraceEvent(1, "teleport", "d1"),
+            TraceEvent(2, "ride_complete", "nobody"),
+        ]
+        stats = TraceReplayer(self.ride_system).replay(events)
+        self.assertEqual((stats.events, stats.skipped, stats.drivers_registered), (3, 2, 0))
+
+    def test_rejects_cancelling_a_ride_in_trip(self):
+        replayer = TraceReplayer(self.ride_system)
+        replayer.replay([TraceEvent(0, "driver_ping", "d1", 43.59, -79.64), TraceEvent(1, "ride_request", "r1", 43.591, -79.641, 43.65, -79.6)])
+        ride = replayer.active_rides["r1"]
+        ride.start_ride()
+        stats = replayer.replay([TraceEvent(2, "ride_cancel", "r1")])
+        self.assertEqual((stats.skipped, stats.cancelled, stats.completed), (1, 0, 0))
+        self.assertEqual(ride.ride_status, RideStatus.IN_TRIP)
+        # The ride stays active, so the trip's completion row still applies
+        stats = replayer.replay([TraceEvent(3, "ride_complete", "r1")])
+        self.assertEqual(stats.completed, 1)
+        self.assertEqual(ride.ride_status, RideStatus.COMPLETED)
+
+    def test_speed_multiplier_paces_replay(self):
+        clock = FakeClock()
+        events = [TraceEvent(time, "driver_ping", "d1", 43.59, -79.64) for time in (1000, 1060, 1060, 1120)]
+        TraceReplayer(self.ride_system, speed_multiplier=60, clock=clock, sleep=clock.sleep).replay(events)
+        self.assertEqual(clock.sleeps, [1.0, 1.0])
+        self.assertEqual(clock.now, 102.0)
+
+    def test_merges_streams_by_timestamp(self):
+        pings = [TraceEvent(0, "driver_ping", "d1"), TraceEvent(5, "driver_ping", "d1")]
+        trips = [TraceEvent(3, "ride_request", "r1")]
+        self.assertEqual([event.timestamp for event in merge_traces(pings, trips)], [0, 3, 5])
+
+    def test_reads_parquet_when_pyarrow_installed(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet as parquet
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        columns = {column: [row[index] if row[index] != "" else None for row in ROWS] for index, column in enumerate(TRACE_COLUMNS)}
+        columns["subject_id"] = [str(value) for value in columns["subject_id"]]
+        path = os.path.join(self.directory.name, "trace.parquet")
+        parquet.write_table(pyarrow.table(columns), path)
+        self.assertEqual([len(chunk) for chunk in read_parquet_chunks(path, chunk_rows=4)], [4, 3])
+        self.assertEqual(list(iter_trace(path)), list(iter_trace(self.write_csv("trace.csv", ROWS))))
+
+if __name__ == "__main__":
+    unittest.main()